@@ -40,6 +40,9 @@ class Settings(BaseSettings):
     MONGO_CONNECT_TIMEOUT_MS: int = Field(default=30000)  # 连接超时：30秒（原为10秒）
     MONGO_SOCKET_TIMEOUT_MS: int = Field(default=60000)   # 套接字超时：60秒（原为20秒）
     MONGO_SERVER_SELECTION_TIMEOUT_MS: int = Field(default=5000)  # 服务器选择超时：5秒
+    # 历史行情批量写入：每批操作数与同时进行的批次数
+    HISTORICAL_BULK_BATCH_SIZE: int = Field(default=1000, ge=1)
+    HISTORICAL_BULK_CONCURRENCY: int = Field(default=4, ge=1)
 
     @property
     def MONGO_URI(self) -> str:
@@ -135,6 +138,10 @@ class Settings(BaseSettings):
     SSE_TASK_MAX_IDLE_SECONDS: int = Field(default=300)
     SSE_BATCH_POLL_INTERVAL_SECONDS: float = Field(default=2.0)
     SSE_BATCH_MAX_IDLE_SECONDS: int = Field(default=600)
+    # 分析过程中把 LLM 输出增量推送到 task_progress 频道（SSE/WebSocket 的 report_delta 事件）
+    ANALYSIS_STREAM_TOKENS: bool = Field(default=True)
+    ANALYSIS_STREAM_FLUSH_INTERVAL_SECONDS: float = Field(default=0.2)
+    ANALYSIS_STREAM_FLUSH_CHARS: int = Field(default=200)
 
 
     # 监控配置
@@ -147,6 +154,10 @@ class Settings(BaseSettings):
     # - db：以数据库为准（仅兼容旧版，不推荐）
     # - hybrid：文件/env 优先，DB 作为兜底
     CONFIG_SOT: str = Field(default="file")
+    # 配置快照：system_configs / llm_providers 的进程内只读副本
+    # 每隔 CHECK_INTERVAL 秒对比一次 Redis 中的配置版本号，超过 MAX_AGE 秒无条件重新加载
+    CONFIG_SNAPSHOT_CHECK_INTERVAL_SECONDS: float = Field(default=2.0)
+    CONFIG_SNAPSHOT_MAX_AGE_SECONDS: float = Field(default=300.0)
 
 
     # 基础信息同步任务配置（可配置调度）
@@ -196,8 +207,16 @@ class Settings(BaseSettings):
     TUSHARE_QUOTES_SYNC_CRON: str = Field(default="*/5 9-15 * * 1-5")  # 交易时间每5分钟
     TUSHARE_HISTORICAL_SYNC_ENABLED: bool = Field(default=True)
     TUSHARE_HISTORICAL_SYNC_CRON: str = Field(default="0 16 * * 1-5")  # 工作日16点
+    # 增量日线同步按交易日拉取全市场数据（每个交易日一次请求），缺口超过该交易日数的股票仍逐只同步
+    TUSHARE_HISTORICAL_SYNC_BY_DATE: bool = Field(default=True)
+    TUSHARE_HISTORICAL_SYNC_BY_DATE_MAX_DATES: int = Field(default=30, ge=1)
     TUSHARE_FINANCIAL_SYNC_ENABLED: bool = Field(default=True)
     TUSHARE_FINANCIAL_SYNC_CRON: str = Field(default="0 3 * * 0")  # 周日凌晨3点
+    # 财务数据同步流水线：并发获取的股票数、每批写入的股票数
+    TUSHARE_FINANCIAL_SYNC_CONCURRENCY: int = Field(default=4, ge=1)
+    TUSHARE_FINANCIAL_WRITE_BATCH_SIZE: int = Field(default=50, ge=1)
+    # 按报告期批量获取全部公司报表（*_vip 接口，需要 5000 积分）：auto 表示 premium/vip 等级时启用
+    TUSHARE_FINANCIAL_PERIOD_BULK: str = Field(default="auto", description="auto/true/false")
     TUSHARE_STATUS_CHECK_ENABLED: bool = Field(default=True)
     TUSHARE_STATUS_CHECK_CRON: str = Field(default="0 * * * *")  # 每小时
 
@@ -276,6 +295,11 @@ class Settings(BaseSettings):
     NEWS_SYNC_HOURS_BACK: int = Field(default=24)
     NEWS_SYNC_MAX_PER_SOURCE: int = Field(default=50)
 
+    # ===== 使用统计预聚合 =====
+    USAGE_ROLLUP_REFRESH_ENABLED: bool = Field(default=True)
+    USAGE_ROLLUP_REFRESH_CRON: str = Field(default="*/15 * * * *")  # 每15分钟重算最近的桶
+    USAGE_ROLLUP_LOOKBACK_HOURS: int = Field(default=48)
+
     @property
     def is_production(self) -> bool:
         """是否为生产环境"""
@@ -259,16 +259,9 @@ class UnifiedConfigManager:
     def get_data_source_configs(self) -> List[DataSourceConfig]:
         """获取数据源配置 - 优先从数据库读取，回退到硬编码（同步版本）"""
         try:
-            # 🔥 优先从数据库读取配置（使用同步连接）
-            from app.core.database import get_mongo_db_sync
-            db = get_mongo_db_sync()
-            config_collection = db.system_configs
-
-            # 获取最新的激活配置
-            config_data = config_collection.find_one(
-                {"is_active": True},
-                sort=[("version", -1)]
-            )
+            # 🔥 优先从数据库读取配置（进程内配置快照，同步版本）
+            from app.services.config_snapshot import get_config_snapshot_store
+            config_data = get_config_snapshot_store().get_sync().system_config_doc()
 
             if config_data and config_data.get('data_source_configs'):
                 # 从数据库读取到配置
@@ -327,16 +320,9 @@ class UnifiedConfigManager:
     async def get_data_source_configs_async(self) -> List[DataSourceConfig]:
         """获取数据源配置 - 优先从数据库读取，回退到硬编码（异步版本）"""
         try:
-            # 🔥 优先从数据库读取配置（使用异步连接）
-            from app.core.database import get_mongo_db
-            db = get_mongo_db()
-            config_collection = db.system_configs
-
-            # 获取最新的激活配置
-            config_data = await config_collection.find_one(
-                {"is_active": True},
-                sort=[("version", -1)]
-            )
+            # 🔥 优先从数据库读取配置（进程内配置快照，异步版本）
+            from app.services.config_snapshot import get_config_snapshot_store
+            config_data = (await get_config_snapshot_store().get()).system_config_doc()
 
             if config_data and config_data.get('data_source_configs'):
                 # 从数据库读取到配置
@@ -569,6 +569,25 @@ async def lifespan(app: FastAPI):
         else:
             logger.info(f"📰 新闻数据同步已配置（仅自选股）: {settings.NEWS_SYNC_CRON}")
 
+        # 使用统计预聚合：首次启动时构建，之后定时重算最近的桶
+        from app.services.usage_statistics_service import usage_statistics_service
+        try:
+            await usage_statistics_service.ensure_rollups()
+        except Exception as e:
+            logger.warning(f"⚠️ 使用统计预聚合初始化失败: {e}")
+        scheduler.add_job(
+            usage_statistics_service.refresh_recent_rollups,
+            CronTrigger.from_crontab(settings.USAGE_ROLLUP_REFRESH_CRON, timezone=settings.TIMEZONE),
+            id="usage_rollup_refresh",
+            name="使用统计预聚合重算",
+            kwargs={"lookback_hours": settings.USAGE_ROLLUP_LOOKBACK_HOURS}
+        )
+        if not settings.USAGE_ROLLUP_REFRESH_ENABLED:
+            scheduler.pause_job("usage_rollup_refresh")
+            logger.info(f"⏸️ 使用统计预聚合重算已添加但暂停: {settings.USAGE_ROLLUP_REFRESH_CRON}")
+        else:
+            logger.info(f"📊 使用统计预聚合重算已配置: {settings.USAGE_ROLLUP_REFRESH_CRON}")
+
         scheduler.start()
 
         # 设置调度器实例到服务中，以便API可以管理任务
@@ -33,7 +33,7 @@ class LogExportRequest(BaseModel):
     level: Optional[str] = Field(default=None, description="日志级别过滤")
     start_time: Optional[str] = Field(default=None, description="开始时间（ISO格式）")
     end_time: Optional[str] = Field(default=None, description="结束时间（ISO格式）")
-    format: str = Field(default="zip", description="导出格式：zip, txt")
+    format: str = Field(default="zip", description="导出格式：zip, txt, gz")
 
 
 # 响应模型
@@ -132,6 +132,7 @@ async def export_logs(
     支持导出格式：
     - zip: 压缩包（推荐）
     - txt: 合并的文本文件
+    - gz: gzip 压缩的合并文本文件
     
     支持过滤条件：
     - filenames: 指定要导出的文件
@@ -153,7 +154,7 @@ async def export_logs(
         # 返回文件下载
         import os
         filename = os.path.basename(export_path)
-        media_type = "application/zip" if request.format == "zip" else "text/plain"
+        media_type = {"zip": "application/zip", "gz": "application/gzip"}.get(request.format, "text/plain")
         
         return FileResponse(
             path=export_path,
@@ -67,7 +67,9 @@ async def task_progress_generator(task_id: str, user_id: str):
                     idle_elapsed = 0.0
                     try:
                         progress_data = json.loads(message['data'])
-                        yield f"event: progress\ndata: {json.dumps(progress_data, ensure_ascii=False)}\n\n"
+                        # 报告增量（LLM 输出流）与进度更新共用频道，用事件类型区分
+                        event = "report_delta" if progress_data.get("type") == "report_delta" else "progress"
+                        yield f"event: {event}\ndata: {json.dumps(progress_data, ensure_ascii=False)}\n\n"
                     except json.JSONDecodeError:
                         logger.warning(f"Invalid JSON in progress message: {message['data']}")
                 else:
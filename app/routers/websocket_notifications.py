@@ -197,6 +197,32 @@ async def websocket_notifications_endpoint(
         await manager.disconnect(websocket, user_id)
 
 
+async def forward_task_updates(websocket: WebSocket, pubsub, task_id: str):
+    """把任务进度频道的消息（进度、报告增量）转发给 WebSocket 客户端
+
+    读取频道或发送失败（如客户端已断开）时记录日志并结束转发，不抛出异常。
+    """
+    while True:
+        try:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+        except Exception as e:
+            logger.warning(f"⚠️ [WS-Task] 读取进度频道失败，停止转发: task={task_id}, error={e}")
+            return
+        if not message or message.get("type") != "message":
+            continue
+        try:
+            payload = json.loads(message["data"])
+        except json.JSONDecodeError:
+            logger.warning(f"Invalid JSON in progress message: {message['data']}")
+            continue
+        msg_type = "report_delta" if payload.get("type") == "report_delta" else "progress"
+        try:
+            await websocket.send_json({"type": msg_type, "data": payload})
+        except Exception as e:
+            logger.info(f"🔌 [WS-Task] 发送进度失败，停止转发: task={task_id}, error={e}")
+            return
+
+
 @router.websocket("/ws/tasks/{task_id}")
 async def websocket_task_progress_endpoint(
     websocket: WebSocket,
@@ -210,7 +236,7 @@ async def websocket_task_progress_endpoint(
     
     消息格式:
     {
-        "type": "progress",  // 消息类型: progress, completed, error, heartbeat
+        "type": "progress",  // 消息类型: progress, report_delta, completed, error, heartbeat
         "data": {
             "task_id": "...",
             "message": "正在分析...",
@@ -244,9 +270,20 @@ async def websocket_task_progress_endpoint(
         }
     })
     
+    # 订阅 Redis 任务进度频道（与 SSE 相同），转发进度和报告增量
+    pubsub = None
+    forward_task = None
+    try:
+        from app.core.database import get_redis_client
+        pubsub = get_redis_client().pubsub()
+        await pubsub.subscribe(channel)
+    except Exception as e:
+        logger.warning(f"⚠️ [WS-Task] 订阅进度频道失败，仅保持连接: task={task_id}, error={e}")
+        pubsub = None
+
     try:
-        # 这里可以从 Redis 或数据库获取任务进度
-        # 暂时保持连接，等待任务完成
+        if pubsub is not None:
+            forward_task = asyncio.create_task(forward_task_updates(websocket, pubsub, task_id))
         while True:
             try:
                 data = await websocket.receive_text()
@@ -259,6 +296,18 @@ async def websocket_task_progress_endpoint(
                 break
     
     finally:
+        if forward_task is not None:
+            forward_task.cancel()
+            try:
+                await forward_task
+            except asyncio.CancelledError:
+                pass
+        if pubsub is not None:
+            try:
+                await pubsub.unsubscribe(channel)
+                await pubsub.close()
+            except Exception as e:
+                logger.debug(f"关闭 PubSub 连接失败: {e}")
         logger.info(f"🔌 [WS-Task] 断开连接: task={task_id}")
 
 
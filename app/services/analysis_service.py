@@ -121,16 +121,10 @@ class AnalysisService:
             deep_model_config = None
 
             try:
-                from pymongo import MongoClient
-                from app.core.config import settings
+                from app.services.config_snapshot import get_config_snapshot_store
 
-                # 使用同步 MongoDB 客户端
-                client = MongoClient(settings.MONGO_URI)
-                db = client[settings.MONGO_DB]
-                collection = db.system_configs
-
-                # 查询最新的活跃配置
-                doc = collection.find_one({"is_active": True}, sort=[("version", -1)])
+                # 从进程内配置快照读取最新的活跃配置
+                doc = get_config_snapshot_store().get_sync().system_config_doc()
 
                 if doc and "llm_configs" in doc:
                     llm_configs = doc["llm_configs"]
@@ -249,16 +243,10 @@ class AnalysisService:
             deep_model_config = None
 
             try:
-                from pymongo import MongoClient
-                from app.core.config import settings
-
-                # 使用同步 MongoDB 客户端
-                client = MongoClient(settings.MONGO_URI)
-                db = client[settings.MONGO_DB]
-                collection = db.system_configs
+                from app.services.config_snapshot import get_config_snapshot_store
 
-                # 查询最新的活跃配置
-                doc = collection.find_one({"is_active": True}, sort=[("version", -1)])
+                # 从进程内配置快照读取最新的活跃配置
+                doc = get_config_snapshot_store().get_sync().system_config_doc()
 
                 if doc and "llm_configs" in doc:
                     llm_configs = doc["llm_configs"]
@@ -12,6 +12,7 @@ from bson import ObjectId
 
 from app.core.database import get_mongo_db
 from app.core.unified_config import unified_config
+from app.services.config_snapshot import get_config_snapshot_store
 from app.models.config import (
     SystemConfig, LLMConfig, DataSourceConfig, DatabaseConfig,
     ModelProvider, DataSourceType, DatabaseType, LLMProvider,
@@ -39,6 +40,14 @@ class ConfigService:
                 self.db = get_mongo_db()
         return self.db
 
+    async def _get_snapshot(self):
+        """获取 system_configs / llm_providers 的进程内快照"""
+        return await get_config_snapshot_store().get(await self._get_db())
+
+    async def _notify_config_changed(self):
+        """system_configs 或 llm_providers 写入后调用，使各进程的配置快照失效"""
+        await get_config_snapshot_store().notify_changed()
+
     # ==================== 市场分类管理 ====================
 
     async def get_market_categories(self) -> List[MarketCategory]:
@@ -276,6 +285,7 @@ class ConfigService:
                                 }
                             }
                         )
+                        await self._notify_config_changed()
                         logger.info(f"✅ [优先级同步] system_configs 版本更新: {version} -> {version + 1}")
                     else:
                         logger.warning(f"⚠️ [优先级同步] 未找到匹配的数据源配置: {data_source_name}")
@@ -346,6 +356,7 @@ class ConfigService:
                             }
                         }
                     )
+                    await self._notify_config_changed()
                     print(f"✅ [优先级同步] 已同步更新 system_configs 集合，新版本: {config_data.get('version', 0) + 1}")
                 else:
                     print(f"⚠️ [优先级同步] 没有找到需要更新的数据源配置")
@@ -360,19 +371,12 @@ class ConfigService:
             return False
 
     async def get_system_config(self) -> Optional[SystemConfig]:
-        """获取系统配置 - 优先从数据库获取最新数据"""
+        """获取系统配置 - 从配置快照读取，配置写入后快照随版本号刷新"""
         try:
-            # 直接从数据库获取最新配置，避免缓存问题
-            db = await self._get_db()
-            config_collection = db.system_configs
-
-            config_data = await config_collection.find_one(
-                {"is_active": True},
-                sort=[("version", -1)]
-            )
+            snapshot = await self._get_snapshot()
+            config_data = snapshot.system_config_doc()
 
             if config_data:
-                print(f"📊 从数据库获取配置，版本: {config_data.get('version', 0)}, LLM配置数量: {len(config_data.get('llm_configs', []))}")
                 return SystemConfig(**config_data)
 
             # 如果没有配置，创建默认配置
@@ -552,6 +556,7 @@ class ConfigService:
 
             insert_result = await config_collection.insert_one(config_dict)
             print(f"📝 新配置ID: {insert_result.inserted_id}")
+            await self._notify_config_changed()
 
             # 验证保存结果
             saved_config = await config_collection.find_one({"_id": insert_result.inserted_id})
@@ -2751,10 +2756,8 @@ class ConfigService:
     async def get_llm_providers(self) -> List[LLMProvider]:
         """获取所有大模型厂家（合并环境变量配置）"""
         try:
-            db = await self._get_db()
-            providers_collection = db.llm_providers
-
-            providers_data = await providers_collection.find().to_list(length=None)
+            snapshot = await self._get_snapshot()
+            providers_data = snapshot.provider_docs()
             providers = []
 
             logger.info(f"🔍 [get_llm_providers] 从数据库获取到 {len(providers_data)} 个供应商")
@@ -2891,6 +2894,7 @@ class ConfigService:
                 del provider_data["_id"]
 
             result = await providers_collection.insert_one(provider_data)
+            await self._notify_config_changed()
             return str(result.inserted_id)
         except Exception as e:
             print(f"添加厂家失败: {e}")
@@ -2929,6 +2933,8 @@ class ConfigService:
             # 修复：matched_count > 0 表示找到了记录（即使没有修改）
             # modified_count > 0 只有在实际修改了字段时才为真
             # 如果记录存在但值相同，modified_count 为 0，但这不应该返回 404
+            if result.matched_count > 0:
+                await self._notify_config_changed()
             return result.matched_count > 0
         except Exception as e:
             print(f"更新厂家失败: {e}")
@@ -2978,6 +2984,8 @@ class ConfigService:
                 result = await providers_collection.delete_one({"_id": provider_id})
 
             success = result.deleted_count > 0
+            if success:
+                await self._notify_config_changed()
 
             print(f"🗑️ 删除结果: {success}, deleted_count: {result.deleted_count}")
             return success
@@ -3015,6 +3023,8 @@ class ConfigService:
                     {"$set": {"is_active": is_active, "updated_at": now_tz()}}
                 )
 
+            if result.matched_count > 0:
+                await self._notify_config_changed()
             return result.matched_count > 0
         except Exception as e:
             print(f"切换厂家状态失败: {e}")
@@ -3099,6 +3109,9 @@ class ConfigService:
                 else:
                     print(f"✅ 添加聚合渠道: {config['display_name']} (需手动配置 API Key)")
 
+            if added_count or updated_count:
+                await self._notify_config_changed()
+
             message_parts = []
             if added_count > 0:
                 message_parts.append(f"成功添加 {added_count} 个聚合渠道")
@@ -3219,6 +3232,8 @@ class ConfigService:
                 print(f"✅ 创建厂家 {provider_config['display_name']}")
 
             total_changes = migrated_count + updated_count
+            if total_changes:
+                await self._notify_config_changed()
             message_parts = []
             if migrated_count > 0:
                 message_parts.append(f"新建 {migrated_count} 个厂家")
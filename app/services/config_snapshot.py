@@ -0,0 +1,251 @@
+"""
+配置快照
+- 在进程内保存 system_configs（当前激活版本）与 llm_providers 的只读副本，读取变为字典查找
+- 同时提供同步（get_sync）与异步（get）入口，同步入口复用全局同步 Mongo 客户端
+- 配置写入后调用 notify_changed：清除本进程快照，并递增 Redis 中的配置版本号；
+  其他进程最多每 CONFIG_SNAPSHOT_CHECK_INTERVAL_SECONDS 秒对比一次版本号，发现变化后重新加载
+- Redis 不可用或有绕过 ConfigService 的写入时，超过 CONFIG_SNAPSHOT_MAX_AGE_SECONDS 秒无条件重新加载
+"""
+import copy
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("app.services.config_snapshot")
+
+CONFIG_VERSION_KEY = "tradingagents:config_version"
+
+_ACTIVE_CONFIG_QUERY = {"is_active": True}
+_ACTIVE_CONFIG_SORT = [("version", -1)]
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """某一时刻的配置只读副本；访问方法返回深拷贝，调用方可以随意修改"""
+
+    system_config: Optional[Dict[str, Any]]
+    providers: Dict[str, Dict[str, Any]]
+    token: Optional[str] = None
+    loaded_at: float = field(default_factory=time.monotonic)
+    llm_configs: Dict[str, Dict[str, Any]] = field(init=False)
+
+    def __post_init__(self):
+        llm_configs: Dict[str, Dict[str, Any]] = {}
+        for config in (self.system_config or {}).get("llm_configs") or []:
+            # 与原先的线性查找一致：同名模型取第一条
+            llm_configs.setdefault(config.get("model_name"), config)
+        object.__setattr__(self, "llm_configs", llm_configs)
+
+    @classmethod
+    def from_documents(cls, system_config: Optional[Dict[str, Any]], providers: List[Dict[str, Any]],
+                       token: Optional[str] = None) -> "ConfigSnapshot":
+        by_name: Dict[str, Dict[str, Any]] = {}
+        for doc in providers:
+            by_name.setdefault(doc.get("name"), doc)
+        return cls(system_config=system_config, providers=by_name, token=token)
+
+    @property
+    def version(self) -> int:
+        return (self.system_config or {}).get("version", 0)
+
+    def system_config_doc(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self.system_config)
+
+    def find_llm_config(self, model_name: str) -> Optional[Dict[str, Any]]:
+        config = self.llm_configs.get(model_name)
+        return copy.deepcopy(config) if config is not None else None
+
+    def get_provider(self, name: str) -> Optional[Dict[str, Any]]:
+        doc = self.providers.get(name)
+        return copy.deepcopy(doc) if doc is not None else None
+
+    def provider_docs(self) -> List[Dict[str, Any]]:
+        return copy.deepcopy(list(self.providers.values()))
+
+
+class ConfigSnapshotStore:
+    """进程内配置快照的加载、版本检查与失效"""
+
+    def __init__(self, check_interval: float = 2.0, max_age: float = 300.0):
+        """
+        Args:
+            check_interval: 两次对比 Redis 配置版本号的最小间隔（秒）
+            max_age: 快照最长使用时间（秒），超过后无条件重新加载
+        """
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._sync_redis = None
+        self._redis_retry_at = 0.0
+
+    # ---------- 读取 ----------
+
+    def _fresh(self, now: float) -> Optional[ConfigSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+        return None
+
+    def _is_stale(self, snapshot: Optional[ConfigSnapshot], token: Optional[str], now: float) -> bool:
+        if snapshot is None:
+            return True
+        return token != snapshot.token or now - snapshot.loaded_at >= self.max_age
+
+    def _install(self, snapshot: ConfigSnapshot, previous: Optional[ConfigSnapshot]) -> ConfigSnapshot:
+        self._snapshot = snapshot
+        self._checked_at = time.monotonic()
+        if previous is None or previous.version != snapshot.version or previous.token != snapshot.token:
+            logger.info(f"🔄 [配置快照] 已加载: 配置版本={snapshot.version}, "
+                        f"模型={len(snapshot.llm_configs)}, 厂家={len(snapshot.providers)}, 版本号={snapshot.token}")
+        return snapshot
+
+    def get_sync(self, db=None) -> ConfigSnapshot:
+        """同步获取配置快照（可在线程/同步代码中调用）"""
+        snapshot = self._fresh(time.monotonic())
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            now = time.monotonic()
+            snapshot = self._fresh(now)
+            if snapshot is not None:
+                return snapshot
+            previous = self._snapshot
+            token = self._read_token_sync()
+            if not self._is_stale(previous, token, now):
+                self._checked_at = now
+                return previous
+            try:
+                loaded = self._load_sync(db, token)
+            except Exception as e:
+                if previous is None:
+                    raise
+                logger.warning(f"⚠️ [配置快照] 重新加载失败，继续使用旧快照: {e}")
+                self._checked_at = now
+                return previous
+            return self._install(loaded, previous)
+
+    async def get(self, db=None) -> ConfigSnapshot:
+        """异步获取配置快照；db 为 Motor 数据库实例，默认使用全局连接"""
+        now = time.monotonic()
+        snapshot = self._fresh(now)
+        if snapshot is not None:
+            return snapshot
+        previous = self._snapshot
+        token = await self._read_token_async()
+        if not self._is_stale(previous, token, now):
+            self._checked_at = now
+            return previous
+        try:
+            loaded = await self._load_async(db, token)
+        except Exception as e:
+            if previous is None:
+                raise
+            logger.warning(f"⚠️ [配置快照] 重新加载失败，继续使用旧快照: {e}")
+            self._checked_at = now
+            return previous
+        return self._install(loaded, previous)
+
+    def _load_sync(self, db, token: Optional[str]) -> ConfigSnapshot:
+        if db is None:
+            from app.core.database import get_mongo_db_sync
+            db = get_mongo_db_sync()
+        doc = db.system_configs.find_one(_ACTIVE_CONFIG_QUERY, sort=_ACTIVE_CONFIG_SORT)
+        providers = list(db.llm_providers.find())
+        return ConfigSnapshot.from_documents(doc, providers, token)
+
+    async def _load_async(self, db, token: Optional[str]) -> ConfigSnapshot:
+        if db is None:
+            from app.core.database import get_mongo_db
+            db = get_mongo_db()
+        doc = await db.system_configs.find_one(_ACTIVE_CONFIG_QUERY, sort=_ACTIVE_CONFIG_SORT)
+        providers = await db.llm_providers.find().to_list(length=None)
+        return ConfigSnapshot.from_documents(doc, providers, token)
+
+    # ---------- 版本号 ----------
+
+    def _get_sync_redis(self):
+        if self._sync_redis is None:
+            import redis
+            from app.core.config import settings
+            self._sync_redis = redis.Redis.from_url(
+                settings.REDIS_URL, decode_responses=True,
+                socket_connect_timeout=0.5, socket_timeout=0.5,
+            )
+        return self._sync_redis
+
+    def _redis_failed(self, e: Exception):
+        # Redis 不可用时暂停访问，避免每次检查都等待连接超时
+        self._redis_retry_at = time.monotonic() + self.max_age
+        logger.debug(f"[配置快照] 读取配置版本号失败，改为按最长使用时间重新加载: {e}")
+
+    def _read_token_sync(self) -> Optional[str]:
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            return self._get_sync_redis().get(CONFIG_VERSION_KEY)
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+
+    async def _read_token_async(self) -> Optional[str]:
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            from app.core.database import get_redis_client
+            client = get_redis_client()
+        except Exception:
+            # 未初始化异步 Redis（如独立 worker 进程）时使用同步客户端
+            return self._read_token_sync()
+        try:
+            value = await client.get(CONFIG_VERSION_KEY)
+            return value.decode() if isinstance(value, bytes) else value
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+
+    # ---------- 失效 ----------
+
+    def invalidate(self):
+        """清除本进程快照，下次读取时重新加载"""
+        with self._lock:
+            self._snapshot = None
+            self._checked_at = 0.0
+
+    async def notify_changed(self):
+        """配置写入后调用：清除本进程快照并通知其他进程"""
+        self.invalidate()
+        try:
+            from app.core.database import get_redis_client
+            await get_redis_client().incr(CONFIG_VERSION_KEY)
+        except Exception:
+            self.notify_changed_sync(invalidate=False)
+
+    def notify_changed_sync(self, invalidate: bool = True):
+        """notify_changed 的同步版本"""
+        if invalidate:
+            self.invalidate()
+        try:
+            self._get_sync_redis().incr(CONFIG_VERSION_KEY)
+        except Exception as e:
+            logger.debug(f"[配置快照] 递增配置版本号失败，其他进程将在快照过期后刷新: {e}")
+
+
+_store: Optional[ConfigSnapshotStore] = None
+_store_lock = threading.Lock()
+
+
+def get_config_snapshot_store() -> ConfigSnapshotStore:
+    """获取进程内共享的配置快照"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            from app.core.config import settings
+            _store = ConfigSnapshotStore(
+                check_interval=settings.CONFIG_SNAPSHOT_CHECK_INTERVAL_SECONDS,
+                max_age=settings.CONFIG_SNAPSHOT_MAX_AGE_SECONDS,
+            )
+        return _store
@@ -8,6 +8,7 @@ from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional
 import pandas as pd
 from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
 
 from app.core.database import get_mongo_db
 
@@ -161,6 +162,63 @@ class FinancialDataService:
             logger.error(f"❌ 保存财务数据失败 {symbol}: {e}")
             return 0
     
+    async def save_financial_data_batch(
+        self,
+        items: List[Dict[str, Any]],
+        data_source: str,
+        market: str = "CN"
+    ) -> int:
+        """
+        批量保存多只股票的财务数据（一次无序批量写入）
+
+        Args:
+            items: 各股票的财务数据字典（需包含 symbol，报告期和报告类型取自 report_period/report_type）
+            data_source: 数据源 (tushare/akshare/baostock)
+            market: 市场类型 (CN/HK/US)
+
+        Returns:
+            保存的记录数量
+        """
+        if self.db is None:
+            await self.initialize()
+
+        operations = []
+        for item in items:
+            standardized_data = self._standardize_financial_data(
+                item["symbol"], item, data_source, market,
+                item.get("report_period"), item.get("report_type", "quarterly")
+            )
+            if not standardized_data:
+                continue
+            for data_item in standardized_data if isinstance(standardized_data, list) else [standardized_data]:
+                operations.append(ReplaceOne(
+                    filter={
+                        "symbol": data_item["symbol"],
+                        "report_period": data_item["report_period"],
+                        "data_source": data_item["data_source"]
+                    },
+                    replacement=data_item,
+                    upsert=True
+                ))
+
+        if not operations:
+            return 0
+
+        try:
+            result = await self.db[self.collection_name].bulk_write(operations, ordered=False)
+            saved_count = result.upserted_count + result.modified_count
+        except BulkWriteError as e:
+            # 无序写入：单条失败不影响其他记录
+            details = e.details or {}
+            saved_count = details.get("nUpserted", 0) + details.get("nModified", 0)
+            logger.error(f"❌ 批量保存财务数据部分失败: {len(details.get('writeErrors', []))} 条错误")
+        except Exception as e:
+            logger.error(f"❌ 批量保存财务数据失败: {e}")
+            return 0
+
+        logger.info(f"✅ 批量保存财务数据完成: {saved_count}/{len(operations)} 条记录")
+        return saved_count
+
     async def get_financial_data(
         self,
         symbol: str,
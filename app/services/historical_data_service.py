@@ -6,14 +6,84 @@
 import asyncio
 import logging
 from datetime import datetime, date
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
 
+from app.core.config import settings
 from app.core.database import get_database
 
 logger = logging.getLogger(__name__)
 
+# 可选字段：字段名 -> 候选列（按顺序取第一个非空值，与逐行实现的 `a or b` 语义一致）
+_OPTIONAL_FIELDS = {
+    "turnover_rate": ("turnover_rate", "turn"),
+    "volume_ratio": ("volume_ratio",),
+    "pe": ("pe",),
+    "pb": ("pb",),
+    "ps": ("ps",),
+    "adjustflag": ("adjustflag", "adj_factor"),
+    "tradestatus": ("tradestatus",),
+    "isST": ("isST",),
+}
+
+
+def _is_falsy(value) -> bool:
+    try:
+        return not value
+    except (TypeError, ValueError):
+        return False
+
+
+def _pick_column(data: pd.DataFrame, names: Tuple[str, ...]) -> Tuple[pd.Series, np.ndarray]:
+    """按 `row.get(a) or row.get(b)` 的语义在列上选值
+
+    Returns:
+        (所选的值, 该值是否为 None 的掩码)。列不存在或对象列中的 None 都记为 None。
+    """
+    n = len(data)
+    first = data[names[0]] if names[0] in data.columns else None
+    if first is not None and pd.api.types.is_numeric_dtype(first) and first.dtype != bool:
+        # 常见情况：首个候选是数值列且没有 0 值，无需回退到后面的候选
+        if len(names) == 1 or not (first == 0).any():
+            return first, np.zeros(n, dtype=bool)
+
+    result = pd.Series([None] * n, index=data.index, dtype=object)
+    is_none = np.ones(n, dtype=bool)
+    pending = np.ones(n, dtype=bool)  # 前面的候选为假值，需要继续取下一个候选
+    for name in names:
+        if name in data.columns:
+            col = data[name]
+            if col.dtype == object:
+                col_none = col.map(lambda v: v is None).to_numpy(dtype=bool)
+                col_falsy = col.map(_is_falsy).to_numpy(dtype=bool)
+            elif col.dtype == bool:
+                col_none = np.zeros(n, dtype=bool)
+                col_falsy = ~col.to_numpy()
+            else:
+                col_none = np.zeros(n, dtype=bool)
+                col_falsy = (col == 0).to_numpy(dtype=bool)
+        else:
+            col, col_none, col_falsy = None, np.ones(n, dtype=bool), np.ones(n, dtype=bool)
+        if col is not None:
+            result = result.mask(pending, col.astype(object))
+        else:
+            result = result.mask(pending, None)
+        is_none = np.where(pending, col_none, is_none)
+        pending = pending & col_falsy
+    return result, is_none
+
+
+def _to_float(values: pd.Series) -> np.ndarray:
+    """向量化的 _safe_float：无法转换的值和空值为 NaN"""
+    if pd.api.types.is_numeric_dtype(values) and values.dtype != bool:
+        return values.to_numpy(dtype=float)
+    if values.dtype == object:
+        values = values.map(lambda v: "" if v is None else v)
+    return pd.to_numeric(values, errors="coerce").astype(float).to_numpy()
+
 
 class HistoricalDataService:
     """统一历史数据管理服务"""
@@ -62,6 +132,14 @@ class HistoricalDataService:
                 ("trade_date", -1)
             ], name="symbol_date_index", background=True)
 
+            # 5. 复合索引：数据源+周期+股票代码+交易日期（一次聚合取全部股票的最新日期）
+            await self.collection.create_index([
+                ("data_source", 1),
+                ("period", 1),
+                ("symbol", 1),
+                ("trade_date", -1)
+            ], name="source_period_symbol_date_index", background=True)
+
             logger.info("✅ 历史数据索引检查完成")
         except Exception as e:
             # 索引创建失败不应该阻止服务启动
@@ -105,17 +183,7 @@ class HistoricalDataService:
             convert_start = datetime.now()
             # 🔥 在 DataFrame 层面做单位转换（向量化操作，比逐行快得多）
             if data_source == "tushare":
-                # 成交额：千元 -> 元
-                if 'amount' in data.columns:
-                    data['amount'] = data['amount'] * 1000
-                elif 'turnover' in data.columns:
-                    data['turnover'] = data['turnover'] * 1000
-
-                # 成交量：手 -> 股
-                if 'volume' in data.columns:
-                    data['volume'] = data['volume'] * 100
-                elif 'vol' in data.columns:
-                    data['vol'] = data['vol'] * 100
+                self._convert_tushare_units(data)
 
             # 🔥 港股/美股数据：添加 pre_close 字段（从前一天的 close 获取）
             if market in ["HK", "US"] and 'pre_close' not in data.columns and 'close' in data.columns:
@@ -127,62 +195,41 @@ class HistoricalDataService:
 
             # ⏱️ 性能监控：构建操作列表
             prepare_start = datetime.now()
-            # 准备批量操作
-            operations = []
-            saved_count = 0
-            batch_size = 200  # 进一步减小批量大小，避免超时（从500改为200）
-
-            for date_index, row in data.iterrows():
-                try:
-                    # 标准化数据（传递日期索引）
-                    doc = self._standardize_record(symbol, row, data_source, market, period, date_index)
-
-                    # 创建upsert操作
-                    filter_doc = {
+            try:
+                # 列式标准化：整表向量化处理后一次性转换为文档
+                docs = self._standardize_frame(symbol, data, data_source, market, period)
+            except Exception as e:
+                logger.warning(f"⚠️ {symbol} 列式标准化失败，回退到逐行处理: {e}")
+                docs = self._standardize_rows(symbol, data, data_source, market, period)
+
+            operations = [
+                ReplaceOne(
+                    filter={
                         "symbol": doc["symbol"],
                         "trade_date": doc["trade_date"],
                         "data_source": doc["data_source"],
                         "period": doc["period"]
-                    }
-
-                    from pymongo import ReplaceOne
-                    operations.append(ReplaceOne(
-                        filter=filter_doc,
-                        replacement=doc,
-                        upsert=True
-                    ))
-
-                    # 批量执行（每200条）
-                    if len(operations) >= batch_size:
-                        batch_write_start = datetime.now()
-                        batch_saved = await self._execute_bulk_write_with_retry(symbol, operations)
-                        batch_write_duration = (datetime.now() - batch_write_start).total_seconds()
-                        logger.debug(f"   批量写入 {len(operations)} 条，耗时 {batch_write_duration:.2f}秒")
-                        saved_count += batch_saved
-                        operations = []
-
-                except Exception as e:
-                    # 获取日期信息用于错误日志
-                    date_str = str(date_index) if hasattr(date_index, '__str__') else 'unknown'
-                    logger.error(f"❌ 处理记录失败 {symbol} {date_str}: {e}")
-                    continue
-
+                    },
+                    replacement=doc,
+                    upsert=True
+                )
+                for doc in docs
+            ]
             prepare_duration = (datetime.now() - prepare_start).total_seconds()
 
-            # ⏱️ 性能监控：最后一批写入
-            final_write_start = datetime.now()
-            # 执行剩余操作
-            if operations:
-                saved_count += await self._execute_bulk_write_with_retry(
-                    symbol, operations
-                )
-            final_write_duration = (datetime.now() - final_write_start).total_seconds()
+            # ⏱️ 性能监控：批量写入（无序批量，多个批次在信号量限制下并发执行）
+            write_start = datetime.now()
+            saved_count = await self._bulk_write_concurrently(symbol, operations)
+            write_duration = (datetime.now() - write_start).total_seconds()
+
+            if saved_count:
+                await self._append_to_bar_store(symbol, docs, data_source, market, period)
 
             total_duration = (datetime.now() - total_start).total_seconds()
             logger.info(
                 f"✅ {symbol} 历史数据保存完成: {saved_count}条记录，"
                 f"总耗时 {total_duration:.2f}秒 "
-                f"(转换: {convert_duration:.3f}秒, 准备: {prepare_duration:.2f}秒, 最后写入: {final_write_duration:.2f}秒)"
+                f"(转换: {convert_duration:.3f}秒, 准备: {prepare_duration:.3f}秒, 写入: {write_duration:.2f}秒)"
             )
             return saved_count
             
@@ -190,6 +237,152 @@ class HistoricalDataService:
             logger.error(f"❌ 保存历史数据失败 {symbol}: {e}")
             return 0
 
+    async def save_market_data(
+        self,
+        data: pd.DataFrame,
+        data_source: str,
+        market: str = "CN",
+        period: str = "daily"
+    ) -> int:
+        """
+        保存多只股票的行情数据（如某个交易日的全市场日线）
+
+        与 save_historical_data 相同的标准化和写入逻辑，但整表只标准化一次、
+        所有股票的记录合并为一组并发批量写入。
+
+        Args:
+            data: 行情数据，必须包含 symbol 列（6位代码）
+            data_source: 数据源 (tushare/akshare/baostock)
+            market: 市场类型 (CN/HK/US)
+            period: 数据周期 (daily/weekly/monthly)
+
+        Returns:
+            保存的记录数量
+        """
+        if self.collection is None:
+            await self.initialize()
+
+        if data is None or data.empty:
+            return 0
+
+        try:
+            total_start = datetime.now()
+            data = data.reset_index(drop=True)
+            if data_source == "tushare":
+                self._convert_tushare_units(data)
+
+            docs = self._standardize_frame("", data, data_source, market, period)
+            for doc, symbol in zip(docs, data["symbol"].astype(str).tolist()):
+                doc["symbol"] = doc["code"] = symbol
+                doc["full_symbol"] = self._get_full_symbol(symbol, market)
+
+            operations = [
+                ReplaceOne(
+                    filter={
+                        "symbol": doc["symbol"],
+                        "trade_date": doc["trade_date"],
+                        "data_source": doc["data_source"],
+                        "period": doc["period"]
+                    },
+                    replacement=doc,
+                    upsert=True
+                )
+                for doc in docs
+            ]
+            saved_count = await self._bulk_write_concurrently(f"{data_source}全市场", operations)
+            if saved_count:
+                await self._append_to_bar_store(f"{data_source}全市场", docs, data_source, market, period)
+
+            total_duration = (datetime.now() - total_start).total_seconds()
+            logger.info(f"✅ 全市场{period}数据保存完成: {saved_count}条记录，耗时 {total_duration:.2f}秒")
+            return saved_count
+
+        except Exception as e:
+            logger.error(f"❌ 保存全市场{period}数据失败: {e}")
+            return 0
+
+    @staticmethod
+    def _convert_tushare_units(data: pd.DataFrame):
+        """Tushare 单位转换（原地）：成交额 千元 -> 元，成交量 手 -> 股"""
+        if 'amount' in data.columns:
+            data['amount'] = data['amount'] * 1000
+        elif 'turnover' in data.columns:
+            data['turnover'] = data['turnover'] * 1000
+
+        if 'volume' in data.columns:
+            data['volume'] = data['volume'] * 100
+        elif 'vol' in data.columns:
+            data['vol'] = data['vol'] * 100
+
+    async def _append_to_bar_store(
+        self,
+        symbol: str,
+        docs: List[Dict[str, Any]],
+        data_source: str,
+        market: str,
+        period: str
+    ):
+        """把已写入 MongoDB 的 K 线同步追加到列式存储（TA_BAR_STORE_ENABLED 开启时），失败不影响保存结果
+
+        存储关闭或追加失败时清除该数据源的就绪标记，避免重新开启后读取方拿到缺失的 K 线。
+        """
+        try:
+            from tradingagents.dataflows.cache.bar_store import bar_store_enabled, get_bar_store
+
+            store = get_bar_store()
+            if not bar_store_enabled():
+                await asyncio.to_thread(store.invalidate, market, period, data_source)
+                return
+        except Exception as e:
+            logger.warning(f"⚠️ {symbol} 检查列式存储失败: {e}")
+            return
+
+        try:
+            appended = await asyncio.to_thread(store.append_documents, market, period, data_source, docs)
+            logger.debug(f"🗃️ {symbol} 追加到列式存储: {appended}条")
+        except Exception as e:
+            logger.warning(f"⚠️ {symbol} 追加列式存储失败: {e}")
+            try:
+                await asyncio.to_thread(store.invalidate, market, period, data_source)
+            except Exception as invalidate_error:
+                logger.warning(f"⚠️ {symbol} 清除列式存储就绪标记失败: {invalidate_error}")
+
+    async def _bulk_write_concurrently(
+        self,
+        symbol: str,
+        operations: List,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> int:
+        """
+        分批并发执行批量写入
+
+        Args:
+            symbol: 股票代码
+            operations: 批量操作列表
+            batch_size: 每批操作数（默认 HISTORICAL_BULK_BATCH_SIZE）
+            concurrency: 同时进行的批次数（默认 HISTORICAL_BULK_CONCURRENCY）
+
+        Returns:
+            成功保存的记录数
+        """
+        if not operations:
+            return 0
+        batch_size = batch_size or settings.HISTORICAL_BULK_BATCH_SIZE
+        semaphore = asyncio.Semaphore(concurrency or settings.HISTORICAL_BULK_CONCURRENCY)
+
+        async def write_batch(batch: List) -> int:
+            async with semaphore:
+                batch_write_start = datetime.now()
+                batch_saved = await self._execute_bulk_write_with_retry(symbol, batch)
+                batch_write_duration = (datetime.now() - batch_write_start).total_seconds()
+                logger.debug(f"   批量写入 {len(batch)} 条，耗时 {batch_write_duration:.2f}秒")
+                return batch_saved
+
+        batches = [operations[i:i + batch_size] for i in range(0, len(operations), batch_size)]
+        results = await asyncio.gather(*(write_batch(batch) for batch in batches))
+        return sum(results)
+
     async def _execute_bulk_write_with_retry(
         self,
         symbol: str,
@@ -245,6 +438,132 @@ class HistoricalDataService:
 
         return saved_count
 
+    def _standardize_frame(
+        self,
+        symbol: str,
+        data: pd.DataFrame,
+        data_source: str,
+        market: str,
+        period: str = "daily"
+    ) -> List[Dict[str, Any]]:
+        """列式标准化整张表，结果与逐行调用 _standardize_record 一致"""
+        now = datetime.utcnow()
+        n = len(data)
+
+        trade_date = self._format_date_column(data)
+
+        prices = {}
+        for field, names in (
+            ("open", ("open",)),
+            ("high", ("high",)),
+            ("low", ("low",)),
+            ("close", ("close",)),
+            ("pre_close", ("pre_close", "preclose")),
+            ("volume", ("volume", "vol")),
+            ("amount", ("amount", "turnover")),
+        ):
+            prices[field] = _to_float(_pick_column(data, names)[0])
+
+        # 计算涨跌数据（收盘价和昨收都有效且非零时计算，否则使用原始列）
+        close, pre_close = prices["close"], prices["pre_close"]
+        computable = (np.nan_to_num(close) != 0) & (np.nan_to_num(pre_close) != 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            computed_change = np.round(close - pre_close, 4)
+            computed_pct = np.round(computed_change / pre_close * 100, 4)
+        change = np.where(computable, computed_change, _to_float(_pick_column(data, ("change",))[0]))
+        pct_chg = np.where(computable, computed_pct,
+                           _to_float(_pick_column(data, ("pct_chg", "change_percent"))[0]))
+
+        base = {
+            "symbol": symbol,
+            "code": symbol,  # 添加 code 字段，与 symbol 保持一致（向后兼容）
+            "full_symbol": self._get_full_symbol(symbol, market),
+            "market": market,
+        }
+        constants = {
+            "period": period,
+            "data_source": data_source,
+            "created_at": now,
+            "updated_at": now,
+            "version": 1,
+        }
+        columns = {
+            "trade_date": trade_date,
+            **prices,
+            "change": change,
+            "pct_chg": pct_chg,
+        }
+        # 可选字段：所选值为 None 的行不写该字段
+        partial_fields = {}
+        for field, names in _OPTIONAL_FIELDS.items():
+            values, is_none = _pick_column(data, names)
+            if is_none.all():
+                continue
+            columns[field] = _to_float(values)
+            if is_none.any():
+                partial_fields[field] = is_none
+
+        # 按列转换为 Python 值（NaN -> None）后一次性组装文档
+        fields = list(base) + ["trade_date"] + list(constants) + [k for k in columns if k != "trade_date"]
+        values = [[value] * n for value in base.values()]
+        values.append(trade_date.tolist() if isinstance(trade_date, np.ndarray) else [trade_date] * n)
+        values.extend([value] * n for value in constants.values())
+        for field, column in columns.items():
+            if field == "trade_date":
+                continue
+            column = np.asarray(column, dtype=float)
+            missing = np.isnan(column)
+            values.append(np.where(missing, None, column).tolist() if missing.any() else column.tolist())
+        docs = [dict(zip(fields, row)) for row in zip(*values)]
+
+        for field, is_none in partial_fields.items():
+            for i in np.flatnonzero(is_none):
+                docs[i].pop(field, None)
+        return docs
+
+    def _format_date_column(self, data: pd.DataFrame) -> Union[pd.Series, str]:
+        """列式的交易日期格式化（与 _format_date 的规则一致）"""
+        dates, is_none = _pick_column(data, ("date", "trade_date"))
+        if is_none.all():
+            index = data.index
+            if isinstance(index, pd.DatetimeIndex):
+                return np.asarray(index.strftime('%Y-%m-%d'), dtype=object)
+            if len(index) and all(isinstance(v, (date, datetime, pd.Timestamp)) for v in index):
+                return np.array([self._format_date(v) for v in index], dtype=object)
+            return self._format_date(None)
+
+        kind = pd.api.types.infer_dtype(dates, skipna=True)
+        if kind == "string" and not is_none.any():
+            text = dates.astype(str)
+            compact = (text.str.len() == 8).to_numpy()
+            formatted = text.str[:4] + "-" + text.str[4:6] + "-" + text.str[6:8]
+            return np.where(compact, formatted, text)
+        if kind in ("datetime64", "datetime", "date") and not is_none.any():
+            return pd.to_datetime(dates).dt.strftime('%Y-%m-%d').to_numpy()
+        # 混合类型或部分缺失：逐个格式化，缺失的行与逐行实现一样回退到日期索引或当天
+        return np.array([
+            self._format_date(value) if not missing else
+            self._format_date(index_value if isinstance(index_value, (date, datetime, pd.Timestamp)) else None)
+            for value, missing, index_value in zip(dates, is_none, data.index)
+        ], dtype=object)
+
+    def _standardize_rows(
+        self,
+        symbol: str,
+        data: pd.DataFrame,
+        data_source: str,
+        market: str,
+        period: str = "daily"
+    ) -> List[Dict[str, Any]]:
+        """逐行标准化（列式处理失败时的回退路径）"""
+        docs = []
+        for date_index, row in data.iterrows():
+            try:
+                docs.append(self._standardize_record(symbol, row, data_source, market, period, date_index))
+            except Exception as e:
+                logger.error(f"❌ 处理记录失败 {symbol} {date_index}: {e}")
+        return docs
+
     def _standardize_record(
         self,
         symbol: str,
@@ -448,6 +767,24 @@ class HistoricalDataService:
             logger.error(f"❌ 获取最新日期失败 {symbol}: {e}")
             return None
     
+    async def get_latest_dates(self, data_source: str, period: str = "daily") -> Dict[str, str]:
+        """一次聚合查询所有股票的最新数据日期 {symbol: YYYY-MM-DD}（替代逐只调用 get_latest_date）"""
+        if self.collection is None:
+            await self.initialize()
+
+        try:
+            # $sort 与 source_period_symbol_date_index 一致，$group 取 $first 可以走索引
+            results = await self.collection.aggregate([
+                {"$match": {"data_source": data_source, "period": period}},
+                {"$sort": {"data_source": 1, "period": 1, "symbol": 1, "trade_date": -1}},
+                {"$group": {"_id": "$symbol", "latest_date": {"$first": "$trade_date"}}}
+            ], allowDiskUse=True).to_list(length=None)
+            return {item["_id"]: item["latest_date"] for item in results if item.get("_id")}
+
+        except Exception as e:
+            logger.error(f"❌ 批量获取最新日期失败 {data_source}: {e}")
+            return {}
+
     async def get_data_statistics(self) -> Dict[str, Any]:
         """获取数据统计信息"""
         if self.collection is None:
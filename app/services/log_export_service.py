@@ -3,14 +3,15 @@
 提供日志文件的查询、过滤和导出功能
 """
 
+import gzip
 import logging
 import os
 import zipfile
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Optional, Dict, Any
-import re
-import json
+
+from app.services import log_reader
 
 logger = logging.getLogger("webapi")
 
@@ -154,17 +155,13 @@ class LogExportService:
             raise FileNotFoundError(f"日志文件不存在: {filename}")
         
         try:
-            # 读取文件内容
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                all_lines = f.readlines()
-            
-            # 从末尾开始读取指定行数
-            recent_lines = all_lines[-lines:] if len(all_lines) > lines else all_lines
-            
+            # 从文件末尾（或时间范围的起点）定位读取，不再把整个文件读入内存
+            recent_lines = log_reader.last_lines(file_path, lines, start_time, end_time)
+
             # 应用过滤器
             filtered_lines = []
             stats = {
-                "total_lines": len(all_lines),
+                "total_lines": log_reader.count_lines(file_path),
                 "filtered_lines": 0,
                 "error_count": 0,
                 "warning_count": 0,
@@ -184,23 +181,8 @@ class LogExportService:
                     stats["debug_count"] += 1
                 
                 # 应用过滤条件
-                if level and level.upper() not in line:
-                    continue
-                
-                if keyword and keyword.lower() not in line.lower():
-                    continue
-                
-                # 时间过滤（简单实现，假设日志格式为 YYYY-MM-DD HH:MM:SS）
-                if start_time or end_time:
-                    time_match = re.search(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}', line)
-                    if time_match:
-                        log_time = time_match.group()
-                        if start_time and log_time < start_time:
-                            continue
-                        if end_time and log_time > end_time:
-                            continue
-                
-                filtered_lines.append(line.rstrip())
+                if log_reader.matches(line, level, keyword):
+                    filtered_lines.append(line)
             
             stats["filtered_lines"] = len(filtered_lines)
             
@@ -230,7 +212,7 @@ class LogExportService:
             level: 日志级别过滤
             start_time: 开始时间
             end_time: 结束时间
-            format: 导出格式（zip, txt）
+            format: 导出格式（zip, txt, gz）
             
         Returns:
             导出文件的路径
@@ -252,57 +234,42 @@ class LogExportService:
             # 生成导出文件名
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             
+            filtered = bool(level or start_time or end_time)
+
             if format == "zip":
                 export_path = export_dir / f"logs_export_{timestamp}.zip"
                 
-                # 创建ZIP文件
+                # 创建ZIP文件（过滤后的内容直接流式写入压缩包，不经过临时文件）
                 with zipfile.ZipFile(export_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                     for file_path in files_to_export:
-                        # 如果有过滤条件，先过滤再添加
-                        if level or start_time or end_time:
-                            filtered_data = self.read_log_file(
-                                file_path.name,
-                                lines=999999,  # 读取所有行
-                                level=level,
-                                start_time=start_time,
-                                end_time=end_time
-                            )
-                            # 将过滤后的内容写入临时文件
-                            temp_file = export_dir / f"temp_{file_path.name}"
-                            with open(temp_file, 'w', encoding='utf-8') as f:
-                                f.write('\n'.join(filtered_data['lines']))
-                            zipf.write(temp_file, file_path.name)
-                            temp_file.unlink()  # 删除临时文件
+                        if filtered:
+                            with zipf.open(file_path.name, 'w', force_zip64=True) as entry:
+                                self._write_lines(entry, file_path, level, start_time, end_time)
                         else:
                             zipf.write(file_path, file_path.name)
                 
                 logger.info(f"✅ 日志导出成功: {export_path}")
                 return str(export_path)
             
-            elif format == "txt":
-                export_path = export_dir / f"logs_export_{timestamp}.txt"
+            elif format in ("txt", "gz"):
+                suffix = "txt.gz" if format == "gz" else "txt"
+                export_path = export_dir / f"logs_export_{timestamp}.{suffix}"
+                opener = gzip.open if format == "gz" else open
                 
-                # 合并所有日志到一个文本文件
-                with open(export_path, 'w', encoding='utf-8') as outf:
+                # 合并所有日志到一个文本文件（gz 格式边写边压缩）
+                with opener(export_path, 'wb') as outf:
                     for file_path in files_to_export:
-                        outf.write(f"\n{'='*80}\n")
-                        outf.write(f"文件: {file_path.name}\n")
-                        outf.write(f"{'='*80}\n\n")
+                        header = f"\n{'='*80}\n文件: {file_path.name}\n{'='*80}\n\n"
+                        outf.write(header.encode('utf-8'))
                         
-                        if level or start_time or end_time:
-                            filtered_data = self.read_log_file(
-                                file_path.name,
-                                lines=999999,
-                                level=level,
-                                start_time=start_time,
-                                end_time=end_time
-                            )
-                            outf.write('\n'.join(filtered_data['lines']))
+                        if filtered:
+                            self._write_lines(outf, file_path, level, start_time, end_time)
                         else:
-                            with open(file_path, 'r', encoding='utf-8', errors='ignore') as inf:
-                                outf.write(inf.read())
+                            with open(file_path, 'rb') as inf:
+                                for block in iter(lambda: inf.read(log_reader.BLOCK_SIZE), b""):
+                                    outf.write(block)
                         
-                        outf.write('\n\n')
+                        outf.write(b'\n\n')
                 
                 logger.info(f"✅ 日志导出成功: {export_path}")
                 return str(export_path)
@@ -314,6 +281,18 @@ class LogExportService:
             logger.error(f"❌ 导出日志失败: {e}")
             raise
 
+    @staticmethod
+    def _write_lines(out, file_path: Path, level: Optional[str], start_time: Optional[str],
+                     end_time: Optional[str]) -> int:
+        """把过滤后的行流式写入二进制输出，返回写入的行数"""
+        written = 0
+        for line in log_reader.iter_filtered(file_path, level, None, start_time, end_time):
+            if written:
+                out.write(b'\n')
+            out.write(line.encode('utf-8'))
+            written += 1
+        return written
+
     def get_log_statistics(self, days: int = 7) -> Dict[str, Any]:
         """
         获取日志统计信息
@@ -356,10 +335,9 @@ class LogExportService:
                     stats["error_files"] += 1
                     # 读取最近的错误
                     try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            lines = f.readlines()
-                            error_lines = [line for line in lines[-100:] if "ERROR" in line]
-                            stats["recent_errors"].extend(error_lines[-10:])
+                        lines = log_reader.tail_lines(file_path, 100)
+                        error_lines = [line for line in lines if "ERROR" in line]
+                        stats["recent_errors"].extend(error_lines[-10:])
                     except Exception:
                         pass
             
@@ -0,0 +1,246 @@
+"""
+日志文件读取器
+按块从文件末尾向前读取最后 N 行；按固定字节间隔记录 时间戳→偏移 的稀疏索引，
+时间范围查询先二分定位起始偏移再顺序读取。所有读取都以生成器流式返回，
+内存占用与文件大小无关（日志文件每天可达数百 MB）。
+"""
+
+import bisect
+import gzip
+import os
+import re
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional
+
+BLOCK_SIZE = 64 * 1024
+# 稀疏索引的间隔：每 1MB 记录一个检查点
+INDEX_STRIDE = 1024 * 1024
+
+# 日志格式均以 %(asctime)s 开头，只识别行首的时间戳（消息正文里的日期不算）
+_TIMESTAMP_RE = re.compile(rb"\[?(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})")
+# 连续这么多条晚于 end_time 的行之后才停止读取（多进程写入时时间戳可能轻微乱序）
+END_STREAK_LINES = 100
+
+
+def normalize_time(value: Optional[str]) -> Optional[str]:
+    """把 ISO 时间（可带 T 分隔符、毫秒、时区）转换为日志中的 'YYYY-MM-DD HH:MM:SS' 格式以便按字符串比较"""
+    if not value:
+        return None
+    return value.replace("T", " ")[:19]
+
+
+def line_timestamp(line: bytes) -> Optional[str]:
+    """行首的 'YYYY-MM-DD HH:MM:SS' 时间戳；没有（如堆栈行）返回 None"""
+    match = _TIMESTAMP_RE.match(line)
+    return match.group(1).decode("ascii") if match else None
+
+
+def _decode(line: bytes) -> str:
+    return line.decode("utf-8", errors="ignore").rstrip("\r\n")
+
+
+def _is_compressed(path: Path) -> bool:
+    return path.suffix == ".gz"
+
+
+def tail_lines(path: Path, count: int, block_size: int = BLOCK_SIZE) -> List[str]:
+    """返回文件最后 count 行：从末尾按块向前读取，只读取需要的部分"""
+    if count <= 0:
+        return []
+    if _is_compressed(path):
+        with gzip.open(path, "rb") as f:
+            return [_decode(line) for line in deque(f, maxlen=count)]
+
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        blocks: Deque[bytes] = deque()
+        newlines = 0
+        # 多读一个换行符，保证最早的一行是完整的
+        while position > 0 and newlines <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            block = f.read(step)
+            blocks.appendleft(block)
+            newlines += block.count(b"\n")
+        data = b"".join(blocks)
+
+    lines = data.split(b"\n")
+    if lines and lines[-1] == b"":
+        lines.pop()
+    return [_decode(line) for line in lines[-count:]]
+
+
+class LogFileIndex:
+    """单个日志文件的稀疏时间索引与行数统计
+
+    文件追加增长时只处理新增部分；文件被截断或轮转（inode 变化）时重建。
+    """
+
+    def __init__(self, path: Path, stride: int = INDEX_STRIDE):
+        self.path = path
+        self.stride = stride
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, inode):
+        self.inode = inode
+        self.indexed_size = 0
+        self.newlines = 0
+        self.ends_with_newline = True
+        self.next_checkpoint = 0
+        self.timestamps: List[str] = []
+        self.offsets: List[int] = []
+
+    def refresh(self) -> "LogFileIndex":
+        """索引文件新增的部分"""
+        with self._lock:
+            stat = self.path.stat()
+            if stat.st_ino != self.inode or stat.st_size < self.indexed_size:
+                self._reset(stat.st_ino)
+            if stat.st_size == self.indexed_size:
+                return self
+
+            with open(self.path, "rb") as f:
+                f.seek(self.indexed_size)
+                position = self.indexed_size
+                while position < stat.st_size:
+                    chunk = f.read(min(BLOCK_SIZE, stat.st_size - position))
+                    if not chunk:
+                        break
+                    self.newlines += chunk.count(b"\n")
+                    self.ends_with_newline = chunk.endswith(b"\n")
+                    position += len(chunk)
+                    if position >= self.next_checkpoint:
+                        self._add_checkpoint(f, stat.st_size)
+                self.indexed_size = position
+            return self
+
+    def _add_checkpoint(self, f, limit: int):
+        """在 next_checkpoint 之后第一个带时间戳的完整行的行首记录检查点"""
+        resume = f.tell()
+        f.seek(self.next_checkpoint)
+        if self.next_checkpoint > 0:
+            f.readline()  # 跳过被截断的行
+        next_checkpoint = self.next_checkpoint + self.stride
+        for _ in range(64):
+            line_start = f.tell()
+            if line_start >= limit:
+                break
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break
+            ts = line_timestamp(line)
+            if ts is not None:
+                # 多进程写入时时间戳可能轻微乱序，只保留单调递增的检查点以便二分
+                if not self.timestamps or ts >= self.timestamps[-1]:
+                    self.timestamps.append(ts)
+                    self.offsets.append(line_start)
+                next_checkpoint = line_start + self.stride
+                break
+        self.next_checkpoint = next_checkpoint
+        f.seek(resume)
+
+    @property
+    def line_count(self) -> int:
+        """行数（与 readlines() 的结果一致：末尾没有换行的最后一行也计入）"""
+        if self.indexed_size == 0:
+            return 0
+        return self.newlines + (0 if self.ends_with_newline else 1)
+
+    def seek_offset(self, start_time: Optional[str]) -> int:
+        """时间戳早于 start_time 的最后一个检查点的偏移（二分查找）"""
+        if not start_time:
+            return 0
+        i = bisect.bisect_left(self.timestamps, start_time)
+        return self.offsets[i - 1] if i > 0 else 0
+
+
+_indexes: Dict[str, LogFileIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_file_index(path: Path) -> LogFileIndex:
+    """获取（并增量刷新）文件的索引，索引在进程内按路径缓存"""
+    key = str(Path(path).resolve())
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = LogFileIndex(Path(path))
+    return index.refresh()
+
+
+def count_lines(path: Path) -> int:
+    """文件行数（普通文件使用增量索引，压缩文件流式计数）"""
+    if _is_compressed(path):
+        with gzip.open(path, "rb") as f:
+            return sum(1 for _ in f)
+    return get_file_index(path).line_count
+
+
+def iter_time_range(path: Path, start_time: Optional[str] = None,
+                    end_time: Optional[str] = None) -> Iterator[str]:
+    """流式返回时间范围内的行
+
+    没有时间戳的行（如异常堆栈）跟随前一行输出。晚于 end_time 的行被跳过，
+    连续 END_STREAK_LINES 条带时间戳的行都晚于 end_time 时才停止读取
+    （日志按时间顺序追加，但多进程写入时可能轻微乱序）。
+    """
+    start_time, end_time = normalize_time(start_time), normalize_time(end_time)
+    if _is_compressed(path):
+        f = gzip.open(path, "rb")
+    else:
+        offset = get_file_index(path).seek_offset(start_time) if start_time else 0
+        f = open(path, "rb")
+        f.seek(offset)
+    with f:
+        started = start_time is None
+        in_range = started
+        past_end = 0
+        for raw in f:
+            ts = line_timestamp(raw)
+            if ts is not None:
+                if end_time and ts > end_time:
+                    past_end += 1
+                    if past_end >= END_STREAK_LINES:
+                        return
+                    in_range = False
+                    continue
+                past_end = 0
+                if not started:
+                    started = ts >= start_time
+                in_range = started
+            if in_range:
+                yield _decode(raw)
+
+
+def matches(line: str, level: Optional[str] = None, keyword: Optional[str] = None) -> bool:
+    """级别、关键词过滤（与原有的子串匹配规则一致）"""
+    if level and level.upper() not in line:
+        return False
+    if keyword and keyword.lower() not in line.lower():
+        return False
+    return True
+
+
+def iter_filtered(path: Path, level: Optional[str] = None, keyword: Optional[str] = None,
+                  start_time: Optional[str] = None, end_time: Optional[str] = None) -> Iterator[str]:
+    """流式返回满足全部过滤条件的行"""
+    for line in iter_time_range(path, start_time, end_time):
+        if matches(line, level, keyword):
+            yield line
+
+
+def last_lines(path: Path, count: int, start_time: Optional[str] = None,
+               end_time: Optional[str] = None) -> List[str]:
+    """时间范围内的最后 count 行
+
+    没有时间范围时直接从文件末尾向前读取；有时间范围时从索引定位的位置顺序读取，
+    只保留最后 count 行。
+    """
+    if not start_time and not end_time:
+        return tail_lines(path, count)
+    return list(deque(iter_time_range(path, start_time, end_time), maxlen=count))
@@ -122,17 +122,10 @@ class ModelCapabilityService:
         """
         # 1. 优先从 MongoDB 数据库配置读取（使用同步客户端）
         try:
-            from pymongo import MongoClient
-            from app.core.config import settings
-            from app.models.config import SystemConfig
+            from app.services.config_snapshot import get_config_snapshot_store
 
-            # 使用同步 MongoDB 客户端
-            client = MongoClient(settings.MONGO_URI)
-            db = client[settings.MONGO_DB]
-            collection = db.system_configs  # 注意：集合名是复数
-
-            # 查询系统配置（与 config_service 保持一致）
-            doc = collection.find_one({"is_active": True}, sort=[("version", -1)])
+            # 从进程内配置快照读取系统配置（与 config_service 保持一致）
+            doc = get_config_snapshot_store().get_sync().system_config_doc()
 
             logger.info(f"🔍 [MongoDB] 查询结果: doc={'存在' if doc else '不存在'}")
             if doc:
@@ -171,9 +164,6 @@ class ModelCapabilityService:
 
                         logger.info(f"📊 [MongoDB配置] {model_name}: features={features_enum}, roles={roles_enum}")
 
-                        # 关闭连接
-                        client.close()
-
                         return {
                             "model_name": config_dict.get("model_name"),
                             "capability_level": config_dict.get('capability_level', 2),
@@ -183,9 +173,6 @@ class ModelCapabilityService:
                             "performance_metrics": config_dict.get('performance_metrics', None)
                         }
 
-            # 关闭连接
-            client.close()
-
         except Exception as e:
             logger.warning(f"从 MongoDB 读取模型信息失败: {e}", exc_info=True)
 
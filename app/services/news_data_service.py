@@ -2,6 +2,7 @@
 新闻数据服务
 提供统一的新闻数据存储、查询和管理功能
 """
+from collections import defaultdict
 from typing import Optional, List, Dict, Any, Union
 from datetime import datetime, timedelta
 from dataclasses import dataclass
@@ -11,9 +12,19 @@ from pymongo.errors import BulkWriteError
 from bson import ObjectId
 
 from app.core.database import get_database
+from tradingagents.dataflows.news.near_duplicate import (
+    NearDuplicateIndex,
+    band_keys,
+    news_signature,
+    signature_from_bytes,
+    signature_to_bytes,
+)
 
 logger = logging.getLogger(__name__)
 
+# 查询结果中排除近似重复检测用的指纹字段（二进制签名不能直接序列化为 JSON）
+FINGERPRINT_EXCLUDE_PROJECTION = {"minhash": 0, "minhash_bands": 0}
+
 
 def convert_objectid_to_str(data: Union[Dict, List[Dict]]) -> Union[Dict, List[Dict]]:
     """
@@ -78,6 +89,9 @@ class NewsStats:
 class NewsDataService:
     """新闻数据服务"""
     
+    # 近似重复查重的时间窗口（天）：只与该窗口内发布的新闻比较
+    NEAR_DUPLICATE_WINDOW_DAYS = 7
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self._db = None
@@ -130,6 +144,12 @@ class NewsDataService:
             # 10. 更新时间索引（数据维护）
             await collection.create_index([("updated_at", -1)], name="updated_at_index", background=True)
 
+            # 11. 近似重复检测的 LSH 桶索引（多键索引，查重只扫描同桶候选）
+            await collection.create_index([
+                ("minhash_bands", 1),
+                ("publish_time", -1)
+            ], name="minhash_bands_time_index", background=True)
+
             self._indexes_ensured = True
             self.logger.info("✅ 新闻数据索引检查完成")
         except Exception as e:
@@ -176,14 +196,18 @@ class NewsDataService:
             if not news_list:
                 return 0
             
+            # 标准化数据，并跳过库中已有的近似重复新闻（改写标题的转载稿）
+            standardized_list = [
+                self._standardize_news_data(news, data_source, market, now) for news in news_list
+            ]
+            query, projection = self._near_duplicate_query(standardized_list)
+            existing = await collection.find(query, projection).to_list(length=None) if query else []
+            standardized_list = self._drop_near_duplicates(standardized_list, existing)
+
             # 准备批量操作
             operations = []
 
-            for i, news in enumerate(news_list):
-                # 标准化新闻数据
-                standardized_news = self._standardize_news_data(
-                    news, data_source, market, now
-                )
+            for i, standardized_news in enumerate(standardized_list):
 
                 # 🔍 记录前3条数据的详细信息
                 if i < 3:
@@ -276,14 +300,20 @@ class NewsDataService:
             if not news_list:
                 return 0
 
+            self.logger.info(f"📝 开始标准化 {len(news_list)} 条新闻数据...")
+
+            # 标准化数据，并跳过库中已有的近似重复新闻（改写标题的转载稿）
+            standardized_list = [
+                self._standardize_news_data(news, data_source, market, now) for news in news_list
+            ]
+            query, projection = self._near_duplicate_query(standardized_list)
+            existing = list(collection.find(query, projection)) if query else []
+            standardized_list = self._drop_near_duplicates(standardized_list, existing)
+
             # 准备批量操作
             operations = []
 
-            self.logger.info(f"📝 开始标准化 {len(news_list)} 条新闻数据...")
-
-            for i, news in enumerate(news_list, 1):
-                # 标准化新闻数据
-                standardized_news = self._standardize_news_data(news, data_source, market, now)
+            for i, standardized_news in enumerate(standardized_list, 1):
 
                 # 记录前3条新闻的详细信息
                 if i <= 3:
@@ -394,8 +424,68 @@ class NewsDataService:
             "updated_at": now,
             "version": 1
         }
-        
+
+        # 近似重复检测指纹（MinHash 签名 + LSH 桶键）
+        signature = news_signature(standardized["title"], standardized["content"])
+        if signature is not None:
+            standardized["minhash"] = signature_to_bytes(signature)
+            standardized["minhash_bands"] = band_keys(signature)
+
         return standardized
+
+    def _near_duplicate_query(self, docs: List[Dict[str, Any]]):
+        """构造查询：与本批新闻属于相同股票、共享 LSH 桶、且发布时间在窗口内的已有新闻
+
+        查重按股票隔离：同一篇转载稿关联到不同股票时各自保留，否则按股票查询会丢失新闻。
+        """
+        bands = sorted({key for doc in docs for key in doc.get("minhash_bands", ())})
+        if not bands:
+            return None, None
+        # None 匹配没有股票代码的市场新闻
+        symbols = list({doc.get("symbol") for doc in docs if doc.get("minhash_bands")})
+        query: Dict[str, Any] = {"minhash_bands": {"$in": bands}, "symbol": {"$in": symbols}}
+        times = [doc["publish_time"] for doc in docs if doc.get("publish_time")]
+        if times:
+            query["publish_time"] = {"$gte": min(times) - timedelta(days=self.NEAR_DUPLICATE_WINDOW_DAYS)}
+        projection = {"symbol": 1, "url": 1, "title": 1, "publish_time": 1, "minhash": 1, "minhash_bands": 1}
+        return query, projection
+
+    def _drop_near_duplicates(
+        self,
+        docs: List[Dict[str, Any]],
+        existing: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """去掉与同一股票的已有新闻或本批中更早新闻近似重复的条目
+
+        与已有记录 URL+标题+发布时间完全相同的条目是更新，照常写入。
+        """
+        def identity(doc):
+            return (doc.get("url"), doc.get("title"), doc.get("publish_time"))
+
+        batch_identities = {identity(doc) for doc in docs}
+        indexes: Dict[Optional[str], NearDuplicateIndex] = defaultdict(NearDuplicateIndex)
+        for doc in existing:
+            if doc.get("minhash") and identity(doc) not in batch_identities:
+                indexes[doc.get("symbol")].add(
+                    identity(doc), signature_from_bytes(doc["minhash"]), doc.get("minhash_bands"))
+
+        kept = []
+        for doc in docs:
+            if "minhash" not in doc:
+                kept.append(doc)
+                continue
+            signature = signature_from_bytes(doc["minhash"])
+            index = indexes[doc.get("symbol")]
+            duplicate_of = index.find(signature, doc["minhash_bands"])
+            if duplicate_of is not None and duplicate_of != identity(doc):
+                self.logger.debug(f"🔁 跳过近似重复新闻: {doc.get('title', '')[:50]} ≈ {duplicate_of[1][:50]}")
+                continue
+            index.add(identity(doc), signature, doc["minhash_bands"])
+            kept.append(doc)
+
+        if len(kept) < len(docs):
+            self.logger.info(f"🔁 近似重复新闻已跳过: {len(docs) - len(kept)}条")
+        return kept
     
     def _get_full_symbol(self, symbol: str, market: str) -> str:
         """获取完整股票代码"""
@@ -517,8 +607,8 @@ class NewsDataService:
             total_count = await collection.count_documents(query)
             self.logger.info(f"   数据库中符合条件的总记录数: {total_count}")
 
-            # 执行查询
-            cursor = collection.find(query)
+            # 执行查询（不返回近似重复检测用的指纹字段）
+            cursor = collection.find(query, FINGERPRINT_EXCLUDE_PROJECTION)
 
             # 排序
             cursor = cursor.sort(params.sort_by, params.sort_order)
@@ -737,7 +827,7 @@ class NewsDataService:
             # 执行搜索，按相关性排序
             cursor = collection.find(
                 query,
-                {"score": {"$meta": "textScore"}}
+                {"score": {"$meta": "textScore"}, **FINGERPRINT_EXCLUDE_PROJECTION}
             ).sort([("score", {"$meta": "textScore"})])
 
             cursor = cursor.limit(limit)
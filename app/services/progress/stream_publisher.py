@@ -0,0 +1,96 @@
+"""
+报告增量推送
+- 接收 TradingAgentsGraph.propagate 的 stream_callback(节点名, 增量文本)
+- 按节点缓冲，约每 0.2 秒或每 200 个字符合并为一条消息，避免逐 token 发布
+- 发布到与进度相同的 task_progress:{task_id} 频道，消息 type 为 report_delta
+- 没有 Redis 连接时不做任何事
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("app.services.progress.stream_publisher")
+
+
+class ReportStreamPublisher:
+    """把 LLM 输出增量批量发布到任务进度频道"""
+
+    def __init__(self, task_id: str, redis_client: Any = None,
+                 flush_interval: float = 0.2, flush_chars: int = 200):
+        """
+        Args:
+            task_id: 任务ID
+            redis_client: 同步 Redis 客户端（如 RedisProgressTracker.redis_client），None 表示不推送
+            flush_interval: 同一节点两次发布的最小间隔（秒）
+            flush_chars: 缓冲达到该字符数时立即发布
+        """
+        self.task_id = task_id
+        self.redis_client = redis_client
+        self.channel = f"task_progress:{task_id}"
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        self._buffers: Dict[str, str] = {}
+        self._last_flush: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.redis_client is not None
+
+    def __call__(self, node_name: str, delta: str) -> None:
+        """stream_callback：缓冲增量，满足条件时发布"""
+        if not self.enabled or not delta:
+            return
+        now = time.monotonic()
+        with self._lock:
+            buffered = self._buffers.get(node_name, "") + delta
+            last = self._last_flush.setdefault(node_name, now)
+            if len(buffered) < self.flush_chars and now - last < self.flush_interval:
+                self._buffers[node_name] = buffered
+                return
+            self._buffers[node_name] = ""
+            self._last_flush[node_name] = now
+        self._publish(node_name, buffered)
+
+    def flush(self) -> None:
+        """发布所有节点剩余的缓冲内容（分析结束时调用）"""
+        with self._lock:
+            pending = {node: text for node, text in self._buffers.items() if text}
+            self._buffers.clear()
+        for node_name, text in pending.items():
+            self._publish(node_name, text)
+
+    def _publish(self, node_name: str, delta: str) -> None:
+        message = {
+            "task_id": self.task_id,
+            "type": "report_delta",
+            "node": node_name,
+            "delta": delta,
+            "timestamp": datetime.now().isoformat(),
+        }
+        try:
+            self.redis_client.publish(self.channel, json.dumps(message, ensure_ascii=False))
+        except Exception as e:
+            # 推送失败不影响分析
+            logger.warning(f"⚠️ [报告流] 发布增量失败: {self.task_id} - {e}")
+
+
+def create_report_stream_publisher(task_id: str, progress_tracker: Any = None) -> Optional[ReportStreamPublisher]:
+    """根据配置创建增量推送器；未启用或没有 Redis 时返回 None"""
+    from app.core.config import settings
+
+    if not settings.ANALYSIS_STREAM_TOKENS:
+        return None
+    redis_client = getattr(progress_tracker, "redis_client", None) if getattr(progress_tracker, "use_redis", False) else None
+    if redis_client is None:
+        logger.debug(f"📡 [报告流] 未使用 Redis，跳过增量推送: {task_id}")
+        return None
+    return ReportStreamPublisher(
+        task_id,
+        redis_client,
+        flush_interval=settings.ANALYSIS_STREAM_FLUSH_INTERVAL_SECONDS,
+        flush_chars=settings.ANALYSIS_STREAM_FLUSH_CHARS,
+    )
@@ -2,8 +2,11 @@
 Queue 子包
 - keys: Redis 键名与常量
 - helpers: 队列相关的 Redis 操作辅助函数
+- scripts: 入队/出队/确认等原子操作的 Lua 脚本
 """
 from .keys import (
+    QUEUE_HASH_TAG,
+    KEY_PREFIX,
     READY_LIST,
     TASK_PREFIX,
     BATCH_PREFIX,
@@ -14,9 +17,12 @@ from .keys import (
     USER_PROCESSING_PREFIX,
     GLOBAL_CONCURRENT_KEY,
     VISIBILITY_TIMEOUT_PREFIX,
+    VISIBILITY_DEADLINES,
+    INFLIGHT_PREFIX,
     DEFAULT_USER_CONCURRENT_LIMIT,
     GLOBAL_CONCURRENT_LIMIT,
     VISIBILITY_TIMEOUT_SECONDS,
+    DEQUEUE_SCAN_LIMIT,
 )
 
 from .helpers import (
@@ -28,3 +34,40 @@ from .helpers import (
     clear_visibility_timeout,
 )
 
+from .scripts import (
+    ENQUEUE_LUA,
+    DEQUEUE_LUA,
+    ACK_LUA,
+    REQUEUE_EXPIRED_LUA,
+)
+
+__all__ = [
+    "QUEUE_HASH_TAG",
+    "KEY_PREFIX",
+    "READY_LIST",
+    "TASK_PREFIX",
+    "BATCH_PREFIX",
+    "SET_PROCESSING",
+    "SET_COMPLETED",
+    "SET_FAILED",
+    "BATCH_TASKS_PREFIX",
+    "USER_PROCESSING_PREFIX",
+    "GLOBAL_CONCURRENT_KEY",
+    "VISIBILITY_TIMEOUT_PREFIX",
+    "VISIBILITY_DEADLINES",
+    "INFLIGHT_PREFIX",
+    "DEFAULT_USER_CONCURRENT_LIMIT",
+    "GLOBAL_CONCURRENT_LIMIT",
+    "VISIBILITY_TIMEOUT_SECONDS",
+    "DEQUEUE_SCAN_LIMIT",
+    "check_user_concurrent_limit",
+    "check_global_concurrent_limit",
+    "mark_task_processing",
+    "unmark_task_processing",
+    "set_visibility_timeout",
+    "clear_visibility_timeout",
+    "ENQUEUE_LUA",
+    "DEQUEUE_LUA",
+    "ACK_LUA",
+    "REQUEUE_EXPIRED_LUA",
+]
@@ -12,6 +12,7 @@ from .keys import (
     SET_PROCESSING,
     USER_PROCESSING_PREFIX,
     VISIBILITY_TIMEOUT_PREFIX,
+    VISIBILITY_DEADLINES,
 )
 
 
@@ -52,10 +53,12 @@ async def set_visibility_timeout(r: Redis, task_id: str, worker_id: str, visibil
     }
     await r.hset(timeout_key, mapping=timeout_data)
     await r.expire(timeout_key, visibility_timeout)
+    await r.zadd(VISIBILITY_DEADLINES, {task_id: int(timeout_data["timeout_at"])})
 
 
 async def clear_visibility_timeout(r: Redis, task_id: str) -> None:
     """清除可见性超时"""
     timeout_key = VISIBILITY_TIMEOUT_PREFIX + task_id
     await r.delete(timeout_key)
+    await r.zrem(VISIBILITY_DEADLINES, task_id)
 
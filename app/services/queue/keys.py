@@ -3,22 +3,30 @@
 """
 
 # Redis键名常量
-READY_LIST = "qa:ready"
+# 所有键共享同一个哈希标签 {queue}：Lua 脚本需要在服务端按任务/用户拼接键名（出队时任务ID在脚本内才确定），
+# 只有全部键落在同一个槽位时，脚本才能在 Redis Cluster / 代理下正确执行。新增队列键必须使用 KEY_PREFIX。
+QUEUE_HASH_TAG = "{queue}"
+KEY_PREFIX = f"qa:{QUEUE_HASH_TAG}:"
 
-TASK_PREFIX = "qa:task:"
-BATCH_PREFIX = "qa:batch:"
-SET_PROCESSING = "qa:processing"
-SET_COMPLETED = "qa:completed"
-SET_FAILED = "qa:failed"
-BATCH_TASKS_PREFIX = "qa:batch_tasks:"
+READY_LIST = KEY_PREFIX + "ready"
+
+TASK_PREFIX = KEY_PREFIX + "task:"
+BATCH_PREFIX = KEY_PREFIX + "batch:"
+SET_PROCESSING = KEY_PREFIX + "processing"
+SET_COMPLETED = KEY_PREFIX + "completed"
+SET_FAILED = KEY_PREFIX + "failed"
+BATCH_TASKS_PREFIX = KEY_PREFIX + "batch_tasks:"
 
 # 并发控制相关
-USER_PROCESSING_PREFIX = "qa:user_processing:"
-GLOBAL_CONCURRENT_KEY = "qa:global_concurrent"
-VISIBILITY_TIMEOUT_PREFIX = "qa:visibility:"
+USER_PROCESSING_PREFIX = KEY_PREFIX + "user_processing:"
+GLOBAL_CONCURRENT_KEY = KEY_PREFIX + "global_concurrent"
+VISIBILITY_TIMEOUT_PREFIX = KEY_PREFIX + "visibility:"
+VISIBILITY_DEADLINES = KEY_PREFIX + "visibility_deadlines"  # 有序集合：任务ID -> 可见性超时截止时间
+INFLIGHT_PREFIX = KEY_PREFIX + "inflight:"  # 阻塞出队时每个Worker的暂存列表
 
 # 配置常量 - 开源版限制
 DEFAULT_USER_CONCURRENT_LIMIT = 3
 GLOBAL_CONCURRENT_LIMIT = 3  # 开源版全局最大并发限制为3
 VISIBILITY_TIMEOUT_SECONDS = 300  # 5分钟
+DEQUEUE_SCAN_LIMIT = 100  # 出队时最多向后扫描的就绪任务数（跳过已达并发上限的用户）
 
@@ -0,0 +1,145 @@
+"""
+队列操作的 Redis Lua 脚本：入队、出队（含并发检查）、确认、超时重新入队均在服务端原子执行，
+每个操作只需一次网络往返。
+
+调用方已知的键通过 KEYS 传入；出队、确认、超时重新入队时任务ID或用户ID要在脚本内才能确定，
+这部分键由 ARGV 传入的前缀在脚本内拼接。所有队列键都带同一个哈希标签 {queue}（见 keys.py），
+保证脚本访问的键位于同一槽位，可在 Redis Cluster / 代理下执行；不要传入不带该标签的键。
+"""
+
+# 入队：检查并发限制 -> 写任务哈希 -> 加入就绪队列 -> 记录批次
+# KEYS: [READY_LIST, SET_PROCESSING, 任务键, 用户处理中集合, 批次任务集合（无批次时为 BATCH_TASKS_PREFIX）]
+# ARGV: [task_id, user_id, symbol, params_json, now, batch_id, user_limit, global_limit]
+# 返回: "ok" | "user_limit" | "global_limit"
+ENQUEUE_LUA = """
+local task_key, user_key, batch_key = KEYS[3], KEYS[4], KEYS[5]
+local task_id, user_id, symbol, params, now, batch_id = ARGV[1], ARGV[2], ARGV[3], ARGV[4], ARGV[5], ARGV[6]
+local user_limit, global_limit = tonumber(ARGV[7]), tonumber(ARGV[8])
+
+if redis.call('SCARD', user_key) >= user_limit then
+    return 'user_limit'
+end
+if redis.call('SCARD', KEYS[2]) >= global_limit then
+    return 'global_limit'
+end
+
+redis.call('HSET', task_key,
+    'id', task_id, 'user', user_id, 'symbol', symbol, 'status', 'queued',
+    'created_at', now, 'params', params, 'enqueued_at', now)
+if batch_id ~= '' then
+    redis.call('HSET', task_key, 'batch_id', batch_id)
+    redis.call('SADD', batch_key, task_id)
+end
+redis.call('LPUSH', KEYS[1], task_id)
+return 'ok'
+"""
+
+# 出队：从最早入队的任务开始扫描，取第一个所属用户未达并发上限的任务并原子地标记为处理中。
+# 达到上限的用户的任务留在原位（不再出队后重新入队，也就不会打乱顺序或丢失）。
+# 状态不是 queued 的任务（如在就绪队列或暂存列表中时被取消）直接从队列移除，不会交给 Worker。
+# 如果提供了 inflight 列表（阻塞出队时 BRPOPLPUSH 的暂存列表），先把其中的任务放回队首。
+# KEYS: [READY_LIST, SET_PROCESSING, VISIBILITY_DEADLINES, inflight_list]
+# ARGV: [task_prefix, user_processing_prefix, visibility_prefix,
+#        worker_id, now, user_limit, global_limit, visibility_timeout, scan_limit]
+# 返回: {"ok", 任务哈希的扁平字段列表...} | {"empty"} | {"limited"}
+DEQUEUE_LUA = """
+local task_prefix, user_prefix, vis_prefix = ARGV[1], ARGV[2], ARGV[3]
+local worker_id, now = ARGV[4], tonumber(ARGV[5])
+local user_limit, global_limit = tonumber(ARGV[6]), tonumber(ARGV[7])
+local vis_timeout, scan_limit = tonumber(ARGV[8]), tonumber(ARGV[9])
+
+if KEYS[4] ~= '' then
+    local moved = redis.call('RPOP', KEYS[4])
+    while moved do
+        redis.call('RPUSH', KEYS[1], moved)
+        moved = redis.call('RPOP', KEYS[4])
+    end
+end
+
+if redis.call('LLEN', KEYS[1]) == 0 then
+    return {'empty'}
+end
+if redis.call('SCARD', KEYS[2]) >= global_limit then
+    return {'limited'}
+end
+
+local candidates = redis.call('LRANGE', KEYS[1], -scan_limit, -1)
+for i = #candidates, 1, -1 do
+    local task_id = candidates[i]
+    local task_key = task_prefix .. task_id
+    local info = redis.call('HMGET', task_key, 'user', 'status')
+    local user_id, status = info[1], info[2]
+    if not user_id or status ~= 'queued' then
+        -- 任务数据已不存在或已被取消，直接从队列移除
+        redis.call('LREM', KEYS[1], -1, task_id)
+    elseif redis.call('SCARD', user_prefix .. user_id) < user_limit then
+        redis.call('LREM', KEYS[1], -1, task_id)
+        redis.call('SADD', user_prefix .. user_id, task_id)
+        redis.call('SADD', KEYS[2], task_id)
+
+        local deadline = now + vis_timeout
+        local vis_key = vis_prefix .. task_id
+        redis.call('HSET', vis_key, 'task_id', task_id, 'worker_id', worker_id, 'timeout_at', tostring(deadline))
+        redis.call('EXPIRE', vis_key, vis_timeout)
+        redis.call('ZADD', KEYS[3], deadline, task_id)
+
+        redis.call('HSET', task_key, 'status', 'processing', 'worker_id', worker_id, 'started_at', tostring(now))
+        local result = redis.call('HGETALL', task_key)
+        table.insert(result, 1, 'ok')
+        return result
+    end
+end
+return {'limited'}
+"""
+
+# 确认：移出处理中集合 -> 清除可见性超时 -> 更新状态 -> 记入完成/失败集合
+# KEYS: [SET_PROCESSING, SET_COMPLETED, SET_FAILED, VISIBILITY_DEADLINES, 任务键, 可见性超时键]
+# ARGV: [user_processing_prefix, task_id, success(1/0), now]
+# 返回: 1 成功；0 任务不存在
+ACK_LUA = """
+local task_key, vis_key = KEYS[5], KEYS[6]
+local user_prefix = ARGV[1]
+local task_id, success, now = ARGV[2], ARGV[3] == '1', ARGV[4]
+if redis.call('EXISTS', task_key) == 0 then
+    return 0
+end
+-- 用户ID只能从任务哈希中读取，用户键在脚本内拼接（同一哈希标签）
+local user_id = redis.call('HGET', task_key, 'user') or ''
+redis.call('SREM', user_prefix .. user_id, task_id)
+redis.call('SREM', KEYS[1], task_id)
+redis.call('DEL', vis_key)
+redis.call('ZREM', KEYS[4], task_id)
+if success then
+    redis.call('HSET', task_key, 'status', 'completed', 'completed_at', now)
+    redis.call('SADD', KEYS[2], task_id)
+else
+    redis.call('HSET', task_key, 'status', 'failed', 'completed_at', now)
+    redis.call('SADD', KEYS[3], task_id)
+end
+return 1
+"""
+
+# 可见性超时：把截止时间已过、仍处于处理中的任务重新放回队列
+# KEYS: [READY_LIST, SET_PROCESSING, VISIBILITY_DEADLINES]
+# ARGV: [task_prefix, user_processing_prefix, visibility_prefix, now, max_count]
+# 返回: 重新入队的任务ID列表
+REQUEUE_EXPIRED_LUA = """
+local task_prefix, user_prefix, vis_prefix = ARGV[1], ARGV[2], ARGV[3]
+local now, max_count = ARGV[4], tonumber(ARGV[5])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', '(' .. now, 'LIMIT', 0, max_count)
+local requeued = {}
+for _, task_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[3], task_id)
+    local task_key = task_prefix .. task_id
+    if redis.call('HGET', task_key, 'status') == 'processing' then
+        local user_id = redis.call('HGET', task_key, 'user') or ''
+        redis.call('SREM', user_prefix .. user_id, task_id)
+        redis.call('SREM', KEYS[2], task_id)
+        redis.call('DEL', vis_prefix .. task_id)
+        redis.call('LPUSH', KEYS[1], task_id)
+        redis.call('HSET', task_key, 'status', 'queued', 'worker_id', '', 'requeued_at', now)
+        table.insert(requeued, task_id)
+    end
+end
+return requeued
+"""
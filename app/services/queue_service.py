@@ -1,6 +1,9 @@
 """
 增强版队列服务
 基于现有实现，添加并发控制、优先级队列、可见性超时等功能
+
+入队、出队（含并发检查）、确认与超时重新入队均通过服务端 Lua 脚本原子执行（单次往返），
+出队支持阻塞等待（BRPOPLPUSH），Worker 无需轮询。
 """
 
 import json
@@ -26,9 +29,16 @@ from app.services.queue import (
     USER_PROCESSING_PREFIX,
     GLOBAL_CONCURRENT_KEY,
     VISIBILITY_TIMEOUT_PREFIX,
+    VISIBILITY_DEADLINES,
+    INFLIGHT_PREFIX,
     DEFAULT_USER_CONCURRENT_LIMIT,
     GLOBAL_CONCURRENT_LIMIT,
     VISIBILITY_TIMEOUT_SECONDS,
+    DEQUEUE_SCAN_LIMIT,
+    ENQUEUE_LUA,
+    DEQUEUE_LUA,
+    ACK_LUA,
+    REQUEUE_EXPIRED_LUA,
     check_user_concurrent_limit,
     check_global_concurrent_limit,
     mark_task_processing,
@@ -45,11 +55,21 @@ logger = logging.getLogger(__name__)
 class QueueService:
     """增强版队列服务类"""
 
+    # 有任务排队但所属用户都已达并发上限时，阻塞出队的重试间隔（秒）
+    LIMITED_RETRY_INTERVAL = 0.5
+
     def __init__(self, redis: Redis):
         self.r = redis
         self.user_concurrent_limit = DEFAULT_USER_CONCURRENT_LIMIT
         self.global_concurrent_limit = GLOBAL_CONCURRENT_LIMIT
         self.visibility_timeout = VISIBILITY_TIMEOUT_SECONDS
+        self.dequeue_scan_limit = DEQUEUE_SCAN_LIMIT
+
+        # 注册 Lua 脚本（EVALSHA，脚本缓存丢失时自动回退 EVAL）
+        self._enqueue_script = redis.register_script(ENQUEUE_LUA)
+        self._dequeue_script = redis.register_script(DEQUEUE_LUA)
+        self._ack_script = redis.register_script(ACK_LUA)
+        self._requeue_expired_script = redis.register_script(REQUEUE_EXPIRED_LUA)
 
     async def enqueue_task(
         self,
@@ -58,117 +78,108 @@ class QueueService:
         params: Dict[str, Any],
         batch_id: Optional[str] = None
     ) -> str:
-        """任务入队，支持并发控制（开源版FIFO队列）"""
+        """任务入队，支持并发控制（开源版FIFO队列）
+
+        并发检查、写入任务数据、加入队列和批次在一个 Lua 脚本中原子完成。
+        """
+        task_id = str(uuid.uuid4())
+        now = str(int(time.time()))
+
+        result = await self._enqueue_script(
+            keys=[
+                READY_LIST, SET_PROCESSING, TASK_PREFIX + task_id,
+                USER_PROCESSING_PREFIX + user_id, BATCH_TASKS_PREFIX + (batch_id or ""),
+            ],
+            args=[
+                task_id, user_id, symbol, json.dumps(params or {}), now, batch_id or "",
+                self.user_concurrent_limit, self.global_concurrent_limit,
+            ],
+        )
+        result = _decode(result)
 
         # 检查用户并发限制
-        if not await self._check_user_concurrent_limit(user_id):
+        if result == "user_limit":
             raise ValueError(f"用户 {user_id} 达到并发限制 ({self.user_concurrent_limit})")
 
         # 检查全局并发限制
-        if not await self._check_global_concurrent_limit():
+        if result == "global_limit":
             raise ValueError(f"系统达到全局并发限制 ({self.global_concurrent_limit})")
 
-        task_id = str(uuid.uuid4())
-        key = TASK_PREFIX + task_id
-        now = int(time.time())
-
-        mapping = {
-            "id": task_id,
-            "user": user_id,
-            "symbol": symbol,
-            "status": "queued",
-            "created_at": str(now),
-            "params": json.dumps(params or {}),
-            "enqueued_at": str(now)
-        }
-
-        if batch_id:
-            mapping["batch_id"] = batch_id
-
-        # 保存任务数据
-        await self.r.hset(key, mapping=mapping)
-
-        # 添加到FIFO队列
-        await self.r.lpush(READY_LIST, task_id)
-
-        if batch_id:
-            await self.r.sadd(BATCH_TASKS_PREFIX + batch_id, task_id)
-
         logger.info(f"任务已入队: {task_id}")
         return task_id
 
-    async def dequeue_task(self, worker_id: str) -> Optional[Dict[str, Any]]:
-        """从FIFO队列中取出任务"""
-        try:
-            # 从FIFO队列获取任务
-            task_id = await self.r.rpop(READY_LIST)
-            if not task_id:
-                return None
-
-            # 获取任务详情
-            task_data = await self.get_task(task_id)
-            if not task_data:
-                logger.warning(f"任务数据不存在: {task_id}")
-                return None
-
-            user_id = task_data.get("user")
-
-            # 再次检查并发限制（防止竞态条件）
-            if not await self._check_user_concurrent_limit(user_id):
-                # 如果超过限制，将任务放回队列
-                await self.r.lpush(READY_LIST, task_id)
-                logger.warning(f"用户 {user_id} 并发限制，任务重新入队: {task_id}")
-                return None
-
-            # 标记任务为处理中
-            await self._mark_task_processing(task_id, user_id, worker_id)
+    async def dequeue_task(self, worker_id: str, timeout: float = 0) -> Optional[Dict[str, Any]]:
+        """从FIFO队列中取出任务
 
-            # 设置可见性超时
-            await self._set_visibility_timeout(task_id, worker_id)
-
-            # 更新任务状态
-            await self.r.hset(TASK_PREFIX + task_id, mapping={
-                "status": "processing",
-                "worker_id": worker_id,
-                "started_at": str(int(time.time()))
-            })
+        并发检查与标记处理中在 Lua 脚本中原子完成：跳过已达并发上限用户的任务（留在原位），
+        取最早的可执行任务。
 
-            logger.info(f"任务已出队: {task_id} -> Worker: {worker_id}")
+        Args:
+            worker_id: Worker ID
+            timeout: 阻塞等待秒数；0 表示不等待。队列为空时用 BRPOPLPUSH 阻塞到有新任务，
+                     有任务但用户均达上限时按 LIMITED_RETRY_INTERVAL 重试，直到超时
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        inflight = INFLIGHT_PREFIX + worker_id
+        try:
+            status, task_data = await self._claim_task(worker_id)
+            while task_data is None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                if status == "empty":
+                    # 阻塞直到有新任务入队；任务先移到本Worker的暂存列表，再由脚本原子地认领
+                    # BRPOPLPUSH 与 BLMOVE RIGHT LEFT 等价，兼容更早的 Redis 版本
+                    moved = await self.r.brpoplpush(READY_LIST, inflight, remaining)
+                    if moved is None:
+                        return None
+                    status, task_data = await self._claim_task(worker_id, inflight)
+                else:
+                    await asyncio.sleep(min(self.LIMITED_RETRY_INTERVAL, remaining))
+                    status, task_data = await self._claim_task(worker_id)
+
+            logger.info(f"任务已出队: {task_data.get('id')} -> Worker: {worker_id}")
             return task_data
 
         except Exception as e:
             logger.error(f"出队失败: {e}")
+            # 阻塞模式下出错同样等待，避免调用方空转
+            remaining = deadline - loop.time()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
             return None
 
+    async def _claim_task(self, worker_id: str, inflight: str = "") -> tuple[str, Optional[Dict[str, Any]]]:
+        """执行出队脚本，返回 (状态, 任务数据)；状态为 ok / empty / limited"""
+        result = await self._dequeue_script(
+            keys=[READY_LIST, SET_PROCESSING, VISIBILITY_DEADLINES, inflight],
+            args=[
+                TASK_PREFIX, USER_PROCESSING_PREFIX, VISIBILITY_TIMEOUT_PREFIX,
+                worker_id, int(time.time()),
+                self.user_concurrent_limit, self.global_concurrent_limit,
+                self.visibility_timeout, self.dequeue_scan_limit,
+            ],
+        )
+        result = [_decode(x) for x in result]
+        if result[0] != "ok":
+            return result[0], None
+        fields = result[1:]
+        return "ok", self._parse_task(dict(zip(fields[::2], fields[1::2])))
+
     async def ack_task(self, task_id: str, success: bool = True) -> bool:
-        """确认任务完成"""
+        """确认任务完成（单次原子操作）"""
         try:
-            task_data = await self.get_task(task_id)
-            if not task_data:
+            done = await self._ack_script(
+                keys=[
+                    SET_PROCESSING, SET_COMPLETED, SET_FAILED, VISIBILITY_DEADLINES,
+                    TASK_PREFIX + task_id, VISIBILITY_TIMEOUT_PREFIX + task_id,
+                ],
+                args=[USER_PROCESSING_PREFIX, task_id, "1" if success else "0", str(int(time.time()))],
+            )
+            if not int(done):
                 return False
 
-            user_id = task_data.get("user")
-            worker_id = task_data.get("worker_id")
-
-            # 从处理中集合移除
-            await self._unmark_task_processing(task_id, user_id)
-
-            # 清除可见性超时
-            await self._clear_visibility_timeout(task_id)
-
-            # 更新任务状态
-            status = "completed" if success else "failed"
-            await self.r.hset(TASK_PREFIX + task_id, mapping={
-                "status": status,
-                "completed_at": str(int(time.time()))
-            })
-
-            # 添加到相应的集合
-            if success:
-                await self.r.sadd(SET_COMPLETED, task_id)
-            else:
-                await self.r.sadd(SET_FAILED, task_id)
-
             logger.info(f"任务已确认: {task_id} (成功: {success})")
             return True
 
@@ -196,6 +207,10 @@ class QueueService:
         data = await self.r.hgetall(key)
         if not data:
             return None
+        return self._parse_task(data)
+
+    @staticmethod
+    def _parse_task(data: Dict[str, Any]) -> Dict[str, Any]:
         # parse fields
         if "params" in data:
             try:
@@ -270,27 +285,28 @@ class QueueService:
             "available_slots": max(0, self.user_concurrent_limit - int(processing_count or 0))
         }
 
-    async def cleanup_expired_tasks(self):
-        """清理过期任务（可见性超时）"""
+    async def cleanup_expired_tasks(self, batch_size: int = 500):
+        """清理过期任务（可见性超时），超时且仍在处理中的任务原子地重新入队"""
         try:
-            # 获取所有可见性超时键
-            timeout_keys = await self.r.keys(VISIBILITY_TIMEOUT_PREFIX + "*")
-
-            current_time = int(time.time())
-            expired_tasks = []
-
-            for timeout_key in timeout_keys:
-                timeout_data = await self.r.hgetall(timeout_key)
-                if timeout_data:
-                    timeout_at = int(timeout_data.get("timeout_at", 0))
-                    if current_time > timeout_at:
-                        task_id = timeout_data.get("task_id")
-                        if task_id:
-                            expired_tasks.append(task_id)
-
-            # 处理过期任务
+            now = str(int(time.time()))
+            expired_tasks: List[str] = []
+            while True:
+                requeued = await self._requeue_expired_script(
+                    keys=[READY_LIST, SET_PROCESSING, VISIBILITY_DEADLINES],
+                    args=[TASK_PREFIX, USER_PROCESSING_PREFIX, VISIBILITY_TIMEOUT_PREFIX, now, batch_size],
+                )
+                expired_tasks.extend(_decode(t) for t in requeued)
+                if len(requeued) < batch_size:
+                    break
+
+            # Worker 在阻塞取到任务后、认领前退出时，任务会留在其暂存列表中，放回队首
+            # （即使该 Worker 仍存活也无妨：认领脚本会重新扫描就绪队列）
+            async for inflight in self.r.scan_iter(match=INFLIGHT_PREFIX + "*"):
+                while (task_id := await self.r.lmove(inflight, READY_LIST, "RIGHT", "RIGHT")) is not None:
+                    logger.warning(f"暂存列表中的任务放回队列: {_decode(task_id)}")
+
             for task_id in expired_tasks:
-                await self._handle_expired_task(task_id)
+                logger.warning(f"过期任务重新入队: {task_id}")
 
             if expired_tasks:
                 logger.warning(f"处理了 {len(expired_tasks)} 个过期任务")
@@ -298,36 +314,6 @@ class QueueService:
         except Exception as e:
             logger.error(f"清理过期任务失败: {e}")
 
-    async def _handle_expired_task(self, task_id: str):
-        """处理过期任务"""
-        try:
-            task_data = await self.get_task(task_id)
-            if not task_data:
-                return
-
-            user_id = task_data.get("user")
-
-            # 从处理中集合移除
-            await self._unmark_task_processing(task_id, user_id)
-
-            # 清除可见性超时
-            await self._clear_visibility_timeout(task_id)
-
-            # 重新加入队列
-            await self.r.lpush(READY_LIST, task_id)
-
-            # 更新任务状态
-            await self.r.hset(TASK_PREFIX + task_id, mapping={
-                "status": "queued",
-                "worker_id": "",
-                "requeued_at": str(int(time.time()))
-            })
-
-            logger.warning(f"过期任务重新入队: {task_id}")
-
-        except Exception as e:
-            logger.error(f"处理过期任务失败: {task_id} - {e}")
-
     async def cancel_task(self, task_id: str) -> bool:
         """取消任务"""
         try:
@@ -360,5 +346,10 @@ class QueueService:
             return False
 
 
+def _decode(value: Any) -> Any:
+    """兼容 decode_responses=False 的客户端"""
+    return value.decode() if isinstance(value, bytes) else value
+
+
 def get_queue_service() -> QueueService:
     return QueueService(get_redis_client())
\ No newline at end of file
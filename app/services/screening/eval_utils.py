@@ -157,6 +157,103 @@ def evaluate_conditions(
     return False
 
 
+def evaluate_conditions_mask(
+    latest: pd.DataFrame,
+    previous: pd.DataFrame,
+    node: Dict[str, Any],
+    allowed_fields: Iterable[str],
+    allowed_ops: Iterable[str],
+) -> pd.Series:
+    """evaluate_conditions 的向量化版本：一次性对所有股票求值，返回布尔掩码。
+
+    latest / previous 以股票代码为索引，分别是每只股票的最近一行和倒数第二行
+    （previous 缺失的股票在交叉判断中视为不满足）。判定规则与 evaluate_conditions 一致。
+    """
+    index = latest.index
+
+    def const(flag: bool) -> pd.Series:
+        return pd.Series(flag, index=index, dtype=bool)
+
+    def column(frame: pd.DataFrame, name: str) -> pd.Series:
+        if name not in frame.columns:
+            return pd.Series(np.nan, index=index)
+        return pd.to_numeric(frame[name], errors="coerce").reindex(index)
+
+    if not node:
+        return const(True)
+    # group 节点
+    if node.get("op") == "group" or "children" in node:
+        logic = (node.get("logic") or "AND").upper()
+        if logic not in {"AND", "OR"}:
+            logic = "AND"
+        masks = [evaluate_conditions_mask(latest, previous, c, allowed_fields, allowed_ops)
+                 for c in node.get("children", [])]
+        combined = const(logic == "AND")
+        for m in masks:
+            combined = (combined & m) if logic == "AND" else (combined | m)
+        return combined
+
+    # 叶子：字段比较
+    field = node.get("field")
+    op = node.get("op")
+    if field not in allowed_fields or op not in set(allowed_ops) or field not in latest.columns:
+        return const(False)
+
+    # 交叉：最近两行
+    if op in {"cross_up", "cross_down"}:
+        right_field = node.get("right_field")
+        if right_field not in allowed_fields:
+            return const(False)
+        a0, a1 = column(latest, field), column(previous, field)
+        b0, b1 = column(latest, right_field), column(previous, right_field)
+        valid = a0.notna() & a1.notna() & b0.notna() & b1.notna()
+        if op == "cross_up":
+            return valid & (a1 <= b1) & (a0 > b0)
+        return valid & (a1 >= b1) & (a0 < b0)
+
+    # 普通比较：最近一行
+    left = column(latest, field)
+    valid = left.notna()
+
+    if node.get("right_field"):
+        rf = node.get("right_field")
+        if rf not in allowed_fields or rf not in latest.columns:
+            return const(False)
+        if op == "between":
+            return const(False)
+        right: Any = column(latest, rf)
+    else:
+        right = node.get("value")
+        if op == "between":
+            lo_hi = right if isinstance(right, (list, tuple)) else (None, None)
+            lo, hi = lo_hi if isinstance(lo_hi, (list, tuple)) and len(lo_hi) == 2 else (None, None)
+            if lo is None or hi is None:
+                return const(False)
+            try:
+                lo, hi = float(lo), float(hi)
+            except (TypeError, ValueError):
+                return const(False)
+            return valid & (left >= lo) & (left <= hi)
+        try:
+            right = float(right)
+        except (TypeError, ValueError):
+            return const(False)
+
+    if op == ">":
+        return valid & (left > right)
+    if op == "<":
+        return valid & (left < right)
+    if op == ">=":
+        return valid & (left >= right)
+    if op == "<=":
+        return valid & (left <= right)
+    if op == "==":
+        return valid & (left == right)
+    if op == "!=":
+        return valid & (left != right)
+    return const(False)
+
+
 def safe_float(v: Any) -> Optional[float]:
     try:
         if v is None or (isinstance(v, float) and np.isnan(v)):
@@ -0,0 +1,92 @@
+"""
+Load the whole-market daily OHLCV panel for vectorized screening.
+
+全市场日线一次性从 MongoDB stock_daily_quotes 读取为长表（每行一只股票一个交易日），
+供 ScreeningService 按股票分组向量化计算指标。各数据源都已回填到列式存储时改为从内存映射文件读取。
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Iterable, Optional, Sequence
+
+import pandas as pd
+
+logger = logging.getLogger("agents")
+
+# 同一股票同一交易日存在多个数据源的记录时，按此顺序取第一条
+DEFAULT_SOURCE_PRIORITY: Sequence[str] = ("tushare", "akshare", "baostock")
+
+PANEL_COLUMNS = ["code", "trade_date", "open", "high", "low", "close", "vol", "amount"]
+
+_PROJECTION = {
+    "_id": 0, "symbol": 1, "trade_date": 1, "data_source": 1,
+    "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1, "amount": 1,
+}
+
+
+def load_daily_panel(
+    db: Any,
+    start_date: str,
+    end_date: str,
+    symbols: Optional[Iterable[str]] = None,
+    source_priority: Sequence[str] = DEFAULT_SOURCE_PRIORITY,
+    bar_store: Any = None,
+) -> pd.DataFrame:
+    """读取 [start_date, end_date] 区间内的日线面板。
+
+    Args:
+        db: 同步 MongoDB 数据库对象（pymongo）
+        start_date / end_date: YYYY-MM-DD
+        symbols: 仅读取这些股票；None 表示全市场
+        source_priority: 多数据源去重时的优先级
+        bar_store: 列式存储（ColumnarBarStore）；所有数据源都已就绪时代替 MongoDB 读取
+
+    Returns:
+        列为 PANEL_COLUMNS 的 DataFrame，按 (code, trade_date) 升序排列；无数据时为空表
+    """
+    codes = [str(s).zfill(6) for s in symbols] if symbols is not None else None
+    if bar_store is not None and all(bar_store.is_ready("CN", "daily", src) for src in source_priority):
+        df = _read_bar_store(bar_store, start_date, end_date, codes, source_priority)
+    else:
+        query: dict = {"period": "daily", "trade_date": {"$gte": start_date, "$lte": end_date}}
+        if codes is not None:
+            query["symbol"] = {"$in": codes}
+        df = pd.DataFrame(list(db.stock_daily_quotes.find(query, _PROJECTION).batch_size(10000)))
+    if df.empty:
+        return pd.DataFrame(columns=PANEL_COLUMNS)
+
+    df = df.rename(columns={"symbol": "code", "volume": "vol"})
+    for col in PANEL_COLUMNS + ["data_source"]:
+        if col not in df.columns:
+            df[col] = None
+
+    rank = {src: i for i, src in enumerate(source_priority)}
+    df["_rank"] = df["data_source"].map(rank).fillna(len(rank))
+    df = (
+        df.sort_values(["code", "trade_date", "_rank"], kind="stable")
+        .drop_duplicates(["code", "trade_date"], keep="first")
+    )
+
+    panel = df[PANEL_COLUMNS].reset_index(drop=True)
+    for col in ["open", "high", "low", "close", "vol", "amount"]:
+        panel[col] = pd.to_numeric(panel[col], errors="coerce")
+
+    logger.info(f"📊 日线面板加载完成: {panel['code'].nunique()} 只股票, {len(panel)} 条记录 ({start_date} ~ {end_date})")
+    return panel
+
+
+def _read_bar_store(
+    bar_store: Any,
+    start_date: str,
+    end_date: str,
+    codes: Optional[Sequence[str]],
+    source_priority: Sequence[str],
+) -> pd.DataFrame:
+    """从列式存储按数据源读取区间内的日线（每个数据源一次区间切片）"""
+    columns = [c for c in _PROJECTION if c != "_id"]
+    frames = [
+        bar_store.read_frame("CN", "daily", src, codes, start_date, end_date)
+        for src in source_priority
+    ]
+    frames = [f[columns] for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -8,7 +8,8 @@ import pandas as pd
 import numpy as np
 
 # 统一指标库
-from tradingagents.tools.analysis.indicators import IndicatorSpec, compute_many
+from tradingagents.tools.analysis.indicators import IndicatorSpec, compute_many_grouped
+from tradingagents.tools.analysis.indicator_engine import get_indicator_engine
 # 统一多数据源DF接口（按优先级降级）
 from tradingagents.dataflows.data_source_manager import get_data_source_manager
 from tradingagents.dataflows.providers.china.fundamentals_snapshot import get_cn_fund_snapshot
@@ -17,9 +18,11 @@ from tradingagents.dataflows.providers.china.fundamentals_snapshot import get_cn
 from app.services.screening.eval_utils import (
     collect_fields_from_conditions as _collect_fields_from_conditions_util,
     evaluate_conditions as _evaluate_conditions_util,
+    evaluate_conditions_mask as _evaluate_conditions_mask_util,
     evaluate_fund_conditions as _evaluate_fund_conditions_util,
     safe_float as _safe_float_util,
 )
+from app.services.screening.panel_loader import load_daily_panel
 
 # --- DSL 约束 ---
 ALLOWED_FIELDS = {
@@ -54,6 +57,27 @@ FUND_FIELDS = {"pe", "pb", "roe", "market_cap"}
 
 ALLOWED_OPS = {">", "<", ">=", "<=", "==", "!=", "between", "cross_up", "cross_down"}
 
+# 技术指标字段对应的指标规格
+TECH_SPECS = [
+    IndicatorSpec("ma", {"n": 5}),
+    IndicatorSpec("ma", {"n": 10}),
+    IndicatorSpec("ma", {"n": 20}),
+    IndicatorSpec("ma", {"n": 60}),
+    IndicatorSpec("ema", {"n": 12}),
+    IndicatorSpec("ema", {"n": 26}),
+    IndicatorSpec("macd"),
+    IndicatorSpec("rsi", {"n": 14}),
+    IndicatorSpec("boll", {"n": 20, "k": 2}),
+    IndicatorSpec("atr", {"n": 14}),
+    IndicatorSpec("kdj", {"n": 9, "m1": 3, "m2": 3}),
+]
+
+# 结果中返回的技术指标字段
+RESULT_TECH_FIELDS = ["ma20", "rsi14", "kdj_k", "kdj_d", "kdj_j", "dif", "dea", "macd_hist"]
+
+# 逐只计算（无法加载全市场面板时的降级路径）的样本上限
+PER_SYMBOL_LIMIT = 120
+
 
 @dataclass
 class ScreeningParams:
@@ -75,17 +99,11 @@ class ScreeningService:
 
     # --- 公共入口 ---
     def run(self, conditions: Dict[str, Any], params: ScreeningParams) -> Dict[str, Any]:
-        symbols = self._get_universe()
-        # 为控制时长，先限制样本规模（后续用批量/缓存优化）
-        symbols = symbols[:120]
-
-        end_date = datetime.now()
+        end_date = datetime.strptime(params.date, "%Y-%m-%d") if params.date else datetime.now()
         start_date = end_date - timedelta(days=220)
         end_s = end_date.strftime("%Y-%m-%d")
         start_s = start_date.strftime("%Y-%m-%d")
 
-        results: List[Dict[str, Any]] = []
-
         # 解析条件中涉及的字段，决定是否需要技术指标/行情
         needed_fields = self._collect_fields_from_conditions(conditions)
         order_fields = {o.get("field") for o in (params.order_by or []) if o.get("field")}
@@ -94,6 +112,87 @@ class ScreeningService:
         need_base = any(f in BASE_FIELDS for f in all_needed) or need_tech
         need_fund = any(f in FUND_FIELDS for f in all_needed)
 
+        results: Optional[List[Dict[str, Any]]] = None
+        if need_base:
+            # 全市场面板 + 向量化计算；面板不可用时降级为逐只计算
+            panel = self._load_panel(start_s, end_s)
+            if panel is not None and not panel.empty:
+                results = self._screen_panel(panel, conditions, need_tech)
+        if results is None:
+            results = self._screen_per_symbol(conditions, start_s, end_s, need_base, need_tech, need_fund)
+
+        total = len(results)
+        # 排序
+        if params.order_by:
+            for order in reversed(params.order_by):  # 后者优先级低
+                f = order.get("field")
+                d = order.get("direction", "desc").lower()
+                if f in ALLOWED_FIELDS:
+                    results.sort(key=lambda x: (x.get(f) is None, x.get(f)), reverse=(d == "desc"))
+
+        # 分页
+        start = params.offset or 0
+        end = start + (params.limit or 50)
+        page_items = results[start:end]
+
+        return {
+            "total": total,
+            "items": page_items,
+        }
+
+    # --- 内部：全市场向量化筛选 ---
+    def _load_panel(self, start_s: str, end_s: str) -> Optional[pd.DataFrame]:
+        """从 MongoDB stock_daily_quotes 加载全市场日线面板，失败时返回 None"""
+        try:
+            from app.core.database import get_mongo_db_sync
+            from tradingagents.dataflows.cache.bar_store import bar_store_enabled, get_bar_store
+
+            bar_store = get_bar_store() if bar_store_enabled() else None
+            return load_daily_panel(get_mongo_db_sync(), start_s, end_s, bar_store=bar_store)
+        except Exception as e:
+            logger.warning(f"⚠️ 加载全市场日线面板失败，降级为逐只计算: {e}")
+            return None
+
+    def _screen_panel(self, panel: pd.DataFrame, conditions: Dict[str, Any], need_tech: bool) -> List[Dict[str, Any]]:
+        """在日线面板上一次性计算指标，并以布尔掩码评估条件"""
+        dfu = panel.copy()
+        # 计算派生：pct_chg（组内前一日收盘）
+        prev_close = dfu.groupby("code", sort=False)["close"].shift(1)
+        dfu["pct_chg"] = (dfu["close"] / prev_close - 1.0) * 100.0
+        if need_tech:
+            dfu = compute_many_grouped(dfu, TECH_SPECS, by="code")
+
+        grouped = dfu.groupby("code", sort=False)
+        latest = grouped.tail(1).set_index("code")
+        previous = grouped.nth(-2).set_index("code").reindex(latest.index)
+
+        mask = _evaluate_conditions_mask_util(latest, previous, conditions, ALLOWED_FIELDS, ALLOWED_OPS)
+        matched = latest[mask.to_numpy()]
+
+        out_fields = ["close", "pct_chg", "amount"] + RESULT_TECH_FIELDS
+        results: List[Dict[str, Any]] = []
+        for code, row in zip(matched.index, matched.reindex(columns=out_fields).to_dict("records")):
+            item = {"code": code}
+            for f in out_fields:
+                item[f] = self._safe_float(row.get(f)) if (need_tech or f not in RESULT_TECH_FIELDS) else None
+            results.append(item)
+        return results
+
+    # --- 内部：逐只筛选（降级路径） ---
+    def _screen_per_symbol(
+        self,
+        conditions: Dict[str, Any],
+        start_s: str,
+        end_s: str,
+        need_base: bool,
+        need_tech: bool,
+        need_fund: bool,
+    ) -> List[Dict[str, Any]]:
+        symbols = self._get_universe()
+        # 为控制时长，逐只计算时限制样本规模
+        symbols = symbols[:PER_SYMBOL_LIMIT]
+
+        results: List[Dict[str, Any]] = []
         for code in symbols:
             try:
                 dfc = None
@@ -116,19 +215,7 @@ class ScreeningService:
 
                     # 仅在需要技术指标时计算
                     if need_tech:
-                        specs = [
-                            IndicatorSpec("ma", {"n": 5}),
-                            IndicatorSpec("ma", {"n": 10}),
-                            IndicatorSpec("ma", {"n": 20}),
-                            IndicatorSpec("ema", {"n": 12}),
-                            IndicatorSpec("ema", {"n": 26}),
-                            IndicatorSpec("macd"),
-                            IndicatorSpec("rsi", {"n": 14}),
-                            IndicatorSpec("boll", {"n": 20, "k": 2}),
-                            IndicatorSpec("atr", {"n": 14}),
-                            IndicatorSpec("kdj", {"n": 9, "m1": 3, "m2": 3}),
-                        ]
-                        dfc = compute_many(dfu, specs)
+                        dfc = get_indicator_engine().compute(f"{code}:daily", dfu, TECH_SPECS)
                     else:
                         dfc = dfu
 
@@ -153,37 +240,16 @@ class ScreeningService:
                             "close": self._safe_float(last.get("close")),
                             "pct_chg": self._safe_float(last.get("pct_chg")),
                             "amount": self._safe_float(last.get("amount")),
-                            "ma20": self._safe_float(last.get("ma20")) if need_tech else None,
-                            "rsi14": self._safe_float(last.get("rsi14")) if need_tech else None,
-                            "kdj_k": self._safe_float(last.get("kdj_k")) if need_tech else None,
-                            "kdj_d": self._safe_float(last.get("kdj_d")) if need_tech else None,
-                            "kdj_j": self._safe_float(last.get("kdj_j")) if need_tech else None,
-                            "dif": self._safe_float(last.get("dif")) if need_tech else None,
-                            "dea": self._safe_float(last.get("dea")) if need_tech else None,
-                            "macd_hist": self._safe_float(last.get("macd_hist")) if need_tech else None,
+                        })
+                        item.update({
+                            f: self._safe_float(last.get(f)) if need_tech else None
+                            for f in RESULT_TECH_FIELDS
                         })
                     results.append(item)
             except Exception:
                 continue
+        return results
 
-        total = len(results)
-        # 排序
-        if params.order_by:
-            for order in reversed(params.order_by):  # 后者优先级低
-                f = order.get("field")
-                d = order.get("direction", "desc").lower()
-                if f in ALLOWED_FIELDS:
-                    results.sort(key=lambda x: (x.get(f) is None, x.get(f)), reverse=(d == "desc"))
-
-        # 分页
-        start = params.offset or 0
-        end = start + (params.limit or 50)
-        page_items = results[start:end]
-
-        return {
-            "total": total,
-            "items": page_items,
-        }
     def _evaluate_fund_conditions(self, snap: Dict[str, Any], node: Dict[str, Any]) -> bool:
         """Delegate fundamental condition evaluation to utils to keep service slim."""
         return _evaluate_fund_conditions_util(snap, node, FUND_FIELDS)
@@ -206,9 +272,9 @@ class ScreeningService:
     def _get_universe(self) -> List[str]:
         """获取A股代码集合：从 MongoDB stock_basic_info 集合获取所有A股股票代码"""
         try:
-            from app.core.database import get_mongo_db
+            from app.core.database import get_mongo_db_sync
 
-            db = get_mongo_db()
+            db = get_mongo_db_sync()
             collection = db.stock_basic_info
 
             # 查询所有A股股票代码（兼容不同的数据结构）
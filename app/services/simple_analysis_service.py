@@ -20,6 +20,8 @@ from tradingagents.utils.logging_init import init_logging
 init_logging()
 
 from tradingagents.graph.trading_graph import TradingAgentsGraph
+from tradingagents.graph.graph_pool import get_trading_graph_pool
+from tradingagents.config.runtime_settings import get_bool
 from tradingagents.default_config import DEFAULT_CONFIG
 from app.models.analysis import (
     AnalysisTask, AnalysisStatus, SingleAnalysisRequest, AnalysisParameters
@@ -27,8 +29,9 @@ from app.models.analysis import (
 from app.models.user import PyObjectId
 from app.models.notification import NotificationCreate
 from bson import ObjectId
-from app.core.database import get_mongo_db
+from app.core.database import get_mongo_db, get_mongo_db_sync
 from app.services.config_service import ConfigService
+from app.services.config_snapshot import get_config_snapshot_store
 from app.services.memory_state_manager import get_memory_state_manager, TaskStatus
 from app.services.redis_progress_tracker import RedisProgressTracker, get_progress_by_id
 from app.services.progress_log_handler import register_analysis_tracker, unregister_analysis_tracker
@@ -101,6 +104,8 @@ def get_provider_and_url_by_model_sync(model_name: str) -> dict:
     """
     根据模型名称从数据库配置中查找对应的供应商和 API URL（同步版本）
 
+    配置来自进程内配置快照（system_configs + llm_providers），不再为每次查询创建 MongoClient。
+
     Args:
         model_name: 模型名称，如 'qwen-turbo', 'gpt-4' 等
 
@@ -108,166 +113,89 @@ def get_provider_and_url_by_model_sync(model_name: str) -> dict:
         dict: {"provider": "google", "backend_url": "https://...", "api_key": "xxx"}
     """
     try:
-        # 使用同步 MongoDB 客户端直接查询
-        from pymongo import MongoClient
-        from app.core.config import settings
-        import os
-
-        client = MongoClient(settings.MONGO_URI)
-        db = client[settings.MONGO_DB]
-
-        # 查询最新的活跃配置
-        configs_collection = db.system_configs
-        doc = configs_collection.find_one({"is_active": True}, sort=[("version", -1)])
-
-        if doc and "llm_configs" in doc:
-            llm_configs = doc["llm_configs"]
-
-            for config_dict in llm_configs:
-                if config_dict.get("model_name") == model_name:
-                    provider = config_dict.get("provider")
-                    api_base = config_dict.get("api_base")
-                    model_api_key = config_dict.get("api_key")  # 🔥 获取模型配置的 API Key
-
-                    # 从 llm_providers 集合中查找厂家配置
-                    providers_collection = db.llm_providers
-                    provider_doc = providers_collection.find_one({"name": provider})
-
-                    # 🔥 确定 API Key（优先级：模型配置 > 厂家配置 > 环境变量）
-                    api_key = None
-                    if model_api_key and model_api_key.strip() and model_api_key != "your-api-key":
-                        api_key = model_api_key
-                        logger.info(f"✅ [同步查询] 使用模型配置的 API Key")
-                    elif provider_doc and provider_doc.get("api_key"):
-                        provider_api_key = provider_doc["api_key"]
-                        if provider_api_key and provider_api_key.strip() and provider_api_key != "your-api-key":
-                            api_key = provider_api_key
-                            logger.info(f"✅ [同步查询] 使用厂家配置的 API Key")
-
-                    # 如果数据库中没有有效的 API Key，尝试从环境变量获取
-                    if not api_key:
-                        api_key = _get_env_api_key_for_provider(provider)
-                        if api_key:
-                            logger.info(f"✅ [同步查询] 使用环境变量的 API Key")
-                        else:
-                            logger.warning(f"⚠️ [同步查询] 未找到 {provider} 的 API Key")
-
-                    # 确定 backend_url
-                    backend_url = None
-                    if api_base:
-                        backend_url = api_base
-                        logger.info(f"✅ [同步查询] 模型 {model_name} 使用自定义 API: {api_base}")
-                    elif provider_doc and provider_doc.get("default_base_url"):
-                        backend_url = provider_doc["default_base_url"]
-                        logger.info(f"✅ [同步查询] 模型 {model_name} 使用厂家默认 API: {backend_url}")
-                    else:
-                        backend_url = _get_default_backend_url(provider)
-                        logger.warning(f"⚠️ [同步查询] 厂家 {provider} 没有配置 default_base_url，使用硬编码默认值")
-
-                    client.close()
-                    return {
-                        "provider": provider,
-                        "backend_url": backend_url,
-                        "api_key": api_key
-                    }
-
-        client.close()
-
-        # 如果数据库中没有找到模型配置，使用默认映射
-        logger.warning(f"⚠️ [同步查询] 数据库中未找到模型 {model_name}，使用默认映射")
-        provider = _get_default_provider_by_model(model_name)
-
-        # 尝试从厂家配置中获取 default_base_url 和 API Key
-        try:
-            client = MongoClient(settings.MONGO_URI)
-            db = client[settings.MONGO_DB]
-            providers_collection = db.llm_providers
-            provider_doc = providers_collection.find_one({"name": provider})
-
-            backend_url = _get_default_backend_url(provider)
-            api_key = None
-
-            if provider_doc:
-                if provider_doc.get("default_base_url"):
-                    backend_url = provider_doc["default_base_url"]
-                    logger.info(f"✅ [同步查询] 使用厂家 {provider} 的 default_base_url: {backend_url}")
-
-                if provider_doc.get("api_key"):
-                    provider_api_key = provider_doc["api_key"]
-                    if provider_api_key and provider_api_key.strip() and provider_api_key != "your-api-key":
-                        api_key = provider_api_key
-                        logger.info(f"✅ [同步查询] 使用厂家 {provider} 的 API Key")
-
-            # 如果厂家配置中没有 API Key，尝试从环境变量获取
-            if not api_key:
-                api_key = _get_env_api_key_for_provider(provider)
-                if api_key:
-                    logger.info(f"✅ [同步查询] 使用环境变量的 API Key")
-
-            client.close()
-            return {
-                "provider": provider,
-                "backend_url": backend_url,
-                "api_key": api_key
-            }
-        except Exception as e:
-            logger.warning(f"⚠️ [同步查询] 无法查询厂家配置: {e}")
-
-        # 最后回退到硬编码的默认 URL 和环境变量 API Key
-        return {
-            "provider": provider,
-            "backend_url": _get_default_backend_url(provider),
-            "api_key": _get_env_api_key_for_provider(provider)
-        }
-
+        snapshot = get_config_snapshot_store().get_sync()
     except Exception as e:
-        logger.error(f"❌ [同步查询] 查找模型供应商失败: {e}")
-        provider = _get_default_provider_by_model(model_name)
-
-        # 尝试从厂家配置中获取 default_base_url 和 API Key
-        try:
-            from pymongo import MongoClient
-            from app.core.config import settings
-
-            client = MongoClient(settings.MONGO_URI)
-            db = client[settings.MONGO_DB]
-            providers_collection = db.llm_providers
-            provider_doc = providers_collection.find_one({"name": provider})
-
+        logger.error(f"❌ [同步查询] 读取配置快照失败: {e}")
+        snapshot = None
+
+    config_dict = snapshot.find_llm_config(model_name) if snapshot else None
+    if config_dict:
+        provider = config_dict.get("provider")
+        api_base = config_dict.get("api_base")
+        model_api_key = config_dict.get("api_key")  # 🔥 获取模型配置的 API Key
+
+        # 从 llm_providers 中查找厂家配置
+        provider_doc = snapshot.get_provider(provider)
+
+        # 🔥 确定 API Key（优先级：模型配置 > 厂家配置 > 环境变量）
+        api_key = None
+        if model_api_key and model_api_key.strip() and model_api_key != "your-api-key":
+            api_key = model_api_key
+            logger.info(f"✅ [同步查询] 使用模型配置的 API Key")
+        elif provider_doc and provider_doc.get("api_key"):
+            provider_api_key = provider_doc["api_key"]
+            if provider_api_key and provider_api_key.strip() and provider_api_key != "your-api-key":
+                api_key = provider_api_key
+                logger.info(f"✅ [同步查询] 使用厂家配置的 API Key")
+
+        # 如果数据库中没有有效的 API Key，尝试从环境变量获取
+        if not api_key:
+            api_key = _get_env_api_key_for_provider(provider)
+            if api_key:
+                logger.info(f"✅ [同步查询] 使用环境变量的 API Key")
+            else:
+                logger.warning(f"⚠️ [同步查询] 未找到 {provider} 的 API Key")
+
+        # 确定 backend_url
+        if api_base:
+            backend_url = api_base
+            logger.info(f"✅ [同步查询] 模型 {model_name} 使用自定义 API: {api_base}")
+        elif provider_doc and provider_doc.get("default_base_url"):
+            backend_url = provider_doc["default_base_url"]
+            logger.info(f"✅ [同步查询] 模型 {model_name} 使用厂家默认 API: {backend_url}")
+        else:
             backend_url = _get_default_backend_url(provider)
-            api_key = None
-
-            if provider_doc:
-                if provider_doc.get("default_base_url"):
-                    backend_url = provider_doc["default_base_url"]
-                    logger.info(f"✅ [同步查询] 使用厂家 {provider} 的 default_base_url: {backend_url}")
+            logger.warning(f"⚠️ [同步查询] 厂家 {provider} 没有配置 default_base_url，使用硬编码默认值")
 
-                if provider_doc.get("api_key"):
-                    provider_api_key = provider_doc["api_key"]
-                    if provider_api_key and provider_api_key.strip() and provider_api_key != "your-api-key":
-                        api_key = provider_api_key
-                        logger.info(f"✅ [同步查询] 使用厂家 {provider} 的 API Key")
-
-            # 如果厂家配置中没有 API Key，尝试从环境变量获取
-            if not api_key:
-                api_key = _get_env_api_key_for_provider(provider)
-
-            client.close()
-            return {
-                "provider": provider,
-                "backend_url": backend_url,
-                "api_key": api_key
-            }
-        except Exception as e2:
-            logger.warning(f"⚠️ [同步查询] 无法查询厂家配置: {e2}")
-
-        # 最后回退到硬编码的默认 URL 和环境变量 API Key
         return {
             "provider": provider,
-            "backend_url": _get_default_backend_url(provider),
-            "api_key": _get_env_api_key_for_provider(provider)
+            "backend_url": backend_url,
+            "api_key": api_key
         }
 
+    # 如果数据库中没有找到模型配置，使用默认映射
+    if snapshot is not None:
+        logger.warning(f"⚠️ [同步查询] 数据库中未找到模型 {model_name}，使用默认映射")
+    provider = _get_default_provider_by_model(model_name)
+
+    # 尝试从厂家配置中获取 default_base_url 和 API Key
+    provider_doc = snapshot.get_provider(provider) if snapshot else None
+    backend_url = _get_default_backend_url(provider)
+    api_key = None
+
+    if provider_doc:
+        if provider_doc.get("default_base_url"):
+            backend_url = provider_doc["default_base_url"]
+            logger.info(f"✅ [同步查询] 使用厂家 {provider} 的 default_base_url: {backend_url}")
+
+        if provider_doc.get("api_key"):
+            provider_api_key = provider_doc["api_key"]
+            if provider_api_key and provider_api_key.strip() and provider_api_key != "your-api-key":
+                api_key = provider_api_key
+                logger.info(f"✅ [同步查询] 使用厂家 {provider} 的 API Key")
+
+    # 如果厂家配置中没有 API Key，尝试从环境变量获取
+    if not api_key:
+        api_key = _get_env_api_key_for_provider(provider)
+        if api_key:
+            logger.info(f"✅ [同步查询] 使用环境变量的 API Key")
+
+    return {
+        "provider": provider,
+        "backend_url": backend_url,
+        "api_key": api_key
+    }
+
 
 def _get_env_api_key_for_provider(provider: str) -> str:
     """
@@ -529,13 +457,7 @@ def create_analysis_config(
             # 🔧 未知厂家，尝试从数据库获取厂家的 default_base_url
             logger.warning(f"⚠️  未知厂家 {llm_provider}，尝试从数据库获取配置")
             try:
-                from pymongo import MongoClient
-                from app.core.config import settings
-
-                client = MongoClient(settings.MONGO_URI)
-                db = client[settings.MONGO_DB]
-                providers_collection = db.llm_providers
-                provider_doc = providers_collection.find_one({"name": llm_provider})
+                provider_doc = get_config_snapshot_store().get_sync().get_provider(llm_provider)
 
                 if provider_doc and provider_doc.get("default_base_url"):
                     config["backend_url"] = provider_doc["default_base_url"]
@@ -544,8 +466,6 @@ def create_analysis_config(
                     # 如果数据库中也没有，使用 OpenAI 兼容格式作为最后的回退
                     config["backend_url"] = "https://api.openai.com/v1"
                     logger.warning(f"⚠️  数据库中未找到厂家 {llm_provider} 的配置，使用默认 OpenAI 端点")
-
-                client.close()
             except Exception as e2:
                 logger.error(f"❌ 查询数据库失败: {e2}，使用默认 OpenAI 端点")
                 config["backend_url"] = "https://api.openai.com/v1"
@@ -592,7 +512,6 @@ class SimpleAnalysisService:
     """简化的股票分析服务类"""
 
     def __init__(self):
-        self._trading_graph_cache = {}
         self.memory_manager = get_memory_state_manager()
 
         # 进度跟踪器缓存
@@ -707,24 +626,29 @@ class SimpleAnalysisService:
     def _get_trading_graph(self, config: Dict[str, Any]) -> TradingAgentsGraph:
         """获取或创建TradingAgents实例
 
-        ⚠️ 注意：为了避免并发执行时的数据混淆，每次都创建新实例
-        虽然这会增加一些初始化开销，但可以确保线程安全
+        propagate 的运行状态（股票代码、日期、最终状态）都是局部变量，编译后的图与 LLM 客户端
+        可以在并发任务之间共享；因此按 (分析师, 模型, 研究深度等完整配置) 从复用池获取实例，
+        相同配置的任务不再重复构造。TA_GRAPH_POOL_ENABLED=false 时恢复每次新建。
 
-        TradingAgentsGraph 实例包含可变状态（self.ticker, self.curr_state等），
-        如果多个线程共享同一个实例，会导致数据混淆。
+        注意：dataflows 接口与 Toolkit 的配置是进程级的（每次 propagate 开始时由 activate_config 写入），
+        不同配置的任务并发运行时会互相覆盖，无论是否使用复用池。
         """
-        # 🔧 [并发安全] 每次都创建新实例，避免多线程共享状态
-        # 不再使用缓存，因为 TradingAgentsGraph 有可变的实例变量
-        logger.info(f"🔧 创建新的TradingAgents实例（并发安全模式）...")
-
-        trading_graph = TradingAgentsGraph(
-            selected_analysts=config.get("selected_analysts", ["market", "fundamentals"]),
-            debug=config.get("debug", False),
-            config=config
-        )
-
-        logger.info(f"✅ TradingAgents实例创建成功（实例ID: {id(trading_graph)}）")
+        selected_analysts = config.get("selected_analysts", ["market", "fundamentals"])
+        debug = config.get("debug", False)
+
+        if not get_bool("TA_GRAPH_POOL_ENABLED", "ta_graph_pool_enabled", True):
+            logger.info(f"🔧 创建新的TradingAgents实例（未启用复用池）...")
+            trading_graph = TradingAgentsGraph(
+                selected_analysts=selected_analysts,
+                debug=debug,
+                config=config
+            )
+            logger.info(f"✅ TradingAgents实例创建成功（实例ID: {id(trading_graph)}）")
+            return trading_graph
 
+        pool = get_trading_graph_pool()
+        trading_graph = pool.get(selected_analysts, config, debug=debug)
+        logger.info(f"✅ 获取TradingAgents实例（实例ID: {id(trading_graph)}，复用池: {pool.stats()}）")
         return trading_graph
 
     async def create_analysis_task(
@@ -1133,13 +1057,10 @@ class SimpleAnalysisService:
                     finally:
                         loop.close()
 
-                    # 2. 更新 MongoDB（使用同步客户端，避免事件循环冲突）
-                    from pymongo import MongoClient
-                    from app.core.config import settings
+                    # 2. 更新 MongoDB（使用共享的同步客户端，避免事件循环冲突）
                     from datetime import datetime
 
-                    sync_client = MongoClient(settings.MONGO_URI)
-                    sync_db = sync_client[settings.MONGO_DB]
+                    sync_db = get_mongo_db_sync()
 
                     sync_db.analysis_tasks.update_one(
                         {"task_id": task_id},
@@ -1152,7 +1073,6 @@ class SimpleAnalysisService:
                             }
                         }
                     )
-                    sync_client.close()
 
                 except Exception as e:
                     logger.warning(f"⚠️ 进度更新失败: {e}")
@@ -1439,13 +1359,8 @@ class SimpleAnalysisService:
                                     )
                                     logger.debug(f"✅ [Graph进度] 已提交异步更新任务: {int(progress_pct)}%")
                                 except RuntimeError:
-                                    # 没有运行的事件循环，使用同步方式更新 MongoDB
-                                    from pymongo import MongoClient
-                                    from app.core.config import settings
-
-                                    # 创建同步 MongoDB 客户端
-                                    sync_client = MongoClient(settings.MONGO_URI)
-                                    sync_db = sync_client[settings.MONGO_DB]
+                                    # 没有运行的事件循环，使用共享的同步客户端更新 MongoDB
+                                    sync_db = get_mongo_db_sync()
 
                                     # 同步更新 MongoDB
                                     sync_db.analysis_tasks.update_one(
@@ -1459,7 +1374,6 @@ class SimpleAnalysisService:
                                             }
                                         }
                                     )
-                                    sync_client.close()
 
                                     # 异步更新内存（创建新的事件循环）
                                     loop = asyncio.new_event_loop()
@@ -1498,13 +1412,22 @@ class SimpleAnalysisService:
 
             logger.info(f"🚀 准备调用 trading_graph.propagate，progress_callback={graph_progress_callback}")
 
+            # 报告增量推送（SSE/WebSocket 的 report_delta 事件），没有 Redis 时为 None
+            from app.services.progress.stream_publisher import create_report_stream_publisher
+            report_stream = create_report_stream_publisher(task_id, progress_tracker)
+
             # 执行实际分析，传递进度回调和task_id
-            state, decision = trading_graph.propagate(
-                request.stock_code,
-                analysis_date,
-                progress_callback=graph_progress_callback,
-                task_id=task_id
-            )
+            try:
+                state, decision = trading_graph.propagate(
+                    request.stock_code,
+                    analysis_date,
+                    progress_callback=graph_progress_callback,
+                    task_id=task_id,
+                    stream_callback=report_stream
+                )
+            finally:
+                if report_stream:
+                    report_stream.flush()
 
             logger.info(f"✅ trading_graph.propagate 执行完成")
 
@@ -1805,7 +1728,9 @@ class SimpleAnalysisService:
                 # 🔥 添加模型信息字段
                 "model_info": model_info,
                 # 🆕 性能指标数据
-                "performance_metrics": state.get("performance_metrics", {}) if isinstance(state, dict) else {}
+                "performance_metrics": state.get("performance_metrics", {}) if isinstance(state, dict) else {},
+                # 🆕 span 链路（节点/LLM/工具/数据源耗时明细）
+                "analysis_trace": state.get("analysis_trace", {}) if isinstance(state, dict) else {}
             }
 
             logger.info(f"✅ [线程池] 分析完成: {task_id} - 耗时{execution_time:.2f}秒")
@@ -2646,7 +2571,9 @@ class SimpleAnalysisService:
                         "reports": reports,  # 包含提取的报告内容
                         # 🔥 关键修复：添加格式化后的decision字段！
                         "decision": result.get("decision", {})
-                    }}}
+                    },
+                    # 🆕 span 链路随任务保存，用于定位慢分析的耗时来源
+                    "analysis_trace": result.get("analysis_trace", {})}}
                 )
                 logger.info(f"💾 分析结果已保存 (web风格): {task_id}")
             else:
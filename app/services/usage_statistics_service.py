@@ -4,15 +4,32 @@
 """
 
 import logging
-from datetime import datetime, timedelta
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
-from collections import defaultdict
+
+from pymongo import ReplaceOne
 
 from app.core.database import get_mongo_db
 from app.models.config import UsageRecord, UsageStatistics
+from tradingagents.config.usage_rollups import (
+    DAY,
+    HOUR,
+    ROLLUP_COLLECTION,
+    build_rollup_updates,
+    day_range_filter,
+    rebuild_pipeline,
+    rebuilt_documents,
+    rollup_range_filter,
+    summarize,
+    summary_pipeline,
+)
 
 logger = logging.getLogger("app.services.usage_statistics_service")
 
+# 重算预聚合时每批写入的桶数
+REBUILD_BATCH_SIZE = 1000
+
 
 class UsageStatisticsService:
     """使用统计服务"""
@@ -20,6 +37,8 @@ class UsageStatisticsService:
     def __init__(self):
         # 使用 tradingagents 的集合名称
         self.collection_name = "token_usage"
+        # 按 小时/天 × 供应商 × 模型 × 货币 预聚合的统计
+        self.rollup_collection_name = ROLLUP_COLLECTION
     
     async def add_usage_record(self, record: UsageRecord) -> bool:
         """添加使用记录"""
@@ -29,6 +48,7 @@ class UsageStatisticsService:
 
             record_dict = record.model_dump(exclude={"id"})
             result = await collection.insert_one(record_dict)
+            await self._update_rollups([record_dict])
 
             logger.info(f"✅ 添加使用记录成功: {record.provider}/{record.model_name}")
             return True
@@ -85,101 +105,21 @@ class UsageStatisticsService:
         """获取使用统计"""
         try:
             db = get_mongo_db()
-            collection = db[self.collection_name]
-            
+
             # 计算时间范围
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
             
-            # 构建查询条件
-            query = {
-                "timestamp": {
-                    "$gte": start_date.isoformat(),
-                    "$lte": end_date.isoformat()
-                }
-            }
+            # 在预聚合的桶上汇总，扫描量只与天数有关，与原始记录数无关
+            match = rollup_range_filter(start_date, end_date)
             if provider:
-                query["provider"] = provider
+                match["provider"] = provider
             if model_name:
-                query["model_name"] = model_name
-            
-            # 获取所有记录
-            cursor = collection.find(query)
-            records = []
-            async for doc in cursor:
-                records.append(doc)
-            
-            # 统计数据
-            stats = UsageStatistics()
-            stats.total_requests = len(records)
-
-            # 按货币统计成本
-            cost_by_currency = defaultdict(float)
-
-            by_provider = defaultdict(lambda: {
-                "requests": 0,
-                "input_tokens": 0,
-                "output_tokens": 0,
-                "cost": 0.0,
-                "cost_by_currency": defaultdict(float)
-            })
-            by_model = defaultdict(lambda: {
-                "requests": 0,
-                "input_tokens": 0,
-                "output_tokens": 0,
-                "cost": 0.0,
-                "cost_by_currency": defaultdict(float)
-            })
-            by_date = defaultdict(lambda: {
-                "requests": 0,
-                "input_tokens": 0,
-                "output_tokens": 0,
-                "cost": 0.0,
-                "cost_by_currency": defaultdict(float)
-            })
+                match["model_name"] = model_name
+            rollups = db[self.rollup_collection_name]
+            facets = await rollups.aggregate(summary_pipeline(match)).to_list(length=1)
+            stats = UsageStatistics(**summarize(facets[0] if facets else None))
 
-            for record in records:
-                cost = record.get("cost", 0.0)
-                currency = record.get("currency", "CNY")
-
-                # 总计
-                stats.total_input_tokens += record.get("input_tokens", 0)
-                stats.total_output_tokens += record.get("output_tokens", 0)
-                stats.total_cost += cost  # 保留向后兼容
-                cost_by_currency[currency] += cost
-
-                # 按供应商统计
-                provider_key = record.get("provider", "unknown")
-                by_provider[provider_key]["requests"] += 1
-                by_provider[provider_key]["input_tokens"] += record.get("input_tokens", 0)
-                by_provider[provider_key]["output_tokens"] += record.get("output_tokens", 0)
-                by_provider[provider_key]["cost"] += cost
-                by_provider[provider_key]["cost_by_currency"][currency] += cost
-
-                # 按模型统计
-                model_key = f"{record.get('provider', 'unknown')}/{record.get('model_name', 'unknown')}"
-                by_model[model_key]["requests"] += 1
-                by_model[model_key]["input_tokens"] += record.get("input_tokens", 0)
-                by_model[model_key]["output_tokens"] += record.get("output_tokens", 0)
-                by_model[model_key]["cost"] += cost
-                by_model[model_key]["cost_by_currency"][currency] += cost
-
-                # 按日期统计
-                timestamp = record.get("timestamp", "")
-                if timestamp:
-                    date_key = timestamp[:10]  # YYYY-MM-DD
-                    by_date[date_key]["requests"] += 1
-                    by_date[date_key]["input_tokens"] += record.get("input_tokens", 0)
-                    by_date[date_key]["output_tokens"] += record.get("output_tokens", 0)
-                    by_date[date_key]["cost"] += cost
-                    by_date[date_key]["cost_by_currency"][currency] += cost
-
-            # 转换 defaultdict 为普通 dict（包括嵌套的 cost_by_currency）
-            stats.cost_by_currency = dict(cost_by_currency)
-            stats.by_provider = {k: {**v, "cost_by_currency": dict(v["cost_by_currency"])} for k, v in by_provider.items()}
-            stats.by_model = {k: {**v, "cost_by_currency": dict(v["cost_by_currency"])} for k, v in by_model.items()}
-            stats.by_date = {k: {**v, "cost_by_currency": dict(v["cost_by_currency"])} for k, v in by_date.items()}
-            
             logger.info(f"✅ 获取使用统计成功: {stats.total_requests} 条记录")
             return stats
         except Exception as e:
@@ -226,11 +166,100 @@ class UsageStatisticsService:
             
             deleted_count = result.deleted_count
             logger.info(f"✅ 删除旧记录成功: {deleted_count} 条")
+
+            # 删除已过期的桶，并重算截止时间所在的那一天
+            cutoff_text = cutoff_date.isoformat()
+            await db[self.rollup_collection_name].delete_many({"$or": [
+                {"granularity": HOUR, "bucket": {"$lt": cutoff_text[:13]}},
+                {"granularity": DAY, "bucket": {"$lt": cutoff_text[:10]}},
+            ]})
+            if deleted_count:
+                await self.rebuild_rollups(cutoff_date, cutoff_date)
             return deleted_count
         except Exception as e:
             logger.error(f"❌ 删除旧记录失败: {e}")
             return 0
 
+    async def _update_rollups(self, records: List[Dict[str, Any]]):
+        """写入原始记录后增量更新对应的桶（失败时由定时重算修正）"""
+        try:
+            updates = build_rollup_updates(records)
+            if updates:
+                db = get_mongo_db()
+                await db[self.rollup_collection_name].bulk_write(updates, ordered=False)
+        except Exception as e:
+            logger.warning(f"⚠️ 更新使用统计预聚合失败: {e}")
+
+    async def ensure_rollups(self) -> None:
+        """创建预聚合集合的索引；预聚合为空而原始记录不为空时（首次部署）从全部历史重建"""
+        db = get_mongo_db()
+        rollups = db[self.rollup_collection_name]
+        await rollups.create_index([("granularity", 1), ("bucket", 1)], name="granularity_bucket_idx")
+
+        if await rollups.find_one({}, {"_id": 1}) is not None:
+            return
+        collection = db[self.collection_name]
+        first = await collection.find_one({"timestamp": {"$type": "string"}}, {"timestamp": 1},
+                                          sort=[("timestamp", 1)])
+        if first is None:
+            return
+        start = datetime.fromisoformat(first["timestamp"][:19])
+        logger.info(f"🔄 首次构建使用统计预聚合: 从 {start.date()} 开始")
+        await self.rebuild_rollups(start)
+
+    async def rebuild_rollups(self, start: datetime, end: Optional[datetime] = None) -> int:
+        """从原始记录重算 [start, end] 所在各天的全部桶，返回写入的桶数
+
+        聚合结果按批流式写入（不在内存中收集全部桶），每个桶带上本次重算的 generation；
+        写完后删除范围内 generation 不是本次、且在重算开始前创建的桶（原始记录已不存在的桶），
+        删除条件大小与桶数无关；重算期间由增量写入新建的桶（created_at 晚于开始时间）保留。
+        """
+        db = get_mongo_db()
+        collection = db[self.collection_name]
+        rollups = db[self.rollup_collection_name]
+        first_day = start.strftime("%Y-%m-%d")
+        last_day = (end or datetime.now()).strftime("%Y-%m-%d")
+        generation = uuid.uuid4().hex
+        started_at = datetime.now(timezone.utc)
+
+        written = 0
+        for granularity in (HOUR, DAY):
+            cursor = collection.aggregate(rebuild_pipeline(first_day, last_day, granularity),
+                                          allowDiskUse=True, batchSize=REBUILD_BATCH_SIZE)
+            rows: List[Dict[str, Any]] = []
+            async for row in cursor:
+                rows.append(row)
+                if len(rows) >= REBUILD_BATCH_SIZE:
+                    written += await self._write_rebuilt(rollups, rows, granularity, generation)
+                    rows = []
+            written += await self._write_rebuilt(rollups, rows, granularity, generation)
+            # 原始记录已不存在的桶
+            await rollups.delete_many({
+                "granularity": granularity,
+                "bucket": day_range_filter(first_day, last_day),
+                "generation": {"$ne": generation},
+                "created_at": {"$not": {"$gte": started_at}},
+            })
+
+        logger.info(f"✅ 使用统计预聚合已重算: {first_day} ~ {last_day}, {written} 个桶")
+        return written
+
+    @staticmethod
+    async def _write_rebuilt(rollups, rows: List[Dict[str, Any]], granularity: str, generation: str) -> int:
+        docs = rebuilt_documents(rows, granularity, generation)
+        if docs:
+            await rollups.bulk_write([ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs],
+                                     ordered=False)
+        return len(docs)
+
+    async def refresh_recent_rollups(self, lookback_hours: int = 48) -> int:
+        """定时任务：重算最近的桶，修正其他进程写入或增量更新失败造成的偏差"""
+        try:
+            return await self.rebuild_rollups(datetime.now() - timedelta(hours=lookback_hours))
+        except Exception as e:
+            logger.error(f"❌ 重算使用统计预聚合失败: {e}")
+            return 0
+
 
 # 创建全局实例
 usage_statistics_service = UsageStatisticsService()
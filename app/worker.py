@@ -22,12 +22,8 @@ from app.core.logging_config import setup_logging
 from app.core.database import init_db, close_db, get_redis_client
 from app.core.config import settings
 
-# Redis keys (must match queue_service)
-READY_LIST = "qa:ready"
-TASK_PREFIX = "qa:task:"
-SET_PROCESSING = "qa:processing"
-SET_COMPLETED = "qa:completed"
-SET_FAILED = "qa:failed"
+# Redis keys (shared with queue_service)
+from app.services.queue.keys import READY_LIST, TASK_PREFIX, SET_PROCESSING, SET_COMPLETED, SET_FAILED
 
 logger = logging.getLogger("worker")
 
@@ -41,7 +41,7 @@ class AnalysisWorker:
         # 配置参数（可由系统设置覆盖）
         self.heartbeat_interval = int(getattr(settings, 'WORKER_HEARTBEAT_INTERVAL', 30))
         self.max_retries = int(getattr(settings, 'QUEUE_MAX_RETRIES', 3))
-        self.poll_interval = float(getattr(settings, 'QUEUE_POLL_INTERVAL_SECONDS', 1))  # 队列轮询间隔（秒）
+        self.poll_interval = float(getattr(settings, 'QUEUE_POLL_INTERVAL_SECONDS', 1))  # 出队阻塞等待上限（秒）
         self.cleanup_interval = float(getattr(settings, 'QUEUE_CLEANUP_INTERVAL_SECONDS', 60))
 
         # 注册信号处理器
@@ -115,14 +115,11 @@ class AnalysisWorker:
 
         while self.running:
             try:
-                # 从队列获取任务
-                task_data = await self.queue_service.dequeue_task(self.worker_id)
+                # 从队列获取任务（队列为空时阻塞等待，最长 poll_interval 秒，以便及时响应停止信号）
+                task_data = await self.queue_service.dequeue_task(self.worker_id, timeout=self.poll_interval)
 
                 if task_data:
                     await self._process_task(task_data)
-                else:
-                    # 没有任务，短暂休眠
-                    await asyncio.sleep(self.poll_interval)
 
             except Exception as e:
                 logger.error(f"工作循环异常: {e}")
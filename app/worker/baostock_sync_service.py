@@ -114,11 +114,21 @@ class BaoStockSyncService:
             stats.errors.append(str(e))
             return stats
     
+    async def _run_concurrently(self, items: List[Any], worker):
+        """按BaoStock会话数并发处理批次内的股票，吞吐随会话数增长"""
+        semaphore = asyncio.Semaphore(self.provider.session_count)
+
+        async def run(item):
+            async with semaphore:
+                await worker(item)
+
+        await asyncio.gather(*(run(item) for item in items))
+
     async def _sync_basic_info_batch(self, stock_batch: List[Dict[str, Any]]) -> BaoStockSyncStats:
         """同步基础信息批次（包含估值数据和总市值）"""
         stats = BaoStockSyncStats()
 
-        for stock in stock_batch:
+        async def process(stock: Dict[str, Any]):
             try:
                 code = stock['code']
 
@@ -127,7 +137,7 @@ class BaoStockSyncService:
 
                 if not basic_info:
                     stats.errors.append(f"获取{code}基础信息失败")
-                    continue
+                    return
 
                 # 2. 获取估值数据（PE、PB、PS、PCF等）
                 try:
@@ -167,6 +177,7 @@ class BaoStockSyncService:
             except Exception as e:
                 stats.errors.append(f"处理{stock.get('code', 'unknown')}失败: {e}")
 
+        await self._run_concurrently(stock_batch, process)
         return stats
     
     async def _get_total_shares(self, code: str) -> Optional[float]:
@@ -307,7 +318,7 @@ class BaoStockSyncService:
         """同步日K线批次"""
         stats = BaoStockSyncStats()
 
-        for code in code_batch:
+        async def process(code: str):
             try:
                 # 注意：get_stock_quotes 实际返回的是最新日K线数据，不是实时行情
                 quotes = await self.provider.get_stock_quotes(code)
@@ -322,6 +333,7 @@ class BaoStockSyncService:
             except Exception as e:
                 stats.errors.append(f"处理{code}日K线失败: {e}")
 
+        await self._run_concurrently(code_batch, process)
         return stats
 
     async def _update_stock_quotes(self, quotes: Dict[str, Any]):
@@ -421,7 +433,7 @@ class BaoStockSyncService:
         """同步历史数据批次"""
         stats = BaoStockSyncStats()
 
-        for code in code_batch:
+        async def process(code: str):
             try:
                 # 确定该股票的起始日期
                 if incremental:
@@ -447,6 +459,7 @@ class BaoStockSyncService:
             except Exception as e:
                 stats.errors.append(f"处理{code}历史数据失败: {e}")
 
+        await self._run_concurrently(code_batch, process)
         return stats
 
     async def _update_historical_data(self, code: str, hist_data, period: str = "daily") -> int:
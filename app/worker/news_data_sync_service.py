@@ -12,6 +12,7 @@ from app.services.news_data_service import get_news_data_service
 from tradingagents.dataflows.providers.china.tushare import get_tushare_provider
 from tradingagents.dataflows.providers.china.akshare import get_akshare_provider
 from tradingagents.dataflows.news.realtime_news import RealtimeNewsAggregator
+from tradingagents.dataflows.news.near_duplicate import dedupe as near_dedupe
 
 logger = logging.getLogger(__name__)
 
@@ -427,8 +428,13 @@ class NewsDataSyncService:
             if key not in seen:
                 seen.add(key)
                 unique_news.append(news)
-        
-        return unique_news
+
+        # 再去掉改写标题的转载稿（标题/正文近似重复）
+        return near_dedupe(
+            unique_news,
+            title_of=lambda news: news.get("title", ""),
+            content_of=lambda news: news.get("content", ""),
+        )
     
     async def sync_market_news(
         self,
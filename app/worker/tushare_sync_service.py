@@ -7,6 +7,8 @@ from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 import logging
 
+import pandas as pd
+
 from tradingagents.dataflows.providers.china.tushare import TushareProvider
 from app.services.stock_data_service import get_stock_data_service
 from app.services.historical_data_service import get_historical_data_service
@@ -624,7 +626,14 @@ class TushareSyncService:
 
             logger.info(f"📊 历史数据同步: 结束日期={end_date}, 股票数量={len(symbols)}, 模式={'增量' if incremental else '全量'}")
 
-            # 4. 批量处理
+            # 4. 增量日线：缺口较小的股票按交易日拉取全市场数据，其余股票逐只同步
+            if (incremental and not all_history and not start_date and period == "daily"
+                    and getattr(self.settings, "TUSHARE_HISTORICAL_SYNC_BY_DATE", True)):
+                symbols = await self._sync_daily_by_trade_date(symbols, end_date, stats, job_id)
+                if stats.get("stopped"):
+                    symbols = []
+
+            # 5. 逐只处理
             for i, symbol in enumerate(symbols):
                 # 记录单个股票开始时间
                 stock_start_time = datetime.now()
@@ -727,7 +736,7 @@ class TushareSyncService:
                         f"   堆栈跟踪:\n{error_details}"
                     )
 
-            # 4. 完成统计
+            # 6. 完成统计
             stats["end_time"] = datetime.utcnow()
             stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
 
@@ -756,6 +765,147 @@ class TushareSyncService:
             })
             return stats
 
+    async def _sync_daily_by_trade_date(
+        self,
+        symbols: List[str],
+        end_date: str,
+        stats: Dict[str, Any],
+        job_id: str = None
+    ) -> List[str]:
+        """
+        按交易日同步增量日线
+
+        一次聚合查询得到每只股票的最新日期。缺失交易日不超过 TUSHARE_HISTORICAL_SYNC_BY_DATE_MAX_DATES
+        的股票，每个缺失交易日拉取一次全市场日线、复权因子和每日指标后批量写入；
+        新股、长期停牌等缺口较大的股票返回给调用方逐只同步。
+
+        价格按区间最后一个交易日的复权因子做前复权，与 pro_bar(adj='qfq') 对同一区间的结果一致。
+        复权因子缺失时不写入未复权价格：基准因子缺失则全部逐只同步；某个交易日的因子缺失则停止按交易日同步；
+        个别股票缺少因子则交给逐只同步。
+
+        Returns:
+            仍需逐只同步的股票列表
+        """
+        if self.historical_service is None:
+            self.historical_service = await get_historical_data_service()
+
+        max_dates = int(getattr(self.settings, "TUSHARE_HISTORICAL_SYNC_BY_DATE_MAX_DATES", 30))
+        latest_dates = await self.historical_service.get_latest_dates("tushare", "daily")
+
+        # 最近 max_dates+1 个交易日：第一个是基准日，之后的交易日可以按日期补齐
+        end_dt = datetime.strptime(end_date.replace('-', ''), '%Y%m%d')
+        await self.rate_limiter.acquire()
+        calendar = await self.provider.get_trade_dates(end_dt - timedelta(days=max_dates * 2 + 30), end_dt)
+        if not calendar:
+            logger.warning("⚠️ 获取交易日历失败，全部股票逐只同步")
+            return symbols
+        calendar = calendar[-(max_dates + 1):]
+        anchor = calendar[0]
+
+        pending = {s: latest_dates[s] for s in symbols if latest_dates.get(s) and latest_dates[s] >= anchor}
+        remaining = [s for s in symbols if s not in pending]
+        trade_dates = [d for d in calendar[1:] if pending and d > min(pending.values())]
+        logger.info(
+            f"📅 按交易日同步日线: {len(pending)} 只股票，缺失交易日 {len(trade_dates)} 个，"
+            f"{len(remaining)} 只股票逐只同步"
+        )
+        if not trade_dates:
+            return remaining
+
+        await self.rate_limiter.acquire()
+        base_factors = await self.provider.get_adj_factors(trade_dates[-1])
+        if base_factors is None:
+            logger.warning(f"⚠️ 获取 {trade_dates[-1]} 复权因子失败，全部股票逐只同步")
+            return symbols
+
+        updated = set()
+        unadjusted_symbols = []  # 缺少复权因子的股票，交给逐只同步
+        for i, trade_date in enumerate(trade_dates):
+            if job_id and await self._should_stop(job_id):
+                logger.warning(f"⚠️ 任务 {job_id} 收到停止信号，正在退出...")
+                stats["stopped"] = True
+                break
+
+            try:
+                date_start = datetime.now()
+                df, unadjusted = await self._fetch_market_daily(trade_date, base_factors)
+                if df is None:
+                    # 后续交易日不再写入，保证每只股票的数据连续（下次同步从这里继续）
+                    logger.warning(f"⚠️ {trade_date}: 无全市场日线数据或复权因子，停止按交易日同步")
+                    break
+                for symbol in unadjusted:
+                    # 该股票后续交易日也不再按日期写入，避免数据出现缺口
+                    if pending.pop(symbol, None) is not None:
+                        unadjusted_symbols.append(symbol)
+                        updated.discard(symbol)
+
+                # 只保留该交易日尚未同步的股票
+                df = df[[pending.get(symbol, "9999-99-99") < trade_date for symbol in df["symbol"]]]
+                records_saved = await self.historical_service.save_market_data(df, "tushare", market="CN", period="daily")
+                stats["total_records"] += records_saved
+                updated.update(df["symbol"])
+
+                logger.info(
+                    f"✅ {trade_date}: 保存 {records_saved} 条日线记录，"
+                    f"耗时 {(datetime.now() - date_start).total_seconds():.2f}秒"
+                )
+                if job_id:
+                    await self._update_progress(
+                        job_id,
+                        int(((i + 1) / len(trade_dates)) * 100),
+                        f"正在同步 {trade_date} 全市场日线 ({i + 1}/{len(trade_dates)})"
+                    )
+
+            except Exception as e:
+                stats["error_count"] += 1
+                stats["errors"].append({
+                    "trade_date": trade_date,
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                    "context": "sync_daily_by_trade_date"
+                })
+                logger.error(f"❌ {trade_date} 全市场日线同步失败，停止按交易日同步: {e}")
+                break
+
+        if unadjusted_symbols:
+            logger.warning(f"⚠️ {len(unadjusted_symbols)} 只股票缺少复权因子，改为逐只同步: {unadjusted_symbols[:10]}")
+        stats["success_count"] += len(updated)
+        return remaining + unadjusted_symbols
+
+    async def _fetch_market_daily(self, trade_date: str, base_factors):
+        """拉取某个交易日的全市场日线（按 base_factors 前复权）并合并每日指标，附加 symbol 列
+
+        Returns:
+            (日线, 缺少复权因子而被剔除的股票代码)；没有日线或该交易日的复权因子时日线为 None
+        """
+        await self.rate_limiter.acquire()
+        df = await self.provider.get_market_daily(trade_date)
+        if df is None or df.empty:
+            return None, []
+
+        await self.rate_limiter.acquire()
+        factors = await self.provider.get_adj_factors(trade_date)
+        if factors is None:
+            logger.warning(f"⚠️ {trade_date}: 获取复权因子失败")
+            return None, []
+        ratio = df["ts_code"].map(factors) / df["ts_code"].map(base_factors)
+        missing = ratio.isna()
+        unadjusted = df.loc[missing, "ts_code"].str.split(".").str[0].tolist()
+        df = df[~missing].copy()
+        ratio = ratio[~missing]
+        for column in ("open", "high", "low", "close", "pre_close"):
+            if column in df.columns:
+                df[column] = (df[column] * ratio).round(2)
+
+        await self.rate_limiter.acquire()
+        basic = await self.provider.get_daily_basic(trade_date)
+        if basic is not None and not basic.empty:
+            columns = [c for c in ("ts_code", "turnover_rate", "volume_ratio", "pe", "pb") if c in basic.columns]
+            df = df.merge(basic[columns].drop_duplicates("ts_code"), on="ts_code", how="left")
+
+        df["symbol"] = df["ts_code"].str.split(".").str[0]
+        return df, unadjusted
+
     async def _save_historical_data(self, symbol: str, df, period: str = "daily") -> int:
         """保存历史数据到数据库"""
         try:
@@ -873,62 +1023,8 @@ class TushareSyncService:
             stats["total_processed"] = len(symbols)
             logger.info(f"📊 需要同步 {len(symbols)} 只股票财务数据")
 
-            # 批量处理
-            for i, symbol in enumerate(symbols):
-                try:
-                    # 速率限制
-                    await self.rate_limiter.acquire()
-
-                    # 获取财务数据（指定获取期数）
-                    financial_data = await self.provider.get_financial_data(symbol, limit=limit)
-
-                    if financial_data:
-                        # 保存财务数据
-                        success = await self._save_financial_data(symbol, financial_data)
-                        if success:
-                            stats["success_count"] += 1
-                        else:
-                            stats["error_count"] += 1
-                    else:
-                        logger.warning(f"⚠️ {symbol}: 无财务数据")
-
-                    # 进度日志和进度跟踪
-                    if (i + 1) % 20 == 0:
-                        progress = int((i + 1) / len(symbols) * 100)
-                        logger.info(f"📈 财务数据同步进度: {i + 1}/{len(symbols)} ({progress}%) "
-                                   f"(成功: {stats['success_count']}, 错误: {stats['error_count']})")
-                        # 输出速率限制器统计
-                        limiter_stats = self.rate_limiter.get_stats()
-                        logger.info(f"   速率限制: {limiter_stats['current_calls']}/{limiter_stats['max_calls']}次")
-
-                        # 更新任务进度
-                        if job_id:
-                            from app.services.scheduler_service import update_job_progress, TaskCancelledException
-                            try:
-                                await update_job_progress(
-                                    job_id=job_id,
-                                    progress=progress,
-                                    message=f"正在同步 {symbol} 财务数据",
-                                    current_item=symbol,
-                                    total_items=len(symbols),
-                                    processed_items=i + 1
-                                )
-                            except TaskCancelledException:
-                                # 任务被取消，记录并退出
-                                logger.warning(f"⚠️ 财务数据同步任务被用户取消 (已处理 {i + 1}/{len(symbols)})")
-                                stats["end_time"] = datetime.utcnow()
-                                stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
-                                stats["cancelled"] = True
-                                raise
-
-                except Exception as e:
-                    stats["error_count"] += 1
-                    stats["errors"].append({
-                        "code": symbol,
-                        "error": str(e),
-                        "context": "sync_financial_data"
-                    })
-                    logger.error(f"❌ {symbol} 财务数据同步失败: {e}")
+            # 获取 → 标准化 → 批量写入 流水线
+            await self._run_financial_pipeline(symbols, limit, stats, job_id)
 
             # 完成统计
             stats["end_time"] = datetime.utcnow()
@@ -946,29 +1042,206 @@ class TushareSyncService:
             stats["errors"].append({"error": str(e), "context": "sync_financial_data"})
             return stats
 
-    async def _save_financial_data(self, symbol: str, financial_data: Dict[str, Any]) -> bool:
-        """保存财务数据"""
+    async def _run_financial_pipeline(
+        self,
+        symbols: List[str],
+        limit: int,
+        stats: Dict[str, Any],
+        job_id: str = None
+    ):
+        """
+        财务数据同步流水线
+
+        获取阶段由多个 worker 并发执行（每只股票的各类报表同时请求，所有接口调用共享速率限制器）；
+        标准化在线程中执行；写入按批次无序批量写入，与下一批的获取和标准化重叠进行。
+        阶段之间通过有界队列衔接，积分等级允许时改为按报告期批量获取全部公司的报表。
+        """
+        concurrency = int(getattr(self.settings, "TUSHARE_FINANCIAL_SYNC_CONCURRENCY", 4))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 4)
+
+        async def produce():
+            try:
+                remaining = symbols
+                if self._use_financial_period_bulk(len(symbols), limit):
+                    remaining = await self._produce_financials_by_period(symbols, limit, queue)
+                await self._produce_financials_by_symbol(remaining, limit, queue, concurrency)
+            except Exception as e:
+                logger.error(f"❌ 财务数据获取阶段失败: {e}")
+                stats["errors"].append({"error": str(e), "context": "sync_financial_data"})
+            await queue.put(None)
+
+        producer = asyncio.create_task(produce())
         try:
-            # 使用统一的财务数据服务
-            from app.services.financial_data_service import get_financial_data_service
+            await self._consume_financials(queue, stats, len(symbols), job_id)
+        finally:
+            if not producer.done():
+                producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    def _use_financial_period_bulk(self, symbol_count: int, limit: int) -> bool:
+        """是否按报告期批量获取（需要积分等级支持，且比逐只获取的调用次数少）"""
+        mode = str(getattr(self.settings, "TUSHARE_FINANCIAL_PERIOD_BULK", "auto")).lower()
+        if mode == "auto":
+            enabled = getattr(self.rate_limiter, "tier", None) in ("premium", "vip")
+        else:
+            enabled = mode in ("true", "1", "yes")
+        bulk_calls = (limit + 1) * sum(1 for _, _, bulk_api, _ in self.provider.FINANCIAL_STATEMENTS if bulk_api)
+        return enabled and bulk_calls < symbol_count * len(self.provider.FINANCIAL_STATEMENTS)
+
+    async def _produce_financials_by_symbol(self, symbols: List[str], limit: int,
+                                            queue: asyncio.Queue, concurrency: int):
+        """逐只获取财务报表，多个 worker 并发，结果 (symbol, 报表字典或异常) 放入队列"""
+        symbol_iter = iter(symbols)
+
+        async def worker():
+            for symbol in symbol_iter:
+                try:
+                    statements = await self.provider.get_financial_statements(
+                        symbol, limit=limit, rate_limiter=self.rate_limiter
+                    )
+                except Exception as e:
+                    statements = e
+                await queue.put((symbol, statements))
 
-            financial_service = await get_financial_data_service()
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(symbols)))))
 
-            # 保存财务数据
-            saved_count = await financial_service.save_financial_data(
-                symbol=symbol,
-                financial_data=financial_data,
-                data_source="tushare",
-                market="CN",
-                report_period=financial_data.get("report_period"),
-                report_type=financial_data.get("report_type", "quarterly")
-            )
+    async def _produce_financials_by_period(self, symbols: List[str], limit: int,
+                                            queue: asyncio.Queue) -> List[str]:
+        """
+        按报告期批量获取全部公司的报表，拆分到各股票后放入队列
 
-            return saved_count > 0
+        Returns:
+            仍需逐只获取的股票（批量接口不可用时为全部股票）
+        """
+        frames: Dict[str, List[pd.DataFrame]] = {}
+        # 多取一个报告期：刚过季度末时最新一期大多数公司尚未披露，每家公司保留最新的 limit 期
+        periods = self._recent_report_periods(limit + 1)
+        for period in periods:
+            data = await self.provider.get_financial_statements_by_period(period, rate_limiter=self.rate_limiter)
+            if data is None:
+                logger.warning("⚠️ 按报告期批量获取财务报表不可用（可能积分不足），改为逐只获取")
+                return symbols
+            for key, df in data.items():
+                frames.setdefault(key, []).append(df)
+
+        # 与单只股票接口的返回顺序一致：报告期从新到旧
+        grouped = {}
+        for key, dfs in frames.items():
+            df = pd.concat(dfs, ignore_index=True)
+            sort_columns = [c for c in ("end_date", "ann_date") if c in df.columns]
+            grouped[key] = df.sort_values(sort_columns, ascending=False).groupby("ts_code", sort=False)
+        logger.info(f"📦 按报告期批量获取财务报表完成: {len(periods)} 个报告期 ({periods[-1]}~{periods[0]})")
+
+        for symbol in symbols:
+            ts_code = self.provider._normalize_ts_code(symbol)
+            statements = {
+                key: groups.get_group(ts_code).head(limit).to_dict('records')
+                for key, groups in grouped.items() if ts_code in groups.groups
+            }
+            await queue.put((symbol, statements))
+        return []
+
+    @staticmethod
+    def _recent_report_periods(count: int, today: Optional[datetime] = None) -> List[str]:
+        """最近 count 个报告期（季度末，YYYYMMDD，从新到旧）"""
+        today = today or datetime.now()
+        periods = []
+        year, quarter = today.year, (today.month - 1) // 3
+        while len(periods) < count:
+            if quarter == 0:
+                year, quarter = year - 1, 4
+            periods.append(f"{year}{('0331', '0630', '0930', '1231')[quarter - 1]}")
+            quarter -= 1
+        return periods
+
+    async def _consume_financials(self, queue: asyncio.Queue, stats: Dict[str, Any],
+                                  total: int, job_id: str = None):
+        """标准化队列中的报表并分批写入；写入与后续批次的标准化重叠进行"""
+        from app.services.financial_data_service import get_financial_data_service
+
+        financial_service = await get_financial_data_service()
+        batch_size = int(getattr(self.settings, "TUSHARE_FINANCIAL_WRITE_BATCH_SIZE", 50))
+        batch: List[Dict[str, Any]] = []
+        write_task: Optional[asyncio.Task] = None
+        processed = 0
+
+        async def write(items: List[Dict[str, Any]]):
+            saved = await financial_service.save_financial_data_batch(items, data_source="tushare", market="CN")
+            stats["success_count"] += saved
+            stats["error_count"] += len(items) - saved
 
-        except Exception as e:
-            logger.error(f"❌ 保存 {symbol} 财务数据失败: {e}")
-            return False
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                symbol, statements = item
+                processed += 1
+
+                if isinstance(statements, Exception):
+                    stats["error_count"] += 1
+                    stats["errors"].append({"code": symbol, "error": str(statements), "context": "sync_financial_data"})
+                    logger.error(f"❌ {symbol} 财务数据同步失败: {statements}")
+                elif not statements:
+                    logger.warning(f"⚠️ {symbol}: 无财务数据")
+                else:
+                    financial_data = await asyncio.to_thread(
+                        self.provider._standardize_tushare_financial_data,
+                        statements, self.provider._normalize_ts_code(symbol)
+                    )
+                    if financial_data:
+                        batch.append(financial_data)
+                    else:
+                        stats["error_count"] += 1
+                        logger.error(f"❌ {symbol} 财务数据标准化失败")
+
+                if len(batch) >= batch_size:
+                    if write_task is not None:
+                        await write_task
+                    write_task, batch = asyncio.create_task(write(batch)), []
+
+                # 进度日志和进度跟踪
+                if processed % 20 == 0:
+                    await self._report_financial_progress(symbol, processed, total, stats, job_id)
+
+            if write_task is not None:
+                await write_task
+                write_task = None
+            if batch:
+                await write(batch)
+        finally:
+            if write_task is not None:
+                await asyncio.gather(write_task, return_exceptions=True)
+
+    async def _report_financial_progress(self, symbol: str, processed: int, total: int,
+                                         stats: Dict[str, Any], job_id: str = None):
+        """输出财务数据同步进度并更新任务进度（任务被取消时抛出 TaskCancelledException）"""
+        progress = int(processed / total * 100)
+        logger.info(f"📈 财务数据同步进度: {processed}/{total} ({progress}%) "
+                   f"(成功: {stats['success_count']}, 错误: {stats['error_count']})")
+        # 输出速率限制器统计
+        limiter_stats = self.rate_limiter.get_stats()
+        logger.info(f"   速率限制: {limiter_stats['current_calls']}/{limiter_stats['max_calls']}次")
+
+        # 更新任务进度
+        if job_id:
+            from app.services.scheduler_service import update_job_progress, TaskCancelledException
+            try:
+                await update_job_progress(
+                    job_id=job_id,
+                    progress=progress,
+                    message=f"正在同步 {symbol} 财务数据",
+                    current_item=symbol,
+                    total_items=total,
+                    processed_items=processed
+                )
+            except TaskCancelledException:
+                # 任务被取消，记录并退出
+                logger.warning(f"⚠️ 财务数据同步任务被用户取消 (已处理 {processed}/{total})")
+                stats["end_time"] = datetime.utcnow()
+                stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
+                stats["cancelled"] = True
+                raise
 
     # ==================== 辅助方法 ====================
 
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+TradingAgentsGraph 复用池基准：对比每个任务新建实例与从复用池获取实例
+
+分别统计：
+- 构造开销：单次构造 TradingAgentsGraph（LLM 客户端、工具节点、编译 LangGraph）的耗时
+- 任务启动延迟：从任务开始到拿到可执行实例的耗时；任务按 --configs 个不同配置（研究深度）轮换
+
+构造 LLM 客户端不会发起网络请求，默认使用 openai 厂家和占位 API Key；默认关闭记忆库，
+传入 --with-memory 则同时计入 ChromaDB 记忆库的初始化开销（需要可用的 embedding 配置）。
+
+用法:
+    python scripts/benchmark_graph_pool.py --tasks 50 --configs 2
+    python scripts/benchmark_graph_pool.py --tasks 100 --configs 4 --concurrency 4 --with-memory
+"""
+
+import argparse
+import copy
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-placeholder")
+
+from tradingagents.default_config import DEFAULT_CONFIG  # noqa: E402
+from tradingagents.graph.graph_pool import TradingGraphPool  # noqa: E402
+from tradingagents.graph.trading_graph import TradingAgentsGraph  # noqa: E402
+
+
+def make_configs(count: int, with_memory: bool):
+    """不同研究深度（辩论轮次）的配置，对应不同的复用池键"""
+    configs = []
+    for i in range(count):
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        config.update(
+            llm_provider="openai",
+            backend_url="https://api.openai.com/v1",
+            quick_think_llm="gpt-4o-mini",
+            deep_think_llm="gpt-4o",
+            max_debate_rounds=i + 1,
+            max_risk_discuss_rounds=i + 1,
+            memory_enabled=with_memory,
+            online_tools=True,
+        )
+        configs.append(config)
+    return configs
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(label: str, samples):
+    ms = [s * 1000 for s in samples]
+    print(f"{label:<28} n={len(ms):<4} 平均={statistics.mean(ms):8.2f}ms  "
+          f"p50={percentile(ms, 50):8.2f}ms  p95={percentile(ms, 95):8.2f}ms  合计={sum(ms):9.1f}ms")
+
+
+def run_tasks(tasks: int, configs, analysts, concurrency: int, acquire):
+    """模拟任务启动：每个任务记录获取实例的耗时"""
+
+    def start_task(i: int) -> float:
+        config = copy.deepcopy(configs[i % len(configs)])
+        started = time.perf_counter()
+        graph = acquire(analysts, config)
+        elapsed = time.perf_counter() - started
+        assert graph.graph is not None
+        return elapsed
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(start_task, range(tasks)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TradingAgentsGraph 复用池基准")
+    parser.add_argument("--tasks", type=int, default=50, help="模拟的分析任务数")
+    parser.add_argument("--configs", type=int, default=2, help="任务轮换使用的不同配置数")
+    parser.add_argument("--analysts", default="market,fundamentals", help="分析师列表，逗号分隔")
+    parser.add_argument("--concurrency", type=int, default=1, help="同时启动任务的线程数")
+    parser.add_argument("--with-memory", action="store_true", help="启用记忆库（计入 ChromaDB 初始化）")
+    parser.add_argument("--verbose", action="store_true", help="保留构造过程中的日志输出")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    analysts = [a.strip() for a in args.analysts.split(",") if a.strip()]
+    configs = make_configs(args.configs, args.with_memory)
+
+    # 预热：首次构造包含模块导入等一次性开销，不计入
+    TradingAgentsGraph(selected_analysts=analysts, config=copy.deepcopy(configs[0]))
+
+    print(f"任务数={args.tasks} 配置数={args.configs} 分析师={analysts} 并发={args.concurrency} "
+          f"记忆库={'开启' if args.with_memory else '关闭'}")
+    print("-" * 100)
+
+    construction = []
+    for i in range(max(5, args.configs)):
+        started = time.perf_counter()
+        TradingAgentsGraph(selected_analysts=analysts, config=copy.deepcopy(configs[i % len(configs)]))
+        construction.append(time.perf_counter() - started)
+    report("构造开销（单次）", construction)
+
+    def build_new(selected_analysts, config):
+        return TradingAgentsGraph(selected_analysts=selected_analysts, config=config)
+
+    before = run_tasks(args.tasks, configs, analysts, args.concurrency, build_new)
+    report("任务启动（每次新建）", before)
+
+    pool = TradingGraphPool(max_size=max(1, args.configs))
+    after = run_tasks(args.tasks, configs, analysts, args.concurrency, pool.get)
+    report("任务启动（复用池）", after)
+
+    print("-" * 100)
+    print(f"复用池统计: {pool.stats()}")
+    print(f"平均启动延迟降低: {statistics.mean(before) / max(statistics.mean(after), 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+历史行情保存基准：对比逐行标准化 + 200 条顺序批量写入的旧流程与列式标准化 + 并发无序批量写入
+
+分别统计两个阶段的每秒行数：
+- 标准化：DataFrame -> Mongo 文档（纯 CPU）
+- 端到端：标准化 + upsert 写入
+
+默认使用 mongomock（内存模拟，写入没有网络往返，绝对数值只用于相对比较）；
+传入 --mongo-url 则连接真实 mongod，此时并发批量写入的收益才会完整体现。
+
+用法:
+    python scripts/benchmark_historical_save.py --symbols 4 --rows 2500
+    python scripts/benchmark_historical_save.py --symbols 200 --rows 5000 --mongo-url mongodb://localhost:27017
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pymongo import ReplaceOne  # noqa: E402
+
+from app.services.historical_data_service import HistoricalDataService  # noqa: E402
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """模拟 Tushare 日线数据"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=rows)
+    close = 10 + rng.standard_normal(rows).cumsum() * 0.1
+    return pd.DataFrame({
+        "ts_code": "600519.SH",
+        "trade_date": dates.strftime("%Y%m%d"),
+        "open": close + rng.normal(0, 0.05, rows),
+        "high": close + 0.1,
+        "low": close - 0.1,
+        "close": close,
+        "pre_close": np.r_[close[0], close[:-1]],
+        "change": rng.normal(0, 0.1, rows),
+        "pct_chg": rng.normal(0, 1, rows),
+        "vol": rng.integers(1_000, 100_000, rows).astype(float),
+        "amount": rng.uniform(1e4, 1e6, rows),
+        "turnover_rate": rng.uniform(0, 5, rows),
+        "pe": rng.uniform(5, 50, rows),
+        "pb": rng.uniform(0.5, 10, rows),
+    })
+
+
+class _MongomockCollection:
+    """mongomock 集合的异步包装
+
+    mongomock 的 bulk_write 与当前 pymongo 请求对象不兼容，这里逐条执行；mongomock 不使用索引，
+    upsert 每次都会扫描全表，因此用一个键集合模拟唯一索引：新键直接插入，已有键才走 replace_one。
+    """
+
+    def __init__(self, coll):
+        self._coll = coll
+        self._keys = set()
+
+    async def bulk_write(self, requests, ordered=True):
+        upserted = modified = 0
+        for op in requests:
+            key = tuple(sorted(op._filter.items()))
+            if key in self._keys:
+                modified += self._coll.replace_one(op._filter, op._doc).modified_count
+            else:
+                self._coll.insert_one(dict(op._doc))
+                self._keys.add(key)
+                upserted += 1
+        return type("BulkResult", (), {"upserted_count": upserted, "modified_count": modified})()
+
+    async def delete_many(self, query):
+        self._keys.clear()
+        return self._coll.delete_many(query)
+
+
+async def legacy_save(svc: HistoricalDataService, symbol: str, data: pd.DataFrame) -> int:
+    """旧流程：iterrows 逐行标准化，每 200 条顺序写入一批"""
+    operations, saved = [], 0
+    for date_index, row in data.iterrows():
+        doc = svc._standardize_record(symbol, row, "benchmark", "CN", "daily", date_index)
+        operations.append(ReplaceOne(
+            {"symbol": doc["symbol"], "trade_date": doc["trade_date"],
+             "data_source": doc["data_source"], "period": doc["period"]},
+            doc, upsert=True,
+        ))
+        if len(operations) >= 200:
+            saved += await svc._execute_bulk_write_with_retry(symbol, operations)
+            operations = []
+    if operations:
+        saved += await svc._execute_bulk_write_with_retry(symbol, operations)
+    return saved
+
+
+def bench_standardize(svc: HistoricalDataService, frames):
+    start = time.perf_counter()
+    legacy = sum(len(svc._standardize_rows(symbol, data, "tushare", "CN", "daily")) for symbol, data in frames)
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columnar = sum(len(svc._standardize_frame(symbol, data, "tushare", "CN", "daily")) for symbol, data in frames)
+    columnar_s = time.perf_counter() - start
+    assert legacy == columnar
+    return legacy_s, columnar_s
+
+
+async def bench_save(svc: HistoricalDataService, frames):
+    # 两种流程都不做 tushare 单位换算（data_source 使用同一个非 tushare 标记），只比较标准化与写入
+    await svc.collection.delete_many({})
+    start = time.perf_counter()
+    legacy_saved = 0
+    for symbol, data in frames:
+        legacy_saved += await legacy_save(svc, symbol, data)
+    legacy_s = time.perf_counter() - start
+
+    await svc.collection.delete_many({})
+    start = time.perf_counter()
+    columnar_saved = 0
+    for symbol, data in frames:
+        columnar_saved += await svc.save_historical_data(symbol, data.copy(), data_source="benchmark")
+    columnar_s = time.perf_counter() - start
+    return (legacy_saved, legacy_s), (columnar_saved, columnar_s)
+
+
+def report(label: str, rows: int, legacy_s: float, columnar_s: float):
+    print(f"{label:<10} 旧流程 {rows / legacy_s:>12,.0f} 行/秒 ({legacy_s:.3f}s)   "
+          f"列式 {rows / columnar_s:>12,.0f} 行/秒 ({columnar_s:.3f}s)   加速 {legacy_s / columnar_s:.1f}x")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=4, help="股票数量")
+    parser.add_argument("--rows", type=int, default=2500, help="每只股票的日线条数（约 10 年）")
+    parser.add_argument("--mongo-url", default=None, help="真实 MongoDB 地址（默认使用 mongomock）")
+    parser.add_argument("--database", default="ta_benchmark")
+    args = parser.parse_args()
+
+    frames = [(f"{600000 + i:06d}", make_frame(args.rows, seed=i)) for i in range(args.symbols)]
+    total_rows = args.symbols * args.rows
+    svc = HistoricalDataService()
+
+    legacy_s, columnar_s = bench_standardize(svc, frames)
+    report("标准化", total_rows, legacy_s, columnar_s)
+
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.mongo_url)
+        svc.collection = client[args.database].stock_daily_quotes_benchmark
+        await svc._ensure_indexes()
+    else:
+        import mongomock
+        svc.collection = _MongomockCollection(mongomock.MongoClient().db.stock_daily_quotes)
+
+    (legacy_saved, legacy_s), (columnar_saved, columnar_s) = await bench_save(svc, frames)
+    assert legacy_saved == columnar_saved == total_rows, (legacy_saved, columnar_saved)
+    report("端到端", total_rows, legacy_s, columnar_s)
+
+    if args.mongo_url:
+        await svc.collection.drop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
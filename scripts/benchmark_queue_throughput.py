@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+队列吞吐基准：对比逐条命令的旧流程与 Lua 脚本原子流程
+
+每个任务执行 入队 -> 出队 -> 确认，统计每秒处理任务数与每个任务的 Redis 往返次数。
+默认使用 fakeredis（需安装 fakeredis[lua]）；传入 --redis-url 则连接真实 Redis，
+此时网络往返的差异才会完整体现在吞吐上。
+
+用法:
+    python scripts/benchmark_queue_throughput.py --tasks 2000 --workers 8
+    python scripts/benchmark_queue_throughput.py --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.queue import (  # noqa: E402
+    READY_LIST,
+    TASK_PREFIX,
+    SET_PROCESSING,
+    SET_COMPLETED,
+    check_user_concurrent_limit,
+    check_global_concurrent_limit,
+    mark_task_processing,
+    unmark_task_processing,
+    set_visibility_timeout,
+    clear_visibility_timeout,
+)
+from app.services.queue_service import QueueService  # noqa: E402
+
+
+class LegacyQueue:
+    """旧实现：每一步都是一次独立的 Redis 往返"""
+
+    def __init__(self, svc: QueueService):
+        self.svc = svc
+        self.r = svc.r
+
+    async def enqueue_task(self, user_id, symbol, params):
+        if not await check_user_concurrent_limit(self.r, user_id, self.svc.user_concurrent_limit):
+            raise ValueError("user limit")
+        if not await check_global_concurrent_limit(self.r, self.svc.global_concurrent_limit):
+            raise ValueError("global limit")
+        task_id = str(uuid.uuid4())
+        now = str(int(time.time()))
+        await self.r.hset(TASK_PREFIX + task_id, mapping={
+            "id": task_id, "user": user_id, "symbol": symbol, "status": "queued",
+            "created_at": now, "params": json.dumps(params), "enqueued_at": now,
+        })
+        await self.r.lpush(READY_LIST, task_id)
+        return task_id
+
+    async def dequeue_task(self, worker_id, timeout=0):
+        task_id = await self.r.rpop(READY_LIST)
+        if not task_id:
+            return None
+        task = await self.r.hgetall(TASK_PREFIX + task_id)
+        user_id = task["user"]
+        if not await check_user_concurrent_limit(self.r, user_id, self.svc.user_concurrent_limit):
+            await self.r.lpush(READY_LIST, task_id)
+            return None
+        if not await check_global_concurrent_limit(self.r, self.svc.global_concurrent_limit):
+            await self.r.lpush(READY_LIST, task_id)
+            return None
+        await mark_task_processing(self.r, task_id, user_id)
+        await set_visibility_timeout(self.r, task_id, worker_id, self.svc.visibility_timeout)
+        await self.r.hset(TASK_PREFIX + task_id, mapping={
+            "status": "processing", "worker_id": worker_id, "started_at": str(int(time.time())),
+        })
+        return task
+
+    async def ack_task(self, task_id, success=True):
+        task = await self.r.hgetall(TASK_PREFIX + task_id)
+        await unmark_task_processing(self.r, task_id, task["user"])
+        await clear_visibility_timeout(self.r, task_id)
+        await self.r.hset(TASK_PREFIX + task_id, mapping={
+            "status": "completed", "completed_at": str(int(time.time())),
+        })
+        await self.r.sadd(SET_COMPLETED, task_id)
+        return True
+
+
+def _count_commands(redis):
+    """包装 execute_command 统计往返次数（脚本调用计 1 次）"""
+    counter = {"n": 0}
+    original = redis.execute_command
+
+    async def execute_command(*args, **kwargs):
+        counter["n"] += 1
+        return await original(*args, **kwargs)
+
+    redis.execute_command = execute_command
+    return counter
+
+
+async def _run(queue, n_tasks: int, n_workers: int, n_users: int):
+    for i in range(n_tasks):
+        await queue.enqueue_task(f"user{i % n_users}", f"{i:06d}", {"depth": 1})
+
+    async def worker(worker_id):
+        done = 0
+        while True:
+            task = await queue.dequeue_task(worker_id)
+            if task is None:
+                return done
+            await queue.ack_task(task["id"])
+            done += 1
+
+    results = await asyncio.gather(*(worker(f"w{i}") for i in range(n_workers)))
+    return sum(results)
+
+
+async def _bench(name, make_redis, wrap, args):
+    redis = await make_redis()
+    await redis.flushdb()
+    svc = QueueService(redis)
+    svc.user_concurrent_limit = args.workers
+    svc.global_concurrent_limit = args.workers * 2
+    counter = _count_commands(redis)
+
+    begin = time.perf_counter()
+    done = await _run(wrap(svc), args.tasks, args.workers, args.users)
+    elapsed = time.perf_counter() - begin
+
+    leftover = await redis.llen(READY_LIST) + await redis.scard(SET_PROCESSING)
+    print(f"{name:<8} 完成 {done:>6} 个任务, 耗时 {elapsed:6.2f}s, "
+          f"{done / elapsed:8.0f} 任务/秒, 每任务 {counter['n'] / max(done, 1):5.1f} 次往返, 残留 {leftover}")
+    await redis.flushdb()
+    await redis.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--redis-url", default=None, help="真实 Redis 地址（会清空该库！）")
+    args = parser.parse_args()
+
+    if args.redis_url:
+        from redis.asyncio import Redis
+
+        async def make_redis():
+            return Redis.from_url(args.redis_url, decode_responses=True)
+    else:
+        import fakeredis
+
+        server = fakeredis.FakeServer()
+
+        async def make_redis():
+            return fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+    async def _main():
+        await _bench("legacy", make_redis, LegacyQueue, args)
+        await _bench("lua", make_redis, lambda svc: svc, args)
+
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
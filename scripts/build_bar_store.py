@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+从 MongoDB stock_daily_quotes 回填列式日线存储
+
+按 (market, period, data_source) 流式读取全部 K 线写入 TA_BAR_STORE_DIR，合并各年份分区后写入就绪标记；
+之后读取方（MongoDBCacheAdapter、全市场筛选）才会用列式存储代替 MongoDB 查询。
+回填期间请暂停历史数据同步任务，避免回填的旧数据覆盖同步写入的新数据。
+TA_BAR_STORE_ENABLED 关闭期间发生的同步写入会清除对应数据源的就绪标记，重新开启前需再次运行本脚本。
+
+用法:
+    python scripts/build_bar_store.py
+    python scripts/build_bar_store.py --period daily --source tushare --chunk 500000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from pymongo import MongoClient  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from tradingagents.dataflows.cache.bar_store import NUMERIC_COLUMNS, get_bar_store  # noqa: E402
+
+_PROJECTION = {"_id": 0, "symbol": 1, "trade_date": 1, **{c: 1 for c in NUMERIC_COLUMNS}}
+
+
+def backfill(db, store, market: str, period: str, source: str, chunk: int) -> int:
+    query = {"period": period, "data_source": source}
+    if market == "CN":
+        # 早期文档没有 market 字段，默认视为 A 股
+        query["market"] = {"$in": ["CN", None]}
+    else:
+        query["market"] = market
+
+    total, batch = 0, []
+    cursor = db.stock_daily_quotes.find(query, _PROJECTION).batch_size(10000)
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= chunk:
+            total += store.append_documents(market, period, source, batch)
+            batch = []
+            print(f"   ... {total:,} 条")
+    total += store.append_documents(market, period, source, batch)
+    store.compact(market, period, source)
+    store.mark_ready(market, period, source)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--market", default=None, help="只回填指定市场（CN/HK/US）")
+    parser.add_argument("--period", default=None, help="只回填指定周期（daily/weekly/monthly）")
+    parser.add_argument("--source", default=None, help="只回填指定数据源")
+    parser.add_argument("--chunk", type=int, default=200000, help="每次追加的文档数")
+    args = parser.parse_args()
+
+    db = MongoClient(settings.MONGO_URI)[settings.MONGO_DB]
+    store = get_bar_store()
+    print(f"📁 列式存储目录: {store.root.resolve()}")
+
+    groups = db.stock_daily_quotes.aggregate([
+        {"$group": {"_id": {"market": {"$ifNull": ["$market", "CN"]},
+                            "period": "$period", "data_source": "$data_source"}}}
+    ])
+    for group in groups:
+        key = group["_id"]
+        market, period, source = key["market"], key["period"], key["data_source"]
+        if not (period and source):
+            continue
+        if (args.market and market != args.market) or (args.period and period != args.period) \
+                or (args.source and source != args.source):
+            continue
+        start = time.perf_counter()
+        print(f"🔄 回填 {market}/{period}/{source}")
+        count = backfill(db, store, market, period, source, args.chunk)
+        print(f"✅ {market}/{period}/{source}: {count:,} 条, 耗时 {time.perf_counter() - start:.1f}秒")
+
+
+if __name__ == "__main__":
+    main()
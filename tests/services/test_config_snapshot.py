@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+import fakeredis
+import mongomock
+
+import app.core.database as database
+import app.services.config_snapshot as config_snapshot
+from app.services.config_snapshot import ConfigSnapshotStore
+from app.services.simple_analysis_service import get_provider_and_url_by_model_sync
+
+
+class _AsyncCollection:
+    """把 mongomock 集合包装成 Motor 风格的异步接口"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def find_one(self, *args, **kwargs):
+        return self._collection.find_one(*args, **kwargs)
+
+    def find(self, *args, **kwargs):
+        cursor = self._collection.find(*args, **kwargs)
+
+        async def to_list(length=None):
+            return list(cursor)
+
+        return SimpleNamespace(to_list=to_list)
+
+
+def _seed_db():
+    db = mongomock.MongoClient().tradingagents
+    db.system_configs.insert_many([
+        {"is_active": False, "version": 1, "llm_configs": [{"model_name": "qwen-plus", "provider": "openai"}]},
+        {"is_active": True, "version": 2, "llm_configs": [
+            {"model_name": "qwen-plus", "provider": "dashscope", "api_base": None, "api_key": None},
+            {"model_name": "custom-model", "provider": "acme", "api_base": "https://acme.test/v1",
+             "api_key": "model-key-123"},
+        ]},
+    ])
+    db.llm_providers.insert_many([
+        {"name": "dashscope", "default_base_url": "https://dashscope.test/v1", "api_key": "provider-key-123"},
+        {"name": "acme", "default_base_url": "https://acme-default.test/v1", "api_key": ""},
+    ])
+    return db
+
+
+def _store(redis_client, check_interval=60.0):
+    store = ConfigSnapshotStore(check_interval=check_interval, max_age=3600)
+    store._sync_redis = redis_client
+    return store
+
+
+def test_sync_lookups_read_the_snapshot_without_new_connections(monkeypatch):
+    db = _seed_db()
+    loads = []
+    monkeypatch.setattr(database, "get_mongo_db_sync", lambda: loads.append(1) or db)
+    monkeypatch.setattr(config_snapshot, "_store", _store(fakeredis.FakeRedis(decode_responses=True)))
+
+    custom = get_provider_and_url_by_model_sync("custom-model")
+    qwen = get_provider_and_url_by_model_sync("qwen-plus")
+    unknown = get_provider_and_url_by_model_sync("not-configured")
+
+    assert custom == {"provider": "acme", "backend_url": "https://acme.test/v1", "api_key": "model-key-123"}
+    assert qwen == {"provider": "dashscope", "backend_url": "https://dashscope.test/v1",
+                    "api_key": "provider-key-123"}
+    assert unknown["provider"] == "dashscope" and unknown["backend_url"] == "https://dashscope.test/v1"
+    assert len(loads) == 1
+
+
+def test_version_bump_from_another_process_refreshes_snapshot():
+    db = _seed_db()
+    server = fakeredis.FakeServer()
+    reader = _store(fakeredis.FakeRedis(server=server, decode_responses=True), check_interval=0)
+    writer = _store(fakeredis.FakeRedis(server=server, decode_responses=True))
+
+    first = reader.get_sync(db)
+    assert first.find_llm_config("qwen-plus")["provider"] == "dashscope"
+
+    # 返回的是副本，修改不会影响快照
+    first.find_llm_config("qwen-plus")["provider"] = "changed"
+    assert reader.get_sync(db) is first
+    assert first.find_llm_config("qwen-plus")["provider"] == "dashscope"
+
+    db.llm_providers.update_one({"name": "dashscope"}, {"$set": {"default_base_url": "https://new.test/v1"}})
+    assert reader.get_sync(db).get_provider("dashscope")["default_base_url"] == "https://dashscope.test/v1"
+
+    writer.notify_changed_sync()
+    refreshed = reader.get_sync(db)
+    assert refreshed is not first
+    assert refreshed.get_provider("dashscope")["default_base_url"] == "https://new.test/v1"
+
+
+def test_async_snapshot_and_local_invalidation(monkeypatch):
+    db = _seed_db()
+    async_db = SimpleNamespace(system_configs=_AsyncCollection(db.system_configs),
+                               llm_providers=_AsyncCollection(db.llm_providers))
+    monkeypatch.setattr(database, "get_redis_client", lambda: (_ for _ in ()).throw(RuntimeError("未初始化")))
+    store = _store(fakeredis.FakeRedis(decode_responses=True))
+
+    async def run():
+        first = await store.get(async_db)
+        again = await store.get(async_db)
+        db.system_configs.update_one({"version": 2}, {"$set": {"version": 3}})
+        await store.notify_changed()
+        return first, again, await store.get(async_db)
+
+    first, again, refreshed = asyncio.run(run())
+    assert again is first and first.version == 2
+    assert refreshed.version == 3 and refreshed.token == "1"
+    assert [p["name"] for p in refreshed.provider_docs()] == ["dashscope", "acme"]
@@ -0,0 +1,128 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.historical_data_service import HistoricalDataService
+
+
+FRAMES = {
+    "tushare": pd.DataFrame({
+        "trade_date": ["20240102", "20240103", "20240104", "20240105", "20240108"],
+        "open": [1, 2, 3, 4, 5.0], "high": [2.0] * 5, "low": [0.5] * 5,
+        "close": [10, 11, 0, 12, np.nan], "pre_close": [9, 10, 11, 0, 12],
+        # 0 值回退到下一个候选列（与 `a or b` 语义一致）
+        "vol": [100, 0, 300, 400, np.nan], "amount": [0, 1.0, 2, 3, 4],
+        "change": [1.0] * 5, "pct_chg": [1, 2, 3, 4, 5.0],
+        "turnover_rate": [0.1, 0, None, 0.4, 0.5],
+    }),
+    "baostock": pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-02", "2024-01-03"]),
+        "open": [1.0, 2.0], "close": [1.0, 2.0], "preclose": ["0.9", ""],
+        "volume": [1, 2], "turnover": [5.0, 6.0],
+        "turn": ["0.5", ""], "isST": ["0", None], "adjustflag": ["3", "3"],
+    }),
+    "date_index": pd.DataFrame({"close": [1.0, 2.0], "open": [1, 2]},
+                               index=pd.to_datetime(["2024-02-01", "2024-02-02"])),
+    "partial_dates": pd.DataFrame({"date": ["2024-01-02", None], "close": [1.0, 2.0]},
+                                  index=pd.to_datetime(["2024-02-01", "2024-02-02"])),
+}
+
+
+def _strip_times(docs):
+    return [{k: v for k, v in d.items() if k not in ("created_at", "updated_at")} for d in docs]
+
+
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_columnar_standardization_matches_row_path(name):
+    svc = HistoricalDataService()
+    data = FRAMES[name]
+    columnar = _strip_times(svc._standardize_frame("600519", data, "tushare", "CN", "daily"))
+    rows = _strip_times(svc._standardize_rows("600519", data, "tushare", "CN", "daily"))
+    assert columnar == rows
+    assert [list(d) for d in columnar] == [list(d) for d in rows]
+
+
+def test_bulk_writes_are_unordered_batched_and_bounded():
+    class FakeCollection:
+        def __init__(self):
+            self.batches, self.active, self.peak = [], 0, 0
+
+        async def bulk_write(self, operations, ordered=True):
+            assert ordered is False
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            await asyncio.sleep(0.01)
+            self.active -= 1
+            self.batches.append(len(operations))
+            return type("R", (), {"upserted_count": len(operations), "modified_count": 0})()
+
+    svc = HistoricalDataService()
+    svc.collection = FakeCollection()
+    data = pd.DataFrame({
+        "trade_date": pd.bdate_range("2010-01-01", periods=2500).strftime("%Y%m%d"),
+        "close": np.linspace(10, 20, 2500),
+    })
+    saved = asyncio.run(svc._bulk_write_concurrently(
+        "600519", [object()] * len(data), batch_size=300, concurrency=3))
+    assert saved == 2500
+    assert sorted(svc.collection.batches) == [100] + [300] * 8
+    assert svc.collection.peak == 3
+
+    svc.collection = FakeCollection()
+    assert asyncio.run(svc.save_historical_data("600519", data, "akshare")) == 2500
+
+
+def test_market_data_is_saved_with_per_row_symbols():
+    class FakeCollection:
+        def __init__(self):
+            self.operations = []
+
+        async def bulk_write(self, operations, ordered=True):
+            self.operations.extend(operations)
+            return type("R", (), {"upserted_count": len(operations), "modified_count": 0})()
+
+    svc = HistoricalDataService()
+    svc.collection = FakeCollection()
+    data = pd.DataFrame({
+        "ts_code": ["000001.SZ", "600000.SH"], "symbol": ["000001", "600000"],
+        "trade_date": ["20240628", "20240628"], "close": [10.0, 20.0], "pre_close": [9.0, 20.0],
+        "vol": [1.0, 2.0], "amount": [1.0, 2.0], "turnover_rate": [0.5, None],
+    })
+
+    assert asyncio.run(svc.save_market_data(data, "tushare")) == 2
+    docs = [op._doc for op in svc.collection.operations]
+    converted = data.copy()
+    svc._convert_tushare_units(converted)
+    expected = [svc._standardize_frame(s, converted.iloc[[i]].reset_index(drop=True), "tushare", "CN", "daily")[0]
+                for i, s in enumerate(["000001", "600000"])]
+    assert _strip_times(docs) == _strip_times(expected)
+    assert docs[0]["full_symbol"] == "000001.SZ" and docs[1]["full_symbol"] == "600000.SH"
+    assert docs[0]["volume"] == 100.0 and docs[0]["amount"] == 1000.0
+
+
+def test_saves_that_bypass_the_bar_store_clear_its_ready_marker(tmp_path, monkeypatch):
+    import tradingagents.dataflows.cache.bar_store as bar_store_mod
+
+    store = bar_store_mod.ColumnarBarStore(tmp_path)
+    monkeypatch.setattr(bar_store_mod, "get_bar_store", lambda: store)
+    docs = [{"symbol": "600519", "trade_date": "2024-01-02", "close": 10.0}]
+    svc = HistoricalDataService()
+
+    store.mark_ready("CN", "daily", "tushare")
+    monkeypatch.setattr(bar_store_mod, "bar_store_enabled", lambda: True)
+    asyncio.run(svc._append_to_bar_store("600519", docs, "tushare", "CN", "daily"))
+    assert store.is_ready("CN", "daily", "tushare")
+    assert store.read_frame("CN", "daily", "tushare", "600519")["close"].tolist() == [10.0]
+
+    # 存储关闭期间的写入只进入 MongoDB，重新开启后不能再把列式存储当作完整数据
+    monkeypatch.setattr(bar_store_mod, "bar_store_enabled", lambda: False)
+    asyncio.run(svc._append_to_bar_store("600519", docs, "tushare", "CN", "daily"))
+    assert not store.is_ready("CN", "daily", "tushare")
+
+    store.mark_ready("CN", "daily", "tushare")
+    monkeypatch.setattr(bar_store_mod, "bar_store_enabled", lambda: True)
+    monkeypatch.setattr(store, "append_documents", lambda *args: 1 / 0)
+    asyncio.run(svc._append_to_bar_store("600519", docs, "tushare", "CN", "daily"))
+    assert not store.is_ready("CN", "daily", "tushare")
@@ -0,0 +1,115 @@
+import gzip
+import zipfile
+from datetime import datetime, timedelta
+
+from app.services import log_reader
+from app.services.log_export_service import LogExportService
+
+
+def _write_log(path, count=40000):
+    start = datetime(2025, 3, 1, 0, 0, 0)
+    levels = ["INFO", "DEBUG", "WARNING", "ERROR"]
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            ts = (start + timedelta(seconds=5 * i)).strftime("%Y-%m-%d %H:%M:%S")
+            f.write(f"{ts},123 | webapi | {levels[i % 4]:<8} | mod:fn:{i} | 消息 {i} payload {'x' * 40}\n")
+            if i % 1000 == 999:
+                f.write("Traceback (most recent call last):\n  File \"x.py\", line 1\n")
+    return start
+
+
+def _brute_force(path, start_time, end_time):
+    selected, started = [], False
+    for line in path.read_text(encoding="utf-8").splitlines():
+        ts = log_reader.line_timestamp(line.encode())
+        if ts is not None:
+            if ts > end_time:
+                break
+            started = started or ts >= start_time
+        if started:
+            selected.append(line)
+    return selected
+
+
+def test_tail_reads_only_the_end(tmp_path):
+    path = tmp_path / "tradingagents.log"
+    _write_log(path)
+    expected = path.read_text(encoding="utf-8").splitlines()
+
+    assert log_reader.tail_lines(path, 1) == expected[-1:]
+    assert log_reader.tail_lines(path, 2500, block_size=4096) == expected[-2500:]
+    assert log_reader.tail_lines(path, 10 ** 6) == expected
+    assert log_reader.count_lines(path) == len(expected)
+
+
+def test_time_range_seek_matches_full_scan(tmp_path):
+    path = tmp_path / "tradingagents.log"
+    _write_log(path)
+    index = log_reader.get_file_index(path)
+    assert len(index.timestamps) >= 3
+
+    start, end = "2025-03-01 20:00:00", "2025-03-02 02:30:00"
+    expected = _brute_force(path, start, end)
+    assert list(log_reader.iter_time_range(path, "2025-03-01T20:00:00", end)) == expected
+    assert index.seek_offset(start) > 0
+
+    # 文件继续追加后增量索引，行数同步更新
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("2025-03-05 00:00:00,000 | webapi | ERROR    | late line\n")
+    assert log_reader.count_lines(path) == len(path.read_text(encoding="utf-8").splitlines())
+    assert list(log_reader.iter_time_range(path, "2025-03-04 00:00:00")) == \
+        ["2025-03-05 00:00:00,000 | webapi | ERROR    | late line"]
+
+
+def test_service_reads_and_streams_exports(tmp_path, monkeypatch):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    _write_log(log_dir / "tradingagents.log", count=2000)
+    monkeypatch.chdir(tmp_path)
+    svc = LogExportService(log_dir=str(log_dir))
+
+    result = svc.read_log_file("tradingagents.log", lines=100, level="ERROR")
+    assert result["stats"]["total_lines"] == 2004
+    assert result["lines"] and all("ERROR" in line for line in result["lines"])
+
+    ranged = svc.read_log_file("tradingagents.log", lines=3, start_time="2025-03-01T00:10:00",
+                               end_time="2025-03-01T00:20:00")
+    assert [line[:19] for line in ranged["lines"]] == \
+        ["2025-03-01 00:19:50", "2025-03-01 00:19:55", "2025-03-01 00:20:00"]
+
+    errors = list(log_reader.iter_filtered(log_dir / "tradingagents.log", level="ERROR",
+                                           end_time="2025-03-01 00:01:00"))
+    assert len(errors) == 3
+
+    gz_path = svc.export_logs(level="ERROR", format="gz")
+    with gzip.open(gz_path, "rt", encoding="utf-8") as f:
+        assert f.read().count("| ERROR") == 500
+
+    zip_path = svc.export_logs(start_time="2025-03-01 00:00:00", end_time="2025-03-01 00:00:20", format="zip")
+    with zipfile.ZipFile(zip_path) as zf:
+        assert len(zf.read("tradingagents.log").decode("utf-8").splitlines()) == 5
+
+
+def test_dates_inside_messages_do_not_end_the_range(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text(
+        "2025-03-01 00:00:00,000 | worker | INFO     | 回放 2025-03-09 00:00:00 的行情\n"
+        "[2025-03-01 00:00:01,000] worker | INFO     | 旧格式前缀\n"
+        "2025-03-01 00:00:02,000 | worker | ERROR    | boom\n"
+        "2025-03-01 00:00:05,000 | worker | INFO     | 另一进程稍晚写入\n"
+        "2025-03-01 00:00:03,000 | worker | INFO     | 轻微乱序\n",
+        encoding="utf-8",
+    )
+
+    lines = list(log_reader.iter_time_range(path, end_time="2025-03-01 00:00:04"))
+    assert [line.rsplit("| ", 1)[1] for line in lines] == \
+        ["回放 2025-03-09 00:00:00 的行情", "旧格式前缀", "boom", "轻微乱序"]
+
+
+def test_stops_after_a_streak_of_lines_past_end(tmp_path):
+    path = tmp_path / "app.log"
+    late = [f"2025-03-02 00:00:00,000 | worker | INFO     | late {i}" for i in range(log_reader.END_STREAK_LINES)]
+    path.write_text("\n".join(late + ["2025-03-01 00:00:00,000 | worker | INFO     | too late"]) + "\n",
+                    encoding="utf-8")
+
+    assert list(log_reader.iter_time_range(path, end_time="2025-03-01 12:00:00")) == []
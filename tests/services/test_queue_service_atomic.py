@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app.services.queue import INFLIGHT_PREFIX, READY_LIST, SET_PROCESSING, VISIBILITY_DEADLINES
+from app.services.queue_service import QueueService
+
+
+def _service(user_limit=1):
+    svc = QueueService(fakeredis.aioredis.FakeRedis(decode_responses=True))
+    svc.user_concurrent_limit = user_limit
+    return svc
+
+
+def test_dequeue_skips_limited_user_without_reordering():
+    async def _run():
+        svc = _service(user_limit=1)
+        a1 = await svc.enqueue_task("alice", "000001", {"depth": 1})
+        a2 = await svc.enqueue_task("alice", "000002", {})
+        b1 = await svc.enqueue_task("bob", "600000", {})
+
+        first = await svc.dequeue_task("w1")
+        assert first["id"] == a1
+        assert first["parameters"] == {"depth": 1}
+        assert first["status"] == "processing"
+
+        # alice 已达上限：跳过 a2 取 b1，a2 留在队首位置
+        second = await svc.dequeue_task("w2")
+        assert second["id"] == b1
+        assert await svc.r.lrange(READY_LIST, 0, -1) == [a2]
+        assert await svc.dequeue_task("w3") is None
+
+        assert await svc.ack_task(a1, success=True)
+        assert (await svc.get_task(a1))["status"] == "completed"
+        assert await svc.r.zscore(VISIBILITY_DEADLINES, a1) is None
+        third = await svc.dequeue_task("w1")
+        assert third["id"] == a2
+        assert await svc.stats() == {"queued": 0, "processing": 2, "completed": 1, "failed": 0}
+
+    asyncio.run(_run())
+
+
+def test_enqueue_rejects_when_user_limit_reached():
+    async def _run():
+        svc = _service(user_limit=1)
+        await svc.enqueue_task("alice", "000001", {})
+        await svc.dequeue_task("w1")
+        with pytest.raises(ValueError, match="并发限制"):
+            await svc.enqueue_task("alice", "000002", {})
+
+    asyncio.run(_run())
+
+
+def test_expired_task_is_requeued():
+    async def _run():
+        svc = _service()
+        svc.visibility_timeout = 1
+        task_id = await svc.enqueue_task("alice", "000001", {})
+        await svc.dequeue_task("w1")
+
+        # 可见性键本身会随 TTL 过期，重新入队依赖截止时间有序集合
+        await svc.r.zadd(VISIBILITY_DEADLINES, {task_id: time.time() - 10})
+        await svc.cleanup_expired_tasks()
+
+        assert await svc.r.lrange(READY_LIST, 0, -1) == [task_id]
+        assert not await svc.r.sismember(SET_PROCESSING, task_id)
+        assert (await svc.get_task(task_id))["status"] == "queued"
+        assert (await svc.dequeue_task("w2"))["id"] == task_id
+
+    asyncio.run(_run())
+
+
+def test_blocking_dequeue_wakes_on_enqueue():
+    async def _run():
+        svc = _service()
+        waiter = asyncio.create_task(svc.dequeue_task("w1", timeout=5))
+        await asyncio.sleep(0.1)
+        assert not waiter.done()
+
+        task_id = await svc.enqueue_task("alice", "000001", {})
+        task = await asyncio.wait_for(waiter, 2)
+        assert task["id"] == task_id
+        assert await svc.r.llen(INFLIGHT_PREFIX + "w1") == 0
+
+        begin = time.monotonic()
+        assert await svc.dequeue_task("w1", timeout=0.2) is None
+        assert time.monotonic() - begin >= 0.15
+
+    asyncio.run(_run())
+
+
+def test_cleanup_returns_orphaned_inflight_tasks_to_queue_head():
+    async def _run():
+        svc = _service()
+        first = await svc.enqueue_task("alice", "000001", {})
+        second = await svc.enqueue_task("bob", "000002", {})
+        # 模拟 Worker 阻塞取到任务后、认领前退出
+        await svc.r.rpoplpush(READY_LIST, INFLIGHT_PREFIX + "dead-worker")
+
+        await svc.cleanup_expired_tasks()
+        assert await svc.r.lrange(READY_LIST, 0, -1) == [second, first]
+        assert (await svc.dequeue_task("w1"))["id"] == first
+
+    asyncio.run(_run())
+
+
+def test_cancelled_task_is_never_dequeued():
+    async def _run():
+        svc = _service(user_limit=3)
+        cancelled = await svc.enqueue_task("alice", "000001", {})
+        in_flight = await svc.enqueue_task("alice", "000002", {})
+        kept = await svc.enqueue_task("bob", "600000", {})
+
+        # in_flight 已被阻塞出队移入暂存列表，取消时只会从就绪队列中 LREM，暂存列表里仍有它
+        await svc.r.lrem(READY_LIST, 0, in_flight)
+        await svc.r.rpush(INFLIGHT_PREFIX + "w1", in_flight)
+        assert await svc.cancel_task(cancelled)
+        assert await svc.cancel_task(in_flight)
+
+        status, task = await svc._claim_task("w1", INFLIGHT_PREFIX + "w1")
+        assert status == "ok" and task["id"] == kept
+        assert await svc.dequeue_task("w2") is None
+        assert await svc.r.llen(READY_LIST) == 0
+        assert (await svc.get_task(in_flight))["status"] == "cancelled"
+        assert not await svc.r.sismember(SET_PROCESSING, in_flight)
+
+    asyncio.run(_run())
+
+
+def test_all_queue_keys_share_one_hash_tag():
+    from app.services.queue import keys
+
+    names = [v for k, v in vars(keys).items() if k.isupper() and isinstance(v, str) and k != "QUEUE_HASH_TAG"]
+    assert names and all(name.startswith(keys.KEY_PREFIX) for name in names)
+    # Redis Cluster 只按第一个 {...} 计算槽位
+    assert all(name[name.index("{") + 1:name.index("}")] == "queue" for name in names)
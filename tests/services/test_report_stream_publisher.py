@@ -0,0 +1,76 @@
+import json
+
+import app.services.progress.stream_publisher as stream_publisher
+from app.services.progress.stream_publisher import ReportStreamPublisher
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, data):
+        self.published.append((channel, json.loads(data)))
+
+
+def test_deltas_are_batched_per_node_and_flushed(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(stream_publisher.time, "monotonic", lambda: clock[0])
+    redis = _FakeRedis()
+    publisher = ReportStreamPublisher("t1", redis, flush_interval=0.2, flush_chars=10)
+
+    publisher("Market Analyst", "趋势")
+    publisher("News Analyst", "新闻")
+    publisher("Market Analyst", "向上")
+    assert redis.published == []
+
+    # 达到时间间隔
+    clock[0] += 0.3
+    publisher("Market Analyst", "。")
+    # 达到字符数
+    publisher("News Analyst", "0123456789")
+    publisher("News Analyst", "尾部")
+    publisher.flush()
+
+    assert [(m["node"], m["delta"]) for _, m in redis.published] == [
+        ("Market Analyst", "趋势向上。"),
+        ("News Analyst", "新闻0123456789"),
+        ("News Analyst", "尾部"),
+    ]
+    assert all(channel == "task_progress:t1" and m["type"] == "report_delta" for channel, m in redis.published)
+
+
+def test_publisher_without_redis_is_noop():
+    publisher = ReportStreamPublisher("t2", None)
+    publisher("Market Analyst", "文本")
+    publisher.flush()
+    assert not publisher.enabled
+
+
+def test_websocket_forwarder_stops_quietly_when_send_fails():
+    import asyncio
+
+    from app.routers.websocket_notifications import forward_task_updates
+
+    class _PubSub:
+        def __init__(self):
+            self.messages = [
+                {"type": "message", "data": json.dumps({"type": "report_delta", "delta": "趋势"})},
+                {"type": "message", "data": json.dumps({"progress": 50})},
+            ]
+
+        async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+            return self.messages.pop(0) if self.messages else None
+
+    class _ClosedSocket:
+        def __init__(self):
+            self.sent = []
+
+        async def send_json(self, data):
+            self.sent.append(data)
+            raise RuntimeError("websocket closed")
+
+    socket = _ClosedSocket()
+    pubsub = _PubSub()
+    asyncio.run(asyncio.wait_for(forward_task_updates(socket, pubsub, "t1"), timeout=5))
+    assert socket.sent == [{"type": "report_delta", "data": {"type": "report_delta", "delta": "趋势"}}]
+    assert len(pubsub.messages) == 1
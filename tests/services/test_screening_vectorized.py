@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+import app.services.screening_service as mod
+from app.services.screening.panel_loader import load_daily_panel
+from app.services.screening_service import ScreeningParams, ScreeningService
+
+
+def _make_panel(n_symbols=30, n_days=90, seed=7):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2025-01-02", periods=n_days).strftime("%Y-%m-%d")
+    frames = []
+    for i in range(n_symbols):
+        # 部分股票上市时间较短
+        days = dates[-(20 + (i * 7) % n_days):] if i % 4 == 0 else dates
+        close = np.cumsum(rng.normal(0, 1, len(days))) + 50
+        frames.append(pd.DataFrame({
+            "code": f"{600000 + i:06d}",
+            "trade_date": days,
+            "open": close,
+            "high": close + rng.uniform(0, 2, len(days)),
+            "low": close - rng.uniform(0, 2, len(days)),
+            "close": close,
+            "vol": rng.integers(1000, 5000, len(days)).astype(float),
+            "amount": rng.uniform(1e6, 1e8, len(days)),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+CONDITIONS = {
+    "logic": "OR",
+    "children": [
+        {"logic": "AND", "children": [
+            {"field": "close", "op": ">", "right_field": "ma20"},
+            {"field": "rsi14", "op": "between", "value": [40, 80]},
+        ]},
+        {"field": "dif", "op": "cross_up", "right_field": "dea"},
+        {"field": "kdj_j", "op": "<", "value": 10},
+    ],
+}
+
+
+def test_vectorized_screening_matches_per_symbol_path(monkeypatch):
+    panel = _make_panel()
+    params = ScreeningParams(limit=500, order_by=[{"field": "rsi14", "direction": "desc"}])
+
+    class _Manager:
+        def get_stock_dataframe(self, code, start, end):
+            return panel[panel["code"] == code].drop(columns=["code"]).reset_index(drop=True)
+
+    svc = ScreeningService()
+    monkeypatch.setattr(svc, "_load_panel", lambda start, end: panel)
+    vectorized = svc.run(CONDITIONS, params)
+
+    monkeypatch.setattr(svc, "_load_panel", lambda start, end: None)
+    monkeypatch.setattr(svc, "_get_universe", lambda: sorted(panel["code"].unique()))
+    monkeypatch.setattr(mod, "get_data_source_manager", lambda: _Manager())
+    per_symbol = svc.run(CONDITIONS, params)
+
+    assert 0 < vectorized["total"] < panel["code"].nunique()
+    assert vectorized["total"] == per_symbol["total"]
+    for a, b in zip(vectorized["items"], per_symbol["items"]):
+        assert a.keys() == b.keys()
+        for key in a:
+            if isinstance(a[key], float):
+                assert np.isclose(a[key], b[key], rtol=1e-9), key
+            else:
+                assert a[key] == b[key], key
+
+
+def test_load_daily_panel_prefers_configured_source():
+    docs = [
+        {"symbol": "000001", "trade_date": "2025-01-03", "data_source": "akshare", "close": 11.0, "volume": 1},
+        {"symbol": "000001", "trade_date": "2025-01-03", "data_source": "tushare", "close": 10.0, "volume": 2},
+        {"symbol": "000001", "trade_date": "2025-01-02", "data_source": "baostock", "close": 9.0, "volume": 3},
+    ]
+
+    class _Cursor(list):
+        def batch_size(self, _n):
+            return self
+
+    class _Coll:
+        def find(self, query, projection):
+            assert query["period"] == "daily"
+            assert query["trade_date"] == {"$gte": "2025-01-01", "$lte": "2025-01-31"}
+            return _Cursor(docs)
+
+    class _DB:
+        stock_daily_quotes = _Coll()
+
+    panel = load_daily_panel(_DB(), "2025-01-01", "2025-01-31")
+    assert panel["trade_date"].tolist() == ["2025-01-02", "2025-01-03"]
+    assert panel["close"].tolist() == [9.0, 10.0]
+    assert panel["vol"].tolist() == [3, 2]
+
+
+def test_load_daily_panel_reads_bar_store_when_ready(tmp_path):
+    from tradingagents.dataflows.cache.bar_store import ColumnarBarStore
+
+    store = ColumnarBarStore(tmp_path)
+    rows = [
+        ("akshare", "000001", "2025-01-03", 11.0, 1),
+        ("tushare", "000001", "2025-01-03", 10.0, 2),
+        ("baostock", "000001", "2025-01-02", 9.0, 3),
+        ("tushare", "000002", "2024-12-31", 5.0, 4),  # 区间外
+    ]
+    for src, code, day, close, vol in rows:
+        store.append("CN", "daily", src, pd.DataFrame({"symbol": [code], "trade_date": [day],
+                                                       "close": [close], "volume": [vol]}))
+
+    class _EmptyDB:
+        class stock_daily_quotes:
+            @staticmethod
+            def find(query, projection):
+                return _EmptyCursor()
+
+    class _EmptyCursor(list):
+        def batch_size(self, _n):
+            return self
+
+    # 未就绪时仍走 MongoDB
+    assert load_daily_panel(_EmptyDB(), "2025-01-01", "2025-01-31", bar_store=store).empty
+
+    for src in ("tushare", "akshare", "baostock"):
+        store.mark_ready("CN", "daily", src)
+    panel = load_daily_panel(None, "2025-01-01", "2025-01-31", bar_store=store)
+    assert panel["code"].tolist() == ["000001", "000001"]
+    assert panel["trade_date"].tolist() == ["2025-01-02", "2025-01-03"]
+    assert panel["close"].tolist() == [9.0, 10.0]
+    assert panel["vol"].tolist() == [3, 2]
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pandas as pd
+
+import app.services.financial_data_service as financial_data_service
+import tradingagents.dataflows.providers.china.tushare as tushare_mod
+from app.worker.tushare_sync_service import TushareSyncService
+from tradingagents.dataflows.providers.china.tushare import TushareProvider
+
+
+class _SlowApi:
+    """每个报表接口耗时 50ms，记录同时进行的调用数"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = self.peak = 0
+
+    def __getattr__(self, name):
+        def call(**kwargs):
+            with self.lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.05)
+            with self.lock:
+                self.active -= 1
+            if name == "fina_mainbz":
+                raise RuntimeError("无权限")
+            return pd.DataFrame({"ts_code": [kwargs.get("ts_code")], "end_date": ["20240630"],
+                                 "ann_date": ["20240820"], "revenue": [1.0]})
+        return call
+
+
+class _CountingLimiter:
+    tier = "standard"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def acquire(self):
+        self.calls += 1
+
+    def get_stats(self):
+        return {"current_calls": self.calls, "max_calls": 1000}
+
+
+def _provider(monkeypatch):
+    monkeypatch.setattr(tushare_mod, "TUSHARE_AVAILABLE", True)
+    provider = TushareProvider()
+    provider.api = _SlowApi()
+    provider.connected = True
+    return provider
+
+
+def test_statements_for_one_symbol_are_fetched_concurrently(monkeypatch):
+    provider = _provider(monkeypatch)
+    limiter = _CountingLimiter()
+
+    statements = asyncio.run(provider.get_financial_statements("600519", limit=4, rate_limiter=limiter))
+
+    assert set(statements) == {"income_statement", "balance_sheet", "cashflow_statement", "financial_indicators"}
+    assert provider.api.peak == 5
+    assert limiter.calls == 5
+
+
+class _FakeFinancialService:
+    def __init__(self):
+        self.batches = []
+
+    async def save_financial_data_batch(self, items, data_source, market="CN"):
+        self.batches.append([item["symbol"] for item in items])
+        return len(items)
+
+
+def _sync_service(monkeypatch, provider, **settings):
+    service = TushareSyncService.__new__(TushareSyncService)
+    service.provider = provider
+    service.rate_limiter = _CountingLimiter()
+    service.settings = SimpleNamespace(**{
+        "TUSHARE_FINANCIAL_SYNC_CONCURRENCY": 3,
+        "TUSHARE_FINANCIAL_WRITE_BATCH_SIZE": 4,
+        "TUSHARE_FINANCIAL_PERIOD_BULK": "false",
+        **settings,
+    })
+    fake = _FakeFinancialService()
+
+    async def get_service():
+        return fake
+
+    monkeypatch.setattr(financial_data_service, "get_financial_data_service", get_service)
+    return service, fake
+
+
+def _stats():
+    return {"success_count": 0, "error_count": 0, "errors": [], "start_time": datetime.utcnow()}
+
+
+def test_pipeline_fetches_with_bounded_concurrency_and_writes_in_batches(monkeypatch):
+    provider = _provider(monkeypatch)
+    service, fake = _sync_service(monkeypatch, provider)
+    symbols = [f"{600000 + i}" for i in range(10)]
+
+    stats = _stats()
+    started = time.perf_counter()
+    asyncio.run(service._run_financial_pipeline(symbols, 4, stats, None))
+    elapsed = time.perf_counter() - started
+
+    assert stats["success_count"] == 10 and stats["error_count"] == 0
+    assert sorted(s for batch in fake.batches for s in batch) == symbols
+    assert [len(batch) for batch in fake.batches] == [4, 4, 2]
+    # 3 只股票同时获取，每只 5 个接口并发（上限为默认线程池大小）
+    assert provider.api.peak == min(15, min(32, (os.cpu_count() or 1) + 4))
+    assert elapsed < 10 * 0.05 * 5 / 2
+
+
+def test_period_bulk_splits_market_statements_per_symbol(monkeypatch):
+    provider = _provider(monkeypatch)
+    service, fake = _sync_service(monkeypatch, provider, TUSHARE_FINANCIAL_PERIOD_BULK="true")
+    requested = []
+    seen = {}
+
+    async def by_period(period, rate_limiter=None):
+        requested.append(period)
+        rows = pd.DataFrame({"ts_code": ["600519.SH", "000001.SZ"], "end_date": [period, period],
+                             "ann_date": [period, period], "revenue": [float(period[:4]), 1.0]})
+        return {"income_statement": rows}
+
+    def standardize(statements, ts_code):
+        seen[ts_code] = [r["end_date"] for r in statements["income_statement"]]
+        return {"symbol": ts_code.split(".")[0]}
+
+    monkeypatch.setattr(provider, "get_financial_statements_by_period", by_period)
+    monkeypatch.setattr(provider, "_standardize_tushare_financial_data", standardize)
+    monkeypatch.setattr(service, "_recent_report_periods", lambda count: ["20240630", "20240331", "20231231"])
+    symbols = [f"{600000 + i}" for i in range(4)] + ["600519", "000001"]
+
+    stats = _stats()
+    asyncio.run(service._run_financial_pipeline(symbols, 2, stats, None))
+
+    assert requested == ["20240630", "20240331", "20231231"]
+    assert seen == {"600519.SH": ["20240630", "20240331"], "000001.SZ": ["20240630", "20240331"]}
+    assert stats["success_count"] == 2
+    assert provider.api.peak == 0
+
+
+def test_recent_report_periods_are_completed_quarters():
+    periods = TushareSyncService._recent_report_periods(5, today=datetime(2026, 2, 10))
+    assert periods == ["20251231", "20250930", "20250630", "20250331", "20241231"]
+
+
+def test_period_bulk_keeps_limit_reported_periods_just_after_quarter_end(monkeypatch):
+    provider = _provider(monkeypatch)
+    service, fake = _sync_service(monkeypatch, provider, TUSHARE_FINANCIAL_PERIOD_BULK="true")
+    requested = []
+    seen = {}
+
+    async def by_period(period, rate_limiter=None):
+        requested.append(period)
+        # 2026-10-18：三季报只有 600519 已披露
+        codes = ["600519.SH"] if period == "20260930" else ["600519.SH", "000001.SZ"]
+        rows = pd.DataFrame({"ts_code": codes, "end_date": period, "ann_date": period, "revenue": 1.0})
+        return {"income_statement": rows}
+
+    def standardize(statements, ts_code):
+        seen[ts_code] = [r["end_date"] for r in statements["income_statement"]]
+        return {"symbol": ts_code.split(".")[0]}
+
+    monkeypatch.setattr(provider, "get_financial_statements_by_period", by_period)
+    monkeypatch.setattr(provider, "_standardize_tushare_financial_data", standardize)
+    monkeypatch.setattr(service, "_recent_report_periods", lambda count: TushareSyncService._recent_report_periods(
+        count, today=datetime(2026, 10, 18)))
+    symbols = [f"{600000 + i}" for i in range(4)] + ["600519", "000001"]
+
+    asyncio.run(service._run_financial_pipeline(symbols, 2, _stats(), None))
+
+    assert requested == ["20260930", "20260630", "20260331"]
+    assert seen == {"600519.SH": ["20260930", "20260630"], "000001.SZ": ["20260630", "20260331"]}
@@ -0,0 +1,152 @@
+import asyncio
+from types import SimpleNamespace
+
+import pandas as pd
+
+from app.worker.tushare_sync_service import TushareSyncService
+
+
+CALENDAR = ["2024-06-24", "2024-06-25", "2024-06-26", "2024-06-27", "2024-06-28"]
+
+
+class _FakeLimiter:
+    def __init__(self):
+        self.calls = 0
+
+    async def acquire(self):
+        self.calls += 1
+
+
+class _FakeProvider:
+    def __init__(self):
+        self.daily_calls = []
+        self.factor_overrides = {}
+
+    async def get_trade_dates(self, start_date, end_date):
+        return CALENDAR
+
+    async def get_market_daily(self, trade_date):
+        self.daily_calls.append(trade_date)
+        return pd.DataFrame({
+            "ts_code": ["000001.SZ", "600000.SH", "300001.SZ"],
+            "trade_date": [trade_date.replace("-", "")] * 3,
+            "open": [10.0, 20.0, 30.0], "high": [11.0, 21.0, 31.0], "low": [9.0, 19.0, 29.0],
+            "close": [10.0, 20.0, 30.0], "pre_close": [10.0, 20.0, 30.0],
+            "vol": [1.0, 2.0, 3.0], "amount": [1.0, 2.0, 3.0],
+        })
+
+    async def get_adj_factors(self, trade_date):
+        if trade_date in self.factor_overrides:
+            return self.factor_overrides[trade_date]
+        # 600000 在 06-28 除权：之前的价格按 1/2 前复权
+        factor = 2.0 if trade_date == "2024-06-28" else 1.0
+        return pd.Series({"000001.SZ": 1.0, "600000.SH": factor, "300001.SZ": 1.0})
+
+    async def get_daily_basic(self, trade_date):
+        return pd.DataFrame({"ts_code": ["000001.SZ"], "turnover_rate": [0.5], "pe": [8.0], "total_mv": [1.0]})
+
+
+class _FakeHistoricalService:
+    def __init__(self, latest_dates):
+        self.latest_dates = latest_dates
+        self.saved = {}
+
+    async def get_latest_dates(self, data_source, period="daily"):
+        return self.latest_dates
+
+    async def save_market_data(self, data, data_source, market="CN", period="daily"):
+        self.saved[data["trade_date"].iloc[0]] = data
+        return len(data)
+
+
+def _service(latest_dates):
+    service = TushareSyncService.__new__(TushareSyncService)
+    service.provider = _FakeProvider()
+    service.historical_service = _FakeHistoricalService(latest_dates)
+    service.rate_limiter = _FakeLimiter()
+    service.settings = SimpleNamespace(TUSHARE_HISTORICAL_SYNC_BY_DATE_MAX_DATES=3)
+    return service
+
+
+def test_missing_dates_are_fetched_once_for_the_whole_market():
+    service = _service({
+        "000001": "2024-06-26",
+        "600000": "2024-06-27",
+        "300001": "2024-06-20",  # 缺口超过 3 个交易日
+    })
+    stats = {"success_count": 0, "error_count": 0, "total_records": 0, "errors": []}
+
+    remaining = asyncio.run(service._sync_daily_by_trade_date(
+        ["000001", "600000", "300001", "688001"], "2024-06-28", stats))
+
+    assert remaining == ["300001", "688001"]
+    assert service.provider.daily_calls == ["2024-06-27", "2024-06-28"]
+    saved = service.historical_service.saved
+    assert list(saved["20240627"]["symbol"]) == ["000001"]
+    assert list(saved["20240628"]["symbol"]) == ["000001", "600000"]
+    assert stats["success_count"] == 2 and stats["total_records"] == 3
+
+    day = saved["20240627"].set_index("symbol")
+    assert day.loc["000001", "turnover_rate"] == 0.5 and day.loc["000001", "pe"] == 8.0
+    assert "total_mv" not in day.columns
+    last = saved["20240628"].set_index("symbol")
+    assert last.loc["600000", "close"] == 20.0
+    # 交易日历 + 基准复权因子 + 每个交易日 3 次（日线、复权因子、每日指标）
+    assert service.rate_limiter.calls == 2 + 3 * 2
+
+
+def test_forward_adjusts_earlier_dates_to_latest_factor():
+    service = _service({"600000": "2024-06-26"})
+    stats = {"success_count": 0, "error_count": 0, "total_records": 0, "errors": []}
+
+    asyncio.run(service._sync_daily_by_trade_date(["600000"], "2024-06-28", stats))
+
+    saved = service.historical_service.saved
+    assert saved["20240627"]["close"].tolist() == [10.0]
+    assert saved["20240628"]["close"].tolist() == [20.0]
+
+
+def _stats():
+    return {"success_count": 0, "error_count": 0, "total_records": 0, "errors": []}
+
+
+def test_missing_base_factors_send_every_symbol_to_per_symbol_sync():
+    service = _service({"000001": "2024-06-26", "600000": "2024-06-27"})
+    service.provider.factor_overrides["2024-06-28"] = None
+
+    remaining = asyncio.run(service._sync_daily_by_trade_date(
+        ["000001", "600000", "300001"], "2024-06-28", _stats()))
+
+    assert remaining == ["000001", "600000", "300001"]
+    assert service.provider.daily_calls == []
+    assert service.historical_service.saved == {}
+
+
+def test_missing_factors_for_a_date_stop_by_date_sync():
+    service = _service({"000001": "2024-06-25"})
+    service.provider.factor_overrides["2024-06-27"] = None
+    stats = _stats()
+
+    remaining = asyncio.run(service._sync_daily_by_trade_date(["000001"], "2024-06-28", stats))
+
+    assert remaining == []
+    assert service.provider.daily_calls == ["2024-06-26", "2024-06-27"]
+    # 只写入复权因子齐全的 06-26，06-27 起下次同步继续
+    assert list(service.historical_service.saved) == ["20240626"]
+    assert stats["total_records"] == 1
+
+
+def test_symbols_without_factors_are_left_to_per_symbol_sync():
+    service = _service({"000001": "2024-06-25", "600000": "2024-06-25"})
+    service.provider.factor_overrides["2024-06-27"] = pd.Series({"000001.SZ": 1.0, "300001.SZ": 1.0})
+    stats = _stats()
+
+    remaining = asyncio.run(service._sync_daily_by_trade_date(["000001", "600000"], "2024-06-28", stats))
+
+    assert remaining == ["600000"]
+    saved = service.historical_service.saved
+    assert list(saved["20240626"]["symbol"]) == ["000001", "600000"]
+    # 600000 在 06-27 缺少复权因子：当天不写入未复权价格，之后的交易日也不再按日期写入
+    assert list(saved["20240627"]["symbol"]) == ["000001"]
+    assert list(saved["20240628"]["symbol"]) == ["000001"]
+    assert stats["success_count"] == 1
@@ -0,0 +1,193 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = list(docs)
+
+    async def to_list(self, length=None):
+        return self._docs if length is None else self._docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._docs:
+            yield doc
+
+
+class _AsyncCollection:
+    """mongomock 集合的异步包装（模拟 motor 接口）"""
+
+    def __init__(self, coll):
+        self._coll = coll
+        self.bulk_sizes = []
+
+    def aggregate(self, pipeline, **kwargs):
+        return _Cursor(self._coll.aggregate(pipeline))
+
+    async def bulk_write(self, requests, ordered=True):
+        self.bulk_sizes.append(len(requests))
+        # mongomock 的 bulk_write 与当前 pymongo 的请求对象不兼容，逐条执行
+        from pymongo import ReplaceOne, UpdateOne
+        for op in requests:
+            if isinstance(op, UpdateOne):
+                self._coll.update_one(op._filter, op._doc, upsert=op._upsert)
+            elif isinstance(op, ReplaceOne):
+                self._coll.replace_one(op._filter, op._doc, upsert=op._upsert)
+
+    def __getattr__(self, name):
+        method = getattr(self._coll, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class _AsyncDB:
+    def __init__(self):
+        self._db = mongomock.MongoClient().db
+
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = _AsyncCollection(self._db[name])
+        return self._collections[name]
+
+
+def _records(now):
+    specs = [
+        # (距今小时数, provider, model, currency, cost)
+        (1, "dashscope", "qwen-turbo", "CNY", 0.01),
+        (2, "dashscope", "qwen-plus", "CNY", 0.02),
+        (30, "openai", "gpt-4o", "USD", 0.5),
+        (50, "dashscope", "qwen-turbo", "CNY", 0.03),
+        (24 * 9, "dashscope", "qwen-turbo", "CNY", 7.0),  # 超出 7 天窗口
+    ]
+    from app.models.config import UsageRecord
+    return [
+        UsageRecord(timestamp=(now - timedelta(hours=h)).isoformat(), provider=p, model_name=m,
+                    input_tokens=100, output_tokens=20, cost=c, currency=cur, session_id=f"s{i}")
+        for i, (h, p, m, cur, c) in enumerate(specs)
+    ]
+
+
+def test_statistics_come_from_rollups(monkeypatch):
+    import app.services.usage_statistics_service as mod
+
+    db = _AsyncDB()
+    monkeypatch.setattr(mod, "get_mongo_db", lambda: db)
+    svc = mod.UsageStatisticsService()
+    now = datetime.now().replace(minute=30)
+
+    async def run():
+        for record in _records(now):
+            assert await svc.add_usage_record(record)
+        incremental = await svc.get_usage_statistics(days=7)
+
+        # 定时重算与写入时的增量结果一致
+        await db[svc.rollup_collection_name].delete_many({})
+        await svc.ensure_rollups()
+        rebuilt = await svc.get_usage_statistics(days=7)
+        by_model = await svc.get_cost_by_model(days=7)
+        return incremental, rebuilt, by_model
+
+    incremental, rebuilt, by_model = asyncio.run(run())
+
+    assert incremental.total_requests == 4
+    assert incremental.cost_by_currency == pytest.approx({"CNY": 0.06, "USD": 0.5})
+    assert incremental.by_provider["dashscope"]["requests"] == 3
+    assert incremental.by_provider["openai"]["cost_by_currency"] == pytest.approx({"USD": 0.5})
+    assert sum(d["requests"] for d in incremental.by_date.values()) == 4
+    assert rebuilt.total_requests == incremental.total_requests
+    assert rebuilt.cost_by_currency == pytest.approx(incremental.cost_by_currency)
+    assert {k: v["requests"] for k, v in rebuilt.by_model.items()} == \
+        {k: v["requests"] for k, v in incremental.by_model.items()}
+    assert {k: v["requests"] for k, v in rebuilt.by_date.items()} == \
+        {k: v["requests"] for k, v in incremental.by_date.items()}
+    assert by_model["dashscope/qwen-turbo"] == pytest.approx(0.04)
+
+
+def test_rebuild_drops_buckets_without_raw_records(monkeypatch):
+    import app.services.usage_statistics_service as mod
+
+    db = _AsyncDB()
+    monkeypatch.setattr(mod, "get_mongo_db", lambda: db)
+    svc = mod.UsageStatisticsService()
+    now = datetime.now()
+
+    async def run():
+        for record in _records(now)[:2]:
+            await svc.add_usage_record(record)
+        await db[svc.collection_name].delete_many({"model_name": "qwen-plus"})
+        await svc.refresh_recent_rollups(lookback_hours=48)
+        return await svc.get_usage_statistics(days=1, provider="dashscope")
+
+    stats = asyncio.run(run())
+    assert stats.total_requests == 1
+    assert list(stats.by_model) == ["dashscope/qwen-turbo"]
+
+
+def test_rebuild_streams_batches_and_deletes_other_generations(monkeypatch):
+    import app.services.usage_statistics_service as mod
+
+    db = _AsyncDB()
+    monkeypatch.setattr(mod, "get_mongo_db", lambda: db)
+    monkeypatch.setattr(mod, "REBUILD_BATCH_SIZE", 2)
+    svc = mod.UsageStatisticsService()
+    now = datetime.now()
+    rollups = db[svc.rollup_collection_name]
+
+    async def run():
+        for record in _records(now)[:4]:
+            await svc.add_usage_record(record)
+        # 旧一代重算留下的、原始记录已不存在的桶
+        await rollups.insert_one({"_id": "stale", "granularity": "day", "bucket": now.strftime("%Y-%m-%d"),
+                                  "generation": "old", "requests": 9})
+        rollups.bulk_sizes.clear()
+        written = await svc.rebuild_rollups(now - timedelta(days=3))
+        return written, list(rollups._coll.find({}))
+
+    written, docs = asyncio.run(run())
+    generations = {d.get("generation") for d in docs}
+    assert len(generations) == 1 and "old" not in generations
+    assert "stale" not in {d["_id"] for d in docs}
+    assert written == len(docs)
+    assert rollups.bulk_sizes and max(rollups.bulk_sizes) <= 2
+
+
+def test_rebuild_keeps_buckets_created_by_concurrent_increments(monkeypatch):
+    import app.services.usage_statistics_service as mod
+    from app.models.config import UsageRecord
+
+    db = _AsyncDB()
+    monkeypatch.setattr(mod, "get_mongo_db", lambda: db)
+    svc = mod.UsageStatisticsService()
+    now = datetime.now()
+    rollups = db[svc.rollup_collection_name]
+    late = UsageRecord(timestamp=now.isoformat(), provider="deepseek", model_name="deepseek-chat",
+                       input_tokens=10, output_tokens=5, cost=0.1, currency="CNY", session_id="late")
+    write_rebuilt = svc._write_rebuilt
+    late_written = []
+
+    async def write_with_concurrent_record(rollups_coll, rows, granularity, generation):
+        # 重算扫描原始记录之后、删除旧桶之前，另一个请求写入记录并新建桶
+        if granularity == mod.DAY and not late_written:
+            late_written.append(await svc.add_usage_record(late))
+        return await write_rebuilt(rollups_coll, rows, granularity, generation)
+
+    async def run():
+        for record in _records(now)[:1]:
+            await svc.add_usage_record(record)
+        monkeypatch.setattr(svc, "_write_rebuilt", write_with_concurrent_record)
+        await svc.rebuild_rollups(now - timedelta(days=1))
+        return list(rollups._coll.find({"provider": "deepseek"}))
+
+    docs = asyncio.run(run())
+    assert {d["granularity"] for d in docs} == {"hour", "day"}
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from tradingagents.agents.utils.embedding_cache import EmbeddingCache
+from tradingagents.agents.utils.memory import FinancialSituationMemory
+
+
+class _FakeEmbeddings:
+    """OpenAI 兼容的 embeddings 接口；按逆序返回以检查按 index 对齐"""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, model, input):
+        texts = input if isinstance(input, list) else [input]
+        self.calls.append(list(texts))
+        data = [SimpleNamespace(index=i, embedding=[float(len(t)), float(i + 1), 1.0]) for i, t in enumerate(texts)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def _memory(monkeypatch, tmp_path, embeddings, name=None):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("EMBEDDING_BATCH_SIZE", "2")
+    config = {"llm_provider": "openai", "backend_url": "http://embeddings.test/v1", "data_cache_dir": str(tmp_path)}
+    memory = FinancialSituationMemory(name or f"memory_{uuid.uuid4().hex}", config)
+    memory.client = SimpleNamespace(base_url="http://embeddings.test/v1", embeddings=embeddings)
+    return memory
+
+
+def test_add_situations_embeds_in_batches(monkeypatch, tmp_path):
+    embeddings = _FakeEmbeddings()
+    memory = _memory(monkeypatch, tmp_path, embeddings)
+
+    memory.add_situations([("a", "r1"), ("bb", "r2"), ("ccc", "r3"), ("bb", "r4")])
+
+    # 去重后 3 条文本，每批 2 条 -> 两次请求
+    assert embeddings.calls == [["a", "bb"], ["ccc"]]
+    stored = memory.situation_collection.get(include=["embeddings"])
+    by_id = dict(zip(stored["ids"], stored["embeddings"]))
+    assert list(by_id["0"]) == [1.0, 1.0, 1.0]
+    assert list(by_id["1"]) == list(by_id["3"]) == [2.0, 2.0, 1.0]
+
+
+def test_memories_share_one_embedding_per_situation(monkeypatch, tmp_path):
+    embeddings = _FakeEmbeddings()
+    memories = [_memory(monkeypatch, tmp_path, embeddings) for _ in range(5)]
+    for memory in memories:
+        memory.situation_collection.add(documents=["past"], metadatas=[{"recommendation": "hold"}],
+                                        embeddings=[[4.0, 1.0, 1.0]], ids=["0"])
+
+    situation = "市场报告\n\n情绪报告\n\n新闻报告\n\n基本面报告"
+    results = [memory.get_memories(situation, n_matches=1) for memory in memories]
+
+    assert len(embeddings.calls) == 1
+    assert all(r and r[0]["recommendation"] == "hold" for r in results)
+
+
+def test_embedding_cache_persists_across_instances(tmp_path):
+    db_path = tmp_path / "embeddings.sqlite3"
+    EmbeddingCache(db_path).put_many("m", {"text": [0.1, 0.2, 0.3]})
+
+    reopened = EmbeddingCache(db_path)
+    assert reopened.get_many("m", ["text", "other"]) == {"text": [0.1, 0.2, 0.3]}
+    assert reopened.get_many("another-model", ["text"]) == {}
+
+
+def _put_in_forked_child(cache):
+    # 继承自父进程的连接已被丢弃
+    assert getattr(cache._local, "conn", None) is None
+    cache.put_many("m", {"child": [1.0, 2.0]})
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="需要 fork")
+def test_forked_child_opens_its_own_connection(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite3")
+    parent_conn = cache._conn()
+    child = multiprocessing.get_context("fork").Process(target=_put_in_forked_child, args=(cache,))
+    child.start()
+    child.join(60)
+    assert child.exitcode == 0
+    assert cache._conn() is parent_conn
+    assert EmbeddingCache(tmp_path / "embeddings.sqlite3").get_many("m", ["child"]) == {"child": [1.0, 2.0]}
@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+from dataclasses import asdict
+
+from pymongo.errors import BulkWriteError
+
+from tradingagents.config.mongodb_storage import MongoDBStorage
+from tradingagents.config.usage_ledger import UsageLedger, _interprocess_lock
+from tradingagents.config.usage_models import UsageRecord
+
+
+def _record(i, provider="dashscope"):
+    return UsageRecord(
+        timestamp=f"2025-05-01T10:00:{i % 60:02d}+08:00",
+        provider=provider,
+        model_name="qwen-turbo",
+        input_tokens=100 + i,
+        output_tokens=10,
+        cost=0.001,
+        session_id=f"s{i}",
+    )
+
+
+class _FakeMongo:
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.fail_sessions = set()
+        self.batches = []
+
+    def is_connected(self):
+        return True
+
+    def insert_usage_records(self, records):
+        if not self.ok:
+            return list(records)
+        self.batches.append([r for r in records if r.session_id not in self.fail_sessions])
+        return [r for r in records if r.session_id in self.fail_sessions]
+
+
+def test_records_are_buffered_and_appended_in_batches(tmp_path):
+    ledger = UsageLedger(tmp_path, batch_size=3, flush_interval=0)
+    for i in range(5):
+        ledger.append(_record(i))
+
+    # 前 3 条作为一批写出，其余仍在缓冲区，但读取时可见
+    lines = (tmp_path / "usage.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["session_id"] for line in lines] == ["s0", "s1", "s2"]
+    assert [r.session_id for r in ledger.load_records()] == ["s0", "s1", "s2", "s3", "s4"]
+
+    assert ledger.flush() == 2
+    assert len((tmp_path / "usage.jsonl").read_text(encoding="utf-8").splitlines()) == 5
+
+
+def test_timer_flushes_partial_batch(tmp_path):
+    ledger = UsageLedger(tmp_path, batch_size=100, flush_interval=0.05)
+    ledger.append(_record(1))
+    deadline = time.monotonic() + 2
+    while not (tmp_path / "usage.jsonl").exists() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert ledger.stats["flushes"] == 1
+    ledger.close()
+
+
+def test_concurrent_appends_lose_nothing(tmp_path):
+    ledger = UsageLedger(tmp_path, max_records=100000, batch_size=7, flush_interval=0)
+
+    def worker(offset):
+        for i in range(200):
+            ledger.append(_record(offset + i))
+
+    threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ledger.close()
+
+    assert len({r.session_id for r in ledger.load_records()}) == 1600
+
+
+def test_compaction_migrates_legacy_file_and_trims(tmp_path):
+    legacy = [asdict(_record(i)) for i in range(4)]
+    (tmp_path / "usage.json").write_text(json.dumps(legacy), encoding="utf-8")
+    ledger = UsageLedger(tmp_path, max_records=5, batch_size=4, flush_interval=0, compact_ratio=1.5)
+
+    for i in range(4, 12):
+        ledger.append(_record(i))
+    ledger.close()
+
+    assert not (tmp_path / "usage.json").exists()
+    assert [r.session_id for r in ledger.load_records()] == ["s7", "s8", "s9", "s10", "s11"]
+    assert ledger.stats["compactions"] >= 1
+
+
+def test_mongo_batches_use_one_call_and_fall_back_to_file(tmp_path):
+    mongo = _FakeMongo()
+    ledger = UsageLedger(tmp_path, batch_size=4, flush_interval=0, mongodb_storage=mongo)
+    for i in range(8):
+        ledger.append(_record(i))
+    assert [len(b) for b in mongo.batches] == [4, 4]
+    assert not (tmp_path / "usage.jsonl").exists()
+
+    mongo.ok = False
+    ledger.append(_record(99))
+    ledger.flush()
+    assert [r.session_id for r in ledger.load_records()] == ["s99"]
+
+
+def test_partial_mongo_failure_falls_back_only_for_failed_records(tmp_path):
+    mongo = _FakeMongo()
+    mongo.fail_sessions = {"s1", "s3"}
+    ledger = UsageLedger(tmp_path, batch_size=4, flush_interval=0, mongodb_storage=mongo)
+    for i in range(4):
+        ledger.append(_record(i))
+
+    assert [r.session_id for r in mongo.batches[0]] == ["s0", "s2"]
+    assert [r.session_id for r in ledger.load_records()] == ["s1", "s3"]
+
+
+def test_mongo_storage_reports_only_failed_documents():
+    inserted = []
+
+    class _Collection:
+        def insert_many(self, docs, ordered=True):
+            assert ordered is False
+            inserted.extend(d for i, d in enumerate(docs) if i != 1)
+            raise BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "validation"}]})
+
+    storage = MongoDBStorage.__new__(MongoDBStorage)
+    storage._connected = True
+    storage.collection = _Collection()
+    rollups = []
+    storage._update_rollups = rollups.extend
+
+    failed = storage.insert_usage_records([_record(i) for i in range(3)])
+
+    assert [r.session_id for r in failed] == ["s1"]
+    assert [d["session_id"] for d in rollups] == ["s0", "s2"] == [d["session_id"] for d in inserted]
+    assert storage.save_usage_records([]) is True
+
+
+def test_compaction_waits_for_other_process_lock(tmp_path):
+    ledger = UsageLedger(tmp_path, batch_size=1, flush_interval=0)
+    ledger.append(_record(1))
+
+    with _interprocess_lock(tmp_path / "usage.lock"):
+        worker = threading.Thread(target=ledger.compact)
+        worker.start()
+        worker.join(0.2)
+        assert worker.is_alive()
+    worker.join(5)
+    assert not worker.is_alive()
+    assert [r.session_id for r in ledger.load_records()] == ["s1"]
+
+
+def test_concurrent_compaction_from_two_ledgers_loses_nothing(tmp_path):
+    # 两个账本实例共享目录，模拟两个进程；各自的锁文件描述符互相排斥
+    ledgers = [UsageLedger(tmp_path, max_records=100000, batch_size=5, flush_interval=0, compact_ratio=1e9)
+               for _ in range(2)]
+
+    def worker(n):
+        ledger = ledgers[n]
+        for i in range(300):
+            ledger.append(_record(n * 1000 + i))
+            if i % 25 == 0:
+                ledger.compact()
+        ledger.flush()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ledgers[0].compact()
+
+    assert len({r.session_id for r in ledgers[0].load_records()}) == 600
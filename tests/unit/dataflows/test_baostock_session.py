@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from tradingagents.dataflows.providers.china import baostock_session
+from tradingagents.dataflows.providers.china.baostock import BaoStockProvider
+from tradingagents.dataflows.providers.china.baostock_session import (
+    BaoStockSessionPool,
+    _SessionCore,
+    _ThreadSession,
+)
+
+
+class _FakeResultSet:
+    def __init__(self, rows, fields, error_code="0", error_msg="success"):
+        self._rows = list(rows)
+        self.fields = fields
+        self.error_code = error_code
+        self.error_msg = error_msg
+
+    def next(self):
+        return bool(self._rows)
+
+    def get_row_data(self):
+        return self._rows.pop(0)
+
+
+class _FakeBaoStock:
+    """模拟进程级全局会话的 baostock 模块"""
+
+    def __init__(self, query_delay=0.0):
+        self.logins = 0
+        self.logouts = 0
+        self.logged_in = False
+        self.fail_next = None
+        self.query_delay = query_delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def login(self):
+        self.logins += 1
+        self.logged_in = True
+        return SimpleNamespace(error_code="0", error_msg="success")
+
+    def logout(self):
+        self.logouts += 1
+        self.logged_in = False
+
+    def query_trade_dates(self, **kwargs):
+        return _FakeResultSet([], ["calendar_date", "is_trading_day"])
+
+    def query_stock_basic(self, code=""):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.query_delay)
+            if self.fail_next:
+                code_, self.fail_next = self.fail_next, None
+                return _FakeResultSet([], [], error_code=code_, error_msg="fail")
+            if not self.logged_in:
+                return _FakeResultSet([], [], error_code="10001001", error_msg="用户未登录")
+            return _FakeResultSet([[code or "sh.600000", "浦发银行", "1999-11-10", "", "1", "1"]],
+                                  ["code", "code_name", "ipoDate", "outDate", "type", "status"])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _pool(fake, size=1):
+    return BaoStockSessionPool(size, session_factory=lambda _: _ThreadSession(_SessionCore(fake)))
+
+
+def test_queries_share_one_login_and_are_serialized():
+    fake = _FakeBaoStock(query_delay=0.005)
+    pool = _pool(fake)
+
+    async def run():
+        return await asyncio.gather(*(pool.query("query_stock_basic", code=f"sh.60000{i}") for i in range(10)))
+
+    results = asyncio.run(run())
+    pool.close()
+
+    assert [rows[0][0] for rows, _ in results] == [f"sh.60000{i}" for i in range(10)]
+    assert results[0][1][0] == "code"
+    assert fake.logins == 1 and fake.max_active == 1
+
+
+def test_session_relogs_in_after_network_error_or_external_logout():
+    fake = _FakeBaoStock()
+    core = _SessionCore(fake)
+
+    core.run("query_stock_basic", {})
+    fake.fail_next = "10002007"
+    rows, _ = core.run("query_stock_basic", {})
+    assert rows and fake.logins == 2
+
+    # 同进程其他代码 logout 了全局会话
+    fake.logout()
+    rows, _ = core.run("query_stock_basic", {})
+    assert rows and fake.logins == 3
+
+
+def test_query_error_is_raised_without_relogin():
+    fake = _FakeBaoStock()
+    core = _SessionCore(fake)
+    fake.fail_next = "10004011"
+    try:
+        core.run("query_stock_basic", {"code": "xx"})
+        assert False, "应抛出 BaoStockQueryError"
+    except baostock_session.BaoStockQueryError as e:
+        assert e.error_code == "10004011"
+    assert fake.logins == 1
+
+
+def test_idle_session_is_health_checked():
+    fake = _FakeBaoStock()
+    core = _SessionCore(fake, health_check_seconds=0)
+    fake.query_trade_dates = lambda **kwargs: _FakeResultSet([], [], error_code="10002004")
+
+    core.run("query_stock_basic", {})
+    core.last_used -= 1
+    core.run("query_stock_basic", {})
+    assert fake.logins == 2
+
+
+def test_pool_spreads_requests_across_sessions():
+    fakes = [_FakeBaoStock(query_delay=0.02) for _ in range(3)]
+    pool = BaoStockSessionPool(3, session_factory=lambda i: _ThreadSession(_SessionCore(fakes[i])))
+
+    futures = [pool.submit("query_stock_basic") for _ in range(9)]
+    assert all(f.result()[0] for f in futures)
+    pool.close()
+
+    assert [f.logins for f in fakes] == [1, 1, 1]
+    assert all(f.max_active == 1 for f in fakes)
+
+
+def test_provider_routes_queries_through_pool(monkeypatch):
+    fake = _FakeBaoStock()
+    pool = _pool(fake)
+    monkeypatch.setattr(baostock_session, "_session_pool", pool)
+    provider = BaoStockProvider()
+
+    info = asyncio.run(provider._get_stock_info_detail("600000"))
+    stocks = asyncio.run(provider.get_stock_list())
+
+    assert info["name"] == "浦发银行" and info["list_date"] == "1999-11-10"
+    assert stocks == [{"code": "600000", "name": "浦发银行", "source": "baostock"}]
+    assert fake.logins == 1 and fake.logouts == 0
+    pool.close()
+    assert fake.logouts == 1
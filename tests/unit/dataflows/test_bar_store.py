@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from tradingagents.dataflows.cache.bar_store import ColumnarBarStore
+
+
+def _bars(symbols, start="2022-11-01", end="2024-02-29"):
+    dates = pd.bdate_range(start, end)
+    frames = [
+        pd.DataFrame({
+            "symbol": symbol,
+            "trade_date": dates.strftime("%Y-%m-%d"),
+            "close": np.arange(len(dates), dtype=float) + i * 1000,
+            "volume": float(i + 1),
+        })
+        for i, symbol in enumerate(symbols)
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _expected(bars, symbols, start, end):
+    mask = bars["trade_date"].between(start, end)
+    if symbols is not None:
+        mask &= bars["symbol"].isin(symbols)
+    return bars[mask].sort_values(["symbol", "trade_date"]).reset_index(drop=True)
+
+
+def test_range_reads_match_reference_before_and_after_compaction(tmp_path):
+    store = ColumnarBarStore(tmp_path, compact_segments=1000)
+    symbols = [f"{600000 + i:06d}" for i in range(20)]
+    bars = _bars(symbols)
+    for symbol, group in bars.groupby("symbol"):
+        store.append("CN", "daily", "tushare", group)
+
+    cases = [(["600003"], "2023-12-20", "20240105"), (None, "2023-03-01", "2023-06-30"),
+             (["600001", "600019"], None, None), (None, "2022-01-01", "2024-12-31")]
+
+    def check():
+        for symbols_, start, end in cases:
+            frame = store.read_frame("CN", "daily", "tushare", symbols_, start, end)
+            expected = _expected(bars, symbols_, pd.Timestamp(start or "1900-01-01").strftime("%Y-%m-%d"),
+                                 pd.Timestamp(end or "2100-01-01").strftime("%Y-%m-%d"))
+            assert frame["symbol"].tolist() == expected["symbol"].tolist()
+            assert frame["trade_date"].tolist() == expected["trade_date"].tolist()
+            assert np.array_equal(frame["close"].to_numpy(), expected["close"].to_numpy())
+
+    check()
+    assert store.compact() == 3  # 2022/2023/2024 三个年份分区
+    assert not list(tmp_path.rglob("delta-*.arrow"))
+    check()
+
+    # 压缩后的区间读取是对内存映射文件的切片，不从内存池分配
+    allocated = pa.total_allocated_bytes()
+    table = store.read_table("CN", "daily", "tushare", "600007", "2023-02-01", "2023-11-30")
+    universe = store.read_table("CN", "daily", "tushare", None, "2023-01-01", "2023-12-31")
+    assert pa.total_allocated_bytes() == allocated
+    assert table.num_rows == len(_expected(bars, ["600007"], "2023-02-01", "2023-11-30"))
+    assert universe.num_rows == len(_expected(bars, None, "2023-01-01", "2023-12-31"))
+
+
+def test_later_appends_win_and_segments_are_compacted(tmp_path):
+    store = ColumnarBarStore(tmp_path, compact_segments=3)
+    store.append("CN", "daily", "akshare", _bars(["000001"], "2024-01-01", "2024-01-31"))
+    store.append("CN", "daily", "akshare", pd.DataFrame({
+        "symbol": ["000001"], "trade_date": ["20240105"], "close": [-1.0], "pe": [12.5],
+    }))
+    frame = store.read_frame("CN", "daily", "akshare", "000001", "2024-01-04", "2024-01-08")
+    assert frame["close"].tolist() == [3.0, -1.0, 5.0]
+    assert frame["pe"].isna().tolist() == [True, False, True]
+    assert frame["data_source"].unique().tolist() == ["akshare"]
+    assert "turnover_rate" not in frame.columns
+
+    # 第三个增量段触发自动合并
+    store.append("CN", "daily", "akshare", pd.DataFrame({
+        "symbol": ["000002", "000001"], "trade_date": ["2024-01-05", "2024-01-08"], "close": [7.0, 8.0],
+    }))
+    partition = tmp_path / "CN" / "daily" / "akshare" / "2024"
+    assert [p.name for p in partition.iterdir()] == ["base.arrow"]
+    frame = store.read_frame("CN", "daily", "akshare", None, "2024-01-05", "2024-01-08")
+    assert list(zip(frame["symbol"], frame["trade_date"], frame["close"])) == [
+        ("000001", "2024-01-05", -1.0), ("000001", "2024-01-08", 8.0), ("000002", "2024-01-05", 7.0),
+    ]
+    assert store.read_frame("CN", "daily", "tushare", "000001").empty
+
+
+def test_read_racing_another_process_compaction_keeps_delta_rows(tmp_path):
+    writer = ColumnarBarStore(tmp_path, compact_segments=1000)
+    writer.append("CN", "daily", "tushare", _bars(["000001"], "2024-01-01", "2024-01-31"))
+    writer.compact()
+    writer.append("CN", "daily", "tushare", pd.DataFrame({
+        "symbol": ["000001"], "trade_date": ["2024-02-01"], "close": [99.0],
+    }))
+
+    reader = ColumnarBarStore(tmp_path)
+    calls = []
+
+    def deltas_after_compaction(partition):
+        # 读取方已打开旧 base，列出 delta 段之前另一进程完成合并并删除了 delta 段
+        if not calls:
+            writer.compact()
+        calls.append(partition)
+        return ColumnarBarStore._deltas(partition)
+
+    reader._deltas = deltas_after_compaction
+    frame = reader.read_frame("CN", "daily", "tushare", "000001", "2024-01-30", "2024-02-01")
+    assert frame["trade_date"].tolist() == ["2024-01-30", "2024-01-31", "2024-02-01"]
+    assert frame["close"].tolist()[-1] == 99.0
+    assert len(calls) == 2
+
+
+def test_invalidate_clears_ready_marker(tmp_path):
+    store = ColumnarBarStore(tmp_path)
+    assert store.invalidate("CN", "daily", "tushare") is False
+    store.mark_ready("CN", "daily", "tushare")
+    assert store.is_ready("CN", "daily", "tushare")
+    assert store.invalidate("CN", "daily", "tushare") is True
+    assert not store.is_ready("CN", "daily", "tushare")
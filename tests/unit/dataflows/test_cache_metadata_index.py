@@ -0,0 +1,106 @@
+import json
+import multiprocessing
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from tradingagents.dataflows.cache.file_cache import StockDataCache
+from tradingagents.dataflows.cache.metadata_index import CacheMetadataIndex
+
+
+def _frame():
+    return pd.DataFrame({"close": [1.0, 2.0]}, index=pd.date_range("2024-01-02", periods=2, name="date"))
+
+
+def _put_many(db_path, worker, count):
+    index = CacheMetadataIndex(db_path)
+    for i in range(count):
+        index.put(f"w{worker}_{i}", {"symbol": f"{worker}", "data_type": "stock_data",
+                                     "cached_at": datetime.now().isoformat()})
+
+
+def test_legacy_json_metadata_is_imported_once(tmp_path):
+    metadata_dir = tmp_path / "metadata"
+    metadata_dir.mkdir()
+    legacy = {"symbol": "000001", "data_type": "stock_data", "market_type": "china", "data_source": "tushare",
+              "start_date": "2024-01-01", "end_date": "2024-06-30", "file_path": "",
+              "cached_at": datetime.now().isoformat()}
+    (metadata_dir / "abc_meta.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+    index = CacheMetadataIndex(tmp_path / "index.sqlite3", legacy_metadata_dir=metadata_dir)
+    assert index.get("abc")["symbol"] == "000001"
+    index.delete(["abc"])
+
+    # 再次打开不会重新导入已删除的条目
+    reopened = CacheMetadataIndex(tmp_path / "index.sqlite3", legacy_metadata_dir=metadata_dir)
+    assert reopened.count() == 0
+
+
+def test_find_requires_range_containment_and_age(tmp_path):
+    index = CacheMetadataIndex(tmp_path / "index.sqlite3")
+    base = {"symbol": "000001", "data_type": "stock_data", "market_type": "china", "data_source": "tushare"}
+    old = (datetime.now() - timedelta(hours=10)).isoformat()
+    index.put("wide_old", dict(base, start_date="2023-01-01", end_date="2024-12-31", cached_at=old))
+    index.put("narrow_new", dict(base, start_date="20240301", end_date="20240331",
+                                 cached_at=datetime.now().isoformat()))
+
+    assert [m["cache_key"] for m in index.find("000001", "stock_data", start_date="2024-03-05",
+                                                end_date="2024-03-20")] == ["narrow_new", "wide_old"]
+    assert [m["cache_key"] for m in index.find("000001", "stock_data", start_date="2024-02-01",
+                                                end_date="2024-03-20")] == ["wide_old"]
+    assert index.find("000001", "stock_data", start_date="2024-02-01", end_date="2024-03-20",
+                      max_age_hours=1) == []
+    assert index.find("000001", "stock_data", data_source="akshare") == []
+
+
+def test_stock_data_cache_uses_index_for_lookup_stats_and_eviction(tmp_path):
+    cache = StockDataCache(str(tmp_path))
+    key = cache.save_stock_data("000001", _frame(), "2024-01-01", "2024-06-30", "tushare")
+    cache.save_fundamentals_data("000001", "基本面报告", "tushare")
+
+    assert not list(cache.metadata_dir.glob("*_meta.json"))
+    assert cache.find_cached_stock_data("000001", "2024-01-01", "2024-06-30", "tushare") == key
+    assert cache.find_cached_stock_data("000001", "2024-02-01", "2024-03-01", "tushare") == key
+    assert cache.find_cached_stock_data("000001", "2023-12-01", "2024-03-01", "tushare") is None
+    assert cache.find_cached_fundamentals_data("000001", "tushare") is not None
+
+    stats = cache.get_cache_stats()
+    assert stats["stock_data_count"] == 1 and stats["fundamentals_count"] == 1
+    assert stats["total_size"] > 0
+
+    assert cache.clear_old_cache(max_age_days=0) == 2
+    assert cache.metadata_index.count() == 0
+    assert not list(cache.china_stock_dir.glob("*"))
+
+
+def test_concurrent_writers_from_several_processes(tmp_path):
+    db_path = tmp_path / "index.sqlite3"
+    CacheMetadataIndex(db_path)
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=_put_many, args=(db_path, w, 50)) for w in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(60)
+        assert p.exitcode == 0
+    assert CacheMetadataIndex(db_path).count() == 200
+
+
+def _put_in_forked_child(index):
+    # 继承自父进程的连接已被丢弃
+    assert getattr(index._local, "conn", None) is None
+    index.put("child", {"cached_at": datetime.now().isoformat(), "symbol": "000001", "data_type": "stock_data"})
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="需要 fork")
+def test_forked_child_opens_its_own_connection(tmp_path):
+    index = CacheMetadataIndex(tmp_path / "index.sqlite3")
+    parent_conn = index._conn()
+    child = multiprocessing.get_context("fork").Process(target=_put_in_forked_child, args=(index,))
+    child.start()
+    child.join(60)
+    assert child.exitcode == 0
+    assert index._conn() is parent_conn
+    assert index.get("child")["symbol"] == "000001"
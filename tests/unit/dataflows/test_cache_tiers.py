@@ -0,0 +1,85 @@
+import time
+
+import pandas as pd
+import pytest
+
+from tradingagents.dataflows.cache import adaptive as adaptive_mod
+from tradingagents.dataflows.cache import integrated as integrated_mod
+from tradingagents.dataflows.cache.memory_cache import MemoryLRUCache, estimate_size
+
+
+def test_memory_cache_evicts_by_bytes_and_expires():
+    frame = pd.DataFrame({"close": range(1000)}, dtype=float)
+    size = estimate_size(frame)
+    cache = MemoryLRUCache(max_bytes=size * 2 + 10, max_item_bytes=size * 2)
+
+    cache.put("a", frame, ttl_seconds=60)
+    cache.put("b", frame, ttl_seconds=60)
+    assert cache.get("a") is not None  # a 变为最近使用
+    cache.put("c", frame, ttl_seconds=60)
+
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.stats()["evictions"] == 1
+    assert cache.current_bytes <= cache.max_bytes
+
+    # 返回副本，调用方修改不影响缓存
+    got = cache.get("a")
+    got.loc[0, "close"] = -1
+    assert cache.get("a").loc[0, "close"] == 0
+
+    cache.put("short", "text", ttl_seconds=0.05)
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    # 超过单条上限的对象不缓存
+    assert not cache.put("huge", pd.concat([frame] * 3), ttl_seconds=60)
+
+
+def test_integrated_legacy_cache_serves_repeat_loads_from_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(integrated_mod, "ADAPTIVE_CACHE_AVAILABLE", False)
+    manager = integrated_mod.IntegratedCacheManager(str(tmp_path))
+    key = manager.save_stock_data("000001", "股票数据" * 100, "2025-01-01", "2025-01-31", "tushare")
+    manager.memory_cache.clear()
+
+    calls = []
+    original = manager.legacy_cache.load_stock_data
+    monkeypatch.setattr(manager.legacy_cache, "load_stock_data", lambda k: calls.append(k) or original(k))
+
+    for _ in range(3):
+        assert manager.load_stock_data(key) == "股票数据" * 100
+    assert calls == [key]
+
+    tiers = manager.get_cache_stats()["tiers"]
+    assert tiers["memory"]["hits"] == 2
+    assert tiers["file"] == {"hits": 1, "misses": 0}
+
+
+def test_adaptive_cache_promotes_file_hits_to_redis(tmp_path, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    redis_client = fakeredis.FakeRedis()
+
+    class _DBManager:
+        def get_config(self):
+            return {"cache": {"primary_backend": "file", "fallback_enabled": True,
+                              "ttl_settings": {"china_stock_data": 3600}}}
+
+        def is_redis_available(self):
+            return True
+
+        def get_redis_client(self):
+            return redis_client
+
+        def get_mongodb_client(self):
+            return None
+
+    monkeypatch.setattr(adaptive_mod, "get_database_manager", lambda: _DBManager())
+    cache = adaptive_mod.AdaptiveCacheSystem(str(tmp_path))
+    key = cache.save_data("000001", "payload", "2025-01-01", "2025-01-31", "tushare")
+
+    assert cache.load_data(key) == "payload"
+    assert cache.tier_stats["redis"] == {"hits": 0, "misses": 1}
+    assert cache.tier_stats["file"] == {"hits": 1, "misses": 0}
+    assert 0 < redis_client.ttl(key) <= 3600
+
+    assert cache.load_data(key) == "payload"
+    assert cache.tier_stats["redis"]["hits"] == 1
+    assert cache.tier_stats["file"]["hits"] == 1
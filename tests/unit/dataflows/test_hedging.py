@@ -0,0 +1,90 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tradingagents.dataflows.hedging import LatencyHistogram, SourceLatencyTracker, hedged_call
+
+
+def _is_valid(result):
+    return bool(result) and "❌" not in result
+
+
+def test_hedged_call_prefers_fast_secondary_when_primary_is_slow():
+    release = threading.Event()
+    started = []
+
+    def slow_primary():
+        started.append("tushare")
+        release.wait(5)
+        return "tushare-data"
+
+    def fast_secondary():
+        started.append("akshare")
+        return "akshare-data"
+
+    executor = ThreadPoolExecutor(max_workers=4)
+    try:
+        begin = time.monotonic()
+        result, source, _ = hedged_call(
+            [("tushare", slow_primary), ("akshare", fast_secondary), ("baostock", lambda: "baostock-data")],
+            is_valid=_is_valid,
+            delay_for=lambda source: 0.05,
+            executor=executor,
+        )
+        elapsed = time.monotonic() - begin
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+
+    assert (result, source) == ("akshare-data", "akshare")
+    assert elapsed < 1
+    # 次级数据源已成功，不应再启动第三个数据源
+    assert "baostock" not in started
+
+
+def test_hedged_call_falls_through_invalid_results_without_waiting():
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        begin = time.monotonic()
+        result, source, last_invalid = hedged_call(
+            [("mongodb", lambda: "❌ 无数据"), ("tushare", lambda: "tushare-data")],
+            is_valid=_is_valid,
+            delay_for=lambda source: 10,
+            executor=executor,
+        )
+        elapsed = time.monotonic() - begin
+
+        none_result = hedged_call(
+            [("mongodb", lambda: "❌ 无数据"), ("tushare", lambda: 1 / 0)],
+            is_valid=_is_valid,
+            delay_for=lambda source: 10,
+            executor=executor,
+        )
+    finally:
+        executor.shutdown(wait=True)
+
+    assert (result, source, last_invalid) == ("tushare-data", "tushare", "❌ 无数据")
+    # 主数据源失败后立即启动下一个，不必等待延迟预算
+    assert elapsed < 1
+    assert none_result == (None, None, "❌ 无数据")
+
+
+def test_latency_tracker_uses_p95_after_min_samples():
+    histogram = LatencyHistogram()
+    for _ in range(95):
+        histogram.observe(0.2)
+    for _ in range(5):
+        histogram.observe(4.0)
+    histogram.observe(99.0, success=False)
+    assert histogram.quantile(0.5) == 0.25
+    assert histogram.quantile(0.95) == 0.25
+    assert histogram.quantile(0.99) == 5.0
+    assert histogram.snapshot()["failures"] == 1
+
+    tracker = SourceLatencyTracker(min_samples=10)
+    for _ in range(9):
+        tracker.observe("tushare", 0.4)
+    assert tracker.hedge_delay("tushare", default=3.0) == 3.0
+    tracker.observe("tushare", 0.4)
+    assert tracker.hedge_delay("tushare", default=3.0) == 0.5
+    assert tracker.snapshot()["tushare"]["count"] == 10
@@ -0,0 +1,96 @@
+import random
+from datetime import datetime
+
+from tradingagents.dataflows.news.near_duplicate import (
+    NearDuplicateIndex,
+    dedupe,
+    news_signature,
+    similarity,
+)
+
+BODY = ("贵州茅台今日发布公告称，公司2024年实现营业总收入1738亿元，同比增长15.7%；"
+        "归属于上市公司股东的净利润862亿元，同比增长15.4%。公司拟每10股派发现金红利276.24元。")
+
+
+def test_reworded_syndicated_titles_are_near_duplicates():
+    original = news_signature("贵州茅台2024年净利润862亿元 同比增长15.4%", BODY)
+    reworded = news_signature("茅台2024年净利润达862亿元，同比增长15.4%", BODY)
+    title_only = news_signature("茅台2024年净利润达862亿元，同比增长15.4%")
+    previous_year = news_signature("贵州茅台2023年净利润747亿元 同比增长19.2%")
+
+    assert similarity(original, reworded) > 0.9
+    index = NearDuplicateIndex()
+    assert index.add_if_new("a", news_signature("贵州茅台2024年净利润862亿元 同比增长15.4%")) is None
+    assert index.add_if_new("b", title_only) == "a"
+    # 同一公司不同年度的财报新闻不是重复
+    assert index.add_if_new("c", previous_year) is None
+    assert len(index) == 2
+
+
+def test_dedupe_keeps_first_occurrence_among_many_articles():
+    rng = random.Random(7)
+    charset = "上证指数创业板公司发布公告业绩增长下降回购增持减持并购重组分红新能源汽车芯片银行券商保险医药消费白酒地产光伏"
+    items = [{"title": "".join(rng.choice(charset) for _ in range(24)), "content": ""} for _ in range(5000)]
+    syndicated = dict(items[42], title="【转载】" + items[42]["title"][:-1])
+    items.insert(3000, syndicated)
+
+    unique = dedupe(items, title_of=lambda n: n["title"], content_of=lambda n: n["content"])
+
+    assert len(unique) == 5000
+    assert syndicated not in unique
+
+
+def test_news_service_skips_near_duplicates_of_stored_articles():
+    from app.services.news_data_service import NewsDataService
+
+    svc = NewsDataService()
+    now = datetime(2025, 4, 3, 8, 0)
+    stored = svc._standardize_news_data(
+        {"symbol": "600519", "title": "贵州茅台2024年净利润862亿元 同比增长15.4%", "content": BODY,
+         "url": "https://a.example/1", "publish_time": now},
+        "akshare", "CN", now,
+    )
+    batch = [
+        # 同一条新闻的更新：照常写入
+        {"symbol": "600519", "title": stored["title"], "content": BODY,
+         "url": "https://a.example/1", "publish_time": now},
+        # 另一网站改写标题的转载稿：跳过
+        {"symbol": "600519", "title": "茅台2024年净利润达862亿元，同比增长15.4%", "content": BODY,
+         "url": "https://b.example/2", "publish_time": now},
+        {"symbol": "600519", "title": "贵州茅台将于4月召开业绩说明会", "content": "",
+         "url": "https://c.example/3", "publish_time": now},
+    ]
+    docs = [svc._standardize_news_data(n, "tushare", "CN", now) for n in batch]
+
+    query, _ = svc._near_duplicate_query(docs)
+    assert set(stored["minhash_bands"]) <= set(query["minhash_bands"]["$in"])
+
+    kept = svc._drop_near_duplicates(docs, [stored])
+    assert [d["url"] for d in kept] == ["https://a.example/1", "https://c.example/3"]
+
+
+def test_news_service_scopes_near_duplicates_per_symbol():
+    from app.services.news_data_service import NewsDataService
+
+    svc = NewsDataService()
+    now = datetime(2025, 4, 3, 8, 0)
+    title = "白酒板块2024年报：茅台五粮液净利润均实现两位数增长"
+    reworded = "2024年报出炉 茅台、五粮液净利润均实现两位数增长"
+    stored = svc._standardize_news_data(
+        {"symbol": "600519", "title": title, "content": BODY, "url": "https://a.example/1", "publish_time": now},
+        "akshare", "CN", now,
+    )
+    batch = [
+        # 同一篇转载稿关联到另一只股票：两只股票都要保留
+        {"symbol": "000858", "title": reworded, "content": BODY, "url": "https://b.example/2", "publish_time": now},
+        {"symbol": "000858", "title": title, "content": BODY, "url": "https://c.example/3", "publish_time": now},
+        {"symbol": "600519", "title": reworded, "content": BODY, "url": "https://b.example/2", "publish_time": now},
+    ]
+    docs = [svc._standardize_news_data(n, "tushare", "CN", now) for n in batch]
+
+    query, projection = svc._near_duplicate_query(docs)
+    assert sorted(query["symbol"]["$in"]) == ["000858", "600519"] and projection["symbol"] == 1
+
+    kept = svc._drop_near_duplicates(docs, [stored])
+    # 000858 的第二篇与本批同股票的第一篇重复；600519 的转载稿与库中同股票新闻重复
+    assert [(d["symbol"], d["url"]) for d in kept] == [("000858", "https://b.example/2")]
@@ -0,0 +1,105 @@
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from tradingagents.dataflows.cache.range_cache import RangeBarCache, merge_intervals, subtract_intervals
+
+
+class _Provider:
+    """按交易日生成确定性 K 线；factor 模拟复权基准变化"""
+
+    def __init__(self):
+        self.calls = []
+        self.factor = 1.0
+
+    def __call__(self, start, end):
+        self.calls.append((start, end))
+        days = pd.bdate_range(start, end, name="date")
+        if days.empty:
+            return None
+        return pd.DataFrame({"close": [d.toordinal() * self.factor for d in days]}, index=days)
+
+
+def _d(days_ago):
+    return (date.today() - timedelta(days=days_ago)).isoformat()
+
+
+def test_interval_arithmetic():
+    d = date.fromisoformat
+    merged = merge_intervals([(d("2024-03-01"), d("2024-03-31")), (d("2024-01-01"), d("2024-01-31")),
+                              (d("2024-02-01"), d("2024-02-10"))])
+    assert merged == [(d("2024-01-01"), d("2024-02-10")), (d("2024-03-01"), d("2024-03-31"))]
+    assert subtract_intervals(d("2023-12-01"), d("2024-04-05"), merged) == [
+        (d("2023-12-01"), d("2023-12-31")), (d("2024-02-11"), d("2024-02-29")), (d("2024-04-01"), d("2024-04-05")),
+    ]
+    assert subtract_intervals(d("2024-01-05"), d("2024-01-20"), merged) == []
+
+
+def test_sub_ranges_hit_and_edges_are_fetched_incrementally(tmp_path):
+    cache = RangeBarCache(tmp_path, ttl_hours=1)
+    provider = _Provider()
+    key = cache.series_key("600519", "daily", "tushare")
+
+    full = cache.get_or_fetch(key, "2023-01-01", "2024-06-30", provider)
+    assert provider.calls == [("2023-01-01", "2024-06-30")]
+
+    # 子区间直接从缓存切片
+    sub = cache.get_or_fetch(key, "2024-01-01", "2024-06-30", provider)
+    assert len(provider.calls) == 1
+    assert sub.equals(full.loc["2024-01-01":"2024-06-30"])
+
+    # 向前扩展只补取左侧缺口（多取一根已缓存 K 线做重叠校验）
+    wider = cache.get_or_fetch(key, "2022-10-01", "2024-06-30", provider)
+    assert provider.calls[-1] == ("2022-10-01", "2023-01-02")
+    assert wider.equals(provider("2022-10-01", "2024-06-30"))
+    assert cache.stats["hits"] == 1 and cache.stats["partial_hits"] == 1
+
+
+
+def test_distant_cached_interval_does_not_widen_the_fetch(tmp_path):
+    cache = RangeBarCache(tmp_path, ttl_hours=1)
+    provider = _Provider()
+    key = cache.series_key("600519", "daily", "tushare")
+
+    cache.get_or_fetch(key, "2020-01-01", "2020-03-31", provider)
+    cache.get_or_fetch(key, "2024-01-01", "2024-06-30", provider)
+    # 已缓存的 2020 年区间离缺口太远，只获取请求的区间
+    assert provider.calls[-1] == ("2024-01-01", "2024-06-30")
+
+    # 紧邻的已缓存区间仍多取一根 K 线做重叠校验
+    cache.get_or_fetch(key, "2024-07-01", "2024-07-31", provider)
+    assert provider.calls[-1] == ("2024-06-28", "2024-07-31")
+
+def test_daily_increment_fetches_only_the_newest_bars(tmp_path):
+    cache = RangeBarCache(tmp_path, ttl_hours=1)
+    provider = _Provider()
+    key = cache.series_key("000001", "daily", "tushare")
+
+    # 昨天收盘后获取的一年窗口：昨天之前的部分永久有效，昨天的数据只在 TTL 内有效
+    cache.store(key, provider(_d(366), _d(1)), _d(366), _d(1), fetched_at=datetime.now() - timedelta(days=1))
+    provider.calls.clear()
+
+    result = cache.get_or_fetch(key, _d(365), _d(0), provider)
+    assert len(provider.calls) == 1
+    fetch_start, fetch_end = provider.calls[0]
+    assert fetch_end == _d(0) and date.fromisoformat(fetch_start) >= date.today() - timedelta(days=5)
+    assert result.equals(provider(_d(365), _d(0)))
+
+    # 当天数据在 TTL 内直接命中
+    provider.calls.clear()
+    cache.get_or_fetch(key, _d(30), _d(0), provider)
+    assert provider.calls == []
+
+
+def test_adjustment_basis_change_refetches_whole_window(tmp_path):
+    cache = RangeBarCache(tmp_path, ttl_hours=1)
+    provider = _Provider()
+    key = cache.series_key("000002", "daily", "tushare")
+    cache.get_or_fetch(key, "2024-01-01", "2024-03-31", provider)
+
+    provider.factor = 0.97  # 除权后前复权价格整体变化
+    provider.calls.clear()
+    result = cache.get_or_fetch(key, "2024-01-01", "2024-04-30", provider)
+    assert provider.calls[-1] == ("2024-01-01", "2024-04-30")
+    assert result.equals(provider("2024-01-01", "2024-04-30"))
+    assert cache.stats["rebases"] == 1
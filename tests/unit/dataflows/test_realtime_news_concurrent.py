@@ -0,0 +1,93 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from tradingagents.dataflows.news.realtime_news import NewsItem, RealtimeNewsAggregator
+
+
+def _item(title, minutes_ago=5, relevance=1.0, source="test"):
+    return NewsItem(
+        title=title,
+        content="",
+        source=source,
+        publish_time=datetime.now(ZoneInfo("Asia/Shanghai")) - timedelta(minutes=minutes_ago),
+        url="",
+        urgency="low",
+        relevance_score=relevance,
+    )
+
+
+def _aggregator(monkeypatch, **sources):
+    agg = RealtimeNewsAggregator()
+    agg.newsapi_key = "configured"
+    for attr, fetch in sources.items():
+        monkeypatch.setattr(agg, attr, fetch)
+    return agg
+
+
+def test_sources_run_concurrently_and_slow_source_hits_deadline(monkeypatch):
+    release = threading.Event()
+
+    def slow(ticker, hours_back):
+        release.wait(5)
+        return [_item("slow source headline about AAPL")]
+
+    def delayed(items, seconds=0.2):
+        def fetch(ticker, hours_back):
+            time.sleep(seconds)
+            return items
+        return fetch
+
+    agg = _aggregator(
+        monkeypatch,
+        # FinnHub 晚于 Alpha Vantage 到达，但重复标题仍保留优先级更高的 FinnHub 版本
+        _get_finnhub_realtime_news=delayed([_item("AAPL beats earnings estimates", 30, source="FinnHub")], 0.3),
+        _get_alpha_vantage_news=delayed([_item("aapl beats earnings estimates ", 20), _item("短标题")], 0.1),
+        _get_newsapi_news=delayed([_item("Apple launches new iPhone lineup", 10, relevance=0.8)]),
+        _get_chinese_finance_news=slow,
+    )
+    agg.source_timeouts["中文财经"] = 0.5
+
+    begin = time.monotonic()
+    try:
+        news = agg.get_realtime_stock_news("AAPL", hours_back=6, max_news=10)
+    finally:
+        release.set()
+    elapsed = time.monotonic() - begin
+
+    # 三个新闻源并发执行（总耗时约为最慢的 0.3 秒），慢源在 0.5 秒截止时间后被放弃
+    assert elapsed < 1.0
+    assert [n.title for n in news] == ["Apple launches new iPhone lineup", "AAPL beats earnings estimates"]
+    assert news[1].source == "FinnHub"
+
+
+def test_returns_early_once_enough_fresh_relevant_items(monkeypatch):
+    release = threading.Event()
+
+    def fast(ticker, hours_back):
+        titles = ["600519 annual results beat forecasts", "Moutai raises dividend payout (600519)",
+                  "600519 shares hit record high on volume"]
+        return [_item(title, i) for i, title in enumerate(titles)] + \
+            [_item("unrelated market commentary", 1, relevance=0.3)]
+
+    def stalled(ticker, hours_back):
+        release.wait(5)
+        return []
+
+    agg = _aggregator(
+        monkeypatch,
+        _get_finnhub_realtime_news=stalled,
+        _get_alpha_vantage_news=stalled,
+        _get_newsapi_news=stalled,
+        _get_chinese_finance_news=fast,
+    )
+
+    begin = time.monotonic()
+    try:
+        news = agg.get_realtime_stock_news("600519", hours_back=6, max_news=3)
+    finally:
+        release.set()
+
+    assert time.monotonic() - begin < 1.0
+    assert len(news) == 3
@@ -0,0 +1,152 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tradingagents.dataflows.singleflight import SingleFlight, make_key
+
+
+def test_make_key_normalizes_symbol_and_dates():
+    assert make_key("stock_data", " 600519 ", "2025-01-02", "20250131", None) == \
+        make_key("stock_data", "600519", "20250102", "2025-01-31", None)
+    assert make_key("stock_data", "aapl") == "stock_data:AAPL"
+
+
+def test_concurrent_callers_share_one_fetch():
+    flight = SingleFlight()
+    calls = []
+    gate = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        gate.wait(5)
+        return "data"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, "stock_data:600519", fetch) for _ in range(8)]
+        time.sleep(0.2)
+        gate.set()
+        results = [f.result(timeout=5) for f in futures]
+
+    assert len(calls) == 1
+    assert [r for r, _ in results] == ["data"] * 8
+    assert sum(shared for _, shared in results) == 7
+
+    # 请求结束后不再合并
+    assert flight.do("stock_data:600519", lambda: "fresh") == ("fresh", False)
+
+
+def test_leader_error_propagates_to_waiters():
+    flight = SingleFlight()
+    gate = threading.Event()
+
+    def fail():
+        gate.wait(5)
+        raise RuntimeError("quota exceeded")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flight.do, "news:000001", fail) for _ in range(3)]
+        time.sleep(0.2)
+        gate.set()
+        for f in futures:
+            with pytest.raises(RuntimeError, match="quota"):
+                f.result(timeout=5)
+
+
+def test_cross_process_waiter_receives_published_result():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    # 两个 SingleFlight 实例模拟两个进程
+    leader = SingleFlight(fakeredis.FakeRedis(server=server), wait_timeout=5)
+    follower = SingleFlight(fakeredis.FakeRedis(server=server), wait_timeout=5)
+    gate = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        gate.wait(5)
+        return "tushare-data"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(leader.do, "fundamentals:600519", fetch)
+        time.sleep(0.2)
+        second = pool.submit(follower.do, "fundamentals:600519", fetch)
+        time.sleep(0.2)
+        gate.set()
+        assert first.result(timeout=5) == ("tushare-data", False)
+        assert second.result(timeout=5) == ("tushare-data", True)
+
+    assert len(calls) == 1
+    assert follower.stats["remote_shared"] == 1
+
+
+def test_cross_process_errors_are_not_shared():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    leader = SingleFlight(fakeredis.FakeRedis(server=server), wait_timeout=5)
+    follower = SingleFlight(fakeredis.FakeRedis(server=server), wait_timeout=5)
+    gate = threading.Event()
+
+    def failing_fetch():
+        gate.wait(5)
+        return "❌ 获取失败"
+
+    is_valid = lambda result: "❌" not in result
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(leader.do, "stock_data:000001", failing_fetch, is_valid)
+        time.sleep(0.2)
+        second = pool.submit(follower.do, "stock_data:000001", lambda: "retry-data", is_valid)
+        time.sleep(0.2)
+        gate.set()
+        assert first.result(timeout=5) == ("❌ 获取失败", False)
+        # leader 未发布结果，等待方在锁释放后自行获取
+        assert second.result(timeout=5) == ("retry-data", False)
+
+
+def test_waiter_falls_back_to_own_fetch_when_leader_hangs():
+    flight = SingleFlight(wait_timeout=0.2)
+    gate = threading.Event()
+
+    def hung_fetch():
+        gate.wait(5)
+        return "late"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(flight.do, "news:000001", hung_fetch)
+        time.sleep(0.1)
+        second = pool.submit(flight.do, "news:000001", lambda: "own")
+        assert second.result(timeout=2) == ("own", False)
+        gate.set()
+        assert first.result(timeout=5) == ("late", False)
+
+    assert flight.stats["wait_timeouts"] == 1
+
+
+def test_data_source_manager_key_includes_active_source(monkeypatch):
+    import tradingagents.dataflows.data_source_manager as dsm
+
+    flight = SingleFlight()
+    monkeypatch.setattr(dsm, "get_single_flight", lambda: flight)
+    manager = dsm.DataSourceManager.__new__(dsm.DataSourceManager)
+    manager.single_flight_enabled = True
+    gate = threading.Event()
+
+    def fetch(symbol, start_date, end_date, period):
+        source = manager.current_source
+        if source == dsm.ChinaDataSource.TUSHARE:
+            gate.wait(5)
+        return f"{source.name}:{symbol}"
+
+    manager._get_stock_data = fetch
+    manager.current_source = dsm.ChinaDataSource.TUSHARE
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(manager.get_stock_data, "600519", "2025-01-01", "2025-01-31")
+        time.sleep(0.1)
+        # 切换数据源后的请求不应拿到旧数据源进行中的结果
+        manager.current_source = dsm.ChinaDataSource.AKSHARE
+        assert manager.get_stock_data("600519", "2025-01-01", "2025-01-31") == "AKSHARE:600519"
+        gate.set()
+        assert first.result(timeout=5) == "TUSHARE:600519"
@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage
+
+import tradingagents.graph.setup as setup_mod
+import tradingagents.graph.trading_graph as trading_graph_mod
+from tradingagents.graph.conditional_logic import ConditionalLogic
+from tradingagents.graph.graph_pool import TradingGraphPool
+from tradingagents.graph.propagation import Propagator
+from tradingagents.graph.setup import GraphSetup
+from tradingagents.graph.trading_graph import TradingAgentsGraph
+
+
+def _config(**overrides):
+    config = {"quick_think_llm": "qwen-turbo", "deep_think_llm": "qwen-plus",
+              "max_debate_rounds": 1, "quick_api_key": "sk-secret"}
+    config.update(overrides)
+    return config
+
+
+def _counting_pool(max_size=8, delay=0.0):
+    builds = []
+
+    def factory(selected_analysts, debug, config):
+        time.sleep(delay)
+        builds.append((selected_analysts, config))
+        return SimpleNamespace(selected_analysts=selected_analysts, config=config)
+
+    return TradingGraphPool(max_size, factory=factory), builds
+
+
+def test_same_config_reuses_instance_and_keys_hide_secrets():
+    pool, builds = _counting_pool()
+    config = _config()
+
+    first = pool.get(["market", "news"], config)
+    config["deep_think_llm"] = "changed-after-build"
+    again = pool.get(["market", "news"], _config())
+
+    assert again is first and len(builds) == 1
+    assert first.config["deep_think_llm"] == "qwen-plus"
+    assert pool.stats()["hits"] == 1 and pool.stats()["misses"] == 1
+    assert "sk-secret" not in TradingGraphPool.make_key(["market"], _config())
+
+
+def test_analysts_models_and_depth_select_different_instances():
+    pool, builds = _counting_pool()
+    base = pool.get(["market"], _config())
+
+    assert pool.get(["market", "news"], _config()) is not base
+    assert pool.get(["market"], _config(deep_think_llm="qwen-max")) is not base
+    assert pool.get(["market"], _config(max_debate_rounds=2)) is not base
+    assert pool.get(["market"], _config(), debug=True) is not base
+    assert len(builds) == 5
+
+
+def test_concurrent_requests_for_one_key_build_once():
+    pool, builds = _counting_pool(delay=0.05)
+    results = []
+
+    def worker():
+        results.append(pool.get(["market"], _config()))
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(builds) == 1
+    assert len(results) == 6 and all(r is results[0] for r in results)
+
+
+def test_least_recently_used_instance_is_evicted():
+    pool, builds = _counting_pool(max_size=2)
+    a = pool.get(["market"], _config())
+    pool.get(["news"], _config())
+    assert pool.get(["market"], _config()) is a
+    pool.get(["fundamentals"], _config())
+
+    assert len(pool) == 2 and pool.stats()["evictions"] == 1
+    # news 最久未使用，已被淘汰；market 仍在池中
+    assert pool.get(["market"], _config()) is a
+    pool.get(["news"], _config())
+    assert len(builds) == 4
+
+
+def _install_fake_nodes(monkeypatch, barrier):
+    def market_factory(llm, toolkit):
+        def node(state):
+            # 两个任务同时处于运行中才能通过屏障
+            barrier.wait()
+            ticker = state["company_of_interest"]
+            return {"messages": [AIMessage(content=f"{ticker} done")], "market_report": f"{ticker} 报告"}
+        return node
+
+    def bull_factory(llm, memory):
+        return lambda state: {"investment_debate_state": {
+            "history": "", "bull_history": "", "bear_history": "",
+            "current_response": "Bull: ok", "judge_decision": "", "count": 99,
+        }}
+
+    def risky_factory(llm):
+        return lambda state: {"risk_debate_state": {
+            "history": "", "risky_history": "", "safe_history": "", "neutral_history": "",
+            "latest_speaker": "Risky", "current_risky_response": "",
+            "current_safe_response": "", "current_neutral_response": "",
+            "judge_decision": "", "count": 99,
+        }}
+
+    monkeypatch.setattr(setup_mod, "create_market_analyst", market_factory)
+    monkeypatch.setattr(setup_mod, "create_bull_researcher", bull_factory)
+    monkeypatch.setattr(setup_mod, "create_bear_researcher", lambda llm, memory: (lambda state: {}))
+    monkeypatch.setattr(setup_mod, "create_research_manager",
+                        lambda llm, memory: (lambda state: {"investment_plan": "plan"}))
+    monkeypatch.setattr(setup_mod, "create_trader",
+                        lambda llm, memory: (lambda state: {"trader_investment_plan": "trade"}))
+    monkeypatch.setattr(setup_mod, "create_risky_debator", risky_factory)
+    monkeypatch.setattr(setup_mod, "create_safe_debator", lambda llm: (lambda state: {}))
+    monkeypatch.setattr(setup_mod, "create_neutral_debator", lambda llm: (lambda state: {}))
+    monkeypatch.setattr(setup_mod, "create_risk_manager",
+                        lambda llm, memory: (lambda state: {"final_trade_decision": "BUY"}))
+
+
+def _shared_graph():
+    graph = TradingAgentsGraph.__new__(TradingAgentsGraph)
+    graph.config = {}
+    graph.debug = False
+    graph.toolkit = SimpleNamespace(update_config=lambda config: None)
+    graph.deep_thinking_llm = None
+    graph.propagator = Propagator(max_recur_limit=50)
+    graph.graph = GraphSetup(
+        quick_thinking_llm=None, deep_thinking_llm=None, toolkit=None,
+        tool_nodes={"market": (lambda state: {})},
+        bull_memory=None, bear_memory=None, trader_memory=None,
+        invest_judge_memory=None, risk_manager_memory=None,
+        conditional_logic=ConditionalLogic(), config={},
+    ).setup_graph(["market"])
+    graph.curr_state = None
+    graph.ticker = None
+    graph.log_states_dict = {}
+    graph._log_states_lock = threading.Lock()
+    graph.process_signal = lambda signal, ticker: {"action": signal, "ticker": ticker}
+    return graph
+
+
+def test_concurrent_runs_on_shared_instance_keep_their_own_state(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(trading_graph_mod, "set_config", lambda config: None)
+    _install_fake_nodes(monkeypatch, threading.Barrier(2, timeout=10))
+    graph = _shared_graph()
+    results = {}
+
+    def run(ticker, trade_date):
+        results[ticker] = graph.propagate(ticker, trade_date)
+
+    threads = [threading.Thread(target=run, args=("000001", "2025-01-02")),
+               threading.Thread(target=run, args=("600519", "2025-01-03"))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for ticker in ("000001", "600519"):
+        final_state, decision = results[ticker]
+        assert final_state["company_of_interest"] == ticker
+        assert final_state["market_report"] == f"{ticker} 报告"
+        assert decision["action"] == "BUY" and decision["ticker"] == ticker
+
+    log_000001 = json.loads((tmp_path / "eval_results/000001/TradingAgentsStrategy_logs/full_states_log.json").read_text())
+    log_600519 = json.loads((tmp_path / "eval_results/600519/TradingAgentsStrategy_logs/full_states_log.json").read_text())
+    assert list(log_000001) == ["2025-01-02"] and list(log_600519) == ["2025-01-03"]
+    assert log_600519["2025-01-03"]["market_report"] == "600519 报告"
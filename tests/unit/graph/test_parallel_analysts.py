@@ -0,0 +1,170 @@
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+import tradingagents.graph.setup as setup_mod
+from tradingagents.graph.conditional_logic import ConditionalLogic
+from tradingagents.graph.setup import GraphSetup
+
+
+ANALYSTS = ["market", "social", "news", "fundamentals"]
+REPORT_KEYS = {
+    "market": "market_report",
+    "social": "sentiment_report",
+    "news": "news_report",
+    "fundamentals": "fundamentals_report",
+}
+
+
+def _install_fake_nodes(monkeypatch, barrier=None, seen_messages=None, seen_at_bull=None):
+    def make_analyst(report_key):
+        def factory(llm, toolkit):
+            def node(state):
+                if seen_messages is not None:
+                    seen_messages[report_key] = [m.content for m in state["messages"]]
+                if barrier is not None:
+                    # 只有4个分析师同时在运行时才能通过屏障
+                    barrier.wait()
+                return {
+                    "messages": [AIMessage(content=f"{report_key} done")],
+                    report_key: f"{report_key} " + "x" * 120,
+                }
+            return node
+        return factory
+
+    monkeypatch.setattr(setup_mod, "create_market_analyst", make_analyst("market_report"))
+    monkeypatch.setattr(setup_mod, "create_social_media_analyst", make_analyst("sentiment_report"))
+    monkeypatch.setattr(setup_mod, "create_news_analyst", make_analyst("news_report"))
+    monkeypatch.setattr(setup_mod, "create_fundamentals_analyst", make_analyst("fundamentals_report"))
+
+    def bull_factory(llm, memory):
+        def node(state):
+            if seen_at_bull is not None:
+                seen_at_bull.update({k: state.get(k, "") for k in REPORT_KEYS.values()})
+                seen_at_bull["messages"] = [m.content for m in state["messages"]]
+            return {"investment_debate_state": {
+                "history": "", "bull_history": "", "bear_history": "",
+                "current_response": "Bull: ok", "judge_decision": "", "count": 99,
+            }}
+        return node
+
+    monkeypatch.setattr(setup_mod, "create_bull_researcher", bull_factory)
+    monkeypatch.setattr(setup_mod, "create_bear_researcher", lambda llm, memory: (lambda state: {}))
+    monkeypatch.setattr(setup_mod, "create_research_manager",
+                        lambda llm, memory: (lambda state: {"investment_plan": "plan"}))
+    monkeypatch.setattr(setup_mod, "create_trader",
+                        lambda llm, memory: (lambda state: {"trader_investment_plan": "trade"}))
+
+    def risky_factory(llm):
+        def node(state):
+            return {"risk_debate_state": {
+                "history": "", "risky_history": "", "safe_history": "", "neutral_history": "",
+                "latest_speaker": "Risky", "current_risky_response": "",
+                "current_safe_response": "", "current_neutral_response": "",
+                "judge_decision": "", "count": 99,
+            }}
+        return node
+
+    monkeypatch.setattr(setup_mod, "create_risky_debator", risky_factory)
+    monkeypatch.setattr(setup_mod, "create_safe_debator", lambda llm: (lambda state: {}))
+    monkeypatch.setattr(setup_mod, "create_neutral_debator", lambda llm: (lambda state: {}))
+    monkeypatch.setattr(setup_mod, "create_risk_manager",
+                        lambda llm, memory: (lambda state: {"final_trade_decision": "BUY"}))
+
+
+def _build_graph(parallel: bool):
+    graph_setup = GraphSetup(
+        quick_thinking_llm=None,
+        deep_thinking_llm=None,
+        toolkit=None,
+        tool_nodes={a: (lambda state: {}) for a in ANALYSTS},
+        bull_memory=None,
+        bear_memory=None,
+        trader_memory=None,
+        invest_judge_memory=None,
+        risk_manager_memory=None,
+        conditional_logic=ConditionalLogic(),
+        config={"parallel_analysts": parallel},
+    )
+    return graph_setup.setup_graph(ANALYSTS)
+
+
+def _initial_state():
+    return {
+        "messages": [HumanMessage(content="分析 000001")],
+        "company_of_interest": "000001",
+        "trade_date": "2025-01-02",
+        "investment_debate_state": {"history": "", "current_response": "", "count": 0},
+        "risk_debate_state": {"history": "", "count": 0},
+        "market_report": "",
+        "sentiment_report": "",
+        "news_report": "",
+        "fundamentals_report": "",
+    }
+
+
+def test_parallel_analysts_run_concurrently_and_join(monkeypatch):
+    barrier = threading.Barrier(len(ANALYSTS), timeout=10)
+    seen_messages = {}
+    seen_at_bull = {}
+    _install_fake_nodes(monkeypatch, barrier=barrier, seen_messages=seen_messages, seen_at_bull=seen_at_bull)
+
+    graph = _build_graph(parallel=True)
+    final_state = graph.invoke(_initial_state(), {"recursion_limit": 50})
+
+    assert final_state["final_trade_decision"] == "BUY"
+    # 汇合点：Bull Researcher 执行时四份报告都已就绪
+    for key in REPORT_KEYS.values():
+        assert seen_at_bull[key].startswith(key)
+    # 每个分支只看到初始消息，不会看到其他分析师的消息
+    for key in REPORT_KEYS.values():
+        assert seen_messages[key] == ["分析 000001"]
+    # 分支内部消息不会泄漏到主图
+    assert seen_at_bull["messages"] == ["分析 000001"]
+
+
+def test_serial_analysts_still_chain(monkeypatch):
+    seen_messages = {}
+    _install_fake_nodes(monkeypatch, seen_messages=seen_messages)
+
+    graph = _build_graph(parallel=False)
+    final_state = graph.invoke(_initial_state(), {"recursion_limit": 50})
+
+    assert final_state["final_trade_decision"] == "BUY"
+    # 串行模式下，后一个分析师看到的是前一个分析师清理后的占位消息
+    assert seen_messages["market_report"] == ["分析 000001"]
+    assert seen_messages["sentiment_report"] == ["Continue"]
+
+
+def test_stream_callback_receives_tokens_from_analyst_branches(monkeypatch):
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+
+    from tradingagents.graph.propagation import Propagator
+    from tradingagents.graph.trading_graph import TradingAgentsGraph
+
+    _install_fake_nodes(monkeypatch)
+
+    def market_factory(llm, toolkit):
+        def node(state):
+            fake_llm = GenericFakeChatModel(messages=iter([AIMessage(content="市场 趋势 向上")]))
+            response = fake_llm.invoke(state["messages"])
+            return {"messages": [response], "market_report": response.content}
+        return node
+
+    monkeypatch.setattr(setup_mod, "create_market_analyst", market_factory)
+
+    graph = TradingAgentsGraph.__new__(TradingAgentsGraph)
+    graph.graph = _build_graph(parallel=True)
+    deltas, progress = [], []
+    args = Propagator(max_recur_limit=50).get_graph_args(use_progress_callback=True, stream_tokens=True)
+
+    final_state = graph._stream_graph_updates(
+        _initial_state(), args, progress.append, lambda node, delta: deltas.append((node, delta))
+    )
+
+    assert {node for node, _ in deltas} == {"Market Analyst"}
+    assert "".join(delta for _, delta in deltas) == "市场 趋势 向上"
+    assert len(deltas) > 1
+    assert final_state["market_report"] == "市场 趋势 向上"
+    assert final_state["final_trade_decision"] == "BUY"
+    assert "📊 市场分析师" in progress
@@ -0,0 +1,101 @@
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+
+import tradingagents.llm_adapters.response_cache as response_cache
+from tradingagents.llm_adapters.openai_compatible_base import ChatDeepSeekOpenAI
+from tradingagents.llm_adapters.response_cache import _SQLiteBackend, make_cache_key
+from tradingagents.utils.tracing import AnalysisTrace, TraceCallbackHandler
+
+
+def _enable_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("TA_LLM_CACHE_ENABLED", "true")
+    monkeypatch.setenv("TA_LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite3"))
+    monkeypatch.setattr(response_cache, "_cache", None)
+
+
+def test_cache_key_ignores_tool_call_ids_but_not_content():
+    def messages(call_id, answer="42"):
+        return [
+            SystemMessage(content="你是分析师"),
+            AIMessage(content="", tool_calls=[{"name": "get_price", "args": {"code": "000001"}, "id": call_id}]),
+            ToolMessage(content=answer, tool_call_id=call_id),
+        ]
+
+    key = make_cache_key("deepseek", "deepseek-chat", 0.1, messages("call_a"), None, {"tools": [{"name": "get_price"}]})
+    assert key == make_cache_key("deepseek", "deepseek-chat", 0.1, messages("call_b"), None,
+                                 {"tools": [{"name": "get_price"}], "session_id": "s2"})
+    assert key != make_cache_key("deepseek", "deepseek-chat", 0.1, messages("call_a", "43"), None,
+                                 {"tools": [{"name": "get_price"}]})
+    assert key != make_cache_key("deepseek", "deepseek-chat", 0.7, messages("call_a"), None,
+                                 {"tools": [{"name": "get_price"}]})
+    assert key != make_cache_key("deepseek", "deepseek-chat", 0.1, messages("call_a"), None, {})
+
+
+def test_adapter_serves_repeated_prompts_from_cache_and_reports_node_hit_rate(monkeypatch, tmp_path):
+    _enable_cache(monkeypatch, tmp_path)
+    calls = []
+
+    def fake_generate(self, messages, stop=None, run_manager=None, **kwargs):
+        calls.append(messages)
+        message = AIMessage(content=f"回答{len(calls)}", usage_metadata={
+            "input_tokens": 10, "output_tokens": 5, "total_tokens": 15})
+        return ChatResult(generations=[ChatGeneration(message=message)],
+                          llm_output={"token_usage": {"prompt_tokens": 10, "completion_tokens": 5}})
+
+    monkeypatch.setattr(ChatOpenAI, "_generate", fake_generate)
+    llm = ChatDeepSeekOpenAI(api_key="sk-test-0123456789abcdef")
+    trace = AnalysisTrace("task")
+    config = {"callbacks": [TraceCallbackHandler(trace)], "metadata": {"langgraph_node": "Bull Researcher"}}
+
+    first = llm.invoke([HumanMessage(content="分析 000001 2024-06-28")], config=config)
+    second = llm.invoke([HumanMessage(content="分析 000001 2024-06-28  ")], config=config)
+    third = llm.invoke([HumanMessage(content="分析 000002 2024-06-28")], config=config)
+
+    assert len(calls) == 2
+    assert first.content == second.content == "回答1"
+    assert third.content == "回答2"
+    assert trace.summary()["llm_cache"] == {"Bull Researcher": {"hits": 1, "misses": 2, "hit_rate": 0.333}}
+
+
+def test_streaming_goes_through_cache_and_tracing(monkeypatch, tmp_path):
+    _enable_cache(monkeypatch, tmp_path)
+    calls = []
+
+    def fake_stream(self, messages, stop=None, run_manager=None, **kwargs):
+        calls.append(messages)
+        for token in ["看涨", "，", "目标价 12 元"]:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata={
+            "input_tokens": 10, "output_tokens": 5, "total_tokens": 15}))
+
+    monkeypatch.setattr(ChatOpenAI, "_stream", fake_stream)
+    llm = ChatDeepSeekOpenAI(api_key="sk-test-0123456789abcdef")
+    trace = AnalysisTrace("task")
+    config = {"callbacks": [TraceCallbackHandler(trace)], "metadata": {"langgraph_node": "Market Analyst"}}
+    prompt = [HumanMessage(content="分析 000001 2024-06-28")]
+
+    first = [chunk.content for chunk in llm.stream(prompt, config=config)]
+    second = [chunk.content for chunk in llm.stream(prompt, config=config)]
+    # 非流式调用也命中流式写入的缓存
+    third = llm.invoke(prompt, config=config)
+
+    assert len(calls) == 1
+    assert "".join(first) == "".join(second) == third.content == "看涨，目标价 12 元"
+    assert len([c for c in first if c]) == 3
+    assert trace.summary()["llm_cache"] == {"Market Analyst": {"hits": 2, "misses": 1, "hit_rate": 0.667}}
+
+
+def test_sqlite_backend_expires_and_evicts_least_recently_hit(tmp_path):
+    backend = _SQLiteBackend(tmp_path / "llm_cache.sqlite3", max_entries=2)
+    backend.put("expired", "{}", ttl_seconds=-1)
+    backend.put("a", "A", ttl_seconds=60)
+    backend.put("b", "B", ttl_seconds=60)
+    assert backend.get("expired") is None
+    assert backend.get("a") == "A"
+    backend.put("c", "C", ttl_seconds=60)
+
+    backend.evict()
+    assert backend.count() == 2
+    assert backend.get("b") is None
+    assert backend.get("a") == "A" and backend.get("c") == "C"
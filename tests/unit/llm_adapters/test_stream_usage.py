@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import tradingagents.llm_adapters.dashscope_openai_adapter as dashscope_adapter
+import tradingagents.llm_adapters.deepseek_adapter as deepseek_adapter
+import tradingagents.llm_adapters.openai_compatible_base as compatible_base
+import tradingagents.llm_adapters.response_cache as response_cache
+
+_API_KEY = "sk-test-0123456789abcdef"
+
+
+def _chunk(delta=None, usage=None):
+    return {
+        "id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": "m",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": None}] if delta else [],
+        "usage": usage,
+    }
+
+
+class _FakeCompletions:
+    """模拟 OpenAI 兼容接口：只有请求了 include_usage 时最后一个块才带用量"""
+
+    def __init__(self):
+        self.payloads = []
+
+    def create(self, **payload):
+        self.payloads.append(payload)
+        chunks = [_chunk({"role": "assistant", "content": "看涨"}), _chunk({"content": "，目标价 12 元"})]
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            chunks.append(_chunk(usage={"prompt_tokens": 12, "completion_tokens": 5, "total_tokens": 17}))
+        return _FakeStream(chunks)
+
+
+class _FakeStream(list):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _FakeTracker:
+    def __init__(self):
+        self.records = []
+
+    def track_usage(self, **kwargs):
+        self.records.append(kwargs)
+        return SimpleNamespace(cost=0.01)
+
+
+def _stream(llm):
+    completions = _FakeCompletions()
+    llm.client = completions
+    chunks = list(llm.stream([HumanMessage(content="分析 000001")]))
+    assert "".join(chunk.content for chunk in chunks) == "看涨，目标价 12 元"
+    assert completions.payloads[0]["stream_options"] == {"include_usage": True}
+    return chunks
+
+
+@pytest.fixture
+def no_response_cache(monkeypatch):
+    monkeypatch.setattr(response_cache, "get_llm_response_cache", lambda: None)
+
+
+def test_dashscope_stream_records_usage(monkeypatch, no_response_cache):
+    tracker = _FakeTracker()
+    monkeypatch.setattr(dashscope_adapter, "token_tracker", tracker)
+
+    _stream(dashscope_adapter.ChatDashScopeOpenAI(api_key=_API_KEY))
+
+    assert len(tracker.records) == 1
+    assert tracker.records[0]["input_tokens"] == 12 and tracker.records[0]["output_tokens"] == 5
+
+
+def test_deepseek_stream_records_actual_usage_not_estimate(monkeypatch, no_response_cache):
+    tracker = _FakeTracker()
+    monkeypatch.setattr(deepseek_adapter, "token_tracker", tracker, raising=False)
+    monkeypatch.setattr(deepseek_adapter, "TOKEN_TRACKING_ENABLED", True)
+
+    _stream(deepseek_adapter.ChatDeepSeek(api_key=_API_KEY))
+
+    assert len(tracker.records) == 1
+    assert tracker.records[0]["input_tokens"] == 12 and tracker.records[0]["output_tokens"] == 5
+
+
+def test_openai_compatible_stream_logs_usage(monkeypatch, no_response_cache):
+    logged = []
+    monkeypatch.setattr(compatible_base, "TOKEN_TRACKING_ENABLED", True)
+    monkeypatch.setattr(compatible_base, "logger", SimpleNamespace(
+        info=logged.append, debug=lambda *a, **k: None, warning=lambda *a, **k: None))
+
+    _stream(compatible_base.ChatDeepSeekOpenAI(api_key=_API_KEY))
+
+    usage_lines = [line for line in logged if line.startswith("📊 Token使用")]
+    assert len(usage_lines) == 1
+    assert "总tokens: 17, 提示: 12, 补全: 5" in usage_lines[0]
+
+
+def test_cache_miss_marker_does_not_add_an_extra_chunk(monkeypatch, tmp_path):
+    monkeypatch.setenv("TA_LLM_CACHE_ENABLED", "true")
+    monkeypatch.setenv("TA_LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite3"))
+    monkeypatch.setattr(response_cache, "_cache", None)
+    monkeypatch.setattr(compatible_base, "TOKEN_TRACKING_ENABLED", False)
+
+    llm = compatible_base.ChatDeepSeekOpenAI(api_key=_API_KEY)
+    llm.client = _FakeCompletions()
+    chunks = list(llm._stream([HumanMessage(content="分析 000001")]))
+
+    # 两个内容块加一个用量块，未命中标记附在最后一个块上，不额外输出空块
+    assert [chunk.text for chunk in chunks] == ["看涨", "，目标价 12 元", ""]
+    assert chunks[-1].message.usage_metadata["total_tokens"] == 17
+    assert chunks[-1].generation_info == {"cache_hit": False}
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+from tradingagents.tools.analysis.indicators import IndicatorSpec, compute_many
+from tradingagents.tools.analysis.indicator_engine import IndicatorEngine
+
+
+SPECS = [
+    IndicatorSpec('ma', {'n': 5}),
+    IndicatorSpec('ma', {'n': 60}),
+    IndicatorSpec('ema', {'n': 12}),
+    IndicatorSpec('macd'),
+    IndicatorSpec('rsi', {'n': 14}),
+    IndicatorSpec('rsi', {'n': 6, 'method': 'china'}),
+    IndicatorSpec('rsi', {'n': 24, 'method': 'sma'}),
+    IndicatorSpec('boll', {'n': 20, 'k': 2}),
+    IndicatorSpec('atr', {'n': 14}),
+    IndicatorSpec('kdj', {'n': 9, 'm1': 3, 'm2': 3}),
+]
+
+
+def make_bars(n=300, seed=3):
+    rng = np.random.default_rng(seed)
+    close = np.cumsum(rng.normal(0, 1, n)) + 100
+    df = pd.DataFrame({
+        'date': pd.bdate_range('2024-01-01', periods=n).strftime('%Y-%m-%d'),
+        'close': close,
+        'high': close + rng.uniform(0, 2, n),
+        'low': close - rng.uniform(0, 2, n),
+    })
+    # 一字板：最高=最低，RSV 为 NaN
+    df.loc[50:54, ['high', 'low']] = df.loc[50:54, ['close', 'close']].to_numpy()
+    return df
+
+
+def test_incremental_append_matches_full_recompute():
+    df = make_bars()
+    expected = compute_many(df, SPECS)
+    engine = IndicatorEngine()
+
+    engine.compute('000001:daily', df.iloc[:250], SPECS)
+    for end in range(251, len(df) + 1, 7):
+        out = engine.compute('000001:daily', df.iloc[:end], SPECS)
+    pd.testing.assert_frame_equal(out[expected.columns], expected, check_exact=False, rtol=1e-9)
+
+    assert engine.stats['rebuilds'] == 1
+    assert engine.stats['appends'] == 8
+
+    # 已计算过的区间直接复用已有状态
+    again = engine.compute('000001:daily', df.iloc[:200], SPECS)
+    pd.testing.assert_frame_equal(again[expected.columns], expected.iloc[:200], check_exact=False, rtol=1e-9)
+    assert engine.stats['hits'] == 1
+
+
+def test_results_do_not_depend_on_request_order():
+    df = make_bars()
+    window = df.iloc[100:250]
+    expected = compute_many(window, SPECS)
+
+    warmed = IndicatorEngine()
+    warmed.compute('000001:daily', df.iloc[:200], SPECS)
+    warmed.compute('000001:daily', df, SPECS)
+    out_after = warmed.compute('000001:daily', window, SPECS)
+
+    cold = IndicatorEngine()
+    out_first = cold.compute('000001:daily', window, SPECS)
+    cold.compute('000001:daily', df, SPECS)
+    out_again = cold.compute('000001:daily', window, SPECS)
+
+    for out in (out_after, out_first, out_again):
+        pd.testing.assert_frame_equal(out[expected.columns], expected, check_exact=False, rtol=1e-9)
+    assert cold.stats['hits'] == 1
+
+
+def test_window_longer_than_retained_history():
+    df = make_bars()
+    expected = compute_many(df, SPECS)
+    engine = IndicatorEngine(max_history=50)
+
+    first = engine.compute('000001:daily', df.iloc[:280], SPECS)
+    out = engine.compute('000001:daily', df, SPECS)
+
+    pd.testing.assert_frame_equal(first[expected.columns], expected.iloc[:280], check_exact=False, rtol=1e-9)
+    pd.testing.assert_frame_equal(out[expected.columns], expected, check_exact=False, rtol=1e-9)
+    # 保留的历史已不含窗口首根K线，只能重建
+    assert engine.stats['rebuilds'] == 2
+
+
+def test_rewritten_history_triggers_rebuild():
+    df = make_bars()
+    engine = IndicatorEngine()
+    engine.compute('000001:daily', df.iloc[:200], SPECS)
+
+    # 复权后价格整体变化，已有状态不能再用
+    adjusted = df.copy()
+    adjusted[['close', 'high', 'low']] *= 0.9
+    out = engine.compute('000001:daily', adjusted.iloc[:201], SPECS)
+
+    expected = compute_many(adjusted.iloc[:201], SPECS)
+    pd.testing.assert_frame_equal(out[expected.columns], expected, check_exact=False, rtol=1e-9)
+    assert engine.stats['rebuilds'] == 2
@@ -5,6 +5,7 @@ import numpy as np
 from tradingagents.tools.analysis.indicators import (
     IndicatorSpec,
     compute_many,
+    compute_many_grouped,
 )
 
 
@@ -48,3 +49,29 @@ def test_no_inplace_modification():
     out = compute_many(df, [IndicatorSpec('ma', {'n': 5})])
     assert 'ma5' in out.columns and 'ma5' not in df.columns
 
+
+
+def test_compute_many_grouped_matches_per_symbol():
+    specs = [
+        IndicatorSpec('ma', {'n': 5}),
+        IndicatorSpec('ema', {'n': 12}),
+        IndicatorSpec('macd'),
+        IndicatorSpec('rsi', {'n': 14}),
+        IndicatorSpec('boll', {'n': 20, 'k': 2}),
+        IndicatorSpec('atr', {'n': 14}),
+        IndicatorSpec('kdj', {'n': 9, 'm1': 3, 'm2': 3}),
+    ]
+    frames = []
+    for i, n in enumerate([80, 5, 40, 1]):
+        df = make_df(n, seed=i)
+        if n == 40:
+            df.loc[30, 'close'] = np.nan  # 停牌等缺失值
+        df.insert(0, 'code', f'{i:06d}')
+        frames.append(df)
+
+    expected = pd.concat([compute_many(f, specs) for f in frames], ignore_index=True)
+    panel = pd.concat(frames, ignore_index=True)
+    out = compute_many_grouped(panel, specs, by='code')
+
+    pd.testing.assert_frame_equal(out, expected, check_exact=False, rtol=1e-9)
+    assert 'ma5' not in panel.columns
@@ -0,0 +1,102 @@
+import time
+from typing import TypedDict
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langgraph.graph import END, START, StateGraph
+
+from tradingagents.utils.tracing import (
+    SPAN_KIND_CACHE,
+    SPAN_KIND_DATA_SOURCE,
+    AnalysisTrace,
+    TraceCallbackHandler,
+    activate_trace,
+    trace_span,
+    traced,
+)
+
+
+class _State(TypedDict, total=False):
+    a: str
+    b: str
+    joined: str
+
+
+def test_trace_span_is_noop_without_active_trace():
+    with trace_span("data_source:tushare.data", SPAN_KIND_DATA_SOURCE) as span:
+        assert span is None
+
+
+def test_nested_data_source_spans_use_self_time():
+    trace = AnalysisTrace("task-1")
+
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:tushare.data", source="tushare")
+    def fetch_tushare():
+        time.sleep(0.05)
+        return "ok"
+
+    with activate_trace(trace):
+        with trace_span("data_source:mongodb.data", SPAN_KIND_DATA_SOURCE, source="mongodb"):
+            fetch_tushare()
+        with trace_span("cache:stock_data", SPAN_KIND_CACHE) as span:
+            span.attributes["cache_hit"] = True
+
+    spans = {s.name: s for s in trace.spans}
+    assert spans["data_source:tushare.data"].parent_id == spans["data_source:mongodb.data"].span_id
+
+    summary = trace.summary()
+    assert summary["data_sources"]["tushare"]["count"] == 1
+    assert summary["data_sources"]["tushare"]["total_time"] >= 0.05
+    # MongoDB 的耗时不应包含降级到 Tushare 的时间
+    assert summary["data_sources"]["mongodb"]["total_time"] < 0.05
+    assert summary["cache"] == {"hits": 1, "misses": 0}
+
+
+def test_callback_handler_records_concurrent_nodes_and_llm_calls():
+    llm = FakeListChatModel(responses=["a-done", "b-done"])
+
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:akshare.data", source="akshare")
+    def fetch():
+        time.sleep(0.2)
+
+    def node_a(state):
+        fetch()
+        return {"a": llm.invoke("hi").content}
+
+    def node_b(state):
+        time.sleep(0.2)
+        return {"b": "b"}
+
+    def join(state):
+        return {"joined": state["a"] + state["b"]}
+
+    workflow = StateGraph(_State)
+    workflow.add_node("A", node_a)
+    workflow.add_node("B", node_b)
+    workflow.add_node("Join", join)
+    workflow.add_edge(START, "A")
+    workflow.add_edge(START, "B")
+    workflow.add_edge(["A", "B"], "Join")
+    workflow.add_edge("Join", END)
+    graph = workflow.compile()
+
+    trace = AnalysisTrace("task-2")
+    with activate_trace(trace):
+        graph.invoke({}, {"callbacks": [TraceCallbackHandler(trace)]})
+    trace.finish()
+
+    timings = trace.node_timings()
+    assert set(timings) == {"A", "B", "Join"}
+    # 并发执行：两个节点各自耗时约 0.2 秒，总耗时远小于二者之和
+    assert timings["A"] >= 0.2 and timings["B"] >= 0.2
+    assert trace.duration < timings["A"] + timings["B"]
+
+    spans = trace.spans
+    node_a_span = next(s for s in spans if s.name == "A")
+    llm_span = next(s for s in spans if s.kind == "llm")
+    ds_span = next(s for s in spans if s.kind == SPAN_KIND_DATA_SOURCE)
+    assert llm_span.parent_id == node_a_span.span_id
+    assert ds_span.parent_id == node_a_span.span_id
+
+    exported = trace.export()
+    assert exported["trace_id"] == "task-2"
+    assert exported["summary"]["by_kind"]["node"]["count"] == 3
@@ -0,0 +1,160 @@
+"""
+嵌入向量缓存（按内容哈希）
+
+同一段文本在同一嵌入模型下的向量是确定的：五个记忆库（多头、空头、交易员、投资裁判、风险经理）
+在一次分析中查询的是同一个当前情况，反思阶段写入的也是同一个情况。按 (模型, 文本) 的哈希缓存向量后，
+一次分析最多只需要一次嵌入请求，重启后也可以复用之前的向量。
+
+- 内存层：最近使用的向量（LRU）
+- 持久层：SQLite（WAL 模式，多进程共享），向量按 float64 二进制存储
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import weakref
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from tradingagents.utils.logging_init import get_logger
+
+logger = get_logger("agents.utils.embedding_cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    content_hash  TEXT PRIMARY KEY,
+    model         TEXT NOT NULL,
+    vector        BLOB NOT NULL
+);
+"""
+
+
+def content_hash(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """按 (模型, 文本) 内容哈希缓存嵌入向量"""
+
+    def __init__(self, db_path: Optional[Path] = None, max_memory_items: int = 1024):
+        """
+        Args:
+            db_path: SQLite 文件路径，None 表示只使用内存层
+            max_memory_items: 内存层最多保留的向量数
+        """
+        self.db_path = Path(db_path) if db_path else None
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {"hits": 0, "misses": 0}
+        _embedding_caches.add(self)
+        if self.db_path is not None:
+            try:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = self._conn()
+                with conn:
+                    conn.executescript(_SCHEMA)
+            except Exception as e:
+                logger.warning(f"⚠️ 嵌入缓存数据库不可用，仅使用内存缓存: {e}")
+                self.db_path = None
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, vector: List[float]):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, List[float]]:
+        """返回已缓存的 {文本: 向量}"""
+        found: Dict[str, List[float]] = {}
+        pending: Dict[str, str] = {}
+        with self._lock:
+            for text in texts:
+                key = content_hash(model, text)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[text] = self._memory[key]
+                else:
+                    pending[key] = text
+
+        if pending and self.db_path is not None:
+            try:
+                keys = list(pending)
+                placeholders = ",".join("?" * len(keys))
+                rows = self._conn().execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE content_hash IN ({placeholders})", keys
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("d", blob).tolist()
+                    found[pending[key]] = vector
+                    self._remember(key, vector)
+            except Exception as e:
+                logger.warning(f"⚠️ 读取嵌入缓存失败: {e}")
+
+        with self._lock:
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(set(texts)) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]):
+        """缓存 {文本: 向量}"""
+        rows = []
+        for text, vector in vectors.items():
+            key = content_hash(model, text)
+            self._remember(key, list(vector))
+            rows.append((key, model, array("d", vector).tobytes()))
+
+        if rows and self.db_path is not None:
+            try:
+                conn = self._conn()
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            except Exception as e:
+                logger.warning(f"⚠️ 写入嵌入缓存失败: {e}")
+
+
+# 本进程内创建的缓存，fork 后在子进程中重置它们的连接
+_embedding_caches: "weakref.WeakSet[EmbeddingCache]" = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    """子进程不能继续使用父进程打开的 sqlite3 连接（共享文件锁状态），丢弃后按需重新连接"""
+    for cache in list(_embedding_caches):
+        cache._local = threading.local()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(cache_dir: Optional[str] = None) -> Optional[EmbeddingCache]:
+    """获取进程内共享的嵌入缓存（同一目录只创建一个实例）
+
+    ENABLE_EMBEDDING_CACHE=false 时返回 None；EMBEDDING_CACHE_DIR 覆盖缓存目录。
+    """
+    if os.getenv("ENABLE_EMBEDDING_CACHE", "true").lower() != "true":
+        return None
+    directory = os.getenv("EMBEDDING_CACHE_DIR") or cache_dir
+    key = str(Path(directory).resolve()) if directory else ""
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = EmbeddingCache(Path(directory) / "embeddings.sqlite3" if directory else None)
+        return _caches[key]
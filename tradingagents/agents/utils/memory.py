@@ -6,7 +6,9 @@ from dashscope import TextEmbedding
 import os
 import threading
 import hashlib
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+from .embedding_cache import get_embedding_cache
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
@@ -310,6 +312,28 @@ class FinancialSituationMemory:
         self.chroma_manager = ChromaDBManager()
         self.situation_collection = self.chroma_manager.get_or_create_collection(name)
 
+        # 批量嵌入：每次请求的文本数（DashScope text-embedding-v3 单次最多10条）
+        default_batch_size = '10' if self._uses_dashscope() else '64'
+        self.embedding_batch_size = max(1, int(os.getenv('EMBEDDING_BATCH_SIZE', default_batch_size)))
+        # 按内容哈希的嵌入缓存（进程内共享，五个记忆库查询同一情况时只请求一次）
+        cache_dir = config.get("data_cache_dir")
+        self.embedding_cache = get_embedding_cache(os.path.join(cache_dir, "embeddings") if cache_dir else None)
+
+    def _uses_dashscope(self) -> bool:
+        """是否使用阿里百炼的嵌入模型"""
+        return (self.llm_provider == "dashscope" or
+                self.llm_provider == "alibaba" or
+                self.llm_provider == "qianfan" or
+                (self.llm_provider == "google" and self.client is None) or
+                (self.llm_provider == "deepseek" and self.client is None) or
+                (self.llm_provider == "openrouter" and self.client is None))
+
+    def _embedding_model_key(self) -> str:
+        """嵌入缓存的模型标识（同一模型、同一服务的向量才能复用）"""
+        if self._uses_dashscope():
+            return f"dashscope:{self.embedding}"
+        return f"{getattr(self.client, 'base_url', '')}:{self.embedding}"
+
     def _smart_text_truncation(self, text, max_length=8192):
         """智能文本截断，保持语义完整性和缓存兼容性"""
         if len(text) <= max_length:
@@ -350,6 +374,92 @@ class FinancialSituationMemory:
 
     def get_embedding(self, text):
         """Get embedding for a text using the configured provider"""
+        return self.get_embeddings([text])[0]
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量获取嵌入向量
+
+        先查嵌入缓存，未命中的文本去重后按 embedding_batch_size 分批请求，每批一次调用。
+        空文本、超长文本以及记忆功能禁用时与 get_embedding 一样返回零向量。
+        """
+        if self.client == "DISABLED":
+            logger.debug("⚠️ 记忆功能已禁用，返回空向量")
+            return [[0.0] * 1024 for _ in texts]
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            if (not text or not isinstance(text, str) or
+                    (self.enable_embedding_length_check and len(text) > self.max_embedding_length)):
+                # 无效或超长文本：沿用单条处理的日志和降级逻辑
+                vectors[i] = self._embed_one(text)
+            else:
+                pending.setdefault(text, []).append(i)
+        if not pending:
+            return vectors
+
+        model_key = self._embedding_model_key()
+        found = self.embedding_cache.get_many(model_key, list(pending)) if self.embedding_cache else {}
+        missing = [text for text in pending if text not in found]
+        if missing:
+            fetched = self._embed_batch(missing)
+            new_vectors = dict(zip(missing, fetched))
+            found.update(new_vectors)
+            if self.embedding_cache:
+                # 零向量表示请求失败或降级，不缓存
+                self.embedding_cache.put_many(model_key, {t: v for t, v in new_vectors.items() if any(v)})
+        else:
+            logger.debug(f"🎯 嵌入缓存命中: {len(pending)}条")
+
+        for text, indices in pending.items():
+            for i in indices:
+                vectors[i] = found[text]
+        return vectors
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """按批请求嵌入；批量请求失败时逐条请求（逐条请求有长度降级等处理）"""
+        results: List[List[float]] = []
+        for start in range(0, len(texts), self.embedding_batch_size):
+            chunk = texts[start:start + self.embedding_batch_size]
+            embeddings = self._request_embeddings(chunk) if len(chunk) > 1 else None
+            if embeddings is None:
+                embeddings = [self._embed_one(text) for text in chunk]
+            results.extend(embeddings)
+        return results
+
+    def _request_embeddings(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """一次调用获取多条文本的嵌入，失败返回 None"""
+        try:
+            if self._uses_dashscope():
+                import dashscope
+                from dashscope import TextEmbedding
+
+                if not getattr(dashscope, 'api_key', None):
+                    return None
+                response = TextEmbedding.call(model=self.embedding, input=texts)
+                if response.status_code != 200:
+                    logger.warning(f"⚠️ DashScope批量embedding失败，改为逐条请求: {response.code} - {response.message}")
+                    return None
+                items = sorted(response.output['embeddings'], key=lambda item: item['text_index'])
+                embeddings = [item['embedding'] for item in items]
+            else:
+                if self.client is None:
+                    return None
+                response = self.client.embeddings.create(model=self.embedding, input=texts)
+                embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except Exception as e:
+            logger.warning(f"⚠️ {self.llm_provider}批量embedding异常，改为逐条请求: {str(e)}")
+            return None
+
+        if len(embeddings) != len(texts):
+            logger.warning(f"⚠️ 批量embedding返回数量不一致({len(embeddings)}/{len(texts)})，改为逐条请求")
+            return None
+        logger.debug(f"✅ {self.llm_provider}批量embedding成功: {len(texts)}条")
+        return embeddings
+
+    def _embed_one(self, text):
+        """单条请求嵌入（含长度限制、降级处理）"""
 
         # 检查记忆功能是否被禁用
         if self.client == "DISABLED":
@@ -396,12 +506,7 @@ class FinancialSituationMemory:
             'strategy': 'no_truncation_with_fallback'  # 标记策略
         }
 
-        if (self.llm_provider == "dashscope" or
-            self.llm_provider == "alibaba" or
-            self.llm_provider == "qianfan" or
-            (self.llm_provider == "google" and self.client is None) or
-            (self.llm_provider == "deepseek" and self.client is None) or
-            (self.llm_provider == "openrouter" and self.client is None)):
+        if self._uses_dashscope():
             # 使用阿里百炼的嵌入模型
             try:
                 # 导入DashScope模块
@@ -562,7 +667,6 @@ class FinancialSituationMemory:
         situations = []
         advice = []
         ids = []
-        embeddings = []
 
         offset = self.situation_collection.count()
 
@@ -570,7 +674,8 @@ class FinancialSituationMemory:
             situations.append(situation)
             advice.append(recommendation)
             ids.append(str(offset + i))
-            embeddings.append(self.get_embedding(situation))
+
+        embeddings = self.get_embeddings(situations)
 
         self.situation_collection.add(
             documents=situations,
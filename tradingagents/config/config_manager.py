@@ -35,11 +35,12 @@ from tradingagents.utils.logging_init import get_logger
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 # 运行时设置：读取系统时区
-from tradingagents.config.runtime_settings import get_timezone_name
+from tradingagents.config.runtime_settings import get_timezone_name, get_float, get_int
 logger = get_logger('agents')
 
 # 导入数据模型（避免循环导入）
 from .usage_models import UsageRecord, ModelConfig, PricingConfig
+from .usage_ledger import UsageLedger
 
 try:
     from .mongodb_storage import MongoDBStorage
@@ -79,6 +80,15 @@ class ConfigManager:
 
         self._init_default_configs()
 
+        # 使用记录账本：缓冲后批量写入 MongoDB 或追加写入 usage.jsonl
+        self.usage_ledger = UsageLedger(
+            self.config_dir,
+            max_records=self.load_settings().get("max_usage_records", 10000),
+            batch_size=get_int("TA_USAGE_LEDGER_BATCH_SIZE", "ta_usage_ledger_batch_size", 50),
+            flush_interval=get_float("TA_USAGE_LEDGER_FLUSH_SECONDS", "ta_usage_ledger_flush_seconds", 2.0),
+            mongodb_storage=self.mongodb_storage,
+        )
+
     def _load_env_file(self):
         """加载.env文件（保持向后兼容）"""
         # 尝试从项目根目录加载.env文件
@@ -364,25 +374,23 @@ class ConfigManager:
             logger.error(f"保存定价配置失败: {e}")
     
     def load_usage_records(self) -> List[UsageRecord]:
-        """加载使用记录"""
+        """加载使用记录（文件中的记录加上尚未写出的缓冲记录）"""
         try:
-            if not self.usage_file.exists():
-                return []
-            with open(self.usage_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return [UsageRecord(**item) for item in data]
+            return self.usage_ledger.load_records()
         except Exception as e:
             logger.error(f"加载使用记录失败: {e}")
             return []
     
     def save_usage_records(self, records: List[UsageRecord]):
-        """保存使用记录"""
+        """保存使用记录（整体替换文件中的记录）"""
         try:
-            data = [asdict(record) for record in records]
-            with open(self.usage_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.usage_ledger.replace_all(records)
         except Exception as e:
             logger.error(f"保存使用记录失败: {e}")
+
+    def flush_usage_records(self) -> int:
+        """立即写出缓冲中的使用记录"""
+        return self.usage_ledger.flush()
     
     def add_usage_record(self, provider: str, model_name: str, input_tokens: int,
                         output_tokens: int, session_id: str, analysis_type: str = "stock_analysis"):
@@ -402,40 +410,10 @@ class ConfigManager:
             analysis_type=analysis_type
         )
 
-        # 🔍 详细日志：记录保存位置
-        logger.info(f"💾 [Token记录] 准备保存: {provider}/{model_name}, 输入={input_tokens}, 输出={output_tokens}, 成本=¥{cost:.4f}, session={session_id}")
-
-        # 优先使用MongoDB存储
-        if self.mongodb_storage and self.mongodb_storage.is_connected():
-            logger.info(f"📊 [Token记录] 使用 MongoDB 存储 (数据库: {self.mongodb_storage.database_name}, 集合: {self.mongodb_storage.collection_name})")
-            success = self.mongodb_storage.save_usage_record(record)
-            if success:
-                logger.info(f"✅ [Token记录] MongoDB 保存成功: {provider}/{model_name}")
-                return record
-            else:
-                logger.error(f"⚠️ [Token记录] MongoDB保存失败，回退到JSON文件存储")
-        else:
-            # 🔍 详细日志：为什么没有使用MongoDB
-            if self.mongodb_storage is None:
-                logger.warning(f"⚠️ [Token记录] MongoDB存储未初始化 (mongodb_storage=None)")
-                logger.warning(f"   💡 请检查环境变量: USE_MONGODB_STORAGE={os.getenv('USE_MONGODB_STORAGE', '未设置')}")
-            elif not self.mongodb_storage.is_connected():
-                logger.warning(f"⚠️ [Token记录] MongoDB未连接 (is_connected=False)")
-
-            logger.info(f"📄 [Token记录] 使用 JSON 文件存储: {self.usage_file}")
-
-        # 回退到JSON文件存储
-        records = self.load_usage_records()
-        records.append(record)
-
-        # 限制记录数量
-        settings = self.load_settings()
-        max_records = settings.get("max_usage_records", 10000)
-        if len(records) > max_records:
-            records = records[-max_records:]
+        logger.info(f"💾 [Token记录] {provider}/{model_name}, 输入={input_tokens}, 输出={output_tokens}, 成本=¥{cost:.4f}, session={session_id}")
 
-        self.save_usage_records(records)
-        logger.info(f"✅ [Token记录] JSON 文件保存成功: {self.usage_file}")
+        # 进入缓冲区，按批量或定时写出（MongoDB 可用时 insert_many，否则追加到 usage.jsonl）
+        self.usage_ledger.append(record)
         return record
     
     def calculate_cost(self, provider: str, model_name: str, input_tokens: int, output_tokens: int) -> tuple[float, str]:
@@ -540,6 +518,8 @@ class ConfigManager:
         try:
             with open(self.settings_file, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, ensure_ascii=False, indent=2)
+            if "max_usage_records" in settings and getattr(self, "usage_ledger", None) is not None:
+                self.usage_ledger.max_records = settings["max_usage_records"]
         except Exception as e:
             logger.error(f"保存设置失败: {e}")
     
@@ -567,6 +547,8 @@ class ConfigManager:
                 provider_stats = self.mongodb_storage.get_provider_statistics(days)
                 
                 if stats:
+                    # 计入尚未批量写入的缓冲记录
+                    self._add_pending_usage(stats, provider_stats, days)
                     stats["provider_stats"] = provider_stats
                     stats["records_count"] = stats.get("total_requests", 0)
                     return stats
@@ -620,6 +602,29 @@ class ConfigManager:
             "records_count": len(recent_records)
         }
     
+    def _add_pending_usage(self, stats: Dict[str, Any], provider_stats: Dict[str, Any], days: int):
+        """把缓冲区中尚未写入 MongoDB 的记录计入统计"""
+        from datetime import timedelta
+
+        cutoff_date = datetime.now() - timedelta(days=days)
+        for record in self.usage_ledger.pending():
+            try:
+                if datetime.fromisoformat(record.timestamp).replace(tzinfo=None) < cutoff_date:
+                    continue
+            except ValueError:
+                continue
+            stats["total_cost"] = round(stats.get("total_cost", 0) + record.cost, 4)
+            stats["total_input_tokens"] = stats.get("total_input_tokens", 0) + record.input_tokens
+            stats["total_output_tokens"] = stats.get("total_output_tokens", 0) + record.output_tokens
+            stats["total_requests"] = stats.get("total_requests", 0) + 1
+            item = provider_stats.setdefault(record.provider, {
+                "cost": 0, "input_tokens": 0, "output_tokens": 0, "requests": 0
+            })
+            item["cost"] += record.cost
+            item["input_tokens"] += record.input_tokens
+            item["output_tokens"] += record.output_tokens
+            item["requests"] += 1
+
     def get_data_dir(self) -> str:
         """获取数据目录路径"""
         settings = self.load_settings()
@@ -10,6 +10,7 @@ from zoneinfo import ZoneInfo
 from typing import Dict, List, Optional, Any
 from dataclasses import asdict
 from .usage_models import UsageRecord
+from .usage_rollups import ROLLUP_COLLECTION, build_rollup_updates
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -18,7 +19,7 @@ logger = get_logger('agents')
 
 try:
     from pymongo import MongoClient
-    from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+    from pymongo.errors import BulkWriteError, ConnectionFailure, ServerSelectionTimeoutError
     MONGODB_AVAILABLE = True
 except ImportError:
     MONGODB_AVAILABLE = False
@@ -114,7 +115,7 @@ class MongoDBStorage:
     def save_usage_record(self, record: UsageRecord) -> bool:
         """保存单个使用记录到MongoDB"""
         if not self._connected:
-            logger.warning(f"⚠️ [MongoDB存储] 未连接，无法保存记录")
+            logger.warning("⚠️ [MongoDB存储] 未连接，无法保存记录")
             return False
 
         try:
@@ -132,6 +133,7 @@ class MongoDBStorage:
             result = self.collection.insert_one(record_dict)
 
             if result.inserted_id:
+                self._update_rollups([record_dict])
                 logger.info(f"✅ [MongoDB存储] 记录已保存: ID={result.inserted_id}, {record.provider}/{record.model_name}, ¥{record.cost:.4f}")
                 return True
             else:
@@ -144,6 +146,56 @@ class MongoDBStorage:
             logger.error(f"   堆栈: {traceback.format_exc()}")
             return False
     
+    def save_usage_records(self, records: List[UsageRecord]) -> bool:
+        """批量保存使用记录到MongoDB，全部写入成功时返回 True"""
+        return not self.insert_usage_records(records)
+
+    def insert_usage_records(self, records: List[UsageRecord]) -> List[UsageRecord]:
+        """批量保存使用记录到MongoDB（一次无序 insert_many）
+
+        Returns:
+            未能写入的记录；部分失败时只返回失败的那些，调用方回退时不会重复写入已保存的记录
+        """
+        if not self._connected:
+            logger.warning("⚠️ [MongoDB存储] 未连接，无法保存记录")
+            return list(records)
+        if not records:
+            return []
+
+        created_at = datetime.now(ZoneInfo(get_timezone_name()))
+        docs = []
+        for record in records:
+            record_dict = asdict(record)
+            record_dict['_created_at'] = created_at
+            docs.append(record_dict)
+
+        try:
+            self.collection.insert_many(docs, ordered=False)
+            failed_indexes = set()
+        except BulkWriteError as e:
+            # 无序写入时其余文档照常插入，只有 writeErrors 中的文档失败（写关注错误不影响已插入的文档）
+            failed_indexes = {err['index'] for err in e.details.get('writeErrors', [])}
+            logger.error(f"❌ [MongoDB存储] 批量插入部分失败: {len(failed_indexes)}/{len(docs)}")
+        except Exception as e:
+            logger.error(f"❌ [MongoDB存储] 批量保存记录失败: {e}")
+            return list(records)
+
+        inserted = [doc for i, doc in enumerate(docs) if i not in failed_indexes]
+        if inserted:
+            self._update_rollups(inserted)
+        if not failed_indexes:
+            logger.info(f"✅ [MongoDB存储] 批量保存 {len(inserted)} 条记录, 合计 ¥{sum(r.cost for r in records):.4f}")
+        return [records[i] for i in sorted(failed_indexes)]
+
+    def _update_rollups(self, docs: List[Dict[str, Any]]):
+        """增量更新使用统计预聚合（失败时由后端定时重算修正）"""
+        try:
+            updates = build_rollup_updates(docs)
+            if updates:
+                self.db[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+        except Exception as e:
+            logger.warning(f"⚠️ [MongoDB存储] 更新使用统计预聚合失败: {e}")
+
     def load_usage_records(self, limit: int = 10000, days: int = None) -> List[UsageRecord]:
         """从MongoDB加载使用记录"""
         if not self._connected:
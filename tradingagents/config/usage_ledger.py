@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Token 使用记录账本（追加写 + 批量刷盘 + 后台压缩）
+
+每次 LLM 调用都会产生一条使用记录。旧实现每次都读取整个 usage.json、追加一条、
+再整体重写，单次记录的代价随历史记录数线性增长，多个分析并发时还会互相覆盖。
+
+这里改为：
+- 记录先进入内存缓冲区，达到批量大小或定时器到期时一次性写出
+- 文件存储为按行追加的 JSON 段（usage.jsonl），一次 write 写入整批，不再重写历史
+- 配置了 MongoDB 时整批通过 insert_many 写入，失败时回退到文件
+- 段文件记录数超过上限一定比例后，在后台线程中压缩：只保留最近 max_records 条，
+  写入基础段（usage.base.jsonl）；旧的 usage.json 在首次压缩时合并进来
+- 锁文件（usage.lock）协调多个进程：追加时持共享锁，压缩和整体替换持排他锁，
+  压缩不会与其他进程的追加交错（追加落到已读取的封存段上而丢失），也不会互相覆盖基础段
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import threading
+import weakref
+from dataclasses import asdict
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from tradingagents.utils.logging_manager import get_logger
+
+from .usage_models import UsageRecord
+
+logger = get_logger('agents')
+
+ACTIVE_SEGMENT = "usage.jsonl"
+BASE_SEGMENT = "usage.base.jsonl"
+LEGACY_FILE = "usage.json"
+LOCK_FILE = "usage.lock"
+SEALED_SUFFIX = ".compacting"
+
+
+@contextlib.contextmanager
+def _interprocess_lock(path: Path, shared: bool = False):
+    """锁文件上的进程间锁（阻塞等待），进程退出时由操作系统释放；Windows 上共享锁也按排他锁处理"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def _read_segment(path: Path) -> List[UsageRecord]:
+    """读取一个段文件，跳过损坏的行（例如进程崩溃时写了一半的最后一行）"""
+    records = []
+    if not path.exists():
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(UsageRecord(**json.loads(line)))
+            except Exception:
+                logger.debug(f"⚠️ [UsageLedger] 跳过损坏的记录行: {path.name}")
+    return records
+
+
+def _count_lines(path: Path) -> int:
+    if not path.exists():
+        return 0
+    with open(path, 'rb') as f:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 16), b""))
+
+
+def _encode(records: Iterable[UsageRecord]) -> str:
+    return "".join(json.dumps(asdict(r), ensure_ascii=False) + "\n" for r in records)
+
+
+class UsageLedger:
+    """Token 使用记录账本
+
+    Args:
+        directory: 存放段文件的目录（即配置目录）
+        max_records: 文件中保留的最大记录数
+        batch_size: 缓冲区达到该条数时立即刷盘
+        flush_interval: 定时刷盘间隔（秒），<= 0 表示只按批量刷盘
+        mongodb_storage: 已连接的 MongoDBStorage；为 None 时写入文件
+        compact_ratio: 文件记录数超过 max_records * compact_ratio 时触发后台压缩
+    """
+
+    def __init__(self, directory, max_records: int = 10000, batch_size: int = 50,
+                 flush_interval: float = 2.0, mongodb_storage=None, compact_ratio: float = 1.5):
+        self.directory = Path(directory)
+        self.active_file = self.directory / ACTIVE_SEGMENT
+        self.base_file = self.directory / BASE_SEGMENT
+        self.legacy_file = self.directory / LEGACY_FILE
+        self.lock_file = self.directory / LOCK_FILE
+        self.max_records = max_records
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.mongodb_storage = mongodb_storage
+        self.compact_ratio = compact_ratio
+
+        self._buffer: List[UsageRecord] = []
+        self._lock = threading.Lock()
+        # 刷盘与压缩互斥，保证压缩时不会有本进程的写入落到正在重命名的段上
+        self._io_lock = threading.Lock()
+        self._file_records: Optional[int] = None
+        self._compacting = False
+        self._compact_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        self.stats = {"appended": 0, "flushes": 0, "mongo_batches": 0, "compactions": 0}
+
+        _live_ledgers.add(self)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(self, record: UsageRecord):
+        """追加一条记录（只进入缓冲区，按批量或定时写出）"""
+        with self._lock:
+            self._buffer.append(record)
+            self.stats["appended"] += 1
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+        else:
+            self._ensure_timer()
+
+    def flush(self) -> int:
+        """写出缓冲区中的全部记录，返回写出的条数"""
+        with self._io_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+
+            total = len(batch)
+            if self.mongodb_storage is not None and self.mongodb_storage.is_connected():
+                failed = self.mongodb_storage.insert_usage_records(batch)
+                if len(failed) < total:
+                    self.stats["mongo_batches"] += 1
+                if not failed:
+                    self.stats["flushes"] += 1
+                    logger.debug(f"📊 [UsageLedger] 批量写入 MongoDB: {total} 条")
+                    return total
+                # 只回退未写入的记录，已写入 MongoDB 的不再重复写入文件
+                logger.error(f"⚠️ [UsageLedger] MongoDB 批量写入失败，回退到文件存储: {len(failed)}/{total} 条")
+                batch = failed
+
+            try:
+                self._append_to_file(batch)
+            except Exception as e:
+                logger.error(f"❌ [UsageLedger] 写入使用记录失败: {e}")
+                # 放回缓冲区，下次刷盘重试
+                with self._lock:
+                    self._buffer[:0] = batch
+                return 0
+            self.stats["flushes"] += 1
+            logger.debug(f"📄 [UsageLedger] 追加写入 {self.active_file.name}: {len(batch)} 条")
+
+        self._maybe_compact()
+        return total
+
+    def _append_to_file(self, batch: List[UsageRecord]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # 整批编码后一次写入；O_APPEND 保证多进程追加时各批次不会互相覆盖
+        payload = _encode(batch).encode('utf-8')
+        with _interprocess_lock(self.lock_file, shared=True):
+            fd = os.open(self.active_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, payload)
+            finally:
+                os.close(fd)
+        if self._file_records is not None:
+            self._file_records += len(batch)
+
+    def _ensure_timer(self):
+        if self.flush_interval <= 0 or (self._timer is not None and self._timer.is_alive()):
+            return
+        with self._lock:
+            if self._timer is not None and self._timer.is_alive():
+                return
+            self._stop.clear()
+            self._timer = threading.Thread(target=self._run_timer, name="usage-ledger-flush", daemon=True)
+            self._timer.start()
+
+    def _run_timer(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"❌ [UsageLedger] 定时刷盘失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def pending(self) -> List[UsageRecord]:
+        """尚未写出的缓冲记录"""
+        with self._lock:
+            return list(self._buffer)
+
+    def load_records(self) -> List[UsageRecord]:
+        """按时间顺序返回文件中的记录（含未写出的缓冲记录），最多 max_records 条"""
+        with self._io_lock:
+            records = self._read_files()
+        records.extend(self.pending())
+        return records[-self.max_records:] if self.max_records > 0 else records
+
+    def _read_files(self, segments=None) -> List[UsageRecord]:
+        records = []
+        if self.legacy_file.exists():
+            try:
+                with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                    records.extend(UsageRecord(**item) for item in json.load(f))
+            except Exception as e:
+                logger.error(f"加载使用记录失败: {e}")
+        for segment in segments or (self.base_file, self.active_file):
+            records.extend(_read_segment(segment))
+        return records
+
+    # ------------------------------------------------------------------
+    # 压缩
+    # ------------------------------------------------------------------
+
+    def _maybe_compact(self):
+        if self.max_records <= 0 or self._compacting:
+            return
+        if self._file_records is None:
+            with self._io_lock:
+                self._file_records = (_count_lines(self.base_file) + _count_lines(self.active_file)
+                                      + (1 if self.legacy_file.exists() else 0))
+        if self._file_records <= self.max_records * self.compact_ratio and not self.legacy_file.exists():
+            return
+        self._compacting = True
+        self._compact_thread = threading.Thread(target=self._compact_in_background,
+                                                name="usage-ledger-compact", daemon=True)
+        self._compact_thread.start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"❌ [UsageLedger] 压缩使用记录失败: {e}")
+        finally:
+            self._compacting = False
+
+    def compact(self) -> int:
+        """把旧 JSON 文件、基础段和活动段合并为只含最近 max_records 条记录的基础段
+
+        Returns:
+            压缩后保留的记录数
+        """
+        with self._io_lock, _interprocess_lock(self.lock_file):
+            # 先把活动段改名封存：其他进程之后的追加会写入新的活动段，不会在压缩中丢失
+            sealed = self.active_file.with_name(f"{self.active_file.name}.{os.getpid()}{SEALED_SUFFIX}")
+            if self.active_file.exists():
+                os.replace(self.active_file, sealed)
+            # 之前压缩中途退出的进程留下的封存段一并合并（持锁期间不会有其他进程正在使用它们）
+            leftovers = sorted((p for p in self.directory.glob(f"{ACTIVE_SEGMENT}.*{SEALED_SUFFIX}") if p != sealed),
+                               key=lambda p: p.stat().st_mtime)
+            segments = (self.base_file, *leftovers, sealed)
+            records = self._read_files(segments=segments)
+            if self.max_records > 0:
+                records = records[-self.max_records:]
+            self._write_base(records)
+            for path in (*segments[1:], self.legacy_file):
+                if path.exists():
+                    path.unlink()
+            self._file_records = len(records) + _count_lines(self.active_file)
+        self.stats["compactions"] += 1
+        logger.info(f"🗜️ [UsageLedger] 使用记录已压缩，保留 {len(records)} 条")
+        return len(records)
+
+    def _write_base(self, records: List[UsageRecord]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.base_file.with_name(f"{self.base_file.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(_encode(records))
+        os.replace(tmp, self.base_file)
+
+    def replace_all(self, records: List[UsageRecord]):
+        """用给定记录整体替换文件中的记录（例如清空统计）"""
+        with self._io_lock, _interprocess_lock(self.lock_file):
+            with self._lock:
+                self._buffer = []
+            self._write_base(records)
+            for path in (self.active_file, self.legacy_file):
+                if path.exists():
+                    path.unlink()
+            self._file_records = len(records)
+
+    def close(self):
+        """停止定时器并写出剩余记录"""
+        self._stop.set()
+        self.flush()
+        thread = self._compact_thread
+        if thread is not None:
+            thread.join()
+
+
+_live_ledgers: "weakref.WeakSet[UsageLedger]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all_ledgers():
+    """进程退出时写出所有账本中的缓冲记录"""
+    for ledger in list(_live_ledgers):
+        try:
+            ledger.flush()
+        except Exception:
+            pass
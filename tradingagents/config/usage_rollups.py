@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Token 使用量预聚合（rollup）
+
+原始使用记录（token_usage）每次 LLM 调用一条，统计面板如果每次都扫描原始记录，
+耗时随历史记录线性增长。这里维护按 小时/天 × 供应商 × 模型 × 货币 预聚合的
+token_usage_rollups 集合：
+
+- 写入原始记录时用 $inc 增量更新对应的小时、天两个桶（见 build_rollup_updates）
+- 定时任务从原始记录重算最近的桶（见 rebuild_pipeline），修正遗漏或失败的增量
+- 查询时整天用天桶、首尾不完整的两天用小时桶（见 rollup_range_filter），
+  再用聚合管道汇总（见 summary_pipeline），扫描量只与天数有关
+
+桶键取自 ISO 时间戳字符串的前缀（与原始记录按字符串比较时间的方式一致）：
+小时桶 "YYYY-MM-DDTHH"，天桶 "YYYY-MM-DD"。
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+ROLLUP_COLLECTION = "token_usage_rollups"
+
+HOUR = "hour"
+DAY = "day"
+# 各粒度桶键在时间戳字符串中的前缀长度
+BUCKET_LENGTHS = {HOUR: 13, DAY: 10}
+
+METRICS = ("requests", "input_tokens", "output_tokens", "cost")
+
+
+def rollup_id(granularity: str, bucket: str, provider: str, model_name: str, currency: str) -> str:
+    """桶文档的确定性 _id，增量更新和重算写入同一文档"""
+    return "|".join((granularity, bucket, provider, model_name, currency))
+
+
+def _dimensions(record: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (record.get("provider") or "unknown",
+            record.get("model_name") or "unknown",
+            record.get("currency") or "CNY")
+
+
+def build_rollup_updates(records: Iterable[Dict[str, Any]]) -> list:
+    """把一批原始记录转换为对小时桶、天桶的 $inc 更新（同一桶的记录先在内存中合并）"""
+    from pymongo import UpdateOne
+
+    totals: Dict[Tuple[str, str, str, str, str], Dict[str, float]] = defaultdict(
+        lambda: dict.fromkeys(METRICS, 0))
+    for record in records:
+        timestamp = record.get("timestamp")
+        if not isinstance(timestamp, str) or len(timestamp) < BUCKET_LENGTHS[HOUR]:
+            continue
+        provider, model_name, currency = _dimensions(record)
+        for granularity, length in BUCKET_LENGTHS.items():
+            item = totals[(granularity, timestamp[:length], provider, model_name, currency)]
+            item["requests"] += 1
+            item["input_tokens"] += record.get("input_tokens", 0) or 0
+            item["output_tokens"] += record.get("output_tokens", 0) or 0
+            item["cost"] += record.get("cost", 0.0) or 0.0
+
+    created_at = datetime.now(timezone.utc)
+    updates = []
+    for (granularity, bucket, provider, model_name, currency), metrics in totals.items():
+        updates.append(UpdateOne(
+            {"_id": rollup_id(granularity, bucket, provider, model_name, currency)},
+            {
+                "$inc": metrics,
+                "$setOnInsert": {
+                    "granularity": granularity,
+                    "bucket": bucket,
+                    "date": bucket[:10],
+                    "provider": provider,
+                    "model_name": model_name,
+                    "currency": currency,
+                    # 重算只删除其开始之前创建的桶，重算期间增量新建的桶不会被误删
+                    "created_at": created_at,
+                },
+            },
+            upsert=True,
+        ))
+    return updates
+
+
+def day_range_filter(first_day: str, last_day: str) -> Dict[str, Any]:
+    """原始记录中 [first_day, last_day] 这些天的时间戳条件"""
+    next_day = (datetime.strptime(last_day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    return {"$gte": first_day, "$lt": next_day}
+
+
+def rebuild_pipeline(first_day: str, last_day: str, granularity: str) -> List[Dict[str, Any]]:
+    """从原始记录重算 [first_day, last_day] 内某一粒度全部桶的聚合管道"""
+    return [
+        {"$match": {"timestamp": day_range_filter(first_day, last_day)}},
+        {"$group": {
+            "_id": {
+                "bucket": {"$substr": ["$timestamp", 0, BUCKET_LENGTHS[granularity]]},
+                "provider": {"$ifNull": ["$provider", "unknown"]},
+                "model_name": {"$ifNull": ["$model_name", "unknown"]},
+                "currency": {"$ifNull": ["$currency", "CNY"]},
+            },
+            "requests": {"$sum": 1},
+            "input_tokens": {"$sum": {"$ifNull": ["$input_tokens", 0]}},
+            "output_tokens": {"$sum": {"$ifNull": ["$output_tokens", 0]}},
+            "cost": {"$sum": {"$ifNull": ["$cost", 0]}},
+        }},
+    ]
+
+
+def rebuilt_documents(rows: Iterable[Dict[str, Any]], granularity: str,
+                      generation: Optional[str] = None) -> List[Dict[str, Any]]:
+    """把 rebuild_pipeline 的结果转换为桶文档；generation 标记本次重算，重算结束后删除其他代的桶"""
+    docs = []
+    for row in rows:
+        key = row["_id"]
+        docs.append({
+            "_id": rollup_id(granularity, key["bucket"], key["provider"], key["model_name"], key["currency"]),
+            "granularity": granularity,
+            "bucket": key["bucket"],
+            "date": key["bucket"][:10],
+            "provider": key["provider"],
+            "model_name": key["model_name"],
+            "currency": key["currency"],
+            **{metric: row.get(metric, 0) for metric in METRICS},
+        })
+        if generation is not None:
+            docs[-1]["generation"] = generation
+    return docs
+
+
+def rollup_range_filter(start: datetime, end: datetime) -> Dict[str, Any]:
+    """覆盖 [start, end] 的桶条件：中间整天用天桶，首尾两天用小时桶（精度为小时）"""
+    start_text, end_text = start.isoformat(), end.isoformat()
+    start_day, end_day = start_text[:10], end_text[:10]
+    start_hour, end_hour = start_text[:13], end_text[:13]
+    if start_day == end_day:
+        return {"granularity": HOUR, "bucket": {"$gte": start_hour, "$lte": end_hour}}
+    return {"$or": [
+        {"granularity": HOUR, "bucket": {"$gte": start_hour, "$lte": f"{start_day}T23"}},
+        {"granularity": DAY, "bucket": {"$gt": start_day, "$lt": end_day}},
+        {"granularity": HOUR, "bucket": {"$gte": f"{end_day}T00", "$lte": end_hour}},
+    ]}
+
+
+def _sum_metrics() -> Dict[str, Any]:
+    return {metric: {"$sum": f"${metric}"} for metric in METRICS}
+
+
+def summary_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """汇总桶文档：一次查询得到按供应商、模型、日期（均按货币细分）的统计"""
+    return [
+        {"$match": match},
+        {"$facet": {
+            "by_provider": [{"$group": {"_id": {"provider": "$provider", "currency": "$currency"},
+                                        **_sum_metrics()}}],
+            "by_model": [{"$group": {"_id": {"provider": "$provider", "model_name": "$model_name",
+                                             "currency": "$currency"}, **_sum_metrics()}}],
+            "by_date": [{"$group": {"_id": {"date": "$date", "currency": "$currency"},
+                                    **_sum_metrics()}}],
+        }},
+    ]
+
+
+def _accumulate(target: Dict[str, Dict[str, Any]], key: str, row: Dict[str, Any]):
+    item = target.setdefault(key, {"requests": 0, "input_tokens": 0, "output_tokens": 0,
+                                   "cost": 0.0, "cost_by_currency": {}})
+    for metric in METRICS:
+        item[metric] += row.get(metric, 0)
+    currency = row["_id"]["currency"]
+    item["cost_by_currency"][currency] = item["cost_by_currency"].get(currency, 0.0) + row.get("cost", 0.0)
+
+
+def summarize(facets: Optional[Dict[str, List[Dict[str, Any]]]]) -> Dict[str, Any]:
+    """把 summary_pipeline 的结果整理为与 UsageStatistics 相同结构的字典"""
+    facets = facets or {}
+    by_provider: Dict[str, Dict[str, Any]] = {}
+    by_model: Dict[str, Dict[str, Any]] = {}
+    by_date: Dict[str, Dict[str, Any]] = {}
+    for row in facets.get("by_provider", []):
+        _accumulate(by_provider, row["_id"]["provider"], row)
+    for row in facets.get("by_model", []):
+        _accumulate(by_model, f"{row['_id']['provider']}/{row['_id']['model_name']}", row)
+    for row in facets.get("by_date", []):
+        _accumulate(by_date, row["_id"]["date"], row)
+
+    cost_by_currency: Dict[str, float] = defaultdict(float)
+    for item in by_provider.values():
+        for currency, cost in item["cost_by_currency"].items():
+            cost_by_currency[currency] += cost
+    return {
+        "total_requests": sum(item["requests"] for item in by_provider.values()),
+        "total_input_tokens": sum(item["input_tokens"] for item in by_provider.values()),
+        "total_output_tokens": sum(item["output_tokens"] for item in by_provider.values()),
+        "total_cost": sum(item["cost"] for item in by_provider.values()),
+        "cost_by_currency": dict(cost_by_currency),
+        "by_provider": by_provider,
+        "by_model": by_model,
+        "by_date": by_date,
+    }
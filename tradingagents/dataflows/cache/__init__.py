@@ -30,6 +30,9 @@ except ImportError:
     StockDataCache = None
     FILE_CACHE_AVAILABLE = False
 
+# 导入进程内 L1 缓存
+from .memory_cache import MemoryLRUCache
+
 # 导入数据库缓存
 try:
     from .db_cache import DatabaseCacheManager
@@ -122,6 +125,7 @@ __all__ = [
     'IntegratedCacheManager',
     'DatabaseCacheManager',
     'AdaptiveCacheSystem',
+    'MemoryLRUCache',
 
     # 可用性标志
     'FILE_CACHE_AVAILABLE',
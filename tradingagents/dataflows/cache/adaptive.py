@@ -40,6 +40,9 @@ class AdaptiveCacheSystem:
         self.primary_backend = self.cache_config["primary_backend"]
         self.fallback_enabled = self.cache_config["fallback_enabled"]
         
+        # 各层命中统计（Redis 为 L2，MongoDB/文件为 L3）
+        self.tier_stats = {tier: {'hits': 0, 'misses': 0} for tier in ('redis', 'mongodb', 'file')}
+
         self.logger.info(f"自适应缓存系统初始化 - 主要后端: {self.primary_backend}")
     
     def _get_cache_key(self, symbol: str, start_date: str = "", end_date: str = "", 
@@ -107,8 +110,9 @@ class AdaptiveCacheSystem:
             self.logger.error(f"文件缓存加载失败: {e}")
             return None
     
-    def _save_to_redis(self, cache_key: str, data: Any, metadata: Dict, ttl_seconds: int) -> bool:
-        """保存到Redis缓存"""
+    def _save_to_redis(self, cache_key: str, data: Any, metadata: Dict, ttl_seconds: int,
+                       timestamp: Optional[datetime] = None) -> bool:
+        """保存到Redis缓存（timestamp 用于从下层提升时保留原始写入时间）"""
         redis_client = self.db_manager.get_redis_client()
         if not redis_client:
             return False
@@ -117,7 +121,7 @@ class AdaptiveCacheSystem:
             cache_data = {
                 'data': data,
                 'metadata': metadata,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': (timestamp or datetime.now()).isoformat(),
                 'backend': 'redis'
             }
             
@@ -271,38 +275,73 @@ class AdaptiveCacheSystem:
         
         return cache_key
     
-    def load_data(self, cache_key: str) -> Optional[Any]:
-        """从缓存加载数据"""
+    def _count(self, tier: str, hit: bool):
+        self.tier_stats[tier]['hits' if hit else 'misses'] += 1
+
+    def _remaining_ttl(self, cache_data: Dict) -> int:
+        """缓存条目剩余有效秒数"""
+        metadata = cache_data.get('metadata') or {}
+        ttl_seconds = self._get_ttl_seconds(metadata.get('symbol', ''), metadata.get('data_type', 'stock_data'))
+        timestamp = cache_data.get('timestamp')
+        if not isinstance(timestamp, datetime):
+            return ttl_seconds
+        return int(ttl_seconds - (datetime.now(timestamp.tzinfo) - timestamp).total_seconds())
+
+    def load_entry(self, cache_key: str) -> Optional[Dict]:
+        """按层级加载缓存条目（含元数据与时间戳）
+
+        Redis 可用时作为 L2 优先读取；未命中再读主要后端（MongoDB/文件）及文件降级，
+        下层命中后按剩余 TTL 提升到 Redis。
+        """
         cache_data = None
-        
-        # 根据主要后端加载
-        if self.primary_backend == "redis":
+        redis_tier = self.primary_backend == "redis" or self.db_manager.is_redis_available()
+
+        if redis_tier:
             cache_data = self._load_from_redis(cache_key)
-        elif self.primary_backend == "mongodb":
+            self._count('redis', cache_data is not None)
+
+        # 根据主要后端加载
+        if not cache_data and self.primary_backend == "mongodb":
             cache_data = self._load_from_mongodb(cache_key)
-        elif self.primary_backend == "file":
+            self._count('mongodb', cache_data is not None)
+        elif not cache_data and self.primary_backend == "file":
             cache_data = self._load_from_file(cache_key)
-        
+            self._count('file', cache_data is not None)
+
         # 如果主要后端失败，尝试降级
-        if not cache_data and self.fallback_enabled:
+        if not cache_data and self.fallback_enabled and self.primary_backend != "file":
             self.logger.debug(f"主要后端({self.primary_backend})加载失败，尝试文件缓存")
             cache_data = self._load_from_file(cache_key)
-        
+            self._count('file', cache_data is not None)
+
         if not cache_data:
             return None
-        
+
         # 检查缓存是否有效（仅对文件缓存，数据库缓存有自己的TTL机制）
         if cache_data.get('backend') == 'file':
-            symbol = cache_data['metadata'].get('symbol', '')
-            data_type = cache_data['metadata'].get('data_type', 'stock_data')
-            ttl_seconds = self._get_ttl_seconds(symbol, data_type)
-            
-            if not self._is_cache_valid(cache_data['timestamp'], ttl_seconds):
+            remaining = self._remaining_ttl(cache_data)
+            if remaining <= 0:
                 self.logger.debug(f"文件缓存已过期: {cache_key}")
                 return None
-        
+        else:
+            remaining = None
+
+        # 下层命中，提升到 Redis
+        if redis_tier and cache_data.get('backend') != 'redis':
+            remaining = self._remaining_ttl(cache_data) if remaining is None else remaining
+            if remaining > 0:
+                self._save_to_redis(cache_key, cache_data['data'], cache_data['metadata'], remaining,
+                                    timestamp=cache_data.get('timestamp'))
+
+        return cache_data
+
+    def load_data(self, cache_key: str) -> Optional[Any]:
+        """从缓存加载数据"""
+        cache_data = self.load_entry(cache_key)
+        if not cache_data:
+            return None
         return cache_data['data']
-    
+
     def find_cached_data(self, symbol: str, start_date: str = "", end_date: str = "", 
                         data_source: str = "default", data_type: str = "stock_data") -> Optional[str]:
         """查找缓存的数据"""
@@ -398,6 +437,7 @@ class AdaptiveCacheSystem:
 
         # 添加后端详细信息
         stats['backend_info'] = backend_info
+        stats['tiers'] = {tier: dict(counts) for tier, counts in self.tier_stats.items()}
 
         return stats
     
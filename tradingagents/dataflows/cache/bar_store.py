@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+列式日线存储（Arrow IPC，内存映射读取）
+
+按 市场/周期/数据源/年份 分区存放 K 线，每个分区包含：
+- base.arrow：压缩后的主文件，按 (symbol, trade_date) 排序，schema 元数据中记录每只股票的行区间
+- delta-*.arrow：同步任务追加写入的小文件，段数超过阈值时合并进 base.arrow
+
+读取时以内存映射方式打开 base.arrow，单只股票或全市场的区间查询都是对映射表的零拷贝切片；
+只有分区中还存在未合并的 delta 段时才需要合并去重（同一 symbol+trade_date 以最后写入为准）。
+
+目录结构：{root}/{market}/{period}/{data_source}/{year}/
+分区就绪标记：{root}/{market}/{period}/{data_source}/READY（由回填脚本在从 MongoDB 全量导入后写入，
+读取方只在就绪后才用本存储替代 MongoDB 查询；存储关闭期间发生的同步写入会清除该标记，需重新回填）
+
+写入方为单进程（app 的同步任务），进程内用锁保护同一分区的追加与合并。合并先替换 base.arrow
+再删除已合并的 delta 段；读取方在读完 delta 段后核对 base.arrow 的版本（inode/mtime/大小），
+期间发生过合并则重读该分区，不会漏掉刚被合并的增量行。
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from tradingagents.config.runtime_settings import get_bool, get_int
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "pre_close", "volume", "amount", "change", "pct_chg"]
+# 与 HistoricalDataService 的可选字段一致：MongoDB 文档中这些字段可能不存在
+OPTIONAL_COLUMNS = ["turnover_rate", "volume_ratio", "pe", "pb", "ps", "adjustflag", "tradestatus", "isST"]
+NUMERIC_COLUMNS = PRICE_COLUMNS + OPTIONAL_COLUMNS
+
+BAR_SCHEMA = pa.schema(
+    [pa.field("symbol", pa.string()), pa.field("trade_date", pa.date32())]
+    + [pa.field(name, pa.float64()) for name in NUMERIC_COLUMNS]
+)
+
+_SORT_KEYS = [("symbol", "ascending"), ("trade_date", "ascending")]
+_BASE_FILE = "base.arrow"
+_READY_FILE = "READY"
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+SymbolFilter = Union[None, str, Iterable[str]]
+
+
+def bar_store_enabled() -> bool:
+    """是否启用列式日线存储。ENV: TA_BAR_STORE_ENABLED; DB: ta_bar_store_enabled"""
+    return get_bool("TA_BAR_STORE_ENABLED", "ta_bar_store_enabled", False)
+
+
+def _to_days(value: Optional[str]) -> Optional[int]:
+    """'YYYY-MM-DD' / 'YYYYMMDD' -> 距 1970-01-01 的天数"""
+    if not value:
+        return None
+    return int((np.datetime64(pd.Timestamp(value).date(), "D") - _EPOCH).astype(int))
+
+
+def _write_table(path: Path, table: pa.Table):
+    """原子写入未压缩的 Arrow IPC 文件（未压缩才能零拷贝内存映射）"""
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _dedup_last(table: pa.Table) -> pa.Table:
+    """同一 (symbol, trade_date) 只保留最后一行，并按 (symbol, trade_date) 排序"""
+    if table.num_rows == 0:
+        return table
+    seq = table.append_column("_seq", pa.array(np.arange(table.num_rows, dtype=np.int64)))
+    last = seq.group_by(["symbol", "trade_date"]).aggregate([("_seq", "max")])
+    return table.take(last.column("_seq_max")).sort_by(_SORT_KEYS)
+
+
+def _symbol_index(table: pa.Table) -> Dict[str, Tuple[int, int]]:
+    """已排序表中每只股票的 [start, stop) 行区间"""
+    if table.num_rows == 0:
+        return {}
+    symbols = table.column("symbol").combine_chunks()
+    encoded = symbols.dictionary_encode()
+    codes = encoded.indices.to_numpy(zero_copy_only=False)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    stops = np.r_[starts[1:], len(codes)]
+    names = encoded.dictionary.to_pylist()
+    return {names[codes[s]]: (int(s), int(e)) for s, e in zip(starts, stops)}
+
+
+class _BasePartition:
+    """内存映射打开的 base.arrow 及其股票行区间索引"""
+
+    def __init__(self, path: Path, version: Tuple[int, int, int]):
+        self.version = version
+        source = pa.memory_map(str(path), "r")
+        self.table = pa.ipc.open_file(source).read_all()
+        metadata = self.table.schema.metadata or {}
+        self.index: Dict[str, Tuple[int, int]] = {
+            k: tuple(v) for k, v in json.loads(metadata.get(b"symbols", b"{}")).items()
+        }
+        if self.table.num_rows:
+            # date32 按 int32 视图读取，不发生拷贝
+            self.days = self.table.column("trade_date").chunk(0).view(pa.int32()).to_numpy()
+            self.first_day, self.last_day = int(self.days.min()), int(self.days.max())
+
+    def slice(self, symbol: str, lo: Optional[int], hi: Optional[int]) -> Optional[pa.Table]:
+        span = self.index.get(symbol)
+        if span is None:
+            return None
+        start, stop = span
+        days = self.days[start:stop]
+        first = start + (int(np.searchsorted(days, lo, "left")) if lo is not None else 0)
+        last = start + (int(np.searchsorted(days, hi, "right")) if hi is not None else stop - start)
+        return self.table.slice(first, last - first) if last > first else None
+
+    def slice_all(self, lo: Optional[int], hi: Optional[int]) -> List[pa.Table]:
+        if self.table.num_rows == 0:
+            return []
+        if (lo is None or lo <= self.first_day) and (hi is None or hi >= self.last_day):
+            return [self.table]
+        parts = (self.slice(symbol, lo, hi) for symbol in self.index)
+        return [part for part in parts if part is not None]
+
+
+class ColumnarBarStore:
+    """按 市场/周期/数据源/年份 分区的列式 K 线存储"""
+
+    def __init__(self, root: Union[str, Path], compact_segments: int = 64):
+        """
+        Args:
+            root: 存储根目录
+            compact_segments: 分区内 delta 段数达到该值时自动合并
+        """
+        self.root = Path(root)
+        self.compact_segments = max(1, int(compact_segments))
+        self._lock = threading.Lock()
+        self._partition_locks: Dict[Path, threading.Lock] = {}
+        # base.arrow 路径 -> 内存映射分区（按文件版本失效）
+        self._bases: Dict[Path, _BasePartition] = {}
+
+    # ---- 路径 ----
+
+    def _source_dir(self, market: str, period: str, data_source: str) -> Path:
+        return self.root / market / period / data_source
+
+    def _partition_lock(self, partition: Path) -> threading.Lock:
+        with self._lock:
+            return self._partition_locks.setdefault(partition, threading.Lock())
+
+    def _years(self, source_dir: Path, lo: Optional[int], hi: Optional[int]) -> List[Path]:
+        if not source_dir.is_dir():
+            return []
+        lo_year = int(str(_EPOCH + lo)[:4]) if lo is not None else None
+        hi_year = int(str(_EPOCH + hi)[:4]) if hi is not None else None
+        years = []
+        for child in source_dir.iterdir():
+            if not (child.is_dir() and child.name.isdigit()):
+                continue
+            year = int(child.name)
+            if (lo_year is None or year >= lo_year) and (hi_year is None or year <= hi_year):
+                years.append(child)
+        return sorted(years, key=lambda p: int(p.name))
+
+    @staticmethod
+    def _deltas(partition: Path) -> List[Path]:
+        return sorted(partition.glob("delta-*.arrow"))
+
+    @staticmethod
+    def _base_version(partition: Path) -> Optional[Tuple[int, int, int]]:
+        """base.arrow 的版本；合并通过 os.replace 换入新文件，inode 随之变化"""
+        try:
+            stat = (partition / _BASE_FILE).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _open_base(self, partition: Path) -> Optional[_BasePartition]:
+        path = partition / _BASE_FILE
+        # 先取版本再打开：打开前被替换时缓存的版本偏旧，下次读取会重新打开
+        version = self._base_version(partition)
+        if version is None:
+            return None
+        with self._lock:
+            cached = self._bases.get(path)
+            if cached is not None and cached.version == version:
+                return cached
+        try:
+            base = _BasePartition(path, version)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._bases[path] = base
+        return base
+
+    # ---- 就绪标记 ----
+
+    def is_ready(self, market: str, period: str, data_source: str) -> bool:
+        return (self._source_dir(market, period, data_source) / _READY_FILE).exists()
+
+    def mark_ready(self, market: str, period: str, data_source: str):
+        source_dir = self._source_dir(market, period, data_source)
+        source_dir.mkdir(parents=True, exist_ok=True)
+        (source_dir / _READY_FILE).write_text(time.strftime("%Y-%m-%d %H:%M:%S"), encoding="utf-8")
+
+    def invalidate(self, market: str, period: str, data_source: str) -> bool:
+        """清除就绪标记（有写入绕过了本存储，数据已落后于 MongoDB），返回是否清除了标记"""
+        try:
+            (self._source_dir(market, period, data_source) / _READY_FILE).unlink()
+        except FileNotFoundError:
+            return False
+        logger.warning(f"⚠️ [列式存储] {market}/{period}/{data_source} 有写入未同步到列式存储，已清除就绪标记，"
+                       f"请重新运行 scripts/build_bar_store.py 回填")
+        return True
+
+    # ---- 写入 ----
+
+    @staticmethod
+    def to_table(frame: pd.DataFrame) -> pa.Table:
+        """把含 symbol/trade_date 及数值列的 DataFrame 转换为 BAR_SCHEMA 表（无效日期的行被丢弃）"""
+        dates = pd.to_datetime(frame["trade_date"].astype(str), errors="coerce", format="mixed")
+        keep = dates.notna().to_numpy()
+        days = dates[keep].to_numpy().astype("datetime64[D]")
+        arrays = [
+            pa.array(frame["symbol"].astype(str).to_numpy()[keep], type=pa.string()),
+            pa.array(days, type=pa.date32()),
+        ]
+        for name in NUMERIC_COLUMNS:
+            if name in frame.columns:
+                values = pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=float)[keep]
+                arrays.append(pa.array(values, type=pa.float64(), from_pandas=True))
+            else:
+                arrays.append(pa.nulls(int(keep.sum()), type=pa.float64()))
+        return pa.Table.from_arrays(arrays, schema=BAR_SCHEMA)
+
+    def append(self, market: str, period: str, data_source: str, frame: pd.DataFrame) -> int:
+        """追加 K 线（按年份写入各分区的 delta 段），返回写入行数"""
+        if frame is None or frame.empty:
+            return 0
+        table = self.to_table(frame)
+        if table.num_rows == 0:
+            return 0
+
+        source_dir = self._source_dir(market, period, data_source)
+        days = table.column("trade_date").combine_chunks().view(pa.int32()).to_numpy(zero_copy_only=False)
+        years = (_EPOCH + days.astype("timedelta64[D]")).astype("datetime64[Y]").astype(int) + 1970
+        for year in np.unique(years):
+            part = table.filter(pa.array(years == year)).sort_by(_SORT_KEYS)
+            partition = source_dir / str(year)
+            partition.mkdir(parents=True, exist_ok=True)
+            with self._partition_lock(partition):
+                name = f"delta-{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}.arrow"
+                _write_table(partition / name, part)
+                if len(self._deltas(partition)) >= self.compact_segments:
+                    self._compact_partition(partition)
+        return table.num_rows
+
+    def append_documents(self, market: str, period: str, data_source: str,
+                         docs: Sequence[Dict[str, Any]]) -> int:
+        """追加 stock_daily_quotes 格式的文档"""
+        if not docs:
+            return 0
+        columns = ["symbol", "trade_date"] + NUMERIC_COLUMNS
+        frame = pd.DataFrame({c: [doc.get(c) for doc in docs] for c in columns})
+        return self.append(market, period, data_source, frame)
+
+    # ---- 合并 ----
+
+    def _compact_partition(self, partition: Path) -> bool:
+        """把分区内的 delta 段合并进 base.arrow（调用方持有分区锁）"""
+        deltas = self._deltas(partition)
+        if not deltas:
+            return False
+        parts = []
+        base = self._open_base(partition)
+        if base is not None and base.table.num_rows:
+            parts.append(base.table)
+        for path in deltas:
+            with pa.memory_map(str(path), "r") as source:
+                parts.append(pa.ipc.open_file(source).read_all())
+        merged = _dedup_last(pa.concat_tables(parts)).combine_chunks()
+        index = _symbol_index(merged)
+        merged = merged.replace_schema_metadata({"symbols": json.dumps(index, separators=(",", ":"))})
+        _write_table(partition / _BASE_FILE, merged)
+        for path in deltas:
+            path.unlink(missing_ok=True)
+        logger.debug(f"🗜️ [列式存储] 合并分区 {partition}: {len(deltas)} 个增量段, {merged.num_rows} 行")
+        return True
+
+    def compact(self, market: Optional[str] = None, period: Optional[str] = None,
+                data_source: Optional[str] = None) -> int:
+        """合并所有（或指定范围内）分区的 delta 段，返回合并的分区数"""
+        pattern = "/".join([market or "*", period or "*", data_source or "*", "*"])
+        count = 0
+        for partition in sorted(self.root.glob(pattern)):
+            if partition.is_dir() and partition.name.isdigit():
+                with self._partition_lock(partition):
+                    count += self._compact_partition(partition)
+        return count
+
+    # ---- 读取 ----
+
+    def read_table(self, market: str, period: str, data_source: str, symbols: SymbolFilter = None,
+                   start_date: Optional[str] = None, end_date: Optional[str] = None) -> pa.Table:
+        """区间读取 K 线，返回 Arrow 表（按年份分区依次拼接，分区内按 (symbol, trade_date) 排序）
+
+        Args:
+            symbols: 单只股票代码、代码列表，None 表示全市场
+            start_date / end_date: 闭区间，YYYY-MM-DD 或 YYYYMMDD
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        elif symbols is not None:
+            symbols = list(dict.fromkeys(str(s) for s in symbols))
+        lo, hi = _to_days(start_date), _to_days(end_date)
+
+        parts: List[pa.Table] = []
+        for partition in self._years(self._source_dir(market, period, data_source), lo, hi):
+            base = self._open_base(partition)
+            version = base.version if base is not None else None
+            base_parts: List[pa.Table] = []
+            if base is not None:
+                if symbols is None:
+                    base_parts = base.slice_all(lo, hi)
+                else:
+                    base_parts = [p for p in (base.slice(s, lo, hi) for s in symbols) if p is not None]
+
+            delta_parts = []
+            for path in self._deltas(partition):
+                try:
+                    with pa.memory_map(str(path), "r") as source:
+                        delta = pa.ipc.open_file(source).read_all()
+                except FileNotFoundError:
+                    # 读取期间被合并进 base.arrow，重新读取该分区
+                    return self.read_table(market, period, data_source, symbols, start_date, end_date)
+                delta = delta.filter(self._delta_mask(delta, symbols, lo, hi))
+                if delta.num_rows:
+                    delta_parts.append(delta)
+
+            if self._base_version(partition) != version:
+                # 读取期间其他进程完成了合并：旧 base 加上剩余的 delta 段会缺少已合并的行
+                return self.read_table(market, period, data_source, symbols, start_date, end_date)
+
+            if delta_parts:
+                # 仍有未合并的增量：与 base 切片合并去重（后写入的优先）
+                parts.append(_dedup_last(pa.concat_tables(base_parts + delta_parts)))
+            else:
+                parts.extend(base_parts)
+
+        if not parts:
+            return BAR_SCHEMA.empty_table()
+        return pa.concat_tables(parts)
+
+    @staticmethod
+    def _delta_mask(table: pa.Table, symbols: Optional[List[str]], lo: Optional[int], hi: Optional[int]):
+        mask = pa.array(np.ones(table.num_rows, dtype=bool))
+        if symbols is not None:
+            mask = pc.and_(mask, pc.is_in(table.column("symbol"), value_set=pa.array(symbols, type=pa.string())))
+        days = table.column("trade_date").cast(pa.int32())
+        if lo is not None:
+            mask = pc.and_(mask, pc.greater_equal(days, lo))
+        if hi is not None:
+            mask = pc.and_(mask, pc.less_equal(days, hi))
+        return mask
+
+    def read_frame(self, market: str, period: str, data_source: str, symbols: SymbolFilter = None,
+                   start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """区间读取 K 线为 DataFrame，列格式与 stock_daily_quotes 文档一致（trade_date 为 YYYY-MM-DD 字符串）"""
+        table = self.read_table(market, period, data_source, symbols, start_date, end_date)
+        table = table.set_column(1, "trade_date", pc.cast(table.column("trade_date"), pa.string()))
+        df = table.to_pandas()
+        if df["symbol"].nunique() > 1 and not df["symbol"].is_monotonic_increasing:
+            # 跨年份分区读取多只股票时按股票归并（稳定排序保持各股票内的日期顺序）
+            df = df.sort_values("symbol", kind="stable", ignore_index=True)
+        df.insert(1, "code", df["symbol"])
+        df["market"] = market
+        df["period"] = period
+        df["data_source"] = data_source
+        # 与 MongoDB 文档一致：整列为空的可选字段不出现
+        empty = [c for c in OPTIONAL_COLUMNS if table.column(c).null_count == table.num_rows]
+        return df.drop(columns=empty)
+
+
+_bar_store: Optional[ColumnarBarStore] = None
+_bar_store_lock = threading.Lock()
+
+
+def get_bar_store() -> ColumnarBarStore:
+    """全局列式存储实例。目录 ENV: TA_BAR_STORE_DIR（默认 ./data/bar_store）"""
+    global _bar_store
+    with _bar_store_lock:
+        if _bar_store is None:
+            _bar_store = ColumnarBarStore(
+                os.getenv("TA_BAR_STORE_DIR", "./data/bar_store"),
+                compact_segments=get_int("TA_BAR_STORE_COMPACT_SEGMENTS", "ta_bar_store_compact_segments", 64),
+            )
+        return _bar_store
@@ -5,7 +5,6 @@
 """
 
 import os
-import json
 import pickle
 import pandas as pd
 from datetime import datetime, timedelta
@@ -13,6 +12,9 @@ from pathlib import Path
 from typing import Optional, Dict, Any, Union, List
 import hashlib
 
+from .metadata_index import CacheMetadataIndex
+from .range_cache import RangeBarCache
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -85,6 +87,13 @@ class StockDataCache:
             }
         }
 
+        # 元数据索引（SQLite，首次打开时导入旧的 *_meta.json）
+        self.metadata_index = CacheMetadataIndex(self.metadata_dir / "index.sqlite3",
+                                                 legacy_metadata_dir=self.metadata_dir)
+
+        # 按日期区间索引的 K 线缓存（子区间直接命中，只补取缺失的区间）
+        self.range_cache = RangeBarCache(self.cache_dir / "ranges")
+
         # 内容长度限制配置（文件缓存默认不限制）
         self.content_length_config = {
             'max_content_length': int(os.getenv('MAX_CACHE_CONTENT_LENGTH', '50000')),  # 50K字符
@@ -205,30 +214,47 @@ class StockDataCache:
         return base_dir / f"{cache_key}.{file_format}"
     
     def _get_metadata_path(self, cache_key: str) -> Path:
-        """获取元数据文件路径"""
+        """获取旧版元数据文件路径（仅用于兼容，新条目写入元数据索引）"""
         return self.metadata_dir / f"{cache_key}_meta.json"
     
     def _save_metadata(self, cache_key: str, metadata: Dict[str, Any]):
-        """保存元数据"""
-        metadata_path = self._get_metadata_path(cache_key)
-        metadata_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
-        metadata['cached_at'] = datetime.now().isoformat()
-        
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        """保存元数据到索引（按数据类型和市场的 TTL 记录过期时间）"""
+        now = datetime.now()
+        metadata['cached_at'] = now.isoformat()
+
+        market_type = metadata.get('market_type') or self._determine_market_type(metadata.get('symbol', ''))
+        ttl_hours = self.cache_config.get(f"{market_type}_{metadata.get('data_type')}", {}).get('ttl_hours', 24)
+        self.metadata_index.put(cache_key, metadata, expires_at=now.timestamp() + ttl_hours * 3600)
     
     def _load_metadata(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """加载元数据"""
-        metadata_path = self._get_metadata_path(cache_key)
-        if not metadata_path.exists():
-            return None
-        
         try:
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self.metadata_index.get(cache_key)
         except Exception as e:
             logger.error(f"⚠️ 加载元数据失败: {e}")
             return None
+
+    def find_cache_entries(self, symbol: str, data_type: str, market_type: str = None,
+                           data_source: str = None, max_age_hours: float = None) -> List[Dict[str, Any]]:
+        """
+        按条件查找缓存条目（最新的在前）
+
+        Args:
+            symbol: 股票代码
+            data_type: 数据类型（stock_data/news/fundamentals）
+            market_type: 市场类型（china/us）
+            data_source: 数据源
+            max_age_hours: 只返回缓存时间在此范围内的条目，None 表示不限
+
+        Returns:
+            元数据列表，每项附带 cache_key
+        """
+        return self.metadata_index.find(symbol, data_type, market_type=market_type,
+                                        data_source=data_source, max_age_hours=max_age_hours)
+
+    def list_cache_entries(self, data_type: str = None) -> List[Dict[str, Any]]:
+        """列出缓存条目（可按数据类型过滤），最新的在前"""
+        return self.metadata_index.entries(data_type)
     
     def is_cache_valid(self, cache_key: str, max_age_hours: int = None, symbol: str = None, data_type: str = None) -> bool:
         """检查缓存是否有效 - 支持智能TTL配置"""
@@ -351,6 +377,30 @@ class StockDataCache:
             logger.error(f"⚠️ 加载缓存数据失败: {e}")
             return None
     
+    def get_stock_data_range(self, symbol: str, start_date: str, end_date: str,
+                             fetcher, data_source: str = "unknown", period: str = "daily",
+                             max_age_hours: float = None) -> Optional[pd.DataFrame]:
+        """
+        按日期区间获取 K 线 DataFrame：已缓存的部分直接切片，只对缺失的区间调用 fetcher
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期
+            end_date: 结束日期
+            fetcher: fetcher(start_date, end_date) -> DataFrame，从数据源获取缺失区间，失败返回 None
+            data_source: 数据源
+            period: 数据周期
+            max_age_hours: 当天数据的有效期，None 时使用市场对应的 TTL 配置
+
+        Returns:
+            区间内的 K 线，没有数据时返回 None
+        """
+        if max_age_hours is None:
+            cache_type = f"{self._determine_market_type(symbol)}_stock_data"
+            max_age_hours = self.cache_config.get(cache_type, {}).get('ttl_hours', 24)
+        key = self.range_cache.series_key(symbol, period, data_source)
+        return self.range_cache.get_or_fetch(key, start_date, end_date, fetcher, ttl_hours=max_age_hours)
+
     def find_cached_stock_data(self, symbol: str, start_date: str = None,
                               end_date: str = None, data_source: str = None,
                               max_age_hours: int = None) -> Optional[str]:
@@ -387,24 +437,15 @@ class StockDataCache:
             logger.info(f"🎯 找到精确匹配的{desc}: {symbol} -> {search_key}")
             return search_key
 
-        # 如果没有精确匹配，查找部分匹配（相同股票代码的其他缓存）
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'stock_data' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'stock_data'):
-                        desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
-                        logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
-                        return cache_key
-            except Exception:
-                continue
+        # 如果没有精确匹配，查找日期区间包含请求区间的其他缓存（按缓存时间从新到旧）
+        matches = self.metadata_index.find(symbol, 'stock_data', market_type=market_type,
+                                           data_source=data_source, start_date=start_date,
+                                           end_date=end_date, max_age_hours=max_age_hours, limit=1)
+        if matches:
+            cache_key = matches[0]['cache_key']
+            desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
+            logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
+            return cache_key
 
         desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
         logger.error(f"❌ 未找到有效的{desc}缓存: {symbol}")
@@ -528,24 +569,14 @@ class StockDataCache:
             cache_type = f"{market_type}_fundamentals"
             max_age_hours = self.cache_config.get(cache_type, {}).get('ttl_hours', 24)
         
-        # 查找匹配的缓存
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'fundamentals' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-                    
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'fundamentals'):
-                        desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
-                        logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
-                        return cache_key
-            except Exception:
-                continue
+        # 查找匹配的缓存（索引查询，按缓存时间从新到旧）
+        matches = self.metadata_index.find(symbol, 'fundamentals', market_type=market_type,
+                                           data_source=data_source, max_age_hours=max_age_hours, limit=1)
+        if matches:
+            cache_key = matches[0]['cache_key']
+            desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
+            logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
+            return cache_key
         
         desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
         logger.error(f"❌ 未找到有效的{desc}缓存: {symbol} ({data_source})")
@@ -554,28 +585,28 @@ class StockDataCache:
     def clear_old_cache(self, max_age_days: int = 7):
         """清理过期缓存"""
         cutoff_time = datetime.now() - timedelta(days=max_age_days)
-        cleared_count = 0
-        
-        for metadata_file in self.metadata_dir.glob("*_meta.json"):
+        cleared_count = self._remove_entries(self.metadata_index.older_than(cutoff_time.timestamp()))
+        logger.info(f"🧹 已清理 {cleared_count} 个过期缓存文件")
+        return cleared_count
+
+    def clear_expired_cache(self) -> int:
+        """清理已超过各自 TTL 的缓存条目，返回清理数量"""
+        cleared_count = self._remove_entries(self.metadata_index.expired())
+        logger.info(f"🧹 已清理 {cleared_count} 个超过TTL的缓存文件")
+        return cleared_count
+
+    def _remove_entries(self, rows) -> int:
+        """删除条目的数据文件、旧版元数据文件和索引记录"""
+        removed = []
+        for row in rows:
             try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                cached_at = datetime.fromisoformat(metadata['cached_at'])
-                if cached_at < cutoff_time:
-                    # 删除数据文件
-                    data_file = Path(metadata['file_path'])
-                    if data_file.exists():
-                        data_file.unlink()
-                    
-                    # 删除元数据文件
-                    metadata_file.unlink()
-                    cleared_count += 1
-                    
+                for path in (row['file_path'], self._get_metadata_path(row['cache_key'])):
+                    if path:
+                        Path(path).unlink(missing_ok=True)
+                removed.append(row['cache_key'])
             except Exception as e:
                 logger.warning(f"⚠️ 清理缓存时出错: {e}")
-        
-        logger.info(f"🧹 已清理 {cleared_count} 个过期缓存文件")
+        return self.metadata_index.delete(removed)
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
@@ -591,35 +622,15 @@ class StockDataCache:
 
         total_size_bytes = 0
 
-        # 统计有元数据的缓存文件
+        # 统计索引中的缓存条目（文件大小在写入时记录，不需要逐个访问文件）
         metadata_files_count = 0
-        for metadata_file in self.metadata_dir.glob("*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-
-                data_type = metadata.get('data_type', 'unknown')
-                if data_type == 'stock_data':
-                    stats['stock_data_count'] += 1
-                elif data_type == 'news':
-                    stats['news_count'] += 1
-                elif data_type == 'fundamentals':
-                    stats['fundamentals_count'] += 1
-
-                # 检查是否为跳过的缓存（没有实际文件）
-                data_file = Path(metadata.get('file_path', ''))
-                if not data_file.exists():
-                    stats['skipped_count'] += 1
-                else:
-                    # 计算文件大小（字节）
-                    file_size = data_file.stat().st_size
-                    total_size_bytes += file_size
-
-                stats['total_files'] += 1
-                metadata_files_count += 1
-
-            except Exception:
-                continue
+        for data_type, type_stats in self.metadata_index.stats().items():
+            if data_type in ('stock_data', 'news', 'fundamentals'):
+                stats[f"{data_type}_count"] += type_stats['count']
+            stats['skipped_count'] += type_stats['missing']
+            stats['total_files'] += type_stats['count']
+            total_size_bytes += type_stats['size']
+            metadata_files_count += type_stats['count']
 
         # 如果没有元数据文件，则直接统计缓存目录中的文件（兼容旧缓存）
         if metadata_files_count == 0:
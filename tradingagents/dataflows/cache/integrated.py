@@ -3,12 +3,16 @@
 集成缓存管理器
 结合原有缓存系统和新的自适应数据库支持
 提供向后兼容的接口
+
+读取路径为多级缓存：L1 进程内 LRU -> L2 Redis -> L3 MongoDB/文件，
+下层命中后提升到上层。
 """
 
 import os
 import logging
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 import pandas as pd
 
 # 导入统一日志系统
@@ -16,6 +20,8 @@ from tradingagents.utils.logging_init import setup_dataflow_logging
 
 # 导入原有缓存系统
 from .file_cache import StockDataCache
+from .memory_cache import MemoryLRUCache
+from tradingagents.config.runtime_settings import get_bool, get_int
 
 # 导入自适应缓存系统
 try:
@@ -27,6 +33,14 @@ except ImportError as e:
     import logging
     logging.getLogger(__name__).debug(f"自适应缓存不可用: {e}")
 
+# 集成缓存数据类型 -> 传统文件缓存的数据类型（用于查找 TTL 配置）
+_LEGACY_DATA_TYPES = {
+    "stock_data": "stock_data",
+    "news_data": "news",
+    "fundamentals_data": "fundamentals",
+}
+
+
 class IntegratedCacheManager:
     """集成缓存管理器 - 智能选择缓存策略"""
     
@@ -35,6 +49,13 @@ class IntegratedCacheManager:
         
         # 初始化原有缓存系统（作为备用）
         self.legacy_cache = StockDataCache(cache_dir)
+        self.legacy_tier_stats = {'hits': 0, 'misses': 0}
+
+        # L1 进程内缓存（按字节数限容）
+        self.memory_cache = None
+        if get_bool("TA_CACHE_L1_ENABLED", "ta_cache_l1_enabled", True):
+            max_mb = get_int("TA_CACHE_L1_MAX_MB", "ta_cache_l1_max_mb", 256)
+            self.memory_cache = MemoryLRUCache(max_bytes=max_mb * 1024 * 1024)
         
         # 尝试初始化自适应缓存系统
         self.adaptive_cache = None
@@ -69,6 +90,56 @@ class IntegratedCacheManager:
             self.logger.info(f"  降级支持: {'✅ 启用' if self.adaptive_cache.fallback_enabled else '❌ 禁用'}")
         else:
             self.logger.info("📁 使用传统文件缓存系统")
+        if self.memory_cache is not None:
+            self.logger.info(f"  L1 内存缓存: ✅ 启用 (上限 {self.memory_cache.max_bytes // (1024 * 1024)}MB)")
+
+    def _ttl_seconds(self, symbol: str, data_type: str) -> int:
+        """获取数据的TTL秒数（与所用缓存后端的配置一致）"""
+        if self.use_adaptive:
+            return self.adaptive_cache._get_ttl_seconds(symbol, data_type)
+        market_type = self.legacy_cache._determine_market_type(symbol)
+        cache_type = f"{market_type}_{_LEGACY_DATA_TYPES.get(data_type, data_type)}"
+        return int(self.legacy_cache.cache_config.get(cache_type, {}).get('ttl_hours', 24) * 3600)
+
+    def _remember(self, cache_key: str, data: Any, symbol: str, data_type: str):
+        """写入后同步到 L1"""
+        if self.memory_cache is not None and cache_key:
+            self.memory_cache.put(cache_key, data, self._ttl_seconds(symbol, data_type))
+
+    def _load_through(self, cache_key: str, legacy_loader) -> Optional[Any]:
+        """多级读取：L1 未命中时读下层，并按剩余 TTL 提升到 L1"""
+        if self.memory_cache is not None:
+            data = self.memory_cache.get(cache_key)
+            if data is not None:
+                return data
+
+        if self.use_adaptive:
+            entry = self.adaptive_cache.load_entry(cache_key)
+            if entry is None:
+                return None
+            data = entry['data']
+            remaining = self.adaptive_cache._remaining_ttl(entry)
+        else:
+            data = legacy_loader(cache_key)
+            self.legacy_tier_stats['hits' if data is not None else 'misses'] += 1
+            if data is None:
+                return None
+            remaining = self._legacy_remaining_ttl(cache_key)
+
+        if self.memory_cache is not None and remaining > 0:
+            self.memory_cache.put(cache_key, data, remaining)
+        return data
+
+    def _legacy_remaining_ttl(self, cache_key: str) -> int:
+        """传统文件缓存条目的剩余有效秒数"""
+        metadata = self.legacy_cache._load_metadata(cache_key)
+        if not metadata or 'cached_at' not in metadata:
+            return 0
+        market_type = self.legacy_cache._determine_market_type(metadata.get('symbol', ''))
+        cache_type = f"{market_type}_{metadata.get('data_type', 'stock_data')}"
+        ttl_seconds = self.legacy_cache.cache_config.get(cache_type, {}).get('ttl_hours', 24) * 3600
+        age = (datetime.now() - datetime.fromisoformat(metadata['cached_at'])).total_seconds()
+        return int(ttl_seconds - age)
     
     def save_stock_data(self, symbol: str, data: Any, start_date: str = None, 
                        end_date: str = None, data_source: str = "default") -> str:
@@ -87,7 +158,7 @@ class IntegratedCacheManager:
         """
         if self.use_adaptive:
             # 使用自适应缓存系统
-            return self.adaptive_cache.save_data(
+            cache_key = self.adaptive_cache.save_data(
                 symbol=symbol,
                 data=data,
                 start_date=start_date or "",
@@ -97,14 +168,27 @@ class IntegratedCacheManager:
             )
         else:
             # 使用传统缓存系统
-            return self.legacy_cache.save_stock_data(
+            cache_key = self.legacy_cache.save_stock_data(
                 symbol=symbol,
                 data=data,
                 start_date=start_date,
                 end_date=end_date,
                 data_source=data_source
             )
+        self._remember(cache_key, data, symbol, "stock_data")
+        return cache_key
     
+    def get_stock_data_range(self, symbol: str, start_date: str, end_date: str, fetcher,
+                             data_source: str = "default", period: str = "daily") -> Optional[pd.DataFrame]:
+        """
+        按日期区间获取 K 线（区间索引缓存，只补取缺失的区间）
+
+        区间缓存按序列存储在本地文件中，与自适应缓存的精确键条目相互独立。
+        """
+        return self.legacy_cache.get_stock_data_range(
+            symbol, start_date, end_date, fetcher, data_source=data_source, period=period
+        )
+
     def load_stock_data(self, cache_key: str) -> Optional[Any]:
         """
         从缓存加载股票数据
@@ -115,12 +199,7 @@ class IntegratedCacheManager:
         Returns:
             股票数据或None
         """
-        if self.use_adaptive:
-            # 使用自适应缓存系统
-            return self.adaptive_cache.load_data(cache_key)
-        else:
-            # 使用传统缓存系统
-            return self.legacy_cache.load_stock_data(cache_key)
+        return self._load_through(cache_key, self.legacy_cache.load_stock_data)
     
     def find_cached_stock_data(self, symbol: str, start_date: str = None, 
                               end_date: str = None, data_source: str = "default") -> Optional[str]:
@@ -137,14 +216,13 @@ class IntegratedCacheManager:
             缓存键或None
         """
         if self.use_adaptive:
-            # 使用自适应缓存系统
-            return self.adaptive_cache.find_cached_data(
-                symbol=symbol,
-                start_date=start_date or "",
-                end_date=end_date or "",
-                data_source=data_source,
-                data_type="stock_data"
+            # 使用自适应缓存系统（经由多级缓存检查，命中的数据留在 L1 供随后的 load 使用）
+            cache_key = self.adaptive_cache._get_cache_key(
+                symbol, start_date or "", end_date or "", data_source, "stock_data"
             )
+            if self._load_through(cache_key, None) is not None:
+                return cache_key
+            return None
         else:
             # 使用传统缓存系统
             return self.legacy_cache.find_cached_stock_data(
@@ -154,43 +232,50 @@ class IntegratedCacheManager:
                 data_source=data_source
             )
     
+    def find_cache_entries(self, symbol: str, data_type: str, market_type: str = None,
+                           data_source: str = None, max_age_hours: float = None) -> List[Dict[str, Any]]:
+        """按条件查找文件缓存条目（最新的在前）"""
+        return self.legacy_cache.find_cache_entries(symbol, data_type, market_type, data_source, max_age_hours)
+
+    def list_cache_entries(self, data_type: str = None) -> List[Dict[str, Any]]:
+        """列出文件缓存条目（可按数据类型过滤）"""
+        return self.legacy_cache.list_cache_entries(data_type)
+
     def save_news_data(self, symbol: str, data: Any, data_source: str = "default") -> str:
         """保存新闻数据"""
         if self.use_adaptive:
-            return self.adaptive_cache.save_data(
+            cache_key = self.adaptive_cache.save_data(
                 symbol=symbol,
                 data=data,
                 data_source=data_source,
                 data_type="news_data"
             )
         else:
-            return self.legacy_cache.save_news_data(symbol, data, data_source)
+            cache_key = self.legacy_cache.save_news_data(symbol, data, data_source)
+        self._remember(cache_key, data, symbol, "news_data")
+        return cache_key
     
     def load_news_data(self, cache_key: str) -> Optional[Any]:
         """加载新闻数据"""
-        if self.use_adaptive:
-            return self.adaptive_cache.load_data(cache_key)
-        else:
-            return self.legacy_cache.load_news_data(cache_key)
+        return self._load_through(cache_key, self.legacy_cache.load_news_data)
     
     def save_fundamentals_data(self, symbol: str, data: Any, data_source: str = "default") -> str:
         """保存基本面数据"""
         if self.use_adaptive:
-            return self.adaptive_cache.save_data(
+            cache_key = self.adaptive_cache.save_data(
                 symbol=symbol,
                 data=data,
                 data_source=data_source,
                 data_type="fundamentals_data"
             )
         else:
-            return self.legacy_cache.save_fundamentals_data(symbol, data, data_source)
+            cache_key = self.legacy_cache.save_fundamentals_data(symbol, data, data_source)
+        self._remember(cache_key, data, symbol, "fundamentals_data")
+        return cache_key
     
     def load_fundamentals_data(self, cache_key: str) -> Optional[Any]:
         """加载基本面数据"""
-        if self.use_adaptive:
-            return self.adaptive_cache.load_data(cache_key)
-        else:
-            return self.legacy_cache.load_fundamentals_data(cache_key)
+        return self._load_through(cache_key, self.legacy_cache.load_fundamentals_data)
 
     def find_cached_fundamentals_data(self, symbol: str, data_source: str = None,
                                      max_age_hours: int = None) -> Optional[str]:
@@ -243,6 +328,7 @@ class IntegratedCacheManager:
             stats['backend_info']['database_available'] = self.db_manager.is_database_available()
             stats['backend_info']['mongodb_available'] = self.db_manager.is_mongodb_available()
             stats['backend_info']['redis_available'] = self.db_manager.is_redis_available()
+            stats['tiers'] = self._tier_stats(stats.get('tiers', {}))
 
             return stats
         else:
@@ -259,11 +345,23 @@ class IntegratedCacheManager:
             stats['backend_info']['database_available'] = False
             stats['backend_info']['mongodb_available'] = False
             stats['backend_info']['redis_available'] = False
+            stats['tiers'] = self._tier_stats({'file': dict(self.legacy_tier_stats)})
 
             return stats
+
+    def _tier_stats(self, lower_tiers: Dict[str, Any]) -> Dict[str, Any]:
+        """各层命中统计：memory（L1）在前，其后为下层后端"""
+        tiers = {}
+        if self.memory_cache is not None:
+            tiers['memory'] = self.memory_cache.stats()
+        tiers.update(lower_tiers)
+        return tiers
     
     def clear_expired_cache(self):
         """清理过期缓存"""
+        if self.memory_cache is not None:
+            self.memory_cache.purge_expired()
+
         if self.use_adaptive:
             self.adaptive_cache.clear_expired_cache()
 
@@ -282,6 +380,10 @@ class IntegratedCacheManager:
         """
         cleared_count = 0
 
+        # 0. 清空 L1 内存缓存（下层数据将被删除，内存中的副本随之失效）
+        if self.memory_cache is not None:
+            self.memory_cache.clear()
+
         # 1. 清理 Redis 缓存
         if self.use_adaptive and self.db_manager.is_redis_available():
             try:
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+进程内 LRU 缓存（L1）
+
+位于 Redis（L2）与 MongoDB/文件（L3）之前，直接缓存反序列化后的对象，
+同一次分析中多个分析师/工具重复读取同一股票数据时无需再访问磁盘或网络。
+按占用字节数（而非条目数）淘汰，条目按写入时给定的过期时间失效。
+"""
+
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+
+def estimate_size(value: Any) -> int:
+    """估算对象占用的字节数"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class MemoryLRUCache:
+    """按字节数限容的线程安全 LRU 缓存"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_item_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        # 单个条目上限，避免一个超大对象把其他条目全部挤出
+        self.max_item_bytes = max_item_bytes if max_item_bytes is not None else max_bytes // 4
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """命中时返回对象（DataFrame 返回副本，防止调用方修改缓存内容），否则返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return value.copy() if isinstance(value, pd.DataFrame) else value
+
+    def put(self, key: str, value: Any, ttl_seconds: float) -> bool:
+        """写入条目；TTL 已过或对象超过单条上限时不缓存"""
+        if value is None or ttl_seconds <= 0:
+            return False
+        size = estimate_size(value)
+        if size > self.max_item_bytes:
+            return False
+        if isinstance(value, pd.DataFrame):
+            value = value.copy()
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.time() + ttl_seconds)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def purge_expired(self) -> int:
+        """删除已过期条目，返回删除数量"""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                self._remove(key)
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[2] > time.time()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+文件缓存的元数据索引（SQLite）
+
+替代每个缓存条目一个 *_meta.json 的做法：查找、过期清理和统计都是带索引的 SQL 查询，
+不再需要遍历并打开整个 metadata 目录。
+
+- 使用 WAL 模式，多个工作进程可以同时读写；每次写入是一个事务，原子生效
+- sqlite3 连接不能跨线程共享，这里每个线程持有一个连接；fork 出的子进程丢弃继承的连接并重新打开
+- 首次打开时导入旧的 *_meta.json 文件（只导入一次）
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cache_key      TEXT PRIMARY KEY,
+    symbol         TEXT,
+    data_type      TEXT,
+    market_type    TEXT,
+    data_source    TEXT,
+    start_date     TEXT,
+    end_date       TEXT,
+    cached_at      REAL NOT NULL,
+    expires_at     REAL,
+    file_path      TEXT,
+    file_size      INTEGER,
+    metadata       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_lookup
+    ON entries (symbol, data_type, market_type, data_source, cached_at);
+CREATE INDEX IF NOT EXISTS idx_entries_cached_at ON entries (cached_at);
+CREATE INDEX IF NOT EXISTS idx_entries_expires_at ON entries (expires_at);
+CREATE TABLE IF NOT EXISTS index_state (
+    name  TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+# 本进程内创建的索引，fork 后在子进程中重置它们的连接
+_indexes: "weakref.WeakSet[CacheMetadataIndex]" = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    """子进程不能继续使用父进程打开的 sqlite3 连接（共享文件锁状态），丢弃后按需重新连接"""
+    for index in list(_indexes):
+        index._local = threading.local()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _norm_date(value: Any) -> Optional[str]:
+    """日期统一为 YYYY-MM-DD（便于按字符串比较区间），无法解析时原样返回"""
+    if value is None or value == "":
+        return None
+    try:
+        return pd.Timestamp(str(value)).strftime("%Y-%m-%d")
+    except Exception:
+        return str(value)
+
+
+class CacheMetadataIndex:
+    """缓存条目的元数据索引"""
+
+    def __init__(self, db_path: Path, legacy_metadata_dir: Optional[Path] = None):
+        """
+        Args:
+            db_path: SQLite 数据库文件
+            legacy_metadata_dir: 旧版 *_meta.json 所在目录，首次打开时导入
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        _indexes.add(self)
+        conn = self._conn()
+        with conn:
+            conn.executescript(_SCHEMA)
+        if legacy_metadata_dir is not None:
+            self._import_legacy(Path(legacy_metadata_dir))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---- 写入 ----
+
+    @staticmethod
+    def _row(cache_key: str, metadata: Dict[str, Any], expires_at: Optional[float]) -> tuple:
+        cached_at = datetime.fromisoformat(metadata["cached_at"]).timestamp()
+        file_path = metadata.get("file_path")
+        try:
+            file_size = Path(file_path).stat().st_size if file_path else None
+        except OSError:
+            file_size = None
+        return (
+            cache_key, metadata.get("symbol"), metadata.get("data_type"), metadata.get("market_type"),
+            metadata.get("data_source"), _norm_date(metadata.get("start_date")),
+            _norm_date(metadata.get("end_date")), cached_at, expires_at, file_path, file_size,
+            json.dumps(metadata, ensure_ascii=False, default=str),
+        )
+
+    def put(self, cache_key: str, metadata: Dict[str, Any], expires_at: Optional[float] = None):
+        """写入（或覆盖）一个条目；metadata 必须包含 cached_at（ISO 格式）"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._row(cache_key, metadata, expires_at),
+            )
+
+    def delete(self, cache_keys: Iterable[str]) -> int:
+        keys = [(k,) for k in cache_keys]
+        if not keys:
+            return 0
+        conn = self._conn()
+        with conn:
+            return conn.executemany("DELETE FROM entries WHERE cache_key = ?", keys).rowcount
+
+    # ---- 查询 ----
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT metadata FROM entries WHERE cache_key = ?", (cache_key,)).fetchone()
+        return json.loads(row["metadata"]) if row else None
+
+    def find(self, symbol: str, data_type: str, market_type: Optional[str] = None,
+             data_source: Optional[str] = None, start_date: Optional[str] = None,
+             end_date: Optional[str] = None, max_age_hours: Optional[float] = None,
+             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按条件查找条目（最新的在前），每项为 metadata 并附带 cache_key
+
+        Args:
+            start_date / end_date: 只返回日期区间包含 [start_date, end_date] 的条目
+            max_age_hours: 只返回缓存时间在此范围内的条目
+        """
+        sql = ["SELECT cache_key, metadata FROM entries WHERE symbol = ? AND data_type = ?"]
+        params: List[Any] = [symbol, data_type]
+        if market_type is not None:
+            sql.append("AND market_type = ?")
+            params.append(market_type)
+        if data_source is not None:
+            sql.append("AND data_source = ?")
+            params.append(data_source)
+        if start_date:
+            sql.append("AND (start_date IS NULL OR start_date <= ?)")
+            params.append(_norm_date(start_date))
+        if end_date:
+            sql.append("AND (end_date IS NULL OR end_date >= ?)")
+            params.append(_norm_date(end_date))
+        if max_age_hours is not None:
+            sql.append("AND cached_at >= ?")
+            params.append(time.time() - max_age_hours * 3600)
+        sql.append("ORDER BY cached_at DESC")
+        if limit:
+            sql.append(f"LIMIT {int(limit)}")
+        rows = self._conn().execute(" ".join(sql), params).fetchall()
+        return [dict(json.loads(row["metadata"]), cache_key=row["cache_key"]) for row in rows]
+
+    def entries(self, data_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """全部条目（可按数据类型过滤），最新的在前"""
+        sql, params = "SELECT cache_key, metadata FROM entries", ()
+        if data_type:
+            sql, params = sql + " WHERE data_type = ?", (data_type,)
+        rows = self._conn().execute(sql + " ORDER BY cached_at DESC", params).fetchall()
+        return [dict(json.loads(row["metadata"]), cache_key=row["cache_key"]) for row in rows]
+
+    def older_than(self, cutoff: float) -> List[sqlite3.Row]:
+        """缓存时间早于 cutoff（epoch 秒）的条目"""
+        return self._conn().execute(
+            "SELECT cache_key, file_path FROM entries WHERE cached_at < ?", (cutoff,)
+        ).fetchall()
+
+    def expired(self, now: Optional[float] = None) -> List[sqlite3.Row]:
+        """已超过各自 TTL 的条目"""
+        return self._conn().execute(
+            "SELECT cache_key, file_path FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?",
+            (now if now is not None else time.time(),),
+        ).fetchall()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """按数据类型汇总条目数、文件字节数以及没有数据文件的条目数"""
+        rows = self._conn().execute(
+            "SELECT data_type, COUNT(*) AS count, COALESCE(SUM(file_size), 0) AS size, "
+            "SUM(CASE WHEN file_size IS NULL THEN 1 ELSE 0 END) AS missing "
+            "FROM entries GROUP BY data_type"
+        ).fetchall()
+        return {row["data_type"]: {"count": row["count"], "size": row["size"], "missing": row["missing"]}
+                for row in rows}
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # ---- 旧版元数据导入 ----
+
+    def _import_legacy(self, metadata_dir: Path):
+        conn = self._conn()
+        done = conn.execute("SELECT value FROM index_state WHERE name = 'legacy_imported'").fetchone()
+        if done or not metadata_dir.is_dir():
+            return
+
+        rows = []
+        for path in metadata_dir.glob("*_meta.json"):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                rows.append(self._row(path.stem[:-len("_meta")], metadata, None))
+            except Exception as e:
+                logger.debug(f"跳过无法解析的元数据文件 {path.name}: {e}")
+
+        with conn:
+            # INSERT OR IGNORE：并发导入或导入前已写入的新条目不会被旧文件覆盖
+            conn.executemany("INSERT OR IGNORE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO index_state VALUES ('legacy_imported', ?)",
+                         (datetime.now().isoformat(),))
+        if rows:
+            logger.info(f"📇 已将 {len(rows)} 个旧版元数据文件导入缓存索引: {self.db_path}")
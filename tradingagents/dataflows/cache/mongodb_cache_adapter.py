@@ -182,8 +182,23 @@ class MongoDBCacheAdapter:
             # 获取数据源优先级
             priority_order = self._get_data_source_priority(symbol)
 
+            # 列式存储（已从 MongoDB 回填的数据源优先从内存映射文件读取）
+            bar_store = None
+            try:
+                from tradingagents.dataflows.cache.bar_store import bar_store_enabled, get_bar_store
+                if bar_store_enabled():
+                    bar_store = get_bar_store()
+            except ImportError:
+                pass
+
             # 按优先级查询
             for data_source in priority_order:
+                if bar_store is not None and bar_store.is_ready("CN", period, data_source):
+                    df = bar_store.read_frame("CN", period, data_source, code6, start_date, end_date)
+                    if not df.empty:
+                        logger.info(f"✅ [数据来源: 列式存储-{data_source}] {symbol}, {len(df)}条记录 (period={period})")
+                        return df
+
                 # 构建查询条件
                 query = {
                     "symbol": code6,
@@ -277,7 +292,7 @@ class MongoDBCacheAdapter:
                 query["publish_time"] = {"$gte": start_time}
             
             # 查询数据
-            cursor = collection.find(query, {"_id": 0}).sort("publish_time", -1).limit(limit)
+            cursor = collection.find(query, {"_id": 0, "minhash": 0, "minhash_bands": 0}).sort("publish_time", -1).limit(limit)
             data = list(cursor)
             
             if data:
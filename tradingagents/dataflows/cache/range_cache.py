@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+按日期区间索引的 K 线缓存
+
+每个 (symbol, period, data_source) 一个序列文件，记录已覆盖的日历区间和这些区间内的全部 K 线。
+查询 [start, end] 时直接从已覆盖的区间切片，只向数据源请求缺失的区间，取回后与已有数据合并：
+- 请求 2024-01-01..2024-06-30 可以由已缓存的 2023-01-01..2024-06-30 直接得到
+- 第二天再请求整个窗口只需要补取最近一两根 K 线
+
+获取时当天及以后的数据可能还会变化（盘中），这部分覆盖只在 TTL 内有效，过期后重新获取。
+补取缺口时会向两侧各多取一根紧邻的已缓存 K 线做重叠校验：收盘价不一致说明复权基准变了（除权除息），
+此时丢弃整个序列重新获取，避免新旧复权价格混在一起。
+"""
+
+import os
+import pickle
+import re
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+Interval = Tuple[date, date]
+
+_DATE_COLUMNS = ("trade_date", "date", "日期")
+_ONE_DAY = timedelta(days=1)
+# 重叠校验最多向两侧扩展的日历天数（覆盖周末和长假）；更远的已缓存 K 线不参与扩展
+_MAX_NEIGHBOUR_GAP = timedelta(days=10)
+
+
+def _to_date(value: Any) -> date:
+    return pd.Timestamp(value).date()
+
+
+def merge_intervals(intervals: List[Interval]) -> List[Interval]:
+    """合并重叠或相邻（相差一天）的闭区间"""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + _ONE_DAY:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(start: date, end: date, covered: List[Interval]) -> List[Interval]:
+    """[start, end] 中未被 covered（已合并、有序）覆盖的部分"""
+    missing: List[Interval] = []
+    cursor = start
+    for lo, hi in covered:
+        if hi < cursor:
+            continue
+        if lo > end:
+            break
+        if lo > cursor:
+            missing.append((cursor, lo - _ONE_DAY))
+        cursor = max(cursor, hi + _ONE_DAY)
+        if cursor > end:
+            break
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+
+def bar_dates(frame: pd.DataFrame) -> np.ndarray:
+    """K 线日期（datetime64[D]）：DatetimeIndex 或 trade_date/date/日期 列"""
+    if isinstance(frame.index, pd.DatetimeIndex):
+        values = frame.index
+    else:
+        column = next((c for c in _DATE_COLUMNS if c in frame.columns), None)
+        if column is None:
+            raise ValueError("K 线数据缺少日期列")
+        values = pd.to_datetime(frame[column].astype(str), format="mixed")
+    return np.asarray(values, dtype="datetime64[D]")
+
+
+def _merge_frames(old: Optional[pd.DataFrame], new: pd.DataFrame) -> pd.DataFrame:
+    """按日期合并，同一日期以新数据为准"""
+    if old is None or old.empty:
+        combined = new
+    else:
+        combined = pd.concat([old, new])
+    dates = bar_dates(combined)
+    keep = ~pd.Index(dates).duplicated(keep="last")
+    order = np.argsort(dates[keep], kind="stable")
+    return combined[keep].iloc[order]
+
+
+class RangeBarCache:
+    """按日期区间索引的 K 线序列缓存（文件持久化）"""
+
+    def __init__(self, directory: Path, ttl_hours: float = 1.0):
+        """
+        Args:
+            directory: 序列文件目录
+            ttl_hours: 当天及以后数据（获取时尚未收盘）的有效期
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = timedelta(hours=ttl_hours)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.stats = {"hits": 0, "partial_hits": 0, "misses": 0, "fetched_ranges": 0, "rebases": 0}
+
+    @staticmethod
+    def series_key(symbol: str, period: str = "daily", data_source: str = "unknown") -> str:
+        return re.sub(r"[^0-9A-Za-z._-]", "_", f"{symbol}_{period}_{data_source}")
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.pkl"
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    # ---- 持久化 ----
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ [区间缓存] 读取序列失败，忽略: {key}: {e}")
+            return None
+
+    def _save(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def invalidate(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+    # ---- 覆盖区间 ----
+
+    def _covered(self, entry: Optional[Dict[str, Any]], now: datetime,
+                 ttl_hours: Optional[float] = None) -> List[Interval]:
+        if not entry:
+            return []
+        ttl = self.ttl if ttl_hours is None else timedelta(hours=ttl_hours)
+        intervals = list(entry["stable"])
+        tail = entry.get("tail")
+        if tail and now - tail["fetched_at"] < ttl:
+            intervals.append((tail["start"], tail["end"]))
+        return merge_intervals(intervals)
+
+    def missing(self, key: str, start_date: str, end_date: str, now: datetime = None,
+                ttl_hours: Optional[float] = None) -> List[Interval]:
+        """[start_date, end_date] 中尚未缓存（或已过期）的区间"""
+        now = now or datetime.now()
+        covered = self._covered(self._load(key), now, ttl_hours)
+        return subtract_intervals(_to_date(start_date), _to_date(end_date), covered)
+
+    def read(self, key: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """缓存中 [start_date, end_date] 的 K 线（不检查覆盖情况）"""
+        entry = self._load(key)
+        if not entry or entry["frame"] is None:
+            return None
+        return self._slice(entry["frame"], _to_date(start_date), _to_date(end_date))
+
+    @staticmethod
+    def _slice(frame: pd.DataFrame, start: date, end: date) -> pd.DataFrame:
+        dates = bar_dates(frame)
+        mask = (dates >= np.datetime64(start, "D")) & (dates <= np.datetime64(end, "D"))
+        return frame[mask]
+
+    def store(self, key: str, frame: Optional[pd.DataFrame], start_date: str, end_date: str,
+              fetched_at: datetime = None) -> Dict[str, Any]:
+        """记录 [start_date, end_date] 已获取，合并 K 线
+
+        获取当天及以后的部分记为 tail（只在 TTL 内视为已覆盖），之前的部分永久有效。
+        """
+        fetched_at = fetched_at or datetime.now()
+        start, end = _to_date(start_date), _to_date(end_date)
+        today = fetched_at.date()
+
+        entry = self._load(key) or {"frame": None, "stable": [], "tail": None}
+        if frame is not None and not frame.empty:
+            entry["frame"] = _merge_frames(entry["frame"], frame)
+
+        stable_end = min(end, today - _ONE_DAY)
+        if start <= stable_end:
+            entry["stable"] = merge_intervals(entry["stable"] + [(start, stable_end)])
+        if end >= today:
+            entry["tail"] = {"start": max(start, today), "end": end, "fetched_at": fetched_at}
+        self._save(key, entry)
+        return entry
+
+    # ---- 查询 ----
+
+    def get_or_fetch(self, key: str, start_date: str, end_date: str,
+                     fetcher: Callable[[str, str], Optional[pd.DataFrame]],
+                     ttl_hours: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """返回 [start_date, end_date] 的 K 线，只对缺失区间调用 fetcher(start, end)
+
+        Args:
+            fetcher: 按 (YYYY-MM-DD, YYYY-MM-DD) 从数据源获取 K 线，失败返回 None
+            ttl_hours: 覆盖默认的当天数据有效期
+
+        Returns:
+            区间内的 K 线；缓存和数据源都没有数据时返回 None
+        """
+        start, end = _to_date(start_date), _to_date(end_date)
+        with self._key_lock(key):
+            now = datetime.now()
+            entry = self._load(key)
+            gaps = subtract_intervals(start, end, self._covered(entry, now, ttl_hours))
+            if not gaps:
+                self.stats["hits"] += 1
+                logger.debug(f"🎯 [区间缓存] 命中: {key} {start}~{end}")
+                return self._result(entry, start, end)
+
+            cached = entry["frame"] if entry else None
+            if cached is None or cached.empty or len(gaps) == 1 and gaps[0] == (start, end):
+                self.stats["misses"] += 1
+            else:
+                self.stats["partial_hits"] += 1
+
+            for gap_start, gap_end in gaps:
+                fetch_start, fetch_end = self._extend_to_neighbours(cached, gap_start, gap_end)
+                self.stats["fetched_ranges"] += 1
+                logger.info(f"🔄 [区间缓存] 补取缺口: {key} {fetch_start}~{fetch_end}")
+                frame = fetcher(fetch_start.isoformat(), fetch_end.isoformat())
+                if frame is None:
+                    # 获取失败（或该区间确实没有数据）时不记录覆盖，下次重试
+                    continue
+                if not self._same_basis(cached, frame):
+                    # 复权基准变化：丢弃旧序列，整个窗口重新获取
+                    self.stats["rebases"] += 1
+                    logger.info(f"♻️ [区间缓存] 重叠K线不一致（复权基准变化），重新获取: {key}")
+                    self.invalidate(key)
+                    frame = fetcher(start.isoformat(), end.isoformat())
+                    if frame is None:
+                        return None
+                    entry = self.store(key, frame, start.isoformat(), end.isoformat(), now)
+                    return self._result(entry, start, end)
+                entry = self.store(key, frame, fetch_start.isoformat(), fetch_end.isoformat(), now)
+                cached = entry["frame"]
+            return self._result(entry, start, end)
+
+    def _result(self, entry: Optional[Dict[str, Any]], start: date, end: date) -> Optional[pd.DataFrame]:
+        if not entry or entry["frame"] is None:
+            return None
+        result = self._slice(entry["frame"], start, end)
+        return None if result.empty else result.copy()
+
+    @staticmethod
+    def _extend_to_neighbours(cached: Optional[pd.DataFrame], gap_start: date, gap_end: date) -> Interval:
+        """把缺口向两侧扩展到紧邻的已缓存 K 线，用于重叠校验
+
+        只扩展到 _MAX_NEIGHBOUR_GAP 以内的 K 线；相邻的已缓存 K 线离得更远时只获取缺口本身。
+        """
+        if cached is None or cached.empty:
+            return gap_start, gap_end
+        dates = bar_dates(cached)
+        before = dates[(dates < np.datetime64(gap_start, "D"))
+                       & (dates >= np.datetime64(gap_start - _MAX_NEIGHBOUR_GAP, "D"))]
+        after = dates[(dates > np.datetime64(gap_end, "D"))
+                      & (dates <= np.datetime64(gap_end + _MAX_NEIGHBOUR_GAP, "D"))]
+        fetch_start = before.max().astype("O") if len(before) else gap_start
+        fetch_end = after.min().astype("O") if len(after) else gap_end
+        return fetch_start, fetch_end
+
+    @staticmethod
+    def _same_basis(cached: Optional[pd.DataFrame], fetched: pd.DataFrame) -> bool:
+        """重叠日期的收盘价是否一致"""
+        if cached is None or cached.empty or fetched.empty or "close" not in cached or "close" not in fetched:
+            return True
+        old = pd.Series(pd.to_numeric(cached["close"], errors="coerce").to_numpy(), index=bar_dates(cached))
+        new = pd.Series(pd.to_numeric(fetched["close"], errors="coerce").to_numpy(), index=bar_dates(fetched))
+        old = old[~old.index.duplicated(keep="last")]
+        new = new[~new.index.duplicated(keep="last")]
+        common = old.index.intersection(new.index)
+        if common.empty:
+            return True
+        return bool(np.allclose(old[common].to_numpy(), new[common].to_numpy(), rtol=1e-6, equal_nan=True))
@@ -10,7 +10,6 @@ from typing import Dict, List, Optional, Any
 from enum import Enum
 import warnings
 import pandas as pd
-import numpy as np
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -24,6 +23,33 @@ logger = setup_dataflow_logging()
 # 导入统一数据源编码
 from tradingagents.constants import DataSourceCode
 
+# 导入链路追踪（数据源调用记录为 span）
+from tradingagents.utils.tracing import SPAN_KIND_CACHE, SPAN_KIND_DATA_SOURCE, trace_span, traced
+
+# 导入对冲请求工具
+from tradingagents.dataflows.hedging import SourceLatencyTracker, hedged_call
+
+# 导入请求合并（并发的相同数据请求只访问一次数据源）
+from tradingagents.dataflows.singleflight import get_single_flight, make_key as make_flight_key
+
+# 导入共享的增量指标引擎
+from tradingagents.tools.analysis.indicators import IndicatorSpec
+from tradingagents.tools.analysis.indicator_engine import get_indicator_engine
+
+# 分析师行情报告使用的技术指标
+ANALYST_INDICATOR_SPECS = [
+    IndicatorSpec("ma", {"n": 5}),
+    IndicatorSpec("ma", {"n": 10}),
+    IndicatorSpec("ma", {"n": 20}),
+    IndicatorSpec("ma", {"n": 60}),
+    IndicatorSpec("rsi", {"n": 6, "method": "china"}),
+    IndicatorSpec("rsi", {"n": 12, "method": "china"}),
+    IndicatorSpec("rsi", {"n": 24, "method": "china"}),
+    IndicatorSpec("rsi", {"n": 14, "method": "sma"}),
+    IndicatorSpec("macd", {"fast": 12, "slow": 26, "signal": 9}),
+    IndicatorSpec("boll", {"n": 20, "k": 2}),
+]
+
 
 class ChinaDataSource(Enum):
     """
@@ -77,11 +103,32 @@ class DataSourceManager:
         except Exception as e:
             logger.warning(f"⚠️ 统一缓存管理器初始化失败: {e}")
 
+        # 对冲请求配置：主数据源超过延迟预算后并发请求下一个数据源
+        from tradingagents.config.runtime_settings import get_bool, get_float
+        self.hedge_enabled = get_bool("TA_DATA_SOURCE_HEDGE_ENABLED", "ta_data_source_hedge_enabled", False)
+        self.hedge_delay_seconds = get_float("TA_DATA_SOURCE_HEDGE_DELAY_SECONDS", "ta_data_source_hedge_delay_seconds", 3.0)
+        self.hedge_quantile = get_float("TA_DATA_SOURCE_HEDGE_QUANTILE", "ta_data_source_hedge_quantile", 0.95)
+        self.latency_tracker = SourceLatencyTracker()
+
+        # 请求合并：同一 (股票, 日期范围) 的并发请求只访问一次数据源
+        self.single_flight_enabled = get_bool("TA_SINGLEFLIGHT_ENABLED", "ta_singleflight_enabled", True)
+
         logger.info(f"📊 数据源管理器初始化完成")
         logger.info(f"   MongoDB缓存: {'✅ 已启用' if self.use_mongodb_cache else '❌ 未启用'}")
         logger.info(f"   统一缓存: {'✅ 已启用' if self.cache_enabled else '❌ 未启用'}")
         logger.info(f"   默认数据源: {self.default_source.value}")
         logger.info(f"   可用数据源: {[s.value for s in self.available_sources]}")
+        logger.info(f"   对冲请求: {'✅ 已启用' if self.hedge_enabled else '❌ 未启用'} (延迟预算 {self.hedge_delay_seconds}s, p{int(self.hedge_quantile * 100)})")
+        logger.info(f"   请求合并: {'✅ 已启用' if self.single_flight_enabled else '❌ 未启用'}")
+
+    def _coalesced(self, key: str, fn, is_shareable=None):
+        """合并同一请求键的并发调用；共享的列表结果返回浅拷贝"""
+        if not self.single_flight_enabled:
+            return fn()
+        result, shared = get_single_flight().do(key, fn, is_shareable or (lambda r: r is not None))
+        if shared and isinstance(result, list):
+            return list(result)
+        return result
 
     def _check_mongodb_enabled(self) -> bool:
         """检查是否启用MongoDB缓存"""
@@ -257,6 +304,14 @@ class DataSourceManager:
         Returns:
             str: 基本面分析报告
         """
+        return self._coalesced(
+            make_flight_key("fundamentals", self.current_source.value, symbol),
+            lambda: self._get_fundamentals_data(symbol),
+            is_shareable=self._is_valid_stock_data,
+        )
+
+    def _get_fundamentals_data(self, symbol: str) -> str:
+        """获取基本面数据（未合并的实现）"""
         logger.info(f"📊 [数据来源: {self.current_source.value}] 开始获取基本面数据: {symbol}",
                    extra={
                        'symbol': symbol,
@@ -339,6 +394,14 @@ class DataSourceManager:
         Returns:
             List[Dict]: 新闻数据列表
         """
+        return self._coalesced(
+            make_flight_key("news", self.current_source.value, symbol, hours_back, limit),
+            lambda: self._get_news_data(symbol, hours_back, limit),
+            is_shareable=bool,
+        )
+
+    def _get_news_data(self, symbol: str = None, hours_back: int = 24, limit: int = 20) -> List[Dict[str, Any]]:
+        """获取新闻数据（未合并的实现）"""
         logger.info(f"📰 [数据来源: {self.current_source.value}] 开始获取新闻数据: {symbol or '市场新闻'}, 回溯{hours_back}小时",
                    extra={
                        'symbol': symbol,
@@ -621,23 +684,28 @@ class DataSourceManager:
         if not self.cache_enabled or not self.cache_manager:
             return None
 
-        try:
-            cache_key = self.cache_manager.find_cached_stock_data(
-                symbol=symbol,
-                start_date=start_date,
-                end_date=end_date,
-                max_age_hours=max_age_hours
-            )
-
-            if cache_key:
-                cached_data = self.cache_manager.load_stock_data(cache_key)
-                if cached_data is not None and hasattr(cached_data, 'empty') and not cached_data.empty:
-                    logger.debug(f"📦 从缓存获取{symbol}数据: {len(cached_data)}条")
-                    return cached_data
-        except Exception as e:
-            logger.warning(f"⚠️ 从缓存读取数据失败: {e}")
+        with trace_span("cache:stock_data", SPAN_KIND_CACHE, symbol=symbol) as span:
+            try:
+                cache_key = self.cache_manager.find_cached_stock_data(
+                    symbol=symbol,
+                    start_date=start_date,
+                    end_date=end_date,
+                    max_age_hours=max_age_hours
+                )
+
+                if cache_key:
+                    cached_data = self.cache_manager.load_stock_data(cache_key)
+                    if cached_data is not None and hasattr(cached_data, 'empty') and not cached_data.empty:
+                        logger.debug(f"📦 从缓存获取{symbol}数据: {len(cached_data)}条")
+                        if span:
+                            span.attributes["cache_hit"] = True
+                        return cached_data
+            except Exception as e:
+                logger.warning(f"⚠️ 从缓存读取数据失败: {e}")
 
-        return None
+            if span:
+                span.attributes["cache_hit"] = False
+            return None
 
     def _save_to_cache(self, symbol: str, data: pd.DataFrame, start_date: str = None, end_date: str = None):
         """
@@ -680,7 +748,7 @@ class DataSourceManager:
             return 0
 
     def _format_stock_data_response(self, data: pd.DataFrame, symbol: str, stock_name: str,
-                                    start_date: str, end_date: str) -> str:
+                                    start_date: str, end_date: str, period: str = "daily") -> str:
         """
         格式化股票数据响应（包含技术指标）
 
@@ -690,6 +758,7 @@ class DataSourceManager:
             stock_name: 股票名称
             start_date: 开始日期
             end_date: 结束日期
+            period: 数据周期（用于复用增量指标状态）
 
         Returns:
             str: 格式化的数据报告（包含技术指标）
@@ -703,55 +772,12 @@ class DataSourceManager:
             if 'date' in data.columns:
                 data = data.sort_values('date')
 
-            # 计算移动平均线
-            data['ma5'] = data['close'].rolling(window=5, min_periods=1).mean()
-            data['ma10'] = data['close'].rolling(window=10, min_periods=1).mean()
-            data['ma20'] = data['close'].rolling(window=20, min_periods=1).mean()
-            data['ma60'] = data['close'].rolling(window=60, min_periods=1).mean()
-
-            # 计算RSI（相对强弱指标）- 同花顺风格：使用中国式SMA（EMA with adjust=True）
-            # 参考：https://blog.csdn.net/u011218867/article/details/117427927
-            # 同花顺/通达信的RSI使用SMA函数，等价于pandas的ewm(com=N-1, adjust=True)
-            delta = data['close'].diff()
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
-
-            # RSI6 - 使用中国式SMA
-            avg_gain6 = gain.ewm(com=5, adjust=True).mean()  # com = N - 1
-            avg_loss6 = loss.ewm(com=5, adjust=True).mean()
-            rs6 = avg_gain6 / avg_loss6.replace(0, np.nan)
-            data['rsi6'] = 100 - (100 / (1 + rs6))
-
-            # RSI12 - 使用中国式SMA
-            avg_gain12 = gain.ewm(com=11, adjust=True).mean()
-            avg_loss12 = loss.ewm(com=11, adjust=True).mean()
-            rs12 = avg_gain12 / avg_loss12.replace(0, np.nan)
-            data['rsi12'] = 100 - (100 / (1 + rs12))
-
-            # RSI24 - 使用中国式SMA
-            avg_gain24 = gain.ewm(com=23, adjust=True).mean()
-            avg_loss24 = loss.ewm(com=23, adjust=True).mean()
-            rs24 = avg_gain24 / avg_loss24.replace(0, np.nan)
-            data['rsi24'] = 100 - (100 / (1 + rs24))
-
-            # 保留RSI14作为国际标准参考（使用简单移动平均）
-            gain14 = gain.rolling(window=14, min_periods=1).mean()
-            loss14 = loss.rolling(window=14, min_periods=1).mean()
-            rs14 = gain14 / loss14.replace(0, np.nan)
-            data['rsi14'] = 100 - (100 / (1 + rs14))
-
-            # 计算MACD
-            ema12 = data['close'].ewm(span=12, adjust=False).mean()
-            ema26 = data['close'].ewm(span=26, adjust=False).mean()
-            data['macd_dif'] = ema12 - ema26
-            data['macd_dea'] = data['macd_dif'].ewm(span=9, adjust=False).mean()
-            data['macd'] = (data['macd_dif'] - data['macd_dea']) * 2
-
-            # 计算布林带
-            data['boll_mid'] = data['close'].rolling(window=20, min_periods=1).mean()
-            std = data['close'].rolling(window=20, min_periods=1).std()
-            data['boll_upper'] = data['boll_mid'] + 2 * std
-            data['boll_lower'] = data['boll_mid'] - 2 * std
+            # 通过共享的增量指标引擎计算：同一股票再次请求（仅新增K线）时只做增量更新
+            # RSI6/12/24 为同花顺风格（中国式SMA），RSI14 为简单移动平均
+            data = get_indicator_engine().compute(f"{symbol}:{period}", data, ANALYST_INDICATOR_SPECS)
+            data['macd_dif'] = data['dif']
+            data['macd_dea'] = data['dea']
+            data['macd'] = data['macd_hist'] * 2
 
             logger.info(f"✅ [技术指标] 技术指标计算完成")
 
@@ -1041,6 +1067,14 @@ class DataSourceManager:
         Returns:
             str: 格式化的股票数据
         """
+        return self._coalesced(
+            make_flight_key("stock_data", self.current_source.value, symbol, start_date, end_date, period),
+            lambda: self._get_stock_data(symbol, start_date, end_date, period),
+            is_shareable=self._is_valid_stock_data,
+        )
+
+    def _get_stock_data(self, symbol: str, start_date: str = None, end_date: str = None, period: str = "daily") -> str:
+        """获取股票数据（未合并的实现）"""
         # 记录详细的输入参数
         logger.info(f"📊 [数据来源: {self.current_source.value}] 开始获取{period}数据: {symbol}",
                    extra={
@@ -1061,21 +1095,18 @@ class DataSourceManager:
         start_time = time.time()
 
         try:
+            if self.hedge_enabled:
+                return self._get_stock_data_hedged(symbol, start_date, end_date, period)
+
             # 根据数据源调用相应的获取方法
             actual_source = None  # 实际使用的数据源
 
             if self.current_source == ChinaDataSource.MONGODB:
                 result, actual_source = self._get_mongodb_data(symbol, start_date, end_date, period)
-            elif self.current_source == ChinaDataSource.TUSHARE:
-                logger.info(f"🔍 [股票代码追踪] 调用 Tushare 数据源，传入参数: symbol='{symbol}', period='{period}'")
-                result = self._get_tushare_data(symbol, start_date, end_date, period)
-                actual_source = "tushare"
-            elif self.current_source == ChinaDataSource.AKSHARE:
-                result = self._get_akshare_data(symbol, start_date, end_date, period)
-                actual_source = "akshare"
-            elif self.current_source == ChinaDataSource.BAOSTOCK:
-                result = self._get_baostock_data(symbol, start_date, end_date, period)
-                actual_source = "baostock"
+            elif self.current_source in (ChinaDataSource.TUSHARE, ChinaDataSource.AKSHARE, ChinaDataSource.BAOSTOCK):
+                logger.info(f"🔍 [股票代码追踪] 调用 {self.current_source.value} 数据源，传入参数: symbol='{symbol}', period='{period}'")
+                result = self._fetch_from_source(self.current_source, symbol, start_date, end_date, period)
+                actual_source = self.current_source.value
             # TDX 已移除
             else:
                 result = f"❌ 不支持的数据源: {self.current_source.value}"
@@ -1118,7 +1149,7 @@ class DataSourceManager:
                               })
 
                 # 数据质量异常时也尝试降级到其他数据源
-                fallback_result = self._try_fallback_sources(symbol, start_date, end_date)
+                fallback_result, _ = self._try_fallback_sources(symbol, start_date, end_date, period)
                 if fallback_result and "❌" not in fallback_result and "错误" not in fallback_result:
                     logger.info(f"✅ [数据来源: 备用数据源] 降级成功获取数据: {symbol}")
                     return fallback_result
@@ -1138,12 +1169,88 @@ class DataSourceManager:
                             'error': str(e),
                             'event_type': 'data_fetch_exception'
                         }, exc_info=True)
-            return self._try_fallback_sources(symbol, start_date, end_date)
+            fallback_result, _ = self._try_fallback_sources(symbol, start_date, end_date, period)
+            return fallback_result
 
-    def _get_mongodb_data(self, symbol: str, start_date: str, end_date: str, period: str = "daily") -> tuple[str, str | None]:
+    @staticmethod
+    def _is_valid_stock_data(result: str) -> bool:
+        """判断数据源返回的格式化结果是否有效"""
+        return bool(result) and "❌" not in result and "错误" not in result
+
+    def _fetch_from_source(self, source: ChinaDataSource, symbol: str, start_date: str, end_date: str,
+                           period: str = "daily") -> str:
+        """调用单个数据源获取格式化数据，并记录延迟直方图（不做降级）"""
+        start_time = time.time()
+        success = False
+        try:
+            if source == ChinaDataSource.MONGODB:
+                result, _ = self._get_mongodb_data(symbol, start_date, end_date, period, fallback=False)
+            elif source == ChinaDataSource.TUSHARE:
+                result = self._get_tushare_data(symbol, start_date, end_date, period)
+            elif source == ChinaDataSource.AKSHARE:
+                result = self._get_akshare_data(symbol, start_date, end_date, period)
+            elif source == ChinaDataSource.BAOSTOCK:
+                result = self._get_baostock_data(symbol, start_date, end_date, period)
+            else:
+                result = f"❌ 不支持的数据源: {source.value}"
+            success = self._is_valid_stock_data(result)
+            return result
+        finally:
+            self.latency_tracker.observe(source.value, time.time() - start_time, success)
+
+    def _get_stock_data_hedged(self, symbol: str, start_date: str, end_date: str, period: str = "daily") -> str:
+        """对冲模式获取股票数据
+
+        先请求当前数据源；超过其延迟预算（历史 p95，样本不足时使用配置值）仍未返回，
+        就按 _get_data_source_priority_order 并发请求下一个数据源，采用第一个有效结果。
+        """
+        order = [self.current_source] + [
+            s for s in self._get_data_source_priority_order(symbol)
+            if s != self.current_source and s in self.available_sources
+        ]
+        candidates = [
+            (source.value,
+             lambda source=source: self._fetch_from_source(source, symbol, start_date, end_date, period))
+            for source in order
+        ]
+
+        start_time = time.time()
+        result, actual_source, last_invalid = hedged_call(
+            candidates,
+            is_valid=self._is_valid_stock_data,
+            delay_for=lambda source: self.latency_tracker.hedge_delay(
+                source, self.hedge_delay_seconds, self.hedge_quantile
+            ),
+        )
+        duration = time.time() - start_time
+
+        if result is not None:
+            logger.info(f"✅ [数据来源: {actual_source}] 对冲模式获取股票数据成功: {symbol} (耗时{duration:.2f}秒)",
+                        extra={
+                            'symbol': symbol,
+                            'data_source': actual_source,
+                            'requested_source': self.current_source.value,
+                            'duration': duration,
+                            'event_type': 'data_fetch_success'
+                        })
+            return result
+
+        logger.error(f"❌ [数据来源: 所有数据源失败] 对冲模式下所有数据源都无法获取有效数据: {symbol}")
+        return last_invalid or f"❌ 所有数据源都无法获取{symbol}的{period}数据"
+
+    def get_source_latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """各数据源的延迟直方图快照（用于调整对冲延迟）"""
+        return self.latency_tracker.snapshot()
+
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:mongodb.data", source="mongodb")
+    def _get_mongodb_data(self, symbol: str, start_date: str, end_date: str, period: str = "daily",
+                          fallback: bool = True) -> tuple[str, str | None]:
         """
         从MongoDB获取多周期数据 - 包含技术指标计算
 
+        Args:
+            fallback: MongoDB 无数据时是否降级到其他数据源（对冲模式下由调用方负责并发降级）
+
         Returns:
             tuple[str, str | None]: (结果字符串, 实际使用的数据源名称)
         """
@@ -1166,20 +1273,25 @@ class DataSourceManager:
                     stock_name = df['name'].iloc[0]
 
                 # 调用统一的格式化方法（包含技术指标计算）
-                result = self._format_stock_data_response(df, symbol, stock_name, start_date, end_date)
+                result = self._format_stock_data_response(df, symbol, stock_name, start_date, end_date, period)
 
                 logger.info(f"✅ [MongoDB] 已计算技术指标: MA5/10/20/60, MACD, RSI, BOLL")
                 return result, "mongodb"
             else:
+                if not fallback:
+                    return f"❌ MongoDB中未找到{symbol}的{period}数据", None
                 # MongoDB没有数据（adapter内部已记录详细的数据源信息），降级到其他数据源
                 logger.info(f"🔄 [MongoDB] 未找到{period}数据: {symbol}，开始尝试备用数据源")
                 return self._try_fallback_sources(symbol, start_date, end_date, period)
 
         except Exception as e:
             logger.error(f"❌ [数据来源: MongoDB异常] 获取{period}数据失败: {symbol}, 错误: {e}")
+            if not fallback:
+                return f"❌ MongoDB获取{symbol}的{period}数据失败: {e}", None
             # MongoDB异常，降级到其他数据源
             return self._try_fallback_sources(symbol, start_date, end_date, period)
 
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:tushare.data", source="tushare")
     def _get_tushare_data(self, symbol: str, start_date: str, end_date: str, period: str = "daily") -> str:
         """使用Tushare获取多周期数据 - 使用provider + 统一缓存"""
         logger.debug(f"📊 [Tushare] 调用参数: symbol={symbol}, start_date={start_date}, end_date={end_date}, period={period}")
@@ -1193,52 +1305,59 @@ class DataSourceManager:
 
         start_time = time.time()
         try:
-            # 1. 先尝试从缓存获取
+            provider = self._get_tushare_adapter()
+
+            # 使用异步方法获取历史数据
+            import asyncio
+            try:
+                loop = asyncio.get_event_loop()
+                if loop.is_closed():
+                    loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(loop)
+            except RuntimeError:
+                # 在线程池中没有事件循环，创建新的
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+
+            # 1. 区间缓存：请求区间中已缓存的部分直接切片，只向 provider 补取缺失的区间
+            range_lookup = getattr(self.cache_manager, "get_stock_data_range", None) if self.cache_enabled else None
+            if range_lookup is not None and provider and start_date and end_date:
+                data = range_lookup(
+                    symbol, start_date, end_date,
+                    lambda s, e: loop.run_until_complete(provider.get_historical_data(symbol, s, e)),
+                    data_source="tushare",
+                )
+                if data is None or data.empty:
+                    logger.warning(f"⚠️ [Tushare] 未获取到数据，耗时={time.time() - start_time:.2f}s")
+                    return f"❌ 未获取到{symbol}的有效数据"
+
+                stock_info = loop.run_until_complete(provider.get_stock_basic_info(symbol))
+                stock_name = stock_info.get('name', f'股票{symbol}') if stock_info else f'股票{symbol}'
+                result = self._format_stock_data_response(data, symbol, stock_name, start_date, end_date, period)
+                logger.debug(f"📊 [Tushare] 调用完成（区间缓存）: 耗时={time.time() - start_time:.2f}s, 数据条数={len(data)}")
+                return result
+
+            # 2. 先尝试从缓存获取
             cached_data = self._get_cached_data(symbol, start_date, end_date, max_age_hours=24)
             if cached_data is not None and not cached_data.empty:
                 logger.info(f"✅ [缓存命中] 从缓存获取{symbol}数据")
                 # 获取股票基本信息
-                provider = self._get_tushare_adapter()
                 if provider:
-                    import asyncio
-                    try:
-                        loop = asyncio.get_event_loop()
-                        if loop.is_closed():
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-                    except RuntimeError:
-                        # 在线程池中没有事件循环，创建新的
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-
                     stock_info = loop.run_until_complete(provider.get_stock_basic_info(symbol))
                     stock_name = stock_info.get('name', f'股票{symbol}') if stock_info else f'股票{symbol}'
                 else:
                     stock_name = f'股票{symbol}'
 
                 # 格式化返回
-                return self._format_stock_data_response(cached_data, symbol, stock_name, start_date, end_date)
+                return self._format_stock_data_response(cached_data, symbol, stock_name, start_date, end_date, period)
 
-            # 2. 缓存未命中，从provider获取
+            # 3. 缓存未命中，从provider获取
             logger.info(f"🔍 [股票代码追踪] 调用 tushare_provider，传入参数: symbol='{symbol}'")
             logger.info(f"🔍 [DataSourceManager详细日志] 开始调用tushare_provider...")
 
-            provider = self._get_tushare_adapter()
             if not provider:
                 return f"❌ Tushare提供器不可用"
 
-            # 使用异步方法获取历史数据
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_closed():
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-            except RuntimeError:
-                # 在线程池中没有事件循环，创建新的
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
             data = loop.run_until_complete(provider.get_historical_data(symbol, start_date, end_date))
 
             if data is not None and not data.empty:
@@ -1250,7 +1369,7 @@ class DataSourceManager:
                 stock_name = stock_info.get('name', f'股票{symbol}') if stock_info else f'股票{symbol}'
 
                 # 格式化返回
-                result = self._format_stock_data_response(data, symbol, stock_name, start_date, end_date)
+                result = self._format_stock_data_response(data, symbol, stock_name, start_date, end_date, period)
 
                 duration = time.time() - start_time
                 logger.info(f"🔍 [DataSourceManager详细日志] 调用完成，耗时: {duration:.3f}秒")
@@ -1272,6 +1391,7 @@ class DataSourceManager:
             logger.error(f"❌ [DataSourceManager详细日志] 异常堆栈: {traceback.format_exc()}")
             raise
 
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:akshare.data", source="akshare")
     def _get_akshare_data(self, symbol: str, start_date: str, end_date: str, period: str = "daily") -> str:
         """使用AKShare获取多周期数据 - 包含技术指标计算"""
         logger.debug(f"📊 [AKShare] 调用参数: symbol={symbol}, start_date={start_date}, end_date={end_date}, period={period}")
@@ -1305,7 +1425,7 @@ class DataSourceManager:
                 stock_name = stock_info.get('name', f'股票{symbol}') if stock_info else f'股票{symbol}'
 
                 # 调用统一的格式化方法（包含技术指标计算）
-                result = self._format_stock_data_response(data, symbol, stock_name, start_date, end_date)
+                result = self._format_stock_data_response(data, symbol, stock_name, start_date, end_date, period)
 
                 logger.debug(f"📊 [AKShare] 调用成功: 耗时={duration:.2f}s, 数据条数={len(data)}, 结果长度={len(result)}")
                 logger.info(f"✅ [AKShare] 已计算技术指标: MA5/10/20/60, MACD, RSI, BOLL")
@@ -1320,6 +1440,7 @@ class DataSourceManager:
             logger.error(f"❌ [AKShare] 调用失败: {e}, 耗时={duration:.2f}s", exc_info=True)
             return f"❌ AKShare获取{symbol}数据失败: {e}"
 
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:baostock.data", source="baostock")
     def _get_baostock_data(self, symbol: str, start_date: str, end_date: str, period: str = "daily") -> str:
         """使用BaoStock获取多周期数据 - 包含技术指标计算"""
         # 使用BaoStock的统一接口
@@ -1347,7 +1468,7 @@ class DataSourceManager:
             stock_name = stock_info.get('name', f'股票{symbol}') if stock_info else f'股票{symbol}'
 
             # 调用统一的格式化方法（包含技术指标计算）
-            result = self._format_stock_data_response(data, symbol, stock_name, start_date, end_date)
+            result = self._format_stock_data_response(data, symbol, stock_name, start_date, end_date, period)
 
             logger.info(f"✅ [BaoStock] 已计算技术指标: MA5/10/20/60, MACD, RSI, BOLL")
             return result
@@ -1398,12 +1519,8 @@ class DataSourceManager:
                     logger.info(f"🔄 [备用数据源] 尝试 {source.value} 获取{period}数据: {symbol}")
 
                     # 直接调用具体的数据源方法，避免递归
-                    if source == ChinaDataSource.TUSHARE:
-                        result = self._get_tushare_data(symbol, start_date, end_date, period)
-                    elif source == ChinaDataSource.AKSHARE:
-                        result = self._get_akshare_data(symbol, start_date, end_date, period)
-                    elif source == ChinaDataSource.BAOSTOCK:
-                        result = self._get_baostock_data(symbol, start_date, end_date, period)
+                    if source in (ChinaDataSource.TUSHARE, ChinaDataSource.AKSHARE, ChinaDataSource.BAOSTOCK):
+                        result = self._fetch_from_source(source, symbol, start_date, end_date, period)
                     # TDX 已移除
                     else:
                         logger.warning(f"⚠️ 未知数据源: {source.value}")
@@ -1785,6 +1902,7 @@ class DataSourceManager:
 
     # ==================== 基本面数据获取方法 ====================
 
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:mongodb.fundamentals", source="mongodb")
     def _get_mongodb_fundamentals(self, symbol: str) -> str:
         """从 MongoDB 获取财务数据"""
         logger.debug(f"📊 [MongoDB] 调用参数: symbol={symbol}")
@@ -1833,11 +1951,13 @@ class DataSourceManager:
             # MongoDB 异常，降级到其他数据源
             return self._try_fallback_fundamentals(symbol)
 
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:tushare.fundamentals", source="tushare")
     def _get_tushare_fundamentals(self, symbol: str) -> str:
         """从 Tushare 获取基本面数据 - 暂时不可用，需要实现"""
         logger.warning(f"⚠️ Tushare基本面数据功能暂时不可用")
         return f"⚠️ Tushare基本面数据功能暂时不可用，请使用其他数据源"
 
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:akshare.fundamentals", source="akshare")
     def _get_akshare_fundamentals(self, symbol: str) -> str:
         """从 AKShare 生成基本面分析"""
         logger.debug(f"📊 [AKShare] 调用参数: symbol={symbol}")
@@ -2050,6 +2170,7 @@ class DataSourceManager:
         logger.warning(f"⚠️ [数据来源: 生成分析] 所有数据源失败，生成基本分析: {symbol}")
         return self._generate_fundamentals_analysis(symbol)
 
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:mongodb.news", source="mongodb")
     def _get_mongodb_news(self, symbol: str, hours_back: int, limit: int) -> List[Dict[str, Any]]:
         """从MongoDB获取新闻数据"""
         try:
@@ -2070,6 +2191,7 @@ class DataSourceManager:
             logger.error(f"❌ [数据来源: MongoDB] 获取新闻失败: {e}")
             return self._try_fallback_news(symbol, hours_back, limit)
 
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:tushare.news", source="tushare")
     def _get_tushare_news(self, symbol: str, hours_back: int, limit: int) -> List[Dict[str, Any]]:
         """从Tushare获取新闻数据"""
         try:
@@ -2081,6 +2203,7 @@ class DataSourceManager:
             logger.error(f"❌ [数据来源: Tushare] 获取新闻失败: {e}")
             return []
 
+    @traced(SPAN_KIND_DATA_SOURCE, name="data_source:akshare.news", source="akshare")
     def _get_akshare_news(self, symbol: str, hours_back: int, limit: int) -> List[Dict[str, Any]]:
         """从AKShare获取新闻数据"""
         try:
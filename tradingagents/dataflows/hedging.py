@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+数据源对冲请求（Hedged Request）
+
+主数据源在延迟预算（默认取该数据源历史延迟的 p95）内没有返回时，
+并发启动下一个数据源，取第一个有效结果，其余请求取消。
+
+- LatencyHistogram: 固定分桶的延迟直方图，用于估算分位数
+- SourceLatencyTracker: 按数据源维护直方图，给出对冲延迟
+- hedged_call: 执行对冲请求
+
+注意：Python 线程无法被强制终止，"取消" 只能阻止尚未开始的请求，
+已经在运行的请求会在后台结束，其结果被丢弃。
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+T = TypeVar("T")
+
+# 延迟分桶上界（秒），最后一个桶为 +inf
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0,
+)
+
+
+class LatencyHistogram:
+    """固定分桶延迟直方图（线程安全）"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, success: bool = True):
+        """记录一次调用耗时；失败调用只计数，不进入延迟分布"""
+        with self._lock:
+            if not success:
+                self.failures += 1
+                return
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """估算分位数（返回所在桶的上界；落在 +inf 桶时返回观测到的最大值）"""
+        with self._lock:
+            if self.count == 0:
+                return None
+            rank = q * self.count
+            cumulative = 0
+            for i, c in enumerate(self.counts):
+                cumulative += c
+                if cumulative >= rank and c > 0:
+                    return self.buckets[i] if i < len(self.buckets) else self.max
+            return self.max
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            count, total, failures, max_value = self.count, self.total, self.failures, self.max
+            buckets = {
+                (f"le_{b}" if i < len(self.buckets) else "le_inf"): c
+                for i, (b, c) in enumerate(zip(list(self.buckets) + [float("inf")], self.counts))
+            }
+        return {
+            "count": count,
+            "failures": failures,
+            "avg": round(total / count, 4) if count else None,
+            "max": round(max_value, 4),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": buckets,
+        }
+
+
+class SourceLatencyTracker:
+    """按数据源记录延迟直方图，并据此计算对冲延迟"""
+
+    def __init__(self, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, source: str) -> LatencyHistogram:
+        with self._lock:
+            if source not in self._histograms:
+                self._histograms[source] = LatencyHistogram()
+            return self._histograms[source]
+
+    def observe(self, source: str, seconds: float, success: bool = True):
+        self.histogram(source).observe(seconds, success)
+
+    def hedge_delay(self, source: str, default: float, quantile: float = 0.95) -> float:
+        """样本足够时使用该数据源的分位数延迟，否则使用配置的延迟预算"""
+        histogram = self.histogram(source)
+        if histogram.count < self.min_samples:
+            return default
+        value = histogram.quantile(quantile)
+        return value if value is not None else default
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            items = list(self._histograms.items())
+        return {source: h.snapshot() for source, h in items}
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    """对冲请求共用的线程池（进程内单例）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ds-hedge")
+        return _executor
+
+
+def hedged_call(
+    candidates: List[Tuple[str, Callable[[], T]]],
+    is_valid: Callable[[T], bool],
+    delay_for: Callable[[str], float],
+    executor: Optional[ThreadPoolExecutor] = None,
+) -> Tuple[Optional[T], Optional[str], Optional[T]]:
+    """按顺序对冲调用多个数据源
+
+    Args:
+        candidates: [(数据源名称, 无参调用)]，按优先级排序
+        is_valid: 判断结果是否有效
+        delay_for: 返回某个数据源的对冲延迟（秒），超过后启动下一个数据源
+        executor: 线程池，默认使用共享线程池
+
+    Returns:
+        (有效结果, 数据源名称, 最后一个无效结果)；全部失败时前两项为 None
+    """
+    executor = executor or get_hedge_executor()
+    pending = list(candidates)
+    running: Dict[Future, str] = {}
+    last_invalid: Optional[T] = None
+
+    def launch():
+        source, fn = pending.pop(0)
+        # 复制上下文，保证链路追踪等 contextvars 在工作线程中可用
+        ctx = contextvars.copy_context()
+        running[executor.submit(ctx.run, fn)] = source
+        logger.info(f"🚀 [对冲请求] 启动数据源: {source}")
+        return source
+
+    last_launched = launch()
+    deadline = time.monotonic() + delay_for(last_launched)
+
+    try:
+        while running:
+            timeout = max(deadline - time.monotonic(), 0) if pending else None
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                source = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ [对冲请求] {source} 异常: {e}")
+                    continue
+                if is_valid(result):
+                    logger.info(f"✅ [对冲请求] 采用 {source} 的结果")
+                    return result, source, last_invalid
+                logger.warning(f"⚠️ [对冲请求] {source} 返回无效结果")
+                last_invalid = result
+
+            # 超过延迟预算，或当前运行的请求都已失败：启动下一个数据源
+            if pending and (not running or time.monotonic() >= deadline):
+                if running:
+                    logger.info(f"⏱️ [对冲请求] {last_launched} 超过延迟预算，对冲下一个数据源")
+                last_launched = launch()
+                deadline = time.monotonic() + delay_for(last_launched)
+    finally:
+        for future in running:
+            future.cancel()
+
+    return None, None, last_invalid
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+新闻近似重复检测（MinHash + LSH 分段索引）
+
+转载的财经新闻标题常被轻微改写，精确标题匹配无法去重。这里对标题和正文开头的
+字符 3-gram 计算 MinHash 签名，估计的 Jaccard 相似度达到阈值即视为重复。
+（标题很短，64 位 SimHash 在改写标题上的汉明距离波动很大，MinHash 的区分度更稳定。）
+
+查找使用 LSH 分段：128 个哈希值切成 32 段，每段 4 个值的哈希作为桶键，只比较
+至少有一段相同的候选，查找代价与语料规模无关。相同的桶键存入 MongoDB 的多键
+索引字段（minhash_bands），用于跨批次、跨进程查重。
+"""
+
+import hashlib
+import re
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+# 正文只取开头部分（转载稿开头通常一致，结尾常附加免责声明等）
+BODY_CHARS = 400
+DEFAULT_THRESHOLD = 0.55
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+# 固定种子的 multiply-shift 哈希族：h(x) = ((a * x + b) mod 2^64) >> 32
+_rng = np.random.default_rng(0x6E657773)
+_A = _rng.integers(1, 2 ** 64, size=NUM_PERM, dtype=np.uint64, endpoint=False) | np.uint64(1)
+_B = _rng.integers(0, 2 ** 64, size=NUM_PERM, dtype=np.uint64, endpoint=False)
+_SHIFT = np.uint64(32)
+
+
+def normalize_text(text: str) -> str:
+    """小写并去掉标点和空白，保留中英文和数字"""
+    return _NON_WORD.sub("", (text or "").lower())
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """字符 n-gram（中文无需分词）"""
+    normalized = normalize_text(text)
+    if len(normalized) <= size:
+        return [normalized] if normalized else []
+    return [normalized[i:i + size] for i in range(len(normalized) - size + 1)]
+
+
+def minhash(tokens: Iterable[str]) -> Optional[np.ndarray]:
+    """计算 MinHash 签名（uint32 数组）；没有任何 token 时返回 None"""
+    unique = set(tokens)
+    if not unique:
+        return None
+    hv = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest(), "little") for t in unique),
+        dtype=np.uint64, count=len(unique),
+    )
+    permuted = (hv[:, None] * _A + _B) >> _SHIFT
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def news_signature(title: str, content: str = "") -> Optional[np.ndarray]:
+    """新闻签名：标题与正文开头的 3-gram"""
+    return minhash(shingles(title) + shingles((content or "")[:BODY_CHARS]))
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """由签名估计的 Jaccard 相似度"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+def band_keys(signature: np.ndarray) -> List[int]:
+    """LSH 桶键（有符号 64 位整数，段号参与哈希，不同段互不冲突）"""
+    keys = []
+    for band in range(BANDS):
+        row = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(bytes([band]) + row, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def signature_to_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype("<u4").tobytes()
+
+
+def signature_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4").astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """内存中的近似重复索引
+
+    Args:
+        threshold: 视为重复的最低 Jaccard 相似度
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._buckets: Dict[int, List[Tuple[Hashable, np.ndarray]]] = {}
+        self._size = 0
+
+    def find(self, signature: np.ndarray, keys: Optional[List[int]] = None) -> Optional[Hashable]:
+        """返回近似重复条目的键，没有则返回 None"""
+        checked = set()
+        for key in keys or band_keys(signature):
+            for item_key, other in self._buckets.get(key, ()):
+                if item_key in checked:
+                    continue
+                checked.add(item_key)
+                if similarity(signature, other) >= self.threshold:
+                    return item_key
+        return None
+
+    def add(self, item_key: Hashable, signature: np.ndarray, keys: Optional[List[int]] = None):
+        for key in keys or band_keys(signature):
+            self._buckets.setdefault(key, []).append((item_key, signature))
+        self._size += 1
+
+    def add_if_new(self, item_key: Hashable, signature: Optional[np.ndarray]) -> Optional[Hashable]:
+        """不重复时加入索引并返回 None；重复时返回已有条目的键。签名为空（无文本）时视为不重复"""
+        if signature is None:
+            return None
+        keys = band_keys(signature)
+        duplicate_of = self.find(signature, keys)
+        if duplicate_of is None:
+            self.add(item_key, signature, keys)
+        return duplicate_of
+
+    def __len__(self) -> int:
+        return self._size
+
+
+def dedupe(items: Iterable, title_of, content_of=lambda item: "",
+           threshold: float = DEFAULT_THRESHOLD) -> List:
+    """保留首次出现的条目，去掉与之近似重复的后续条目"""
+    index = NearDuplicateIndex(threshold=threshold)
+    unique = []
+    for i, item in enumerate(items):
+        if index.add_if_new(i, news_signature(title_of(item), content_of(item))) is None:
+            unique.append(item)
+    return unique
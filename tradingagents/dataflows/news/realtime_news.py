@@ -9,14 +9,18 @@ import json
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import contextvars
+import threading
 import time
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 
 # 导入日志模块
-from tradingagents.config.runtime_settings import get_timezone_name
+from tradingagents.config.runtime_settings import get_float, get_timezone_name
 
+from tradingagents.dataflows.news.near_duplicate import NearDuplicateIndex, news_signature
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
@@ -34,6 +38,19 @@ class NewsItem:
     relevance_score: float
 
 
+_news_executor: Optional[ThreadPoolExecutor] = None
+_news_executor_lock = threading.Lock()
+
+
+def _get_news_executor() -> ThreadPoolExecutor:
+    """新闻源并发请求共用的线程池（进程内单例）"""
+    global _news_executor
+    with _news_executor_lock:
+        if _news_executor is None:
+            _news_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="news-src")
+        return _news_executor
+
+
 class RealtimeNewsAggregator:
     """实时新闻聚合器"""
 
@@ -47,11 +64,19 @@ class RealtimeNewsAggregator:
         self.alpha_vantage_key = os.getenv('ALPHA_VANTAGE_API_KEY')
         self.newsapi_key = os.getenv('NEWSAPI_KEY')
 
+        # 并发聚合配置：每个新闻源的截止时间（秒），以及提前返回所需的最低相关性
+        self.default_source_timeout = get_float("TA_NEWS_SOURCE_TIMEOUT_SECONDS", "ta_news_source_timeout_seconds", 15.0)
+        self.source_timeouts: Dict[str, float] = {}
+        self.min_relevance = get_float("TA_NEWS_MIN_RELEVANCE", "ta_news_min_relevance", 0.8)
+
     def get_realtime_stock_news(self, ticker: str, hours_back: int = 6, max_news: int = 10) -> List[NewsItem]:
         """
         获取实时股票新闻
         优先级：专业API > 新闻API > 搜索引擎
 
+        各新闻源并发请求，每个新闻源有独立的截止时间；结果到达即去重合并，
+        已收集到 max_news 条新鲜且相关的新闻时提前返回，不再等待慢的新闻源。
+
         Args:
             ticker: 股票代码
             hours_back: 回溯小时数
@@ -59,73 +84,90 @@ class RealtimeNewsAggregator:
         """
         logger.info(f"[新闻聚合器] 开始获取 {ticker} 的实时新闻，回溯时间: {hours_back}小时")
         start_time = datetime.now(ZoneInfo(get_timezone_name()))
-        all_news = []
-
-        # 1. FinnHub实时新闻 (最高优先级)
-        logger.info(f"[新闻聚合器] 尝试从 FinnHub 获取 {ticker} 的新闻")
-        finnhub_start = datetime.now(ZoneInfo(get_timezone_name()))
-        finnhub_news = self._get_finnhub_realtime_news(ticker, hours_back)
-        finnhub_time = (datetime.now(ZoneInfo(get_timezone_name())) - finnhub_start).total_seconds()
-
-        if finnhub_news:
-            logger.info(f"[新闻聚合器] 成功从 FinnHub 获取 {len(finnhub_news)} 条新闻，耗时: {finnhub_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] FinnHub 未返回新闻，耗时: {finnhub_time:.2f}秒")
-
-        all_news.extend(finnhub_news)
-
-        # 2. Alpha Vantage新闻
-        logger.info(f"[新闻聚合器] 尝试从 Alpha Vantage 获取 {ticker} 的新闻")
-        av_start = datetime.now(ZoneInfo(get_timezone_name()))
-        av_news = self._get_alpha_vantage_news(ticker, hours_back)
-        av_time = (datetime.now(ZoneInfo(get_timezone_name())) - av_start).total_seconds()
+        cutoff = start_time - timedelta(hours=hours_back)
 
-        if av_news:
-            logger.info(f"[新闻聚合器] 成功从 Alpha Vantage 获取 {len(av_news)} 条新闻，耗时: {av_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] Alpha Vantage 未返回新闻，耗时: {av_time:.2f}秒")
-
-        all_news.extend(av_news)
-
-        # 3. NewsAPI (如果配置了)
+        sources = [
+            ("FinnHub", self._get_finnhub_realtime_news),
+            ("Alpha Vantage", self._get_alpha_vantage_news),
+        ]
         if self.newsapi_key:
-            logger.info(f"[新闻聚合器] 尝试从 NewsAPI 获取 {ticker} 的新闻")
-            newsapi_start = datetime.now(ZoneInfo(get_timezone_name()))
-            newsapi_news = self._get_newsapi_news(ticker, hours_back)
-            newsapi_time = (datetime.now(ZoneInfo(get_timezone_name())) - newsapi_start).total_seconds()
-
-            if newsapi_news:
-                logger.info(f"[新闻聚合器] 成功从 NewsAPI 获取 {len(newsapi_news)} 条新闻，耗时: {newsapi_time:.2f}秒")
-            else:
-                logger.info(f"[新闻聚合器] NewsAPI 未返回新闻，耗时: {newsapi_time:.2f}秒")
-
-            all_news.extend(newsapi_news)
+            sources.append(("NewsAPI", self._get_newsapi_news))
         else:
             logger.info(f"[新闻聚合器] NewsAPI 密钥未配置，跳过此新闻源")
+        sources.append(("中文财经", self._get_chinese_finance_news))
+
+        executor = _get_news_executor()
+        launched = time.monotonic()
+        pending = {}
+        for name, fetch in sources:
+            logger.info(f"[新闻聚合器] 尝试从 {name} 获取 {ticker} 的新闻")
+            ctx = contextvars.copy_context()
+            pending[executor.submit(ctx.run, fetch, ticker, hours_back)] = name
+        deadlines = {future: launched + self.source_timeouts.get(name, self.default_source_timeout)
+                     for future, name in pending.items()}
+
+        # 各新闻源的结果按到达先后收集，但去重时按新闻源优先级合并：
+        # 同一条新闻出现在多个新闻源时保留优先级高的版本，与到达顺序无关
+        priority = [name for name, _ in sources]
+        results: Dict[str, List[NewsItem]] = {}
+        unique_news: List[NewsItem] = []
+        duplicate_count = short_title_count = 0
+
+        while pending:
+            now = time.monotonic()
+            # 超过截止时间的新闻源直接放弃（线程会在后台结束，结果丢弃）
+            for future in [f for f in pending if deadlines[f] <= now]:
+                future.cancel()
+                logger.warning(f"[新闻聚合器] {pending.pop(future)} 超过截止时间 "
+                               f"{deadlines[future] - launched:.1f}秒，跳过")
+            if not pending:
+                break
+
+            done, _ = wait(list(pending), timeout=min(deadlines[f] for f in pending) - now,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                elapsed = time.monotonic() - launched
+                try:
+                    items = future.result() or []
+                except Exception as e:
+                    logger.error(f"[新闻聚合器] {name} 获取新闻失败: {e}，耗时: {elapsed:.2f}秒")
+                    continue
 
-        # 4. 中文财经新闻源
-        logger.info(f"[新闻聚合器] 尝试获取 {ticker} 的中文财经新闻")
-        chinese_start = datetime.now(ZoneInfo(get_timezone_name()))
-        chinese_news = self._get_chinese_finance_news(ticker, hours_back)
-        chinese_time = (datetime.now(ZoneInfo(get_timezone_name())) - chinese_start).total_seconds()
-
-        if chinese_news:
-            logger.info(f"[新闻聚合器] 成功获取 {len(chinese_news)} 条中文财经新闻，耗时: {chinese_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] 未获取到中文财经新闻，耗时: {chinese_time:.2f}秒")
-
-        all_news.extend(chinese_news)
+                if items:
+                    logger.info(f"[新闻聚合器] 成功从 {name} 获取 {len(items)} 条新闻，耗时: {elapsed:.2f}秒")
+                else:
+                    logger.info(f"[新闻聚合器] {name} 未返回新闻，耗时: {elapsed:.2f}秒")
+
+                results[name] = items
+
+            seen_titles = set()
+            near_index = NearDuplicateIndex()
+            unique_news = []
+            duplicate_count = short_title_count = 0
+            for name in priority:
+                _, dups, shorts = self._merge_unique_news(results.get(name, []), seen_titles,
+                                                          unique_news, near_index)
+                duplicate_count += dups
+                short_title_count += shorts
+            fresh_relevant = sum(
+                1 for item in unique_news
+                if item.publish_time >= cutoff and item.relevance_score >= self.min_relevance
+            )
+
+            if fresh_relevant >= max_news and pending:
+                logger.info(f"[新闻聚合器] 已获得 {fresh_relevant} 条新鲜相关新闻，"
+                            f"不再等待: {', '.join(pending.values())}")
+                for future in pending:
+                    future.cancel()
+                break
 
-        # 去重和排序
-        logger.info(f"[新闻聚合器] 开始对 {len(all_news)} 条新闻进行去重和排序")
-        dedup_start = datetime.now(ZoneInfo(get_timezone_name()))
-        unique_news = self._deduplicate_news(all_news)
         sorted_news = sorted(unique_news, key=lambda x: x.publish_time, reverse=True)
-        dedup_time = (datetime.now(ZoneInfo(get_timezone_name())) - dedup_start).total_seconds()
 
         # 记录去重结果
-        removed_count = len(all_news) - len(unique_news)
-        logger.info(f"[新闻聚合器] 新闻去重完成，移除了 {removed_count} 条重复新闻，剩余 {len(sorted_news)} 条，耗时: {dedup_time:.2f}秒")
+        received = sum(len(items) for items in results.values())
+        logger.info(f"[新闻聚合器] 新闻去重完成，原始新闻: {received}条，移除重复 {duplicate_count} 条，"
+                    f"标题过短 {short_title_count} 条，剩余 {len(sorted_news)} 条")
 
         # 记录总体情况
         total_time = (datetime.now(ZoneInfo(get_timezone_name())) - start_time).total_seconds()
@@ -575,6 +617,26 @@ class RealtimeNewsAggregator:
 
         seen_titles = set()
         unique_news = []
+        _, duplicate_count, short_title_count = self._merge_unique_news(
+            news_items, seen_titles, unique_news, NearDuplicateIndex()
+        )
+
+        # 记录去重结果
+        time_taken = (datetime.now(ZoneInfo(get_timezone_name())) - start_time).total_seconds()
+        logger.info(f"[新闻去重] 去重完成，原始新闻: {len(news_items)}条，去重后: {len(unique_news)}条，")
+        logger.info(f"[新闻去重] 去除重复: {duplicate_count}条，标题过短: {short_title_count}条，耗时: {time_taken:.2f}秒")
+
+        return unique_news
+
+    def _merge_unique_news(self, news_items: List[NewsItem], seen_titles: set,
+                           unique_news: List[NewsItem],
+                           near_index: NearDuplicateIndex) -> Tuple[List[NewsItem], int, int]:
+        """按标题去重（精确匹配 + 标题/正文近似重复），把新出现的新闻追加到 unique_news
+
+        Returns:
+            (新增的新闻, 重复数, 标题过短数)
+        """
+        added = []
         duplicate_count = 0
         short_title_count = 0
 
@@ -594,16 +656,20 @@ class RealtimeNewsAggregator:
                 duplicate_count += 1
                 continue
 
+            # 检查是否为改写标题的转载稿
+            duplicate_of = near_index.add_if_new(len(unique_news), news_signature(item.title, item.content))
+            if duplicate_of is not None:
+                logger.debug(f"[新闻去重] 检测到近似重复新闻: '{item.title[:50]}...' ≈ "
+                             f"'{unique_news[duplicate_of].title[:50]}...'，来源: {item.source}")
+                duplicate_count += 1
+                continue
+
             # 添加到结果集
             seen_titles.add(title_key)
             unique_news.append(item)
+            added.append(item)
 
-        # 记录去重结果
-        time_taken = (datetime.now(ZoneInfo(get_timezone_name())) - start_time).total_seconds()
-        logger.info(f"[新闻去重] 去重完成，原始新闻: {len(news_items)}条，去重后: {len(unique_news)}条，")
-        logger.info(f"[新闻去重] 去除重复: {duplicate_count}条，标题过短: {short_title_count}条，耗时: {time_taken:.2f}秒")
-
-        return unique_news
+        return added, duplicate_count, short_title_count
 
     def format_news_report(self, news_items: List[NewsItem], ticker: str) -> str:
         """格式化新闻报告"""
@@ -221,22 +221,14 @@ class OptimizedChinaDataProvider:
         # 2. 检查文件缓存（除非强制刷新）
         if not force_refresh:
             # 查找基本面数据缓存
-            for metadata_file in self.cache.metadata_dir.glob(f"*_meta.json"):
+            for metadata in self.cache.find_cache_entries(symbol, 'fundamentals', market_type='china'):
                 try:
-                    import json
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-
-                    if (metadata.get('symbol') == symbol and
-                        metadata.get('data_type') == 'fundamentals' and
-                        metadata.get('market_type') == 'china'):
-
-                        cache_key = metadata_file.stem.replace('_meta', '')
-                        if self.cache.is_cache_valid(cache_key, symbol=symbol, data_type='fundamentals'):
-                            cached_data = self.cache.load_stock_data(cache_key)
-                            if cached_data:
-                                logger.info(f"⚡ [数据来源: 文件缓存] 从缓存加载A股基本面数据: {symbol}")
-                                return cached_data
+                    cache_key = metadata['cache_key']
+                    if self.cache.is_cache_valid(cache_key, symbol=symbol, data_type='fundamentals'):
+                        cached_data = self.cache.load_stock_data(cache_key)
+                        if cached_data:
+                            logger.info(f"⚡ [数据来源: 文件缓存] 从缓存加载A股基本面数据: {symbol}")
+                            return cached_data
                 except Exception:
                     continue
 
@@ -2057,21 +2049,11 @@ class OptimizedChinaDataProvider:
         """尝试获取过期的缓存数据作为备用"""
         try:
             # 查找任何相关的缓存，不考虑TTL
-            for metadata_file in self.cache.metadata_dir.glob(f"*_meta.json"):
+            for metadata in self.cache.find_cache_entries(symbol, 'stock_data', market_type='china'):
                 try:
-                    import json
-
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-
-                    if (metadata.get('symbol') == symbol and
-                        metadata.get('data_type') == 'stock_data' and
-                        metadata.get('market_type') == 'china'):
-
-                        cache_key = metadata_file.stem.replace('_meta', '')
-                        cached_data = self.cache.load_stock_data(cache_key)
-                        if cached_data:
-                            return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
+                    cached_data = self.cache.load_stock_data(metadata['cache_key'])
+                    if cached_data:
+                        return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
                 except Exception:
                     continue
         except Exception:
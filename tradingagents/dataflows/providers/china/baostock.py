@@ -3,13 +3,13 @@
 BaoStock统一数据提供器
 实现BaseStockDataProvider接口，提供标准化的BaoStock数据访问
 """
-import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, List, Optional, Union
 import pandas as pd
 
 from ..base_provider import BaseStockDataProvider
+from .baostock_session import BaoStockQueryError, get_baostock_session_pool
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +38,15 @@ class BaoStockProvider(BaseStockDataProvider):
             logger.error(f"❌ BaoStock初始化失败: {e}")
             self.connected = False
     
+    @property
+    def session_count(self) -> int:
+        """会话池中的会话数，批量同步据此决定并发数"""
+        return get_baostock_session_pool().size
+
+    async def _query(self, method: str, **kwargs):
+        """通过会话池执行 bs.<method>(**kwargs)，返回 (行列表, 字段列表)"""
+        return await get_baostock_session_pool().query(method, **kwargs)
+
     async def connect(self) -> bool:
         """连接到BaoStock数据源"""
         return await self.test_connection()
@@ -48,15 +57,8 @@ class BaoStockProvider(BaseStockDataProvider):
             return False
         
         try:
-            # 异步测试登录
-            def test_login():
-                lg = self.bs.login()
-                if lg.error_code != '0':
-                    raise Exception(f"登录失败: {lg.error_msg}")
-                self.bs.logout()
-                return True
-            
-            await asyncio.to_thread(test_login)
+            today = datetime.now().strftime('%Y-%m-%d')
+            await self._query("query_trade_dates", start_date=today, end_date=today)
             logger.info("✅ BaoStock连接测试成功")
             return True
         except Exception as e:
@@ -71,37 +73,24 @@ class BaoStockProvider(BaseStockDataProvider):
         try:
             logger.info("📋 获取BaoStock股票列表（同步）...")
 
-            lg = self.bs.login()
-            if lg.error_code != '0':
-                logger.error(f"BaoStock登录失败: {lg.error_msg}")
-                return None
-
             try:
-                rs = self.bs.query_stock_basic()
-                if rs.error_code != '0':
-                    logger.error(f"BaoStock查询失败: {rs.error_msg}")
-                    return None
-
-                data_list = []
-                while (rs.error_code == '0') & rs.next():
-                    data_list.append(rs.get_row_data())
-
-                if not data_list:
-                    logger.warning("⚠️ BaoStock股票列表为空")
-                    return None
+                data_list, fields = get_baostock_session_pool().query_sync("query_stock_basic")
+            except BaoStockQueryError as e:
+                logger.error(f"BaoStock查询失败: {e}")
+                return None
 
-                # 转换为DataFrame
-                import pandas as pd
-                df = pd.DataFrame(data_list, columns=rs.fields)
+            if not data_list:
+                logger.warning("⚠️ BaoStock股票列表为空")
+                return None
 
-                # 只保留股票类型（type=1）
-                df = df[df['type'] == '1']
+            # 转换为DataFrame
+            df = pd.DataFrame(data_list, columns=fields)
 
-                logger.info(f"✅ BaoStock股票列表获取成功: {len(df)}只股票")
-                return df
+            # 只保留股票类型（type=1）
+            df = df[df['type'] == '1']
 
-            finally:
-                self.bs.logout()
+            logger.info(f"✅ BaoStock股票列表获取成功: {len(df)}只股票")
+            return df
 
         except Exception as e:
             logger.error(f"❌ BaoStock获取股票列表失败: {e}")
@@ -120,25 +109,7 @@ class BaoStockProvider(BaseStockDataProvider):
         try:
             logger.info("📋 获取BaoStock股票列表...")
             
-            def fetch_stock_list():
-                lg = self.bs.login()
-                if lg.error_code != '0':
-                    raise Exception(f"登录失败: {lg.error_msg}")
-                
-                try:
-                    rs = self.bs.query_stock_basic()
-                    if rs.error_code != '0':
-                        raise Exception(f"查询失败: {rs.error_msg}")
-                    
-                    data_list = []
-                    while (rs.error_code == '0') & rs.next():
-                        data_list.append(rs.get_row_data())
-                    
-                    return data_list, rs.fields
-                finally:
-                    self.bs.logout()
-            
-            data_list, fields = await asyncio.to_thread(fetch_stock_list)
+            data_list, fields = await self._query("query_stock_basic")
             
             if not data_list:
                 logger.warning("⚠️ BaoStock股票列表为空")
@@ -230,35 +201,16 @@ class BaoStockProvider(BaseStockDataProvider):
 
             logger.debug(f"📊 获取{code}估值数据: {start_date} 到 {end_date}")
 
-            def fetch_valuation_data():
-                bs_code = self._to_baostock_code(code)
-                lg = self.bs.login()
-                if lg.error_code != '0':
-                    raise Exception(f"登录失败: {lg.error_msg}")
-
-                try:
-                    # 🔥 获取估值指标：peTTM, pbMRQ, psTTM, pcfNcfTTM
-                    rs = self.bs.query_history_k_data_plus(
-                        code=bs_code,
-                        fields="date,code,close,peTTM,pbMRQ,psTTM,pcfNcfTTM",
-                        start_date=start_date,
-                        end_date=end_date,
-                        frequency="d",
-                        adjustflag="3"  # 不复权
-                    )
-
-                    if rs.error_code != '0':
-                        raise Exception(f"查询失败: {rs.error_msg}")
-
-                    data_list = []
-                    while (rs.error_code == '0') & rs.next():
-                        data_list.append(rs.get_row_data())
-
-                    return data_list, rs.fields
-                finally:
-                    self.bs.logout()
-
-            data_list, fields = await asyncio.to_thread(fetch_valuation_data)
+            # 🔥 获取估值指标：peTTM, pbMRQ, psTTM, pcfNcfTTM
+            data_list, fields = await self._query(
+                "query_history_k_data_plus",
+                code=self._to_baostock_code(code),
+                fields="date,code,close,peTTM,pbMRQ,psTTM,pcfNcfTTM",
+                start_date=start_date,
+                end_date=end_date,
+                frequency="d",
+                adjustflag="3"  # 不复权
+            )
 
             if not data_list:
                 logger.warning(f"⚠️ {code}估值数据为空")
@@ -288,36 +240,22 @@ class BaoStockProvider(BaseStockDataProvider):
     async def _get_stock_info_detail(self, code: str) -> Dict[str, Any]:
         """获取股票详细信息"""
         try:
-            def fetch_stock_info():
-                bs_code = self._to_baostock_code(code)
-                lg = self.bs.login()
-                if lg.error_code != '0':
-                    raise Exception(f"登录失败: {lg.error_msg}")
-                
-                try:
-                    rs = self.bs.query_stock_basic(code=bs_code)
-                    if rs.error_code != '0':
-                        return {"code": code, "name": f"股票{code}"}
-                    
-                    data_list = []
-                    while (rs.error_code == '0') & rs.next():
-                        data_list.append(rs.get_row_data())
-                    
-                    if not data_list:
-                        return {"code": code, "name": f"股票{code}"}
-                    
-                    row = data_list[0]
-                    return {
-                        "code": code,
-                        "name": str(row[1]) if len(row) > 1 else f"股票{code}",  # code_name
-                        "list_date": str(row[2]) if len(row) > 2 else "",  # ipoDate
-                        "industry": "未知",  # BaoStock基础信息不包含行业
-                        "area": "未知"  # BaoStock基础信息不包含地区
-                    }
-                finally:
-                    self.bs.logout()
-            
-            return await asyncio.to_thread(fetch_stock_info)
+            try:
+                data_list, _ = await self._query("query_stock_basic", code=self._to_baostock_code(code))
+            except BaoStockQueryError:
+                return {"code": code, "name": f"股票{code}"}
+
+            if not data_list:
+                return {"code": code, "name": f"股票{code}"}
+
+            row = data_list[0]
+            return {
+                "code": code,
+                "name": str(row[1]) if len(row) > 1 else f"股票{code}",  # code_name
+                "list_date": str(row[2]) if len(row) > 2 else "",  # ipoDate
+                "industry": "未知",  # BaoStock基础信息不包含行业
+                "area": "未知"  # BaoStock基础信息不包含地区
+            }
             
         except Exception as e:
             logger.debug(f"获取{code}详细信息失败: {e}")
@@ -370,54 +308,40 @@ class BaoStockProvider(BaseStockDataProvider):
     async def _get_latest_kline_data(self, code: str) -> Dict[str, Any]:
         """获取最新K线数据作为行情"""
         try:
-            def fetch_latest_kline():
-                bs_code = self._to_baostock_code(code)
-                lg = self.bs.login()
-                if lg.error_code != '0':
-                    raise Exception(f"登录失败: {lg.error_msg}")
-                
-                try:
-                    # 获取最近5天的数据
-                    end_date = datetime.now().strftime('%Y-%m-%d')
-                    start_date = (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')
-                    
-                    rs = self.bs.query_history_k_data_plus(
-                        code=bs_code,
-                        fields="date,code,open,high,low,close,preclose,volume,amount,pctChg",
-                        start_date=start_date,
-                        end_date=end_date,
-                        frequency="d",
-                        adjustflag="3"
-                    )
-                    
-                    if rs.error_code != '0':
-                        return {}
-                    
-                    data_list = []
-                    while (rs.error_code == '0') & rs.next():
-                        data_list.append(rs.get_row_data())
-                    
-                    if not data_list:
-                        return {}
-                    
-                    # 取最新一条数据
-                    latest_row = data_list[-1]
-                    return {
-                        "name": f"股票{code}",
-                        "open": self._safe_float(latest_row[2]),
-                        "high": self._safe_float(latest_row[3]),
-                        "low": self._safe_float(latest_row[4]),
-                        "close": self._safe_float(latest_row[5]),
-                        "preclose": self._safe_float(latest_row[6]),
-                        "volume": self._safe_int(latest_row[7]),
-                        "amount": self._safe_float(latest_row[8]),
-                        "change_percent": self._safe_float(latest_row[9]),
-                        "change": self._safe_float(latest_row[5]) - self._safe_float(latest_row[6])
-                    }
-                finally:
-                    self.bs.logout()
-            
-            return await asyncio.to_thread(fetch_latest_kline)
+            # 获取最近5天的数据
+            end_date = datetime.now().strftime('%Y-%m-%d')
+            start_date = (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')
+
+            try:
+                data_list, _ = await self._query(
+                    "query_history_k_data_plus",
+                    code=self._to_baostock_code(code),
+                    fields="date,code,open,high,low,close,preclose,volume,amount,pctChg",
+                    start_date=start_date,
+                    end_date=end_date,
+                    frequency="d",
+                    adjustflag="3"
+                )
+            except BaoStockQueryError:
+                return {}
+
+            if not data_list:
+                return {}
+
+            # 取最新一条数据
+            latest_row = data_list[-1]
+            return {
+                "name": f"股票{code}",
+                "open": self._safe_float(latest_row[2]),
+                "high": self._safe_float(latest_row[3]),
+                "low": self._safe_float(latest_row[4]),
+                "close": self._safe_float(latest_row[5]),
+                "preclose": self._safe_float(latest_row[6]),
+                "volume": self._safe_int(latest_row[7]),
+                "amount": self._safe_float(latest_row[8]),
+                "change_percent": self._safe_float(latest_row[9]),
+                "change": self._safe_float(latest_row[5]) - self._safe_float(latest_row[6])
+            }
             
         except Exception as e:
             logger.debug(f"获取{code}最新K线数据失败: {e}")
@@ -565,41 +489,22 @@ class BaoStockProvider(BaseStockDataProvider):
             }
             bs_frequency = frequency_map.get(period, "d")
 
-            def fetch_historical_data():
-                bs_code = self._to_baostock_code(code)
-                lg = self.bs.login()
-                if lg.error_code != '0':
-                    raise Exception(f"登录失败: {lg.error_msg}")
-
-                try:
-                    # 根据频率选择不同的字段（周线和月线支持的字段较少）
-                    if bs_frequency == "d":
-                        fields_str = "date,code,open,high,low,close,preclose,volume,amount,adjustflag,turn,tradestatus,pctChg,isST"
-                    else:
-                        # 周线和月线只支持基础字段
-                        fields_str = "date,code,open,high,low,close,volume,amount,pctChg"
-
-                    rs = self.bs.query_history_k_data_plus(
-                        code=bs_code,
-                        fields=fields_str,
-                        start_date=start_date,
-                        end_date=end_date,
-                        frequency=bs_frequency,
-                        adjustflag="2"  # 前复权
-                    )
-
-                    if rs.error_code != '0':
-                        raise Exception(f"查询失败: {rs.error_msg}")
-
-                    data_list = []
-                    while (rs.error_code == '0') & rs.next():
-                        data_list.append(rs.get_row_data())
-
-                    return data_list, rs.fields
-                finally:
-                    self.bs.logout()
-
-            data_list, fields = await asyncio.to_thread(fetch_historical_data)
+            # 根据频率选择不同的字段（周线和月线支持的字段较少）
+            if bs_frequency == "d":
+                fields_str = "date,code,open,high,low,close,preclose,volume,amount,adjustflag,turn,tradestatus,pctChg,isST"
+            else:
+                # 周线和月线只支持基础字段
+                fields_str = "date,code,open,high,low,close,volume,amount,pctChg"
+
+            data_list, fields = await self._query(
+                "query_history_k_data_plus",
+                code=self._to_baostock_code(code),
+                fields=fields_str,
+                start_date=start_date,
+                end_date=end_date,
+                frequency=bs_frequency,
+                adjustflag="2"  # 前复权
+            )
 
             if not data_list:
                 logger.warning(f"⚠️ BaoStock历史数据为空: {code}")
@@ -722,30 +627,15 @@ class BaoStockProvider(BaseStockDataProvider):
     async def _get_profit_data(self, code: str, year: int, quarter: int) -> Optional[Dict[str, Any]]:
         """获取盈利能力数据"""
         try:
-            def fetch_profit_data():
-                bs_code = self._to_baostock_code(code)
-                lg = self.bs.login()
-                if lg.error_code != '0':
-                    raise Exception(f"登录失败: {lg.error_msg}")
-
-                try:
-                    rs = self.bs.query_profit_data(code=bs_code, year=year, quarter=quarter)
-                    if rs.error_code != '0':
-                        return None
-
-                    data_list = []
-                    while (rs.error_code == '0') & rs.next():
-                        data_list.append(rs.get_row_data())
-
-                    return data_list, rs.fields
-                finally:
-                    self.bs.logout()
-
-            result = await asyncio.to_thread(fetch_profit_data)
-            if not result or not result[0]:
+            try:
+                data_list, fields = await self._query(
+                    "query_profit_data", code=self._to_baostock_code(code), year=year, quarter=quarter
+                )
+            except BaoStockQueryError:
+                return None
+            if not data_list:
                 return None
 
-            data_list, fields = result
             df = pd.DataFrame(data_list, columns=fields)
             return df.to_dict('records')[0] if not df.empty else None
 
@@ -756,30 +646,15 @@ class BaoStockProvider(BaseStockDataProvider):
     async def _get_operation_data(self, code: str, year: int, quarter: int) -> Optional[Dict[str, Any]]:
         """获取营运能力数据"""
         try:
-            def fetch_operation_data():
-                bs_code = self._to_baostock_code(code)
-                lg = self.bs.login()
-                if lg.error_code != '0':
-                    raise Exception(f"登录失败: {lg.error_msg}")
-
-                try:
-                    rs = self.bs.query_operation_data(code=bs_code, year=year, quarter=quarter)
-                    if rs.error_code != '0':
-                        return None
-
-                    data_list = []
-                    while (rs.error_code == '0') & rs.next():
-                        data_list.append(rs.get_row_data())
-
-                    return data_list, rs.fields
-                finally:
-                    self.bs.logout()
-
-            result = await asyncio.to_thread(fetch_operation_data)
-            if not result or not result[0]:
+            try:
+                data_list, fields = await self._query(
+                    "query_operation_data", code=self._to_baostock_code(code), year=year, quarter=quarter
+                )
+            except BaoStockQueryError:
+                return None
+            if not data_list:
                 return None
 
-            data_list, fields = result
             df = pd.DataFrame(data_list, columns=fields)
             return df.to_dict('records')[0] if not df.empty else None
 
@@ -790,30 +665,15 @@ class BaoStockProvider(BaseStockDataProvider):
     async def _get_growth_data(self, code: str, year: int, quarter: int) -> Optional[Dict[str, Any]]:
         """获取成长能力数据"""
         try:
-            def fetch_growth_data():
-                bs_code = self._to_baostock_code(code)
-                lg = self.bs.login()
-                if lg.error_code != '0':
-                    raise Exception(f"登录失败: {lg.error_msg}")
-
-                try:
-                    rs = self.bs.query_growth_data(code=bs_code, year=year, quarter=quarter)
-                    if rs.error_code != '0':
-                        return None
-
-                    data_list = []
-                    while (rs.error_code == '0') & rs.next():
-                        data_list.append(rs.get_row_data())
-
-                    return data_list, rs.fields
-                finally:
-                    self.bs.logout()
-
-            result = await asyncio.to_thread(fetch_growth_data)
-            if not result or not result[0]:
+            try:
+                data_list, fields = await self._query(
+                    "query_growth_data", code=self._to_baostock_code(code), year=year, quarter=quarter
+                )
+            except BaoStockQueryError:
+                return None
+            if not data_list:
                 return None
 
-            data_list, fields = result
             df = pd.DataFrame(data_list, columns=fields)
             return df.to_dict('records')[0] if not df.empty else None
 
@@ -824,30 +684,15 @@ class BaoStockProvider(BaseStockDataProvider):
     async def _get_balance_data(self, code: str, year: int, quarter: int) -> Optional[Dict[str, Any]]:
         """获取偿债能力数据"""
         try:
-            def fetch_balance_data():
-                bs_code = self._to_baostock_code(code)
-                lg = self.bs.login()
-                if lg.error_code != '0':
-                    raise Exception(f"登录失败: {lg.error_msg}")
-
-                try:
-                    rs = self.bs.query_balance_data(code=bs_code, year=year, quarter=quarter)
-                    if rs.error_code != '0':
-                        return None
-
-                    data_list = []
-                    while (rs.error_code == '0') & rs.next():
-                        data_list.append(rs.get_row_data())
-
-                    return data_list, rs.fields
-                finally:
-                    self.bs.logout()
-
-            result = await asyncio.to_thread(fetch_balance_data)
-            if not result or not result[0]:
+            try:
+                data_list, fields = await self._query(
+                    "query_balance_data", code=self._to_baostock_code(code), year=year, quarter=quarter
+                )
+            except BaoStockQueryError:
+                return None
+            if not data_list:
                 return None
 
-            data_list, fields = result
             df = pd.DataFrame(data_list, columns=fields)
             return df.to_dict('records')[0] if not df.empty else None
 
@@ -858,30 +703,15 @@ class BaoStockProvider(BaseStockDataProvider):
     async def _get_cash_flow_data(self, code: str, year: int, quarter: int) -> Optional[Dict[str, Any]]:
         """获取现金流量数据"""
         try:
-            def fetch_cash_flow_data():
-                bs_code = self._to_baostock_code(code)
-                lg = self.bs.login()
-                if lg.error_code != '0':
-                    raise Exception(f"登录失败: {lg.error_msg}")
-
-                try:
-                    rs = self.bs.query_cash_flow_data(code=bs_code, year=year, quarter=quarter)
-                    if rs.error_code != '0':
-                        return None
-
-                    data_list = []
-                    while (rs.error_code == '0') & rs.next():
-                        data_list.append(rs.get_row_data())
-
-                    return data_list, rs.fields
-                finally:
-                    self.bs.logout()
-
-            result = await asyncio.to_thread(fetch_cash_flow_data)
-            if not result or not result[0]:
+            try:
+                data_list, fields = await self._query(
+                    "query_cash_flow_data", code=self._to_baostock_code(code), year=year, quarter=quarter
+                )
+            except BaoStockQueryError:
+                return None
+            if not data_list:
                 return None
 
-            data_list, fields = result
             df = pd.DataFrame(data_list, columns=fields)
             return df.to_dict('records')[0] if not df.empty else None
 
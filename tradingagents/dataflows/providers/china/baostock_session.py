@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+BaoStock 会话池
+
+BaoStock 客户端是进程级的全局 socket：同一进程只能有一个登录会话，并发的 to_thread 调用会互相干扰；
+原先每次查询都 login/logout 一次，批量同步时大部分时间花在登录握手上。
+
+- 每个会话保持长期登录，空闲超过健康检查间隔后先探测一次
+- 登录失效或网络错误时自动重新登录并重试一次
+- 每个会话的请求由单线程执行器串行处理（请求队列）
+- 会话数为 1 时在当前进程内运行；大于 1 时每个会话一个子进程，请求分发给排队最少的会话
+"""
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 需要重新登录的错误码：未登录、网络错误
+_RELOGIN_ERROR_CODES = {
+    "10001001",
+    "10002001", "10002002", "10002003", "10002004",
+    "10002005", "10002006", "10002007", "10002008",
+}
+
+QueryResult = Tuple[List[List[str]], List[str]]
+
+
+class BaoStockSessionError(Exception):
+    """BaoStock 登录或通信失败"""
+
+
+class BaoStockQueryError(Exception):
+    """BaoStock 查询返回错误码"""
+
+    def __init__(self, error_code: str, error_msg: str = ""):
+        super().__init__(error_code, error_msg)
+        self.error_code = error_code
+        self.error_msg = error_msg
+
+    def __str__(self) -> str:
+        return f"{self.error_msg} (error_code={self.error_code})"
+
+
+class _SessionCore:
+    """一个长期登录的 BaoStock 会话（非线程安全，由调用方串行使用）"""
+
+    def __init__(self, bs_module: Any = None, health_check_seconds: float = 300.0):
+        if bs_module is None:
+            import baostock as bs_module
+        self.bs = bs_module
+        self.health_check_seconds = health_check_seconds
+        self.logged_in = False
+        self.last_used = 0.0
+        self.login_count = 0
+
+    def _login(self):
+        lg = self.bs.login()
+        if lg.error_code != '0':
+            raise BaoStockSessionError(f"登录失败: {lg.error_msg}")
+        self.logged_in = True
+        self.login_count += 1
+        self.last_used = time.monotonic()
+        logger.debug(f"🔐 BaoStock会话已登录（第{self.login_count}次）")
+
+    def _is_healthy(self) -> bool:
+        today = datetime.now().strftime('%Y-%m-%d')
+        try:
+            rs = self.bs.query_trade_dates(start_date=today, end_date=today)
+            return rs.error_code == '0'
+        except Exception:
+            return False
+
+    def _ensure_login(self):
+        if self.logged_in and time.monotonic() - self.last_used > self.health_check_seconds:
+            if not self._is_healthy():
+                logger.info("🔄 BaoStock会话健康检查失败，重新登录")
+                self.reset()
+        if not self.logged_in:
+            self._login()
+
+    def reset(self):
+        """丢弃当前会话，下次请求时重新登录"""
+        if self.logged_in:
+            try:
+                self.bs.logout()
+            except Exception:
+                pass
+        self.logged_in = False
+
+    def run(self, method: str, kwargs: Dict[str, Any]) -> QueryResult:
+        """执行 bs.<method>(**kwargs)，返回 (行列表, 字段列表)"""
+        for attempt in (1, 2):
+            self._ensure_login()
+            try:
+                rs = getattr(self.bs, method)(**kwargs)
+                rows = []
+                while (rs.error_code == '0') & rs.next():
+                    rows.append(rs.get_row_data())
+            except Exception as e:
+                if attempt == 2:
+                    raise BaoStockSessionError(f"{method} 调用失败: {e}") from e
+                logger.warning(f"⚠️ BaoStock {method} 调用异常，重新登录后重试: {e}")
+                self.reset()
+                continue
+
+            if rs.error_code in _RELOGIN_ERROR_CODES and attempt == 1:
+                logger.info(f"🔄 BaoStock会话失效({rs.error_code} {rs.error_msg})，重新登录后重试")
+                self.reset()
+                continue
+            self.last_used = time.monotonic()
+            if rs.error_code != '0':
+                raise BaoStockQueryError(rs.error_code, rs.error_msg)
+            return rows, list(rs.fields)
+
+    def close(self):
+        self.reset()
+
+
+class _ThreadSession:
+    """当前进程内的会话：单线程执行器即请求队列"""
+
+    def __init__(self, core: _SessionCore):
+        self.core = core
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="baostock-session")
+
+    def submit(self, method: str, kwargs: Dict[str, Any]) -> Future:
+        return self._executor.submit(self.core.run, method, kwargs)
+
+    def close(self):
+        self._executor.submit(self.core.close)
+        self._executor.shutdown(wait=True)
+
+
+def _session_worker_main(conn, health_check_seconds: float):
+    """子进程会话主循环：接收 (method, kwargs)，返回 (ok, 结果或异常)"""
+    core = _SessionCore(health_check_seconds=health_check_seconds)
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        method, kwargs = request
+        try:
+            reply = (True, core.run(method, kwargs))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception:
+            # 异常对象无法序列化时退化为字符串
+            conn.send((False, BaoStockSessionError(str(reply[1]))))
+    core.close()
+
+
+class _ProcessSession:
+    """子进程中的会话：本地单线程执行器负责收发，子进程退出后自动重启"""
+
+    def __init__(self, health_check_seconds: float = 300.0):
+        self.health_check_seconds = health_check_seconds
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="baostock-session")
+
+    def _start(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_session_worker_main,
+            args=(child_conn, self.health_check_seconds),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self._process, self._conn = process, parent_conn
+        logger.info(f"🚀 BaoStock会话子进程已启动: pid={process.pid}")
+
+    def _stop(self):
+        if self._conn is not None:
+            try:
+                self._conn.send(None)
+            except Exception:
+                pass
+            self._conn.close()
+        if self._process is not None:
+            self._process.join(5)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._process, self._conn = None, None
+
+    def _call(self, method: str, kwargs: Dict[str, Any]) -> QueryResult:
+        for attempt in (1, 2):
+            if self._process is None or not self._process.is_alive():
+                self._stop()
+                self._start()
+            try:
+                self._conn.send((method, kwargs))
+                ok, payload = self._conn.recv()
+                break
+            except (EOFError, OSError) as e:
+                logger.warning(f"⚠️ BaoStock会话子进程异常退出，重启: {e}")
+                self._stop()
+                if attempt == 2:
+                    raise BaoStockSessionError(f"会话子进程不可用: {e}") from e
+        if not ok:
+            raise payload
+        return payload
+
+    def submit(self, method: str, kwargs: Dict[str, Any]) -> Future:
+        return self._executor.submit(self._call, method, kwargs)
+
+    def close(self):
+        self._executor.submit(self._stop)
+        self._executor.shutdown(wait=True)
+
+
+class BaoStockSessionPool:
+    """BaoStock 会话池，请求分发给排队最少的会话"""
+
+    def __init__(self, size: int = 1, health_check_seconds: float = 300.0,
+                 session_factory: Optional[Callable[[int], Any]] = None):
+        """
+        Args:
+            size: 会话数；1 表示在当前进程内运行，大于 1 时每个会话一个子进程
+            health_check_seconds: 会话空闲超过该时间后，下次请求前先做健康检查
+            session_factory: 自定义会话构造（参数为会话序号），会话需提供 submit/close
+        """
+        self.size = max(1, int(size))
+        if session_factory is None:
+            if self.size == 1:
+                session_factory = lambda _: _ThreadSession(_SessionCore(health_check_seconds=health_check_seconds))
+            else:
+                session_factory = lambda _: _ProcessSession(health_check_seconds)
+        self._sessions = [session_factory(i) for i in range(self.size)]
+        self._pending = [0] * self.size
+        self._lock = threading.Lock()
+
+    def _release(self, index: int):
+        with self._lock:
+            self._pending[index] -= 1
+
+    def submit(self, method: str, **kwargs) -> Future:
+        """提交 bs.<method>(**kwargs) 查询，返回 (行列表, 字段列表) 的 Future"""
+        with self._lock:
+            index = min(range(self.size), key=self._pending.__getitem__)
+            self._pending[index] += 1
+        try:
+            future = self._sessions[index].submit(method, kwargs)
+        except Exception:
+            self._release(index)
+            raise
+        future.add_done_callback(lambda _: self._release(index))
+        return future
+
+    def query_sync(self, method: str, **kwargs) -> QueryResult:
+        return self.submit(method, **kwargs).result()
+
+    async def query(self, method: str, **kwargs) -> QueryResult:
+        return await asyncio.wrap_future(self.submit(method, **kwargs))
+
+    def close(self):
+        for session in self._sessions:
+            try:
+                session.close()
+            except Exception as e:
+                logger.debug(f"关闭BaoStock会话失败: {e}")
+
+
+_session_pool: Optional[BaoStockSessionPool] = None
+_session_pool_lock = threading.Lock()
+
+
+def get_baostock_session_pool() -> BaoStockSessionPool:
+    """获取进程内共享的 BaoStock 会话池
+
+    TA_BAOSTOCK_SESSIONS 控制会话数（默认 1），TA_BAOSTOCK_HEALTH_CHECK_SECONDS 控制健康检查间隔。
+    """
+    global _session_pool
+    with _session_pool_lock:
+        if _session_pool is None:
+            from tradingagents.config.runtime_settings import get_float, get_int
+
+            size = get_int("TA_BAOSTOCK_SESSIONS", "ta_baostock_sessions", 1)
+            health_check = get_float("TA_BAOSTOCK_HEALTH_CHECK_SECONDS", "ta_baostock_health_check_seconds", 300.0)
+            _session_pool = BaoStockSessionPool(size, health_check)
+            atexit.register(_session_pool.close)
+            logger.info(f"🔧 BaoStock会话池已创建: {_session_pool.size}个会话")
+        return _session_pool
@@ -617,6 +617,63 @@ class TushareProvider(BaseStockDataProvider):
             self.logger.error(f"❌ 获取每日基础数据失败 trade_date={trade_date}: {e}")
             return None
     
+    async def get_trade_dates(self, start_date: Union[str, date], end_date: Union[str, date]) -> Optional[List[str]]:
+        """获取区间内的交易日（升序，YYYY-MM-DD）"""
+        if not self.is_available():
+            return None
+
+        try:
+            df = await asyncio.to_thread(
+                self.api.trade_cal,
+                exchange='SSE',
+                start_date=self._format_date(start_date),
+                end_date=self._format_date(end_date),
+                is_open='1'
+            )
+            if df is None or df.empty:
+                return []
+            dates = sorted(str(d) for d in df['cal_date'])
+            return [f"{d[:4]}-{d[4:6]}-{d[6:8]}" for d in dates]
+
+        except Exception as e:
+            self.logger.error(f"❌ 获取交易日历失败 {start_date}~{end_date}: {e}")
+            return None
+
+    async def get_market_daily(self, trade_date: Union[str, date]) -> Optional[pd.DataFrame]:
+        """获取某个交易日全市场的日线行情（未复权，一次调用）"""
+        if not self.is_available():
+            return None
+
+        try:
+            df = await asyncio.to_thread(self.api.daily, trade_date=self._format_date(trade_date))
+            if df is not None and not df.empty:
+                self.logger.info(f"✅ 获取全市场日线: {trade_date} {len(df)}条记录")
+                return df
+            return None
+
+        except Exception as e:
+            self.logger.error(f"❌ 获取全市场日线失败 trade_date={trade_date}: {e}")
+            return None
+
+    async def get_adj_factors(self, trade_date: Union[str, date]) -> Optional[pd.Series]:
+        """获取某个交易日全市场的复权因子（ts_code -> adj_factor）"""
+        if not self.is_available():
+            return None
+
+        try:
+            df = await asyncio.to_thread(
+                self.api.adj_factor,
+                trade_date=self._format_date(trade_date),
+                fields='ts_code,adj_factor'
+            )
+            if df is None or df.empty:
+                return None
+            return df.drop_duplicates('ts_code').set_index('ts_code')['adj_factor'].astype(float)
+
+        except Exception as e:
+            self.logger.error(f"❌ 获取复权因子失败 trade_date={trade_date}: {e}")
+            return None
+
     async def find_latest_trade_date(self) -> Optional[str]:
         """查找最新交易日期"""
         if not self.is_available():
@@ -649,8 +706,18 @@ class TushareProvider(BaseStockDataProvider):
             self.logger.error(f"❌ 查找最新交易日期失败: {e}")
             return None
     
+    # 财务报表：(数据集名称, 单只股票接口, 按报告期全市场接口, 中文名)
+    FINANCIAL_STATEMENTS = (
+        ("income_statement", "income", "income_vip", "利润表"),
+        ("balance_sheet", "balancesheet", "balancesheet_vip", "资产负债表"),
+        ("cashflow_statement", "cashflow", "cashflow_vip", "现金流量表"),
+        ("financial_indicators", "fina_indicator", "fina_indicator_vip", "财务指标"),
+        ("main_business", "fina_mainbz", None, "主营业务构成"),
+    )
+
     async def get_financial_data(self, symbol: str, report_type: str = "quarterly",
-                                period: str = None, limit: int = 4) -> Optional[Dict[str, Any]]:
+                                period: str = None, limit: int = 4,
+                                rate_limiter=None) -> Optional[Dict[str, Any]]:
         """
         获取财务数据
 
@@ -659,6 +726,7 @@ class TushareProvider(BaseStockDataProvider):
             report_type: 报告类型 (quarterly/annual)
             period: 指定报告期 (YYYYMMDD格式)，为空则获取最新数据
             limit: 获取记录数量，默认4条（最近4个季度）
+            rate_limiter: 可选的速率限制器（有 async acquire()），每次接口调用前获取
 
         Returns:
             财务数据字典，包含利润表、资产负债表、现金流量表和财务指标
@@ -670,87 +738,8 @@ class TushareProvider(BaseStockDataProvider):
             ts_code = self._normalize_ts_code(symbol)
             self.logger.debug(f"📊 获取Tushare财务数据: {ts_code}, 类型: {report_type}")
 
-            # 构建查询参数
-            query_params = {
-                'ts_code': ts_code,
-                'limit': limit
-            }
-
-            # 如果指定了报告期，添加期间参数
-            if period:
-                query_params['period'] = period
-
-            financial_data = {}
-
-            # 1. 获取利润表数据 (income statement)
-            try:
-                income_df = await asyncio.to_thread(
-                    self.api.income,
-                    **query_params
-                )
-                if income_df is not None and not income_df.empty:
-                    financial_data['income_statement'] = income_df.to_dict('records')
-                    self.logger.debug(f"✅ {ts_code} 利润表数据获取成功: {len(income_df)} 条记录")
-                else:
-                    self.logger.debug(f"⚠️ {ts_code} 利润表数据为空")
-            except Exception as e:
-                self.logger.warning(f"❌ 获取{ts_code}利润表数据失败: {e}")
-
-            # 2. 获取资产负债表数据 (balance sheet)
-            try:
-                balance_df = await asyncio.to_thread(
-                    self.api.balancesheet,
-                    **query_params
-                )
-                if balance_df is not None and not balance_df.empty:
-                    financial_data['balance_sheet'] = balance_df.to_dict('records')
-                    self.logger.debug(f"✅ {ts_code} 资产负债表数据获取成功: {len(balance_df)} 条记录")
-                else:
-                    self.logger.debug(f"⚠️ {ts_code} 资产负债表数据为空")
-            except Exception as e:
-                self.logger.warning(f"❌ 获取{ts_code}资产负债表数据失败: {e}")
-
-            # 3. 获取现金流量表数据 (cash flow statement)
-            try:
-                cashflow_df = await asyncio.to_thread(
-                    self.api.cashflow,
-                    **query_params
-                )
-                if cashflow_df is not None and not cashflow_df.empty:
-                    financial_data['cashflow_statement'] = cashflow_df.to_dict('records')
-                    self.logger.debug(f"✅ {ts_code} 现金流量表数据获取成功: {len(cashflow_df)} 条记录")
-                else:
-                    self.logger.debug(f"⚠️ {ts_code} 现金流量表数据为空")
-            except Exception as e:
-                self.logger.warning(f"❌ 获取{ts_code}现金流量表数据失败: {e}")
-
-            # 4. 获取财务指标数据 (financial indicators)
-            try:
-                indicator_df = await asyncio.to_thread(
-                    self.api.fina_indicator,
-                    **query_params
-                )
-                if indicator_df is not None and not indicator_df.empty:
-                    financial_data['financial_indicators'] = indicator_df.to_dict('records')
-                    self.logger.debug(f"✅ {ts_code} 财务指标数据获取成功: {len(indicator_df)} 条记录")
-                else:
-                    self.logger.debug(f"⚠️ {ts_code} 财务指标数据为空")
-            except Exception as e:
-                self.logger.warning(f"❌ 获取{ts_code}财务指标数据失败: {e}")
-
-            # 5. 获取主营业务构成数据 (可选)
-            try:
-                mainbz_df = await asyncio.to_thread(
-                    self.api.fina_mainbz,
-                    **query_params
-                )
-                if mainbz_df is not None and not mainbz_df.empty:
-                    financial_data['main_business'] = mainbz_df.to_dict('records')
-                    self.logger.debug(f"✅ {ts_code} 主营业务构成数据获取成功: {len(mainbz_df)} 条记录")
-                else:
-                    self.logger.debug(f"⚠️ {ts_code} 主营业务构成数据为空")
-            except Exception as e:
-                self.logger.debug(f"获取{ts_code}主营业务构成数据失败: {e}")  # 主营业务数据不是必需的，保持debug级别
+            financial_data = await self.get_financial_statements(symbol, period=period, limit=limit,
+                                                                 rate_limiter=rate_limiter)
 
             if financial_data:
                 # 标准化财务数据
@@ -765,6 +754,89 @@ class TushareProvider(BaseStockDataProvider):
             self.logger.error(f"❌ 获取Tushare财务数据失败 symbol={symbol}: {e}")
             return None
 
+    async def get_financial_statements(self, symbol: str, period: str = None, limit: int = 4,
+                                       rate_limiter=None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        并发获取一只股票的各类财务报表（原始记录，未标准化）
+
+        Args:
+            symbol: 股票代码
+            period: 指定报告期 (YYYYMMDD格式)，为空则获取最新数据
+            limit: 每类报表的记录数量
+            rate_limiter: 可选的速率限制器，每次接口调用前获取
+
+        Returns:
+            {数据集名称: 记录列表}，获取失败或为空的数据集不包含在内
+        """
+        if not self.is_available():
+            return {}
+
+        ts_code = self._normalize_ts_code(symbol)
+
+        # 构建查询参数
+        query_params = {
+            'ts_code': ts_code,
+            'limit': limit
+        }
+
+        # 如果指定了报告期，添加期间参数
+        if period:
+            query_params['period'] = period
+
+        async def fetch(key: str, api_name: str, label: str):
+            try:
+                if rate_limiter is not None:
+                    await rate_limiter.acquire()
+                df = await asyncio.to_thread(getattr(self.api, api_name), **query_params)
+                if df is not None and not df.empty:
+                    self.logger.debug(f"✅ {ts_code} {label}数据获取成功: {len(df)} 条记录")
+                    return key, df.to_dict('records')
+                self.logger.debug(f"⚠️ {ts_code} {label}数据为空")
+            except Exception as e:
+                if key == "main_business":
+                    # 主营业务数据不是必需的，保持debug级别
+                    self.logger.debug(f"获取{ts_code}{label}数据失败: {e}")
+                else:
+                    self.logger.warning(f"❌ 获取{ts_code}{label}数据失败: {e}")
+            return key, None
+
+        results = await asyncio.gather(*(
+            fetch(key, api_name, label) for key, api_name, _, label in self.FINANCIAL_STATEMENTS
+        ))
+        return {key: records for key, records in results if records}
+
+    async def get_financial_statements_by_period(self, period: str,
+                                                 rate_limiter=None) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        按报告期获取全部公司的财务报表（*_vip 接口，需要 5000 积分）
+
+        Args:
+            period: 报告期 (YYYYMMDD)
+            rate_limiter: 可选的速率限制器，每次接口调用前获取
+
+        Returns:
+            {数据集名称: DataFrame}；任一接口调用失败（如积分不足）时返回 None
+        """
+        if not self.is_available():
+            return None
+
+        async def fetch(key: str, api_name: str, label: str):
+            if rate_limiter is not None:
+                await rate_limiter.acquire()
+            df = await asyncio.to_thread(getattr(self.api, api_name), period=period)
+            self.logger.debug(f"✅ {period} 全市场{label}: {0 if df is None else len(df)} 条记录")
+            return key, df
+
+        try:
+            results = await asyncio.gather(*(
+                fetch(key, bulk_api, label)
+                for key, _, bulk_api, label in self.FINANCIAL_STATEMENTS if bulk_api
+            ))
+        except Exception as e:
+            self.logger.warning(f"⚠️ 按报告期获取财务报表失败 period={period}: {e}")
+            return None
+        return {key: df for key, df in results if df is not None and not df.empty}
+
     async def get_stock_news(self, symbol: str = None, limit: int = 10,
                            hours_back: int = 24, src: str = None) -> Optional[List[Dict[str, Any]]]:
         """
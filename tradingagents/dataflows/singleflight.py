@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+相同数据请求的合并（Single-flight）
+
+多个分析同时请求同一只股票的同一份数据时，只有一个调用者（leader）真正访问数据源，
+其余并发调用者等待并共享其结果，缓存也只写入一次。
+
+- 进程内：按规范化请求键合并同时发生的调用（线程间）；等待超时后各自回退为直接调用
+- 跨进程（可选）：通过 Redis 锁选出 leader，结果写入 Redis 并发布通知，
+  其他进程的调用者订阅通知后读取结果；leader 超时或失败时各自回退为直接调用
+"""
+
+import pickle
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+T = TypeVar("T")
+
+_LOCK_PREFIX = "ta:singleflight:lock:"
+_RESULT_PREFIX = "ta:singleflight:result:"
+_CHANNEL_PREFIX = "ta:singleflight:done:"
+
+# 释放锁时只删除自己持有的锁
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def make_key(kind: str, *parts: Any) -> str:
+    """规范化请求键：股票代码大写去空格，日期去掉分隔符，None 记为空"""
+    normalized = []
+    for part in parts:
+        if part is None:
+            normalized.append("")
+        else:
+            text = str(part).strip().upper()
+            if len(text) == 10 and text[4] == "-" and text[7] == "-":
+                text = text.replace("-", "")
+            normalized.append(text)
+    return ":".join([kind] + normalized)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """请求合并器
+
+    Args:
+        redis_client: 同步 Redis 客户端；为 None 时只在进程内合并
+        lock_ttl: 跨进程锁的有效期（秒），应大于一次数据获取的最长耗时
+        wait_timeout: 等待 leader（本进程或其他进程）结果的最长时间（秒），超时后自行获取
+        result_ttl: 结果在 Redis 中保留的时间（秒），只用于交接给等待中的进程
+    """
+
+    def __init__(self, redis_client=None, lock_ttl: float = 60.0, wait_timeout: float = 60.0,
+                 result_ttl: float = 30.0):
+        self.redis = redis_client
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._release_script = redis_client.register_script(_RELEASE_LUA) if redis_client is not None else None
+        self.stats = {"leaders": 0, "shared": 0, "remote_shared": 0, "wait_timeouts": 0}
+
+    def do(self, key: str, fn: Callable[[], T],
+           is_shareable: Callable[[Any], bool] = lambda result: True) -> Tuple[T, bool]:
+        """执行 fn，同一 key 的并发调用共享一次执行结果
+
+        Args:
+            key: 规范化请求键（见 make_key）
+            fn: 实际获取数据的无参函数
+            is_shareable: 判断结果是否可以通过 Redis 交给其他进程（错误结果不跨进程共享）
+
+        Returns:
+            (结果, 是否为共享结果)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            if not call.event.wait(self.wait_timeout):
+                # leader 卡住时不拖住所有等待方，各自直接获取（结果不再共享）
+                self.stats["wait_timeouts"] += 1
+                logger.warning(f"⚠️ [SingleFlight] 等待 {key} 超过 {self.wait_timeout}s，自行获取")
+                return fn(), False
+            self.stats["shared"] += 1
+            logger.debug(f"🔗 [SingleFlight] 共享进行中的请求结果: {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        self.stats["leaders"] += 1
+        shared = False
+        try:
+            if self.redis is not None:
+                call.result, shared = self._do_across_processes(key, fn, is_shareable)
+            else:
+                call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+            if call.waiters:
+                logger.info(f"🔗 [SingleFlight] {key} 合并了 {call.waiters} 个并发请求")
+        return call.result, shared
+
+    def _do_across_processes(self, key: str, fn: Callable[[], T],
+                             is_shareable: Callable[[Any], bool]) -> Tuple[T, bool]:
+        lock_key = _LOCK_PREFIX + key
+        token = uuid.uuid4().hex
+        try:
+            acquired = self.redis.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except Exception as e:
+            logger.warning(f"⚠️ [SingleFlight] Redis 不可用，仅进程内合并: {e}")
+            return fn(), False
+
+        if acquired:
+            try:
+                result = fn()
+                if is_shareable(result):
+                    self._publish(key, result)
+                return result, False
+            finally:
+                try:
+                    self._release_script(keys=[lock_key], args=[token])
+                except Exception:
+                    pass
+
+        result = self._wait_remote(key, lock_key)
+        if result is not _MISSING:
+            self.stats["remote_shared"] += 1
+            logger.debug(f"🔗 [SingleFlight] 共享其他进程的请求结果: {key}")
+            return result, True
+        return fn(), False
+
+    def _publish(self, key: str, result: Any):
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(_RESULT_PREFIX + key, pickle.dumps(result), px=int(self.result_ttl * 1000))
+            pipe.publish(_CHANNEL_PREFIX + key, b"1")
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ [SingleFlight] 发布结果失败: {e}")
+
+    def _wait_remote(self, key: str, lock_key: str) -> Any:
+        """等待其他进程的 leader 发布结果；leader 放弃（锁消失且无结果）或超时返回 _MISSING"""
+        pubsub = None
+        try:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(_CHANNEL_PREFIX + key)
+            deadline = time.monotonic() + self.wait_timeout
+            while True:
+                # 先订阅再检查结果，避免错过订阅之前发布的通知
+                payload = self.redis.get(_RESULT_PREFIX + key)
+                if payload is not None:
+                    return pickle.loads(payload)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.redis.exists(lock_key):
+                    return _MISSING
+                pubsub.get_message(timeout=min(remaining, 1.0))
+        except Exception as e:
+            logger.warning(f"⚠️ [SingleFlight] 等待其他进程结果失败: {e}")
+            return _MISSING
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+
+_MISSING = object()
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """获取全局请求合并器（TA_SINGLEFLIGHT_REDIS_ENABLED 开启且 Redis 可用时跨进程合并）"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                from tradingagents.config.runtime_settings import get_bool, get_float
+
+                redis_client = None
+                if get_bool("TA_SINGLEFLIGHT_REDIS_ENABLED", "ta_singleflight_redis_enabled", False):
+                    try:
+                        from tradingagents.config.database_manager import get_redis_client
+                        redis_client = get_redis_client()
+                    except Exception as e:
+                        logger.warning(f"⚠️ [SingleFlight] 获取 Redis 客户端失败，仅进程内合并: {e}")
+                wait_timeout = get_float("TA_SINGLEFLIGHT_WAIT_SECONDS", "ta_singleflight_wait_seconds", 60.0)
+                _single_flight = SingleFlight(redis_client, lock_ttl=wait_timeout, wait_timeout=wait_timeout)
+                logger.info(f"🔗 [SingleFlight] 请求合并已启用 (跨进程: {'✅' if redis_client is not None else '❌'})")
+    return _single_flight
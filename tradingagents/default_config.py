@@ -17,6 +17,8 @@ DEFAULT_CONFIG = {
     "max_debate_rounds": 1,
     "max_risk_discuss_rounds": 1,
     "max_recur_limit": 100,
+    # Graph settings - 分析师并行执行（各分析师独立消息作用域，汇合后进入研究辩论）
+    "parallel_analysts": os.getenv("PARALLEL_ANALYSTS_ENABLED", "false").lower() == "true",
     # Tool settings - 从环境变量读取，提供默认值
     "online_tools": os.getenv("ONLINE_TOOLS_ENABLED", "false").lower() == "true",
     "online_news": os.getenv("ONLINE_NEWS_ENABLED", "true").lower() == "true", 
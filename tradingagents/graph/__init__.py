@@ -1,6 +1,7 @@
 # TradingAgents/graph/__init__.py
 
 from .trading_graph import TradingAgentsGraph
+from .graph_pool import TradingGraphPool, get_trading_graph_pool
 from .conditional_logic import ConditionalLogic
 from .setup import GraphSetup
 from .propagation import Propagator
@@ -13,6 +14,8 @@ logger = get_logger("default")
 
 __all__ = [
     "TradingAgentsGraph",
+    "TradingGraphPool",
+    "get_trading_graph_pool",
     "ConditionalLogic",
     "GraphSetup",
     "Propagator",
@@ -0,0 +1,134 @@
+# TradingAgents/graph/graph_pool.py
+"""
+TradingAgentsGraph 复用池
+
+构造 TradingAgentsGraph 需要创建 LLM 客户端、记忆库、工具节点并编译 LangGraph，
+每个分析任务都重新构造会带来明显的启动延迟。propagate 的运行状态都是局部变量，
+编译后的图与客户端可以在相同配置的并发任务之间共享，因此按配置缓存实例：
+
+- 键为 (分析师列表, debug, 完整配置) 的摘要，模型、研究深度、厂家地址不同即为不同实例
+- 同一个键并发请求时只构造一次，其余请求等待并复用
+- 超过容量时淘汰最久未使用的实例
+"""
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from tradingagents.utils.logging_init import get_logger
+
+logger = get_logger("agents")
+
+
+def _default_factory(selected_analysts: List[str], debug: bool, config: Dict[str, Any]):
+    from .trading_graph import TradingAgentsGraph
+
+    return TradingAgentsGraph(selected_analysts=selected_analysts, debug=debug, config=config)
+
+
+class TradingGraphPool:
+    """按配置缓存 TradingAgentsGraph 实例（线程安全）"""
+
+    def __init__(self, max_size: int = 8, factory: Optional[Callable[..., Any]] = None):
+        """
+        Args:
+            max_size: 最多缓存的实例数，超过后淘汰最久未使用的实例
+            factory: 实例构造函数 factory(selected_analysts, debug, config)，默认构造 TradingAgentsGraph
+        """
+        self.max_size = max(1, int(max_size))
+        self._factory = factory or _default_factory
+        self._graphs: "OrderedDict[str, Any]" = OrderedDict()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(selected_analysts: Sequence[str], config: Dict[str, Any], debug: bool = False) -> str:
+        """计算缓存键；使用摘要而不是原始配置，避免 API Key 出现在键和日志中"""
+        payload = json.dumps(
+            {"analysts": list(selected_analysts), "debug": bool(debug), "config": config},
+            sort_keys=True,
+            default=str,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, selected_analysts: Sequence[str], config: Dict[str, Any], debug: bool = False):
+        """获取与配置对应的实例，不存在时构造"""
+        selected_analysts = list(selected_analysts)
+        key = self.make_key(selected_analysts, config, debug)
+
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+                self.hits += 1
+                return graph
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                graph = self._graphs.get(key)
+                if graph is not None:
+                    # 等待期间已由其他线程构造完成
+                    self._graphs.move_to_end(key)
+                    self.hits += 1
+                    return graph
+
+            logger.info(f"🔧 [图复用池] 构造新的TradingAgents实例: 分析师={selected_analysts}, 键={key[:12]}")
+            # 使用配置副本，调用方之后修改配置不会影响缓存的实例
+            graph = self._factory(selected_analysts, debug, copy.deepcopy(config))
+
+            with self._lock:
+                self.misses += 1
+                self._graphs[key] = graph
+                self._build_locks.pop(key, None)
+                while len(self._graphs) > self.max_size:
+                    evicted_key, _ = self._graphs.popitem(last=False)
+                    self.evictions += 1
+                    logger.info(f"🗑️ [图复用池] 淘汰最久未使用的实例: 键={evicted_key[:12]}")
+        return graph
+
+    def clear(self):
+        """清空缓存（如 LLM 配置变更后）"""
+        with self._lock:
+            self._graphs.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._graphs),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._graphs)
+
+
+_graph_pool: Optional[TradingGraphPool] = None
+_graph_pool_lock = threading.Lock()
+
+
+def get_trading_graph_pool() -> TradingGraphPool:
+    """获取进程内共享的 TradingAgentsGraph 复用池
+
+    TA_GRAPH_POOL_SIZE 控制最多缓存的实例数（默认 8）。
+    """
+    global _graph_pool
+    with _graph_pool_lock:
+        if _graph_pool is None:
+            from tradingagents.config.runtime_settings import get_int
+
+            size = get_int("TA_GRAPH_POOL_SIZE", "ta_graph_pool_size", 8)
+            _graph_pool = TradingGraphPool(size)
+            logger.info(f"🔧 [图复用池] 已创建: 最多缓存{_graph_pool.max_size}个实例")
+        return _graph_pool
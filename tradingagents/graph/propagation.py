@@ -51,13 +51,24 @@ class Propagator:
             "news_report": "",
         }
 
-    def get_graph_args(self, use_progress_callback: bool = False) -> Dict[str, Any]:
+    def get_graph_args(self, use_progress_callback: bool = False, stream_tokens: bool = False) -> Dict[str, Any]:
         """Get arguments for the graph invocation.
 
         Args:
             use_progress_callback: If True, use 'updates' mode for node-level progress tracking.
                                   If False, use 'values' mode for complete state updates.
+            stream_tokens: If True, additionally stream LLM tokens ('messages' mode). Chunks are
+                           then (namespace, mode, payload) tuples, including those from the
+                           analyst subgraphs.
         """
+        if stream_tokens:
+            # 'messages' 模式逐 token 输出 LLM 内容；分析师并行分支是子图，需要 subgraphs=True
+            return {
+                "stream_mode": ["updates", "messages"],
+                "subgraphs": True,
+                "config": {"recursion_limit": self.max_recur_limit},
+            }
+
         # 使用 'updates' 模式可以获取节点级别的更新，用于进度跟踪
         # 使用 'values' 模式可以获取完整的状态更新
         stream_mode = "updates" if use_progress_callback else "values"
@@ -16,6 +16,15 @@ from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
 
+# 分析师类型 -> (报告字段, 工具调用计数字段)，并行模式下每个分支只回写这两个字段
+ANALYST_STATE_KEYS = {
+    "market": ("market_report", "market_tool_call_count"),
+    "social": ("sentiment_report", "sentiment_tool_call_count"),
+    "news": ("news_report", "news_tool_call_count"),
+    "fundamentals": ("fundamentals_report", "fundamentals_tool_call_count"),
+}
+
+
 class GraphSetup:
     """Handles the setup and configuration of the agent graph."""
 
@@ -159,14 +168,6 @@ class GraphSetup:
         # Create workflow
         workflow = StateGraph(AgentState)
 
-        # Add analyst nodes to the graph
-        for analyst_type, node in analyst_nodes.items():
-            workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
-            workflow.add_node(
-                f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
-            )
-            workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
-
         # Add other nodes
         workflow.add_node("Bull Researcher", bull_researcher_node)
         workflow.add_node("Bear Researcher", bear_researcher_node)
@@ -178,30 +179,49 @@ class GraphSetup:
         workflow.add_node("Risk Judge", risk_manager_node)
 
         # Define edges
-        # Start with the first analyst
-        first_analyst = selected_analysts[0]
-        workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
-
-        # Connect analysts in sequence
-        for i, analyst_type in enumerate(selected_analysts):
-            current_analyst = f"{analyst_type.capitalize()} Analyst"
-            current_tools = f"tools_{analyst_type}"
-            current_clear = f"Msg Clear {analyst_type.capitalize()}"
-
-            # Add conditional edges for current analyst
-            workflow.add_conditional_edges(
-                current_analyst,
-                getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
-                [current_tools, current_clear],
-            )
-            workflow.add_edge(current_tools, current_analyst)
-
-            # Connect to next analyst or to Bull Researcher if this is the last analyst
-            if i < len(selected_analysts) - 1:
-                next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
-                workflow.add_edge(current_clear, next_analyst)
-            else:
-                workflow.add_edge(current_clear, "Bull Researcher")
+        if self.config.get("parallel_analysts", False):
+            # 并行模式：每个分析师作为独立分支，全部完成后汇合到 Bull Researcher
+            logger.info(f"🔀 [并行分析师] 启用并行模式: {selected_analysts}")
+            branch_names = []
+            for analyst_type in selected_analysts:
+                branch_name = f"{analyst_type.capitalize()} Analyst"
+                workflow.add_node(
+                    branch_name,
+                    self._create_analyst_branch(
+                        analyst_type,
+                        analyst_nodes[analyst_type],
+                        delete_nodes[analyst_type],
+                        tool_nodes[analyst_type],
+                    ),
+                )
+                workflow.add_edge(START, branch_name)
+                branch_names.append(branch_name)
+
+            workflow.add_edge(branch_names, "Bull Researcher")
+        else:
+            # Add analyst nodes to the graph
+            for analyst_type, node in analyst_nodes.items():
+                workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
+                workflow.add_node(
+                    f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
+                )
+                workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
+
+            # Start with the first analyst
+            first_analyst = selected_analysts[0]
+            workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
+
+            # Connect analysts in sequence
+            for i, analyst_type in enumerate(selected_analysts):
+                current_clear = f"Msg Clear {analyst_type.capitalize()}"
+                self._add_analyst_loop_edges(workflow, analyst_type)
+
+                # Connect to next analyst or to Bull Researcher if this is the last analyst
+                if i < len(selected_analysts) - 1:
+                    next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
+                    workflow.add_edge(current_clear, next_analyst)
+                else:
+                    workflow.add_edge(current_clear, "Bull Researcher")
 
         # Add remaining edges
         workflow.add_conditional_edges(
@@ -251,3 +271,54 @@ class GraphSetup:
 
         # Compile and return
         return workflow.compile()
+
+    def _add_analyst_loop_edges(self, workflow: StateGraph, analyst_type: str):
+        """为单个分析师添加 分析师 -> 工具 -> 分析师 的循环边"""
+        current_analyst = f"{analyst_type.capitalize()} Analyst"
+        current_tools = f"tools_{analyst_type}"
+        current_clear = f"Msg Clear {analyst_type.capitalize()}"
+
+        workflow.add_conditional_edges(
+            current_analyst,
+            getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+            [current_tools, current_clear],
+        )
+        workflow.add_edge(current_tools, current_analyst)
+
+    def _create_analyst_branch(self, analyst_type: str, analyst_node, delete_node, tool_node):
+        """创建并行模式下的分析师分支节点
+
+        每个分支是一个独立编译的子图（分析师 + 工具 + 消息清理），拥有自己的消息作用域，
+        只把报告和工具调用计数写回主图，避免多个分支并发修改同一个 messages 通道。
+
+        Args:
+            analyst_type: 分析师类型（market/social/news/fundamentals）
+            analyst_node: 分析师节点函数
+            delete_node: 消息清理节点函数
+            tool_node: 工具节点
+
+        Returns:
+            可作为主图节点的函数
+        """
+        report_key, count_key = ANALYST_STATE_KEYS[analyst_type]
+        analyst_name = f"{analyst_type.capitalize()} Analyst"
+
+        branch = StateGraph(AgentState)
+        branch.add_node(analyst_name, analyst_node)
+        branch.add_node(f"Msg Clear {analyst_type.capitalize()}", delete_node)
+        branch.add_node(f"tools_{analyst_type}", tool_node)
+        branch.add_edge(START, analyst_name)
+        self._add_analyst_loop_edges(branch, analyst_type)
+        branch.add_edge(f"Msg Clear {analyst_type.capitalize()}", END)
+        compiled_branch = branch.compile()
+
+        def analyst_branch_node(state, config):
+            logger.info(f"🔀 [并行分析师] 分支开始: {analyst_name}")
+            result = compiled_branch.invoke(dict(state), config)
+            logger.info(f"🔀 [并行分析师] 分支完成: {analyst_name}")
+            return {
+                report_key: result.get(report_key, ""),
+                count_key: result.get(count_key, 0),
+            }
+
+        return analyst_branch_node
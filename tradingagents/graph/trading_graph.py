@@ -1,12 +1,13 @@
 # TradingAgents/graph/trading_graph.py
 
 import os
+import threading
 from pathlib import Path
 import json
 from datetime import date
 from typing import Dict, Any, Tuple, List, Optional
-import time
 
+from langchain_core.messages import AIMessageChunk
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -30,6 +31,7 @@ from tradingagents.agents.utils.agent_states import (
     RiskDebateState,
 )
 from tradingagents.dataflows.interface import set_config
+from tradingagents.utils.tracing import AnalysisTrace, TraceCallbackHandler, activate_trace
 
 from .conditional_logic import ConditionalLogic
 from .setup import GraphSetup
@@ -804,9 +806,12 @@ class TradingAgentsGraph:
         self.signal_processor = SignalProcessor(self.quick_thinking_llm)
 
         # State tracking
+        # propagate 的运行状态都是局部变量，同一实例可被并发任务共享（见 graph_pool）；
+        # curr_state / ticker 只记录最近一次运行，供单线程使用的 reflect_and_remember 兼容旧用法
         self.curr_state = None
         self.ticker = None
-        self.log_states_dict = {}  # date to full state dict
+        self.log_states_dict = {}  # ticker -> {date: full state dict}
+        self._log_states_lock = threading.Lock()
 
         # Set up the graph
         self.graph = self.graph_setup.setup_graph(selected_analysts)
@@ -869,14 +874,31 @@ class TradingAgentsGraph:
             ),
         }
 
-    def propagate(self, company_name, trade_date, progress_callback=None, task_id=None):
+    def activate_config(self):
+        """把本实例的配置重新应用到进程级配置（dataflows 接口与 Toolkit）
+
+        构造时会设置这两处；复用实例时其他配置的实例可能已经覆盖了它们。
+        这两处配置是进程级的，不同配置的实例并发运行时会在运行途中互相覆盖。
+        """
+        set_config(self.config)
+        self.toolkit.update_config(self.config)
+
+    def propagate(self, company_name, trade_date, progress_callback=None, task_id=None, stream_callback=None):
         """Run the trading agents graph for a company on a specific date.
 
+        Per-run state (ticker, trade date, task id, final state) lives in local
+        variables and is returned to the caller, so concurrent calls on a shared
+        instance keep their own state. The dataflow and Toolkit config applied by
+        activate_config() is process-wide, though: concurrent runs are only safe
+        when every running instance uses the same config.
+
         Args:
             company_name: Company name or stock symbol
             trade_date: Date for analysis
             progress_callback: Optional callback function for progress updates
             task_id: Optional task ID for tracking performance data
+            stream_callback: Optional callback(node_name, delta_text) receiving LLM output
+                             incrementally while the reports are being generated
         """
 
         # 添加详细的接收日志
@@ -885,8 +907,7 @@ class TradingAgentsGraph:
         logger.debug(f"🔍 [GRAPH DEBUG] 接收到的trade_date: '{trade_date}' (类型: {type(trade_date)})")
         logger.debug(f"🔍 [GRAPH DEBUG] 接收到的task_id: '{task_id}'")
 
-        self.ticker = company_name
-        logger.debug(f"🔍 [GRAPH DEBUG] 设置self.ticker: '{self.ticker}'")
+        self.activate_config()
 
         # Initialize state
         logger.debug(f"🔍 [GRAPH DEBUG] 创建初始状态，传递参数: company_name='{company_name}', trade_date='{trade_date}'")
@@ -896,126 +917,60 @@ class TradingAgentsGraph:
         logger.debug(f"🔍 [GRAPH DEBUG] 初始状态中的company_of_interest: '{init_agent_state.get('company_of_interest', 'NOT_FOUND')}'")
         logger.debug(f"🔍 [GRAPH DEBUG] 初始状态中的trade_date: '{init_agent_state.get('trade_date', 'NOT_FOUND')}'")
 
-        # 初始化计时器
-        node_timings = {}  # 记录每个节点的执行时间
-        total_start_time = time.time()  # 总体开始时间
-        current_node_start = None  # 当前节点开始时间
-        current_node_name = None  # 当前节点名称
-
-        # 保存task_id用于后续保存性能数据
-        self._current_task_id = task_id
-
-        # 根据是否有进度回调选择不同的stream_mode
-        args = self.propagator.get_graph_args(use_progress_callback=bool(progress_callback))
-
-        if self.debug:
-            # Debug mode with tracing and progress updates
-            trace = []
-            final_state = None
-            for chunk in self.graph.stream(init_agent_state, **args):
-                # 记录节点计时
-                for node_name in chunk.keys():
-                    if not node_name.startswith('__'):
-                        # 如果有上一个节点，记录其结束时间
-                        if current_node_name and current_node_start:
-                            elapsed = time.time() - current_node_start
-                            node_timings[current_node_name] = elapsed
-                            logger.info(f"⏱️ [{current_node_name}] 耗时: {elapsed:.2f}秒")
-
-                        # 开始新节点计时
-                        current_node_name = node_name
-                        current_node_start = time.time()
-                        break
-
-                # 在 updates 模式下，chunk 格式为 {node_name: state_update}
-                # 在 values 模式下，chunk 格式为完整的状态
-                if progress_callback and args.get("stream_mode") == "updates":
-                    # updates 模式：chunk = {"Market Analyst": {...}}
-                    self._send_progress_update(chunk, progress_callback)
-                    # 累积状态更新
-                    if final_state is None:
-                        final_state = init_agent_state.copy()
-                    for node_name, node_update in chunk.items():
-                        if not node_name.startswith('__'):
-                            final_state.update(node_update)
-                else:
-                    # values 模式：chunk = {"messages": [...], ...}
-                    if len(chunk.get("messages", [])) > 0:
-                        chunk["messages"][-1].pretty_print()
-                    trace.append(chunk)
-                    final_state = chunk
-
-            if not trace and final_state:
-                # updates 模式下，使用累积的状态
-                pass
-            elif trace:
-                final_state = trace[-1]
-        else:
-            # Standard mode without tracing but with progress updates
-            if progress_callback:
-                # 使用 updates 模式以便获取节点级别的进度
-                trace = []
+        # 初始化链路追踪：节点、LLM、工具和数据源调用都会记录为 span
+        trace = AnalysisTrace(trace_id=task_id)
+        trace_handler = TraceCallbackHandler(trace)
+
+        # 根据是否有进度回调选择不同的stream_mode；需要流式输出时同时订阅 LLM token
+        args = self.propagator.get_graph_args(
+            use_progress_callback=bool(progress_callback), stream_tokens=stream_callback is not None
+        )
+        args["config"] = {**args["config"], "callbacks": [trace_handler]}
+
+        with activate_trace(trace):
+            if stream_callback is not None:
+                # 流式模式：节点更新用于进度和状态累积，LLM 增量文本转发给 stream_callback
+                final_state = self._stream_graph_updates(init_agent_state, args, progress_callback, stream_callback)
+            elif self.debug:
+                # Debug mode with tracing and progress updates
+                trace_chunks = []
                 final_state = None
                 for chunk in self.graph.stream(init_agent_state, **args):
-                    # 记录节点计时
-                    for node_name in chunk.keys():
-                        if not node_name.startswith('__'):
-                            # 如果有上一个节点，记录其结束时间
-                            if current_node_name and current_node_start:
-                                elapsed = time.time() - current_node_start
-                                node_timings[current_node_name] = elapsed
-                                logger.info(f"⏱️ [{current_node_name}] 耗时: {elapsed:.2f}秒")
-                                logger.info(f"🔍 [TIMING] 节点切换: {current_node_name} → {node_name}")
-
-                            # 开始新节点计时
-                            current_node_name = node_name
-                            current_node_start = time.time()
-                            logger.info(f"🔍 [TIMING] 开始计时: {node_name}")
-                            break
-
-                    self._send_progress_update(chunk, progress_callback)
-                    # 累积状态更新
-                    if final_state is None:
-                        final_state = init_agent_state.copy()
-                    for node_name, node_update in chunk.items():
-                        if not node_name.startswith('__'):
-                            final_state.update(node_update)
+                    # 在 updates 模式下，chunk 格式为 {node_name: state_update}
+                    # 在 values 模式下，chunk 格式为完整的状态
+                    if progress_callback and args.get("stream_mode") == "updates":
+                        # updates 模式：chunk = {"Market Analyst": {...}}
+                        self._send_progress_update(chunk, progress_callback)
+                        # 累积状态更新
+                        if final_state is None:
+                            final_state = init_agent_state.copy()
+                        for node_name, node_update in chunk.items():
+                            if not node_name.startswith('__'):
+                                final_state.update(node_update)
+                    else:
+                        # values 模式：chunk = {"messages": [...], ...}
+                        if len(chunk.get("messages", [])) > 0:
+                            chunk["messages"][-1].pretty_print()
+                        trace_chunks.append(chunk)
+                        final_state = chunk
+
+                if trace_chunks:
+                    final_state = trace_chunks[-1]
             else:
-                # 原有的invoke模式（也需要计时）
-                logger.info("⏱️ 使用 invoke 模式执行分析（无进度回调）")
-                # 使用stream模式以便计时，但不发送进度更新
-                trace = []
-                final_state = None
-                for chunk in self.graph.stream(init_agent_state, **args):
-                    # 记录节点计时
-                    for node_name in chunk.keys():
-                        if not node_name.startswith('__'):
-                            # 如果有上一个节点，记录其结束时间
-                            if current_node_name and current_node_start:
-                                elapsed = time.time() - current_node_start
-                                node_timings[current_node_name] = elapsed
-                                logger.info(f"⏱️ [{current_node_name}] 耗时: {elapsed:.2f}秒")
-
-                            # 开始新节点计时
-                            current_node_name = node_name
-                            current_node_start = time.time()
-                            break
-
-                    # 累积状态更新
-                    if final_state is None:
-                        final_state = init_agent_state.copy()
-                    for node_name, node_update in chunk.items():
-                        if not node_name.startswith('__'):
-                            final_state.update(node_update)
-
-        # 记录最后一个节点的时间
-        if current_node_name and current_node_start:
-            elapsed = time.time() - current_node_start
-            node_timings[current_node_name] = elapsed
-            logger.info(f"⏱️ [{current_node_name}] 耗时: {elapsed:.2f}秒")
-
-        # 计算总时间
-        total_elapsed = time.time() - total_start_time
+                # Standard mode without tracing but with progress updates
+                if progress_callback:
+                    # 使用 updates 模式以便获取节点级别的进度
+                    final_state = self._stream_graph_updates(init_agent_state, args, progress_callback)
+                else:
+                    # 原有的invoke模式
+                    logger.info("⏱️ 使用 invoke 模式执行分析（无进度回调）")
+                    final_state = self.graph.invoke(init_agent_state, **args)
+
+        trace.finish()
+
+        # 节点耗时来自 span（按节点真实起止时间计算，并发分支不会互相干扰）
+        node_timings = trace.node_timings()
+        total_elapsed = trace.duration
 
         # 调试日志
         logger.info(f"🔍 [TIMING DEBUG] 节点计时数量: {len(node_timings)}")
@@ -1023,21 +978,22 @@ class TradingAgentsGraph:
         logger.info(f"🔍 [TIMING DEBUG] 节点列表: {list(node_timings.keys())}")
 
         # 打印详细的时间统计
-        logger.info("🔍 [TIMING DEBUG] 准备调用 _print_timing_summary")
-        self._print_timing_summary(node_timings, total_elapsed)
-        logger.info("🔍 [TIMING DEBUG] _print_timing_summary 调用完成")
+        trace_summary = trace.summary()
+        self._print_timing_summary(node_timings, total_elapsed, trace_summary)
 
         # 构建性能数据
-        performance_data = self._build_performance_data(node_timings, total_elapsed)
+        performance_data = self._build_performance_data(node_timings, total_elapsed, trace_summary)
 
-        # 将性能数据添加到状态中
+        # 将性能数据和完整 span 链路添加到状态中（随任务一起保存）
         final_state['performance_metrics'] = performance_data
+        final_state['analysis_trace'] = trace.export()
 
-        # Store current state for reflection
+        # Store current state for reflection（仅记录最近一次运行）
+        self.ticker = company_name
         self.curr_state = final_state
 
         # Log state
-        self._log_state(trade_date, final_state)
+        self._log_state(trade_date, final_state, company_name)
 
         # 获取模型信息
         model_info = ""
@@ -1056,6 +1012,55 @@ class TradingAgentsGraph:
         # Return decision and processed signal
         return final_state, decision
 
+    def _stream_graph_updates(self, init_agent_state, args, progress_callback=None, stream_callback=None):
+        """以 updates 模式执行图并累积状态更新
+
+        stream_callback 不为空时 args 同时订阅了 messages 模式（含子图），chunk 为
+        (namespace, mode, payload)：messages 负载转发给 stream_callback；子图内部的 updates
+        会在分支结束时作为主图节点的更新再出现一次，这里直接跳过。
+        """
+        final_state = init_agent_state.copy()
+        for chunk in self.graph.stream(init_agent_state, **args):
+            if stream_callback is not None:
+                namespace, mode, payload = chunk
+                if mode == "messages":
+                    self._forward_llm_delta(payload, stream_callback)
+                    continue
+                if namespace:
+                    continue
+                chunk = payload
+
+            if progress_callback:
+                self._send_progress_update(chunk, progress_callback)
+            # 累积状态更新
+            for node_name, node_update in chunk.items():
+                if not node_name.startswith('__') and node_update:
+                    final_state.update(node_update)
+        return final_state
+
+    @staticmethod
+    def _forward_llm_delta(payload, stream_callback):
+        """把 messages 模式的一条 (消息, 元数据) 转成 stream_callback(节点名, 增量文本)"""
+        message, metadata = payload
+        # 只转发 LLM 流式输出的消息块；节点返回的完整消息（报告可能已在流式阶段输出过）不重复推送
+        if not isinstance(message, AIMessageChunk):
+            return
+        content = message.content
+        if isinstance(content, list):
+            content = "".join(
+                part if isinstance(part, str) else part.get("text", "")
+                for part in content
+                if isinstance(part, (str, dict))
+            )
+        if not content:
+            return
+        node_name = (metadata or {}).get("langgraph_node") or "unknown"
+        try:
+            stream_callback(node_name, content)
+        except Exception as e:
+            # 流式推送失败不影响分析本身
+            logger.warning(f"⚠️ [流式输出] 回调失败: {e}")
+
     def _send_progress_update(self, chunk, progress_callback):
         """发送进度更新到回调函数
 
@@ -1141,12 +1146,14 @@ class TradingAgentsGraph:
         except Exception as e:
             logger.error(f"❌ 进度更新失败: {e}", exc_info=True)
 
-    def _build_performance_data(self, node_timings: Dict[str, float], total_elapsed: float) -> Dict[str, Any]:
+    def _build_performance_data(self, node_timings: Dict[str, float], total_elapsed: float,
+                                trace_summary: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """构建性能数据结构
 
         Args:
             node_timings: 每个节点的执行时间字典
-            total_elapsed: 总执行时间
+            total_elapsed: 总执行时间（墙钟时间，并行模式下可能小于节点耗时之和）
+            trace_summary: AnalysisTrace.summary() 的结果（LLM/工具/数据源/缓存统计）
 
         Returns:
             性能数据字典
@@ -1243,15 +1250,20 @@ class TradingAgentsGraph:
                 "provider": self.config.get('llm_provider', 'unknown'),
                 "deep_think_model": self.config.get('deep_think_llm', 'unknown'),
                 "quick_think_model": self.config.get('quick_think_llm', 'unknown')
-            }
+            },
+            # 各节点的 LLM 响应缓存命中率（启用 TA_LLM_CACHE_ENABLED 时才有数据）
+            "llm_cache": (trace_summary or {}).get("llm_cache", {}),
+            "trace_summary": trace_summary or {}
         }
 
-    def _print_timing_summary(self, node_timings: Dict[str, float], total_elapsed: float):
+    def _print_timing_summary(self, node_timings: Dict[str, float], total_elapsed: float,
+                              trace_summary: Optional[Dict[str, Any]] = None):
         """打印详细的时间统计报告
 
         Args:
             node_timings: 每个节点的执行时间字典
             total_elapsed: 总执行时间
+            trace_summary: AnalysisTrace.summary() 的结果（可选）
         """
         logger.info("🔍 [_print_timing_summary] 方法被调用")
         logger.info("🔍 [_print_timing_summary] node_timings 数量: " + str(len(node_timings)))
@@ -1325,6 +1337,21 @@ class TradingAgentsGraph:
             fastest_node = min(node_timings.items(), key=lambda x: x[1])
             logger.info(f"⚡ 最快节点: {fastest_node[0]} ({fastest_node[1]:.2f}秒)")
 
+        # 打印 span 链路汇总：区分 LLM、工具、数据源和缓存耗时
+        if trace_summary:
+            logger.info("\n🧭 链路汇总:")
+            for kind, stats in trace_summary.get("by_kind", {}).items():
+                logger.info(f"  • {kind:12s} 次数={stats['count']:4d}  累计={stats['total_time']:8.2f}秒  错误={stats['errors']}")
+            tokens = trace_summary.get("llm_tokens", {})
+            logger.info(f"  • LLM tokens: 输入={tokens.get('input_tokens', 0)}, 输出={tokens.get('output_tokens', 0)}")
+            cache = trace_summary.get("cache", {})
+            logger.info(f"  • 缓存: 命中={cache.get('hits', 0)}, 未命中={cache.get('misses', 0)}")
+            for node, stats in trace_summary.get("llm_cache", {}).items():
+                logger.info(f"  • LLM缓存 {node}: 命中={stats['hits']}, 未命中={stats['misses']}, "
+                            f"命中率={stats['hit_rate']:.0%}")
+            for source, stats in trace_summary.get("data_sources", {}).items():
+                logger.info(f"  • 数据源 {source:10s} 次数={stats['count']:3d}  累计={stats['total_time']:7.2f}秒  最大={stats['max_time']:6.2f}秒")
+
         # 打印LLM配置信息
         logger.info(f"\n🤖 LLM配置:")
         logger.info(f"  • 提供商: {self.config.get('llm_provider', 'unknown')}")
@@ -1332,9 +1359,10 @@ class TradingAgentsGraph:
         logger.info(f"  • 快速思考模型: {self.config.get('quick_think_llm', 'unknown')}")
         logger.info("=" * 80)
 
-    def _log_state(self, trade_date, final_state):
+    def _log_state(self, trade_date, final_state, ticker=None):
         """Log the final state to a JSON file."""
-        self.log_states_dict[str(trade_date)] = {
+        ticker = ticker or final_state["company_of_interest"]
+        entry = {
             "company_of_interest": final_state["company_of_interest"],
             "trade_date": final_state["trade_date"],
             "market_report": final_state["market_report"],
@@ -1365,31 +1393,36 @@ class TradingAgentsGraph:
         }
 
         # Save to file
-        directory = Path(f"eval_results/{self.ticker}/TradingAgentsStrategy_logs/")
-        directory.mkdir(parents=True, exist_ok=True)
+        directory = Path(f"eval_results/{ticker}/TradingAgentsStrategy_logs/")
+        with self._log_states_lock:
+            states = self.log_states_dict.setdefault(ticker, {})
+            states[str(trade_date)] = entry
+            directory.mkdir(parents=True, exist_ok=True)
+            with open(directory / "full_states_log.json", "w") as f:
+                json.dump(states, f, indent=4)
 
-        with open(
-            f"eval_results/{self.ticker}/TradingAgentsStrategy_logs/full_states_log.json",
-            "w",
-        ) as f:
-            json.dump(self.log_states_dict, f, indent=4)
+    def reflect_and_remember(self, returns_losses, final_state=None):
+        """Reflect on decisions and update memory based on returns.
 
-    def reflect_and_remember(self, returns_losses):
-        """Reflect on decisions and update memory based on returns."""
+        Args:
+            returns_losses: Realized returns of the decision
+            final_state: State returned by propagate; defaults to the most recent run
+        """
+        state = final_state if final_state is not None else self.curr_state
         self.reflector.reflect_bull_researcher(
-            self.curr_state, returns_losses, self.bull_memory
+            state, returns_losses, self.bull_memory
         )
         self.reflector.reflect_bear_researcher(
-            self.curr_state, returns_losses, self.bear_memory
+            state, returns_losses, self.bear_memory
         )
         self.reflector.reflect_trader(
-            self.curr_state, returns_losses, self.trader_memory
+            state, returns_losses, self.trader_memory
         )
         self.reflector.reflect_invest_judge(
-            self.curr_state, returns_losses, self.invest_judge_memory
+            state, returns_losses, self.invest_judge_memory
         )
         self.reflector.reflect_risk_manager(
-            self.curr_state, returns_losses, self.risk_manager_memory
+            state, returns_losses, self.risk_manager_memory
         )
 
     def process_signal(self, full_signal, stock_symbol=None):
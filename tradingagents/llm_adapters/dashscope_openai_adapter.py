@@ -5,11 +5,15 @@
 """
 
 import os
-from typing import Any, Dict, List, Optional, Union, Sequence
+from typing import Any, Dict, Iterator, List, Optional, Union, Sequence
 from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk
 from langchain_core.tools import BaseTool
 from pydantic import Field, SecretStr
 from ..config.config_manager import token_tracker
+from .response_cache import cached_stream, get_llm_response_cache, make_cache_key
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -99,42 +103,77 @@ class ChatDashScopeOpenAI(ChatOpenAI):
         api_base = getattr(self, 'base_url', None) or getattr(self, 'openai_api_base', None) or kwargs.get('base_url', 'unknown')
         logger.info(f"   API Base: {api_base}")
     
-    def _generate(self, *args, **kwargs):
-        """重写生成方法，添加 token 使用量追踪"""
-        
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs):
+        """重写生成方法，添加响应缓存和 token 使用量追踪"""
+
+        # LLM 响应缓存（默认关闭）：相同请求直接返回缓存的响应
+        response_cache = get_llm_response_cache()
+        cache_key = None
+        if response_cache is not None:
+            cache_key = make_cache_key("dashscope", self.model_name, self.temperature, messages, stop, kwargs)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         # 调用父类的生成方法
-        result = super()._generate(*args, **kwargs)
+        result = super()._generate(messages, stop, run_manager, **kwargs)
         
         # 追踪 token 使用量
+        self._track_usage(result, messages, kwargs)
+
+        if cache_key:
+            response_cache.put(cache_key, result)
+        
+        return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        """流式生成（LangGraph stream_mode="messages" 时使用），同样经过响应缓存并追踪 token 使用量
+
+        兼容模式的地址不会默认开启 stream_usage，这里显式开启，最后一个块才会带 token 用量。
+        """
+        parent_stream = super()._stream
+        stream_kwargs = {"stream_usage": True, **kwargs}
+        return cached_stream(
+            "dashscope", self.model_name, self.temperature, messages, stop, kwargs,
+            lambda: parent_stream(messages, stop, run_manager, **stream_kwargs),
+            lambda result: self._track_usage(result, messages, kwargs),
+        )
+
+    def _track_usage(self, result, messages: List[BaseMessage], kwargs: Dict[str, Any]):
+        """追踪 token 使用量（流式调用的用量在消息的 usage_metadata 中）"""
         try:
+            input_tokens = output_tokens = 0
             # 从结果中提取 token 使用信息
             if hasattr(result, 'llm_output') and result.llm_output:
                 token_usage = result.llm_output.get('token_usage', {})
                 
                 input_tokens = token_usage.get('prompt_tokens', 0)
                 output_tokens = token_usage.get('completion_tokens', 0)
+            elif result.generations:
+                usage = getattr(result.generations[0].message, 'usage_metadata', None) or {}
+                input_tokens = usage.get('input_tokens', 0)
+                output_tokens = usage.get('output_tokens', 0)
+
+            if input_tokens > 0 or output_tokens > 0:
+                # 生成会话ID
+                session_id = kwargs.get('session_id', f"dashscope_openai_{hash(str(messages))%10000}")
+                analysis_type = kwargs.get('analysis_type', 'stock_analysis')
                 
-                if input_tokens > 0 or output_tokens > 0:
-                    # 生成会话ID
-                    session_id = kwargs.get('session_id', f"dashscope_openai_{hash(str(args))%10000}")
-                    analysis_type = kwargs.get('analysis_type', 'stock_analysis')
-                    
-                    # 使用 TokenTracker 记录使用量
-                    token_tracker.track_usage(
-                        provider="dashscope",
-                        model_name=self.model_name,
-                        input_tokens=input_tokens,
-                        output_tokens=output_tokens,
-                        session_id=session_id,
-                        analysis_type=analysis_type
-                    )
+                # 使用 TokenTracker 记录使用量
+                token_tracker.track_usage(
+                    provider="dashscope",
+                    model_name=self.model_name,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    session_id=session_id,
+                    analysis_type=analysis_type
+                )
                     
         except Exception as track_error:
             # token 追踪失败不应该影响主要功能
             logger.error(f"⚠️ Token 追踪失败: {track_error}")
-        
-        return result
-
 
 # 支持的模型列表
 DASHSCOPE_OPENAI_MODELS = {
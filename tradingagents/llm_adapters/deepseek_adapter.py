@@ -4,9 +4,9 @@ DeepSeek LLM适配器，支持Token使用统计
 
 import os
 import time
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage
-from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
 from langchain_openai import ChatOpenAI
 from langchain_core.callbacks import CallbackManagerForLLMRun
 
@@ -15,6 +15,7 @@ from tradingagents.utils.logging_init import setup_llm_logging
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger, get_logger_manager
+from tradingagents.llm_adapters.response_cache import cached_stream, get_llm_response_cache, make_cache_key
 logger = get_logger('agents')
 logger = setup_llm_logging()
 
@@ -122,73 +123,116 @@ class ChatDeepSeek(ChatOpenAI):
         session_id = kwargs.pop('session_id', None)
         analysis_type = kwargs.pop('analysis_type', None)
 
+        # LLM 响应缓存（默认关闭）：相同请求直接返回缓存的响应
+        response_cache = get_llm_response_cache()
+        cache_key = None
+        if response_cache is not None:
+            cache_key = make_cache_key("deepseek", self.model_name, self.temperature, messages, stop, kwargs)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
             # 调用父类方法生成响应
             result = super()._generate(messages, stop, run_manager, **kwargs)
-            
-            # 提取token使用量
-            input_tokens = 0
-            output_tokens = 0
-            
-            # 尝试从响应中提取token使用量
-            if hasattr(result, 'llm_output') and result.llm_output:
-                token_usage = result.llm_output.get('token_usage', {})
-                if token_usage:
-                    input_tokens = token_usage.get('prompt_tokens', 0)
-                    output_tokens = token_usage.get('completion_tokens', 0)
-            
-            # 如果没有获取到token使用量，进行估算
-            if input_tokens == 0 and output_tokens == 0:
-                input_tokens = self._estimate_input_tokens(messages)
-                output_tokens = self._estimate_output_tokens(result)
-                logger.debug(f"🔍 [DeepSeek] 使用估算token: 输入={input_tokens}, 输出={output_tokens}")
-            else:
-                logger.info(f"📊 [DeepSeek] 实际token使用: 输入={input_tokens}, 输出={output_tokens}")
-            
-            # 记录token使用量
-            if TOKEN_TRACKING_ENABLED and (input_tokens > 0 or output_tokens > 0):
-                try:
-                    # 使用提取的参数或生成默认值
-                    if session_id is None:
-                        session_id = f"deepseek_{hash(str(messages))%10000}"
-                    if analysis_type is None:
-                        analysis_type = 'stock_analysis'
-
-                    # 记录使用量
-                    usage_record = token_tracker.track_usage(
-                        provider="deepseek",
-                        model_name=self.model_name,
-                        input_tokens=input_tokens,
-                        output_tokens=output_tokens,
-                        session_id=session_id,
-                        analysis_type=analysis_type
-                    )
+            self._record_usage(messages, result, session_id, analysis_type)
 
-                    if usage_record:
-                        if usage_record.cost == 0.0:
-                            logger.warning(f"⚠️ [DeepSeek] 成本计算为0，可能配置有问题")
-                        else:
-                            logger.info(f"💰 [DeepSeek] 本次调用成本: ¥{usage_record.cost:.6f}")
-
-                        # 使用统一日志管理器的Token记录方法
-                        logger_manager = get_logger_manager()
-                        logger_manager.log_token_usage(
-                            logger, "deepseek", self.model_name,
-                            input_tokens, output_tokens, usage_record.cost,
-                            session_id
-                        )
-                    else:
-                        logger.warning(f"⚠️ [DeepSeek] 未创建使用记录")
-
-                except Exception as track_error:
-                    logger.error(f"⚠️ [DeepSeek] Token统计失败: {track_error}", exc_info=True)
+            if cache_key:
+                response_cache.put(cache_key, result)
             
             return result
             
         except Exception as e:
             logger.error(f"❌ [DeepSeek] 调用失败: {e}", exc_info=True)
             raise
-    
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        流式生成（LangGraph stream_mode="messages" 时使用），同样经过响应缓存并记录token使用量
+
+        非 OpenAI 官方地址不会默认开启 stream_usage，这里显式开启，最后一个块才会带token使用量
+        """
+        session_id = kwargs.pop('session_id', None)
+        analysis_type = kwargs.pop('analysis_type', None)
+        parent_stream = super()._stream
+        stream_kwargs = {"stream_usage": True, **kwargs}
+        return cached_stream(
+            "deepseek", self.model_name, self.temperature, messages, stop, kwargs,
+            lambda: parent_stream(messages, stop, run_manager, **stream_kwargs),
+            lambda result: self._record_usage(messages, result, session_id, analysis_type),
+        )
+
+    def _record_usage(self, messages: List[BaseMessage], result: ChatResult,
+                      session_id: Optional[str], analysis_type: Optional[str]):
+        """提取（或估算）token使用量并记录"""
+        # 提取token使用量
+        input_tokens = 0
+        output_tokens = 0
+        
+        # 尝试从响应中提取token使用量
+        if hasattr(result, 'llm_output') and result.llm_output:
+            token_usage = result.llm_output.get('token_usage', {})
+            if token_usage:
+                input_tokens = token_usage.get('prompt_tokens', 0)
+                output_tokens = token_usage.get('completion_tokens', 0)
+        # 流式调用的token使用量在消息的 usage_metadata 中
+        if input_tokens == 0 and output_tokens == 0 and result.generations:
+            usage = getattr(result.generations[0].message, 'usage_metadata', None) or {}
+            input_tokens = usage.get('input_tokens', 0)
+            output_tokens = usage.get('output_tokens', 0)
+        
+        # 如果没有获取到token使用量，进行估算
+        if input_tokens == 0 and output_tokens == 0:
+            input_tokens = self._estimate_input_tokens(messages)
+            output_tokens = self._estimate_output_tokens(result)
+            logger.debug(f"🔍 [DeepSeek] 使用估算token: 输入={input_tokens}, 输出={output_tokens}")
+        else:
+            logger.info(f"📊 [DeepSeek] 实际token使用: 输入={input_tokens}, 输出={output_tokens}")
+        
+        # 记录token使用量
+        if TOKEN_TRACKING_ENABLED and (input_tokens > 0 or output_tokens > 0):
+            try:
+                # 使用提取的参数或生成默认值
+                if session_id is None:
+                    session_id = f"deepseek_{hash(str(messages))%10000}"
+                if analysis_type is None:
+                    analysis_type = 'stock_analysis'
+
+                # 记录使用量
+                usage_record = token_tracker.track_usage(
+                    provider="deepseek",
+                    model_name=self.model_name,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    session_id=session_id,
+                    analysis_type=analysis_type
+                )
+
+                if usage_record:
+                    if usage_record.cost == 0.0:
+                        logger.warning(f"⚠️ [DeepSeek] 成本计算为0，可能配置有问题")
+                    else:
+                        logger.info(f"💰 [DeepSeek] 本次调用成本: ¥{usage_record.cost:.6f}")
+
+                    # 使用统一日志管理器的Token记录方法
+                    logger_manager = get_logger_manager()
+                    logger_manager.log_token_usage(
+                        logger, "deepseek", self.model_name,
+                        input_tokens, output_tokens, usage_record.cost,
+                        session_id
+                    )
+                else:
+                    logger.warning(f"⚠️ [DeepSeek] 未创建使用记录")
+
+            except Exception as track_error:
+                logger.error(f"⚠️ [DeepSeek] Token统计失败: {track_error}", exc_info=True)
+
     def _estimate_input_tokens(self, messages: List[BaseMessage]) -> int:
         """
         估算输入token数量
@@ -5,13 +5,14 @@ Google AI OpenAI兼容适配器
 """
 
 import os
-from typing import Any, Dict, List, Optional, Union, Sequence
+from typing import Any, Dict, Iterator, List, Optional, Union, Sequence
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import BaseTool
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage
-from langchain_core.outputs import LLMResult
+from langchain_core.outputs import ChatGenerationChunk, LLMResult
 from pydantic import Field, SecretStr
 from ..config.config_manager import token_tracker
+from .response_cache import get_llm_response_cache, make_cache_key, result_to_chunk
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -159,6 +160,15 @@ class ChatGoogleOpenAI(ChatGoogleGenerativeAI):
     def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs) -> LLMResult:
         """重写生成方法，优化工具调用处理和内容格式"""
 
+        # LLM 响应缓存（默认关闭）：相同请求直接返回缓存的响应
+        response_cache = get_llm_response_cache()
+        cache_key = None
+        if response_cache is not None:
+            cache_key = make_cache_key("google", self.model_name, self.temperature, messages, stop, kwargs)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
             # 调用父类的生成方法
             result = super()._generate(messages, stop, **kwargs)
@@ -180,6 +190,10 @@ class ChatGoogleOpenAI(ChatGoogleGenerativeAI):
             # 追踪 token 使用量
             self._track_token_usage(result, kwargs)
 
+            # 只缓存成功的响应（下面的错误结果不缓存）
+            if cache_key:
+                response_cache.put(cache_key, result)
+
             return result
 
         except Exception as e:
@@ -201,6 +215,15 @@ class ChatGoogleOpenAI(ChatGoogleGenerativeAI):
             error_generation = ChatGeneration(message=error_message)
             return LLMResult(generations=[[error_generation]])
     
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        """流式调用时一次性输出完整响应
+
+        生成结果需要整体做内容优化和 token 追踪，这里复用 _generate（含响应缓存），不逐 token 输出。
+        """
+        result = self._generate(messages, stop, run_manager=run_manager, **kwargs)
+        yield result_to_chunk(result)
+
     def _optimize_message_content(self, message: BaseMessage):
         """优化消息内容格式，确保包含新闻特征关键词"""
         
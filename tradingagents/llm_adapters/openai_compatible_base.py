@@ -5,14 +5,15 @@ OpenAI兼容适配器基类
 
 import os
 import time
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 from langchain_core.messages import BaseMessage
-from langchain_core.outputs import ChatResult
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
 from langchain_openai import ChatOpenAI
 from langchain_core.callbacks import CallbackManagerForLLMRun
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import setup_llm_logging
+from tradingagents.llm_adapters.response_cache import cached_stream, get_llm_response_cache, make_cache_key
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger, get_logger_manager
@@ -163,6 +164,15 @@ class OpenAICompatibleBase(ChatOpenAI):
         生成聊天响应，并记录token使用量
         """
         
+        # LLM 响应缓存（默认关闭）：相同请求直接返回缓存的响应
+        response_cache = get_llm_response_cache()
+        cache_key = None
+        if response_cache is not None:
+            cache_key = make_cache_key(self.provider_name, self.model_name, self.temperature, messages, stop, kwargs)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         # 记录开始时间
         start_time = time.time()
         
@@ -171,16 +181,42 @@ class OpenAICompatibleBase(ChatOpenAI):
         
         # 记录token使用
         self._track_token_usage(result, kwargs, start_time)
+
+        if cache_key:
+            response_cache.put(cache_key, result)
         
         return result
 
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        流式生成（LangGraph stream_mode="messages" 时使用），同样经过响应缓存并记录token使用量
+
+        非 OpenAI 官方地址不会默认开启 stream_usage，这里显式开启，最后一个块才会带token使用量
+        """
+        start_time = time.time()
+        parent_stream = super()._stream
+        stream_kwargs = {"stream_usage": True, **kwargs}
+        return cached_stream(
+            self.provider_name, self.model_name, self.temperature, messages, stop, kwargs,
+            lambda: parent_stream(messages, stop, run_manager, **stream_kwargs),
+            lambda result: self._track_token_usage(result, kwargs, start_time),
+        )
+
     def _track_token_usage(self, result: ChatResult, kwargs: Dict, start_time: float):
         """记录token使用量并输出日志"""
         if not TOKEN_TRACKING_ENABLED:
             return
         try:
-            # 统计token信息
-            usage = getattr(result, "usage_metadata", None)
+            # 统计token信息（ChatResult 本身没有 usage_metadata，用量在消息上）
+            usage = None
+            if result.generations:
+                usage = getattr(result.generations[0].message, "usage_metadata", None)
             total_tokens = usage.get("total_tokens") if usage else None
             prompt_tokens = usage.get("input_tokens") if usage else None
             completion_tokens = usage.get("output_tokens") if usage else None
@@ -355,6 +391,16 @@ class ChatQianfanOpenAI(OpenAICompatibleBase):
         # 调用父类的_generate方法
         return super()._generate(truncated_messages, stop, run_manager, **kwargs)
 
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """流式生成，包含千帆模型的token截断逻辑"""
+        return super()._stream(self._truncate_messages(messages), stop, run_manager, **kwargs)
+
 
 class ChatZhipuOpenAI(OpenAICompatibleBase):
     """智谱AI GLM OpenAI兼容适配器"""
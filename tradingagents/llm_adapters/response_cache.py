@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+LLM 响应缓存（按请求内容寻址）
+
+同一只股票、同一交易日重复分析，或对同一状态重新反思时，发给模型的请求完全相同。
+以 (提供商, 模型, 温度, 工具定义, 规范化后的消息) 的哈希为键缓存响应，命中时直接返回，
+不再产生延迟和费用；回测和历史日期重跑几乎不再调用模型。
+
+- 默认关闭（TA_LLM_CACHE_ENABLED=true 开启）
+- 存储：Redis（TA_LLM_CACHE_BACKEND=redis 且 Redis 可用）或本地 SQLite
+- TTL 过期；SQLite 超过 TA_LLM_CACHE_MAX_ENTRIES 时淘汰最久未命中的条目（Redis 依赖 TTL 和自身的淘汰策略）
+- 规范化消息时忽略 tool_call id 等每次运行都会变化的字段
+- 命中/未命中写入 llm_output["cache_hit"]（流式调用写入 generation_info），由链路追踪按节点统计命中率
+- 流式调用（LangGraph stream_mode="messages"）同样走缓存：命中时一次性输出完整响应
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import generate_from_stream
+from langchain_core.messages import AIMessageChunk, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from tradingagents.config.runtime_settings import get_bool, get_float, get_int
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+# 不影响模型输出的调用参数（会话/统计用途）
+_IGNORED_KWARGS = {"session_id", "analysis_type", "callbacks", "run_manager"}
+_REDIS_PREFIX = "ta:llm_cache:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    cache_key   TEXT PRIMARY KEY,
+    payload     TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    last_hit    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_responses_last_hit ON llm_responses (last_hit);
+CREATE INDEX IF NOT EXISTS idx_llm_responses_expires_at ON llm_responses (expires_at);
+"""
+
+
+def _normalize_message(message: BaseMessage) -> Dict[str, Any]:
+    content = message.content
+    if isinstance(content, str):
+        content = content.strip()
+    normalized: Dict[str, Any] = {"type": message.type, "content": content}
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        normalized["tool_calls"] = [{"name": c.get("name"), "args": c.get("args")} for c in tool_calls]
+    if getattr(message, "name", None):
+        normalized["name"] = message.name
+    return normalized
+
+
+def make_cache_key(provider: Optional[str], model: Optional[str], temperature: Optional[float],
+                   messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                   call_kwargs: Optional[Dict[str, Any]] = None) -> str:
+    """请求的内容哈希；工具定义和 tool_choice 等调用参数包含在 call_kwargs 中"""
+    request = {
+        "provider": provider,
+        "model": model,
+        "temperature": temperature,
+        "stop": stop,
+        "kwargs": {k: v for k, v in (call_kwargs or {}).items() if k not in _IGNORED_KWARGS},
+        "messages": [_normalize_message(m) for m in messages],
+    }
+    encoded = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _dump_result(result: ChatResult) -> str:
+    return json.dumps({
+        "generations": [
+            {"message": message_to_dict(g.message), "generation_info": g.generation_info}
+            for g in result.generations
+        ],
+        "llm_output": result.llm_output,
+    }, ensure_ascii=False, default=str)
+
+
+def _load_result(payload: str) -> ChatResult:
+    data = json.loads(payload)
+    generations = [
+        ChatGeneration(message=messages_from_dict([g["message"]])[0], generation_info=g.get("generation_info"))
+        for g in data["generations"]
+    ]
+    llm_output = dict(data.get("llm_output") or {})
+    llm_output["cache_hit"] = True
+    return ChatResult(generations=generations, llm_output=llm_output)
+
+
+class _SQLiteBackend:
+    """本地 SQLite 存储（WAL 模式，多进程共享）"""
+
+    def __init__(self, path: Path, max_entries: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._puts = 0
+        conn = self._conn()
+        with conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT payload FROM llm_responses WHERE cache_key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE llm_responses SET last_hit = ? WHERE cache_key = ?", (now, key))
+        return row[0]
+
+    def put(self, key: str, payload: str, ttl_seconds: float):
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?)",
+                         (key, payload, now, now + ttl_seconds, now))
+        self._puts += 1
+        if self._puts % 50 == 1:
+            self.evict()
+
+    def evict(self):
+        """删除过期条目；超过容量时按最近命中时间淘汰"""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (time.time(),))
+            count = conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM llm_responses WHERE cache_key IN "
+                    "(SELECT cache_key FROM llm_responses ORDER BY last_hit LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+
+class _RedisBackend:
+    """Redis 存储（SETEX，过期由 Redis 处理）"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(_REDIS_PREFIX + key)
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return value
+
+    def put(self, key: str, payload: str, ttl_seconds: float):
+        self.client.setex(_REDIS_PREFIX + key, max(int(ttl_seconds), 1), payload)
+
+
+class LLMResponseCache:
+    """LLM 响应缓存"""
+
+    def __init__(self, backend, ttl_hours: float = 168.0):
+        self.backend = backend
+        self.ttl_seconds = ttl_hours * 3600
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, key: str) -> Optional[ChatResult]:
+        try:
+            payload = self.backend.get(key)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"⚠️ [LLM缓存] 读取失败: {e}")
+            return None
+        if payload is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        logger.info(f"🎯 [LLM缓存] 命中: {key[:12]}")
+        return _load_result(payload)
+
+    def put(self, key: str, result: ChatResult):
+        """缓存响应，并在 result 上标记为未命中"""
+        result.llm_output = dict(result.llm_output or {})
+        result.llm_output["cache_hit"] = False
+        try:
+            self.backend.put(key, _dump_result(result), self.ttl_seconds)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"⚠️ [LLM缓存] 写入失败: {e}")
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def llm_cache_enabled() -> bool:
+    """是否启用 LLM 响应缓存。ENV: TA_LLM_CACHE_ENABLED; DB: ta_llm_cache_enabled"""
+    return get_bool("TA_LLM_CACHE_ENABLED", "ta_llm_cache_enabled", False)
+
+
+def get_llm_response_cache() -> Optional[LLMResponseCache]:
+    """获取进程内共享的 LLM 响应缓存；未启用时返回 None"""
+    global _cache
+    if not llm_cache_enabled():
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                ttl_hours = get_float("TA_LLM_CACHE_TTL_HOURS", "ta_llm_cache_ttl_hours", 168.0)
+                backend = None
+                if os.getenv("TA_LLM_CACHE_BACKEND", "sqlite").lower() == "redis":
+                    try:
+                        from tradingagents.config.database_manager import get_redis_client
+
+                        client = get_redis_client()
+                        if client is not None:
+                            backend = _RedisBackend(client)
+                            logger.info("✅ [LLM缓存] 使用 Redis 存储")
+                    except Exception as e:
+                        logger.warning(f"⚠️ [LLM缓存] Redis 不可用，改用 SQLite: {e}")
+                if backend is None:
+                    path = os.getenv("TA_LLM_CACHE_PATH", "./data/llm_cache.sqlite3")
+                    max_entries = get_int("TA_LLM_CACHE_MAX_ENTRIES", "ta_llm_cache_max_entries", 10000)
+                    backend = _SQLiteBackend(Path(path), max_entries)
+                    logger.info(f"✅ [LLM缓存] 使用 SQLite 存储: {path}")
+                _cache = LLMResponseCache(backend, ttl_hours)
+    return _cache
+
+
+def result_to_chunk(result: ChatResult) -> ChatGenerationChunk:
+    """把完整响应转换为单个流式块（缓存命中或不支持逐 token 输出时使用）"""
+    message = result.generations[0].message
+    tool_call_chunks = [
+        {"name": call["name"], "args": json.dumps(call["args"], ensure_ascii=False), "id": call.get("id"), "index": i}
+        for i, call in enumerate(getattr(message, "tool_calls", None) or [])
+    ]
+    chunk = AIMessageChunk(
+        content=message.content,
+        additional_kwargs={k: v for k, v in message.additional_kwargs.items() if k != "tool_calls"},
+        tool_call_chunks=tool_call_chunks,
+        usage_metadata=getattr(message, "usage_metadata", None),
+        id=message.id,
+    )
+    generation_info = {}
+    if result.llm_output and "cache_hit" in result.llm_output:
+        generation_info["cache_hit"] = result.llm_output["cache_hit"]
+    return ChatGenerationChunk(message=chunk, generation_info=generation_info or None)
+
+
+def cached_stream(provider: Optional[str], model: Optional[str], temperature: Optional[float],
+                  messages: List[BaseMessage], stop: Optional[List[str]], call_kwargs: Dict[str, Any],
+                  stream: Callable[[], Iterator[ChatGenerationChunk]],
+                  on_complete: Optional[Callable[[ChatResult], None]] = None) -> Iterator[ChatGenerationChunk]:
+    """流式调用的缓存包装
+
+    命中时一次性输出缓存的响应；未命中时边输出边收集，结束后回调 on_complete（token 统计）并写入缓存。
+    token 用量取自最后一个带 usage_metadata 的块（调用方需开启 stream_usage），
+    同时写入 llm_output["token_usage"]，与非流式调用的统计方式一致。
+    """
+    response_cache = get_llm_response_cache()
+    cache_key = None
+    if response_cache is not None:
+        cache_key = make_cache_key(provider, model, temperature, messages, stop, call_kwargs)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            yield result_to_chunk(cached)
+            return
+
+    chunks: List[ChatGenerationChunk] = []
+    usage = None
+    for chunk in stream():
+        if chunks:
+            # 最后一个块留到结束时输出，以便附带未命中标记
+            yield chunks[-1]
+        chunks.append(chunk)
+        usage = getattr(chunk.message, "usage_metadata", None) or usage
+    if not chunks:
+        return
+
+    result = generate_from_stream(iter(chunks))
+    if usage:
+        result.generations[0].message.usage_metadata = usage
+        result.llm_output = {**(result.llm_output or {}), "token_usage": {
+            "prompt_tokens": usage.get("input_tokens", 0),
+            "completion_tokens": usage.get("output_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+        }}
+    if on_complete is not None:
+        on_complete(result)
+
+    last = chunks[-1]
+    if cache_key:
+        response_cache.put(cache_key, result)
+        # 标记未命中（合并到最终消息的 generation_info 中）
+        last = ChatGenerationChunk(message=last.message,
+                                   generation_info={**(last.generation_info or {}), "cache_hit": False})
+    yield last
@@ -0,0 +1,464 @@
+"""
+增量技术指标引擎
+
+按 (股票, 周期) 保存指标的递推状态（EMA 权重、滑动窗口、上一根K线等），
+新增一根K线时只做 O(1) 更新，不再对整段历史重新计算。
+
+- 指标口径与 indicators.compute_many 一致（同一 IndicatorSpec，同名输出列）
+- 状态按请求窗口的首根K线区分：结果只取决于本次请求的数据，与之前请求过什么无关；
+  同一起点的窗口向后延伸时只追加新K线，起点变化时新建状态
+- 请求的数据与状态不一致（历史被复权改写、出现断档）时自动重建
+- 状态只保存在进程内存中（LRU 淘汰），不持久化；进程重启后首次请求会重新计算
+
+用法：
+    engine = get_indicator_engine()
+    df = engine.compute("000001:daily", df, [IndicatorSpec("ma", {"n": 20}), IndicatorSpec("macd")])
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tradingagents.tools.analysis.indicators import SUPPORTED, IndicatorSpec, _unique_specs, compute_many
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+_NAN = float("nan")
+
+
+def _isnan(x: float) -> bool:
+    return x != x
+
+
+# --- 递推单元 ---
+
+class _Ewm:
+    """逐点 EWM，与 pandas ewm(alpha, adjust, ignore_na).mean() 的递推完全一致"""
+
+    __slots__ = ("alpha", "adjust", "ignore_na", "weighted", "old_wt")
+
+    def __init__(self, alpha: float, adjust: bool = False, ignore_na: bool = False):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.ignore_na = ignore_na
+        self.weighted = _NAN
+        self.old_wt = 1.0
+
+    def update(self, x: float) -> float:
+        is_obs = not _isnan(x)
+        new_wt = 1.0 if self.adjust else self.alpha
+        if not _isnan(self.weighted):
+            if is_obs or not self.ignore_na:
+                self.old_wt *= 1 - self.alpha
+                if is_obs:
+                    if self.weighted != x:
+                        self.weighted = (self.old_wt * self.weighted + new_wt * x) / (self.old_wt + new_wt)
+                    self.old_wt = self.old_wt + new_wt if self.adjust else 1.0
+        elif is_obs:
+            self.weighted = x
+        return self.weighted
+
+
+class _SeededEwm:
+    """初值为 seed 的递推（kdj() 中的 K/D 线），NaN 输入不参与递推且输出 NaN"""
+
+    __slots__ = ("alpha", "last")
+
+    def __init__(self, alpha: float, seed: float):
+        self.alpha = alpha
+        self.last = seed
+
+    def update(self, x: float) -> float:
+        if _isnan(x):
+            return _NAN
+        self.last = (1 - self.alpha) * self.last + self.alpha * x
+        return self.last
+
+
+class _Window:
+    """固定长度滑动窗口，NaN 不计入观测数（与 pandas rolling 一致）
+
+    窗口长度是常数（5~60），每次统计只遍历窗口本身，与历史长度无关。
+    """
+
+    __slots__ = ("n", "min_periods", "values")
+
+    def __init__(self, n: int, min_periods: int):
+        self.n = n
+        self.min_periods = min_periods
+        self.values: deque = deque(maxlen=n)
+
+    def push(self, x: float):
+        self.values.append(x)
+
+    def _valid(self) -> List[float]:
+        return [v for v in self.values if not _isnan(v)]
+
+    def mean(self) -> float:
+        valid = self._valid()
+        return math.fsum(valid) / len(valid) if valid and len(valid) >= self.min_periods else _NAN
+
+    def std(self) -> float:
+        valid = self._valid()
+        if len(valid) < max(self.min_periods, 2):
+            return _NAN
+        m = math.fsum(valid) / len(valid)
+        return math.sqrt(math.fsum((v - m) ** 2 for v in valid) / (len(valid) - 1))
+
+    def min(self) -> float:
+        valid = self._valid()
+        return min(valid) if valid and len(valid) >= self.min_periods else _NAN
+
+    def max(self) -> float:
+        valid = self._valid()
+        return max(valid) if valid and len(valid) >= self.min_periods else _NAN
+
+
+# --- 各指标的增量计算器 ---
+
+class _Calculator:
+    def update(self, high: float, low: float, close: float) -> Dict[str, float]:
+        raise NotImplementedError
+
+
+class _MA(_Calculator):
+    def __init__(self, n: int):
+        self.col = f"ma{n}"
+        self.window = _Window(n, 1)
+
+    def update(self, high, low, close):
+        self.window.push(close)
+        return {self.col: self.window.mean()}
+
+
+class _EMA(_Calculator):
+    def __init__(self, n: int):
+        self.col = f"ema{n}"
+        self.ewm = _Ewm(2.0 / (n + 1))
+
+    def update(self, high, low, close):
+        return {self.col: self.ewm.update(close)}
+
+
+class _MACD(_Calculator):
+    def __init__(self, fast: int, slow: int, signal: int):
+        self.fast = _Ewm(2.0 / (fast + 1))
+        self.slow = _Ewm(2.0 / (slow + 1))
+        self.signal = _Ewm(2.0 / (signal + 1))
+
+    def update(self, high, low, close):
+        dif = self.fast.update(close) - self.slow.update(close)
+        dea = self.signal.update(dif)
+        return {"dif": dif, "dea": dea, "macd_hist": dif - dea}
+
+
+class _RSI(_Calculator):
+    def __init__(self, n: int, method: str):
+        if method not in ("ema", "sma", "china"):
+            raise ValueError(f"不支持的RSI计算方法: {method}，支持的方法: 'ema', 'sma', 'china'")
+        self.col = f"rsi{n}"
+        self.method = method
+        self.prev_close = _NAN
+        if method == "sma":
+            self.gain, self.loss = _Window(n, 1), _Window(n, 1)
+        else:
+            adjust = method == "china"
+            self.gain, self.loss = _Ewm(1 / float(n), adjust=adjust), _Ewm(1 / float(n), adjust=adjust)
+
+    def update(self, high, low, close):
+        delta = close - self.prev_close
+        self.prev_close = close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if self.method == "sma":
+            self.gain.push(gain)
+            self.loss.push(loss)
+            avg_gain, avg_loss = self.gain.mean(), self.loss.mean()
+        else:
+            avg_gain, avg_loss = self.gain.update(gain), self.loss.update(loss)
+        if _isnan(avg_gain) or _isnan(avg_loss) or avg_loss == 0:
+            return {self.col: _NAN}
+        return {self.col: 100 - (100 / (1 + avg_gain / avg_loss))}
+
+
+class _BOLL(_Calculator):
+    def __init__(self, n: int, k: float):
+        self.k = k
+        self.window = _Window(n, 1)
+
+    def update(self, high, low, close):
+        self.window.push(close)
+        mid = self.window.mean()
+        std = self.window.std()
+        return {"boll_mid": mid, "boll_upper": mid + self.k * std, "boll_lower": mid - self.k * std}
+
+
+class _ATR(_Calculator):
+    def __init__(self, n: int):
+        self.col = f"atr{n}"
+        self.prev_close = _NAN
+        self.window = _Window(n, n)
+
+    def update(self, high, low, close):
+        ranges = [abs(high - low), abs(high - self.prev_close), abs(low - self.prev_close)]
+        valid = [r for r in ranges if not _isnan(r)]
+        self.window.push(max(valid) if valid else _NAN)
+        self.prev_close = close
+        return {self.col: self.window.mean()}
+
+
+class _KDJ(_Calculator):
+    def __init__(self, n: int, m1: int, m2: int):
+        self.lows = _Window(n, n)
+        self.highs = _Window(n, n)
+        self.k = _SeededEwm(1 / float(m1), 50.0)
+        self.d = _SeededEwm(1 / float(m2), 50.0)
+
+    def update(self, high, low, close):
+        self.lows.push(low)
+        self.highs.push(high)
+        lowest, highest = self.lows.min(), self.highs.max()
+        span = highest - lowest
+        rsv = (close - lowest) / span * 100 if span != 0 and not _isnan(span) else _NAN
+        k = self.k.update(rsv)
+        d = self.d.update(k)
+        return {"kdj_k": k, "kdj_d": d, "kdj_j": 3 * k - 2 * d}
+
+
+def _make_calculator(spec: IndicatorSpec) -> _Calculator:
+    name = spec.name.lower()
+    params = spec.params or {}
+    if name == "ma":
+        return _MA(int(params.get("n", params.get("period", 20))))
+    if name == "ema":
+        return _EMA(int(params.get("n", params.get("period", 20))))
+    if name == "macd":
+        return _MACD(int(params.get("fast", 12)), int(params.get("slow", 26)), int(params.get("signal", 9)))
+    if name == "rsi":
+        return _RSI(int(params.get("n", params.get("period", 14))), params.get("method", "ema"))
+    if name == "boll":
+        return _BOLL(int(params.get("n", 20)), float(params.get("k", 2.0)))
+    if name == "atr":
+        return _ATR(int(params.get("n", 14)))
+    if name == "kdj":
+        return _KDJ(int(params.get("n", 9)), int(params.get("m1", 3)), int(params.get("m2", 3)))
+    raise ValueError(f"不支持的指标: {name}")
+
+
+class IndicatorState:
+    """单个序列（股票+周期+指标组合+窗口起点）的增量指标状态
+
+    每根K线的收盘价和指标值保存在 numpy 数组中，保留最近 max_history 根（超出后批量丢弃最早的部分）。
+    """
+
+    _SLACK = 64  # 超出 max_history 后再多攒这么多根才整体前移，摊还为 O(1)
+
+    def __init__(self, specs: Sequence[IndicatorSpec], max_history: int = 500):
+        self.calculators = [_make_calculator(s) for s in specs]
+        self.max_history = max_history
+        self.columns: List[str] = []
+        self.dates: List[str] = []
+        self.last_date: Optional[str] = None
+        self._closes = np.empty(0)
+        self._values = np.empty((0, 0))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def append(self, date: str, high: float, low: float, close: float) -> np.ndarray:
+        """追加一根K线，O(1) 更新所有指标并返回该K线的指标值（按 columns 顺序）"""
+        values: Dict[str, float] = {}
+        for calc in self.calculators:
+            values.update(calc.update(high, low, close))
+        if not self.columns:
+            self.columns = list(values)
+            capacity = self.max_history + self._SLACK
+            self._closes = np.empty(capacity)
+            self._values = np.empty((capacity, len(self.columns)))
+
+        size = len(self.dates)
+        if size == len(self._closes):
+            keep = self.max_history
+            self._closes[:keep] = self._closes[size - keep:size]
+            self._values[:keep] = self._values[size - keep:size]
+            del self.dates[:size - keep]
+            size = keep
+
+        row = np.fromiter((values[c] for c in self.columns), dtype=float, count=len(self.columns))
+        self._closes[size] = close
+        self._values[size] = row
+        self.dates.append(date)
+        self.last_date = date
+        return row
+
+    def index_of(self, date: str) -> Optional[int]:
+        i = bisect.bisect_left(self.dates, date)
+        return i if i < len(self.dates) and self.dates[i] == date else None
+
+    def closes(self, start: int, stop: int) -> np.ndarray:
+        return self._closes[start:stop]
+
+    def values(self, start: int, stop: int) -> np.ndarray:
+        return self._values[start:stop]
+
+
+def _date_keys(df: pd.DataFrame, date_col: Optional[str]) -> Optional[List[str]]:
+    if date_col is None:
+        return None
+    try:
+        return pd.to_datetime(df[date_col]).dt.strftime("%Y-%m-%d").tolist()
+    except Exception:
+        return df[date_col].astype(str).tolist()
+
+
+def _ohlc(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+
+def _same_prices(a: np.ndarray, b: np.ndarray) -> bool:
+    with np.errstate(invalid="ignore"):
+        same = (a == b) | (np.isnan(a) & np.isnan(b)) | (np.abs(a - b) <= 1e-9 * np.maximum(np.abs(a), np.abs(b)))
+    return bool(same.all())
+
+
+class IndicatorEngine:
+    """共享的增量指标引擎（线程安全）"""
+
+    DATE_COLUMNS = ("date", "trade_date")
+
+    def __init__(self, max_series: int = 256, max_history: int = 500):
+        """
+        Args:
+            max_series: 最多保留的状态数（股票×周期×指标组合×窗口起点），超出后淘汰最久未使用的
+            max_history: 每个状态保留的K线数；请求窗口更长时每次都全量计算
+        """
+        self.max_series = max_series
+        self.max_history = max_history
+        self._states: "OrderedDict[Tuple[str, Tuple], IndicatorState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "appends": 0, "rebuilds": 0}
+
+    @staticmethod
+    def _spec_key(specs: Sequence[IndicatorSpec]) -> Tuple:
+        return tuple((s.name.lower(), tuple(sorted((s.params or {}).items()))) for s in specs)
+
+    def compute(self, key: str, df: pd.DataFrame, specs: List[IndicatorSpec],
+                date_col: Optional[str] = None) -> pd.DataFrame:
+        """
+        计算 df 每一行的指标，复用 key 对应的增量状态
+
+        Args:
+            key: 序列标识，建议为 "代码:周期"，如 "000001:daily"
+            df: 按日期升序的K线数据，需包含 close（ATR/KDJ 还需要 high/low）
+            specs: 指标规格列表
+            date_col: 日期列名；默认自动识别 date/trade_date。没有日期列时不缓存状态，直接全量计算
+
+        Returns:
+            添加了指标列的新 DataFrame（列名与 compute_many 一致）
+        """
+        specs = _unique_specs(specs)
+        for s in specs:
+            if s.name.lower() not in SUPPORTED:
+                raise ValueError(f"不支持的指标: {s.name}")
+        if df.empty or not specs:
+            return df.copy()
+
+        date_col = date_col or next((c for c in self.DATE_COLUMNS if c in df.columns), None)
+        dates = _date_keys(df, date_col)
+        if dates is None or len(set(dates)) != len(dates) or dates != sorted(dates):
+            # 无法按日期对齐，退化为无状态的全量计算
+            return compute_many(df, specs)
+
+        high, low, close = _ohlc(df, "high"), _ohlc(df, "low"), _ohlc(df, "close")
+        # 窗口起点是键的一部分：递推指标的预热只来自本次请求的数据
+        state_key = (key, self._spec_key(specs), dates[0])
+
+        with self._lock:
+            state = self._states.get(state_key)
+            start = self._reusable_from(state, dates, close)
+            if start is None:
+                state = IndicatorState(specs, self.max_history)
+                start = 0
+                self.stats["rebuilds"] += 1
+                logger.debug(f"🔄 [指标引擎] 重建指标状态: {key} ({len(dates)}根K线)")
+            elif start < len(dates):
+                self.stats["appends"] += 1
+            else:
+                self.stats["hits"] += 1
+
+            blocks = [state.values(0, start)] if start else []
+            blocks.extend(state.append(dates[i], high[i], low[i], close[i])[None, :]
+                          for i in range(start, len(dates)))
+            columns = list(state.columns)
+
+            self._states[state_key] = state
+            self._states.move_to_end(state_key)
+            while len(self._states) > self.max_series:
+                self._states.popitem(last=False)
+
+        indicators = pd.DataFrame(np.vstack(blocks), index=df.index, columns=columns)
+        base = df.drop(columns=[c for c in indicators.columns if c in df.columns])
+        return pd.concat([base, indicators], axis=1)
+
+    @staticmethod
+    def _reusable_from(state: Optional[IndicatorState], dates: List[str], close: np.ndarray) -> Optional[int]:
+        """判断已有状态能否复用；可以则返回需要追加的第一行下标，否则返回 None
+
+        状态与请求起点相同（键保证），只有当保留的历史从窗口首根开始、与请求的已有部分
+        逐根相同且收盘价一致（复权改写历史时重建）时才能复用。
+        """
+        if state is None or not len(state) or state.dates[0] != dates[0]:
+            return None
+        overlap = bisect.bisect_right(dates, state.last_date)
+        if overlap < len(dates) and overlap != len(state):
+            # 状态在请求窗口内部还有更晚的K线（数据不连续），无法在中间追加
+            return None
+        if overlap > len(state) or state.dates[:overlap] != dates[:overlap]:
+            return None
+        if not _same_prices(state.closes(0, overlap), close[:overlap]):
+            return None
+        return overlap
+
+    def clear(self, key: Optional[str] = None):
+        """清除指标状态；key 为空时清除全部"""
+        with self._lock:
+            if key is None:
+                self._states.clear()
+            else:
+                for state_key in [k for k in self._states if k[0] == key]:
+                    del self._states[state_key]
+
+
+_engine: Optional[IndicatorEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_indicator_engine() -> IndicatorEngine:
+    """获取全局共享的指标引擎
+
+    TA_INDICATOR_ENGINE_MAX_SERIES / TA_INDICATOR_ENGINE_MAX_HISTORY 控制缓存的状态数和每个状态保留的K线数。
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            from tradingagents.config.runtime_settings import get_int
+
+            _engine = IndicatorEngine(
+                max_series=get_int("TA_INDICATOR_ENGINE_MAX_SERIES", "ta_indicator_engine_max_series", 256),
+                max_history=get_int("TA_INDICATOR_ENGINE_MAX_HISTORY", "ta_indicator_engine_max_history", 500),
+            )
+            logger.warning(
+                f"⚠️ [指标引擎] 指标状态仅保存在进程内存中，不会持久化，进程重启后首次请求需全量计算 "
+                f"(最多{_engine.max_series}个状态, 每个{_engine.max_history}根K线)"
+            )
+        return _engine
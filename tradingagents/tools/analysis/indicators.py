@@ -215,7 +215,7 @@ def compute_indicator(df: pd.DataFrame, spec: IndicatorSpec) -> pd.DataFrame:
     if name == "rsi":
         _require_cols(df, ["close"])
         n = int(params.get("n", params.get("period", 14)))
-        out[f"rsi{n}"] = rsi(df["close"], n)
+        out[f"rsi{n}"] = rsi(df["close"], n, method=params.get("method", "ema"))
         return out
 
     if name == "boll":
@@ -246,9 +246,7 @@ def compute_indicator(df: pd.DataFrame, spec: IndicatorSpec) -> pd.DataFrame:
     raise ValueError(f"不支持的指标: {name}")
 
 
-def compute_many(df: pd.DataFrame, specs: List[IndicatorSpec]) -> pd.DataFrame:
-    if not specs:
-        return df.copy()
+def _unique_specs(specs: List[IndicatorSpec]) -> List[IndicatorSpec]:
     # 粗略去重（按 name+sorted(params)）
     def key(s: IndicatorSpec):
         p = s.params or {}
@@ -262,13 +260,198 @@ def compute_many(df: pd.DataFrame, specs: List[IndicatorSpec]) -> pd.DataFrame:
         if k not in seen:
             seen.add(k)
             unique_specs.append(s)
+    return unique_specs
+
+
+def compute_many(df: pd.DataFrame, specs: List[IndicatorSpec]) -> pd.DataFrame:
+    if not specs:
+        return df.copy()
 
     out = df.copy()
-    for s in unique_specs:
+    for s in _unique_specs(specs):
         out = compute_indicator(out, s)
     return out
 
 
+# --- 分组（面板）向量化计算 ---
+# 面板按 (组内序号, 股票) 展开成二维数组：每列是一只股票自身的行情序列（末尾以 NaN 补齐），
+# 指标按列一次性计算，结果再按原位置取回。窗口按各股票自身的行计数，
+# 因此与逐只调用 compute_many 的结果一致。
+#
+# pandas 对多列 DataFrame 的 rolling/ewm 会在 Python 层逐列循环，几千列时反而很慢，
+# 所以这里：
+# - 滑动窗口：每列前补 NaN 后按列首尾相接展平成一条长序列，只调用一次 rolling；
+# - EWM：按时间行递推，每步对所有股票做一次向量运算。
+
+def _col_rolling(arr: np.ndarray, n: int, min_periods: int, how: str) -> np.ndarray:
+    """按列滑动窗口统计（mean/std/min/max），NaN 不计入窗口观测数"""
+    n = int(n)
+    padded = np.vstack([np.full((n, arr.shape[1]), np.nan), arr])
+    flat = pd.Series(padded.ravel(order="F"))
+    result = getattr(flat.rolling(window=n, min_periods=min_periods), how)()
+    return result.to_numpy().reshape(padded.shape, order="F")[n:]
+
+
+def _col_ewm(arr: np.ndarray, alpha: float, adjust: bool = False, ignore_na: bool = False) -> np.ndarray:
+    """按列递推 EWM，语义与 pandas ewm(alpha, adjust, ignore_na).mean() 一致"""
+    new_wt = 1.0 if adjust else alpha
+    out = np.empty_like(arr)
+    weighted = np.full(arr.shape[1], np.nan)
+    old_wt = np.ones(arr.shape[1])
+    for t in range(arr.shape[0]):
+        x = arr[t]
+        is_obs = ~np.isnan(x)
+        started = ~np.isnan(weighted)
+        decay = started if not ignore_na else started & is_obs
+        old_wt = np.where(decay, old_wt * (1 - alpha), old_wt)
+        update = started & is_obs
+        with np.errstate(invalid="ignore"):
+            mixed = (old_wt * weighted + new_wt * x) / (old_wt + new_wt)
+        weighted = np.where(update, mixed, np.where(is_obs & ~started, x, weighted))
+        old_wt = np.where(update, old_wt + new_wt if adjust else 1.0, old_wt)
+        out[t] = weighted
+    return out
+
+
+def _col_shift(arr: np.ndarray) -> np.ndarray:
+    return np.vstack([np.full((1, arr.shape[1]), np.nan), arr[:-1]])
+
+
+def _col_seeded_ewm(x: np.ndarray, alpha: float, seed: float) -> np.ndarray:
+    """y 初值为 seed 的 EWM，NaN 位置输出 NaN（等价于 kdj() 中的逐行循环）
+
+    把每列第一个有效值替换为 (1-alpha)*seed + alpha*x_0，再做 adjust=False 的 EWM。
+    """
+    valid = ~np.isnan(x)
+    first = valid & (np.cumsum(valid, axis=0) == 1)
+    seeded = np.where(first, (1 - alpha) * seed + alpha * x, x)
+    return np.where(valid, _col_ewm(seeded, alpha, ignore_na=True), np.nan)
+
+
+def _wide_indicator_columns(wide: Dict[str, np.ndarray], spec: IndicatorSpec) -> Dict[str, np.ndarray]:
+    name = spec.name.lower()
+    params = spec.params or {}
+    close = wide["close"]
+
+    if name == "ma":
+        n = int(params.get("n", params.get("period", 20)))
+        return {f"ma{n}": _col_rolling(close, n, 1, "mean")}
+
+    if name == "ema":
+        n = int(params.get("n", params.get("period", 20)))
+        return {f"ema{n}": _col_ewm(close, 2.0 / (n + 1))}
+
+    if name == "macd":
+        fast = int(params.get("fast", 12))
+        slow = int(params.get("slow", 26))
+        signal = int(params.get("signal", 9))
+        dif = _col_ewm(close, 2.0 / (fast + 1)) - _col_ewm(close, 2.0 / (slow + 1))
+        dea = _col_ewm(dif, 2.0 / (signal + 1))
+        return {"dif": dif, "dea": dea, "macd_hist": dif - dea}
+
+    if name == "rsi":
+        n = int(params.get("n", params.get("period", 14)))
+        method = params.get("method", "ema")
+        delta = close - _col_shift(close)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        if method == "ema":
+            avg_gain = _col_ewm(gain, 1 / float(n))
+            avg_loss = _col_ewm(loss, 1 / float(n))
+        elif method == "sma":
+            avg_gain = _col_rolling(gain, n, 1, "mean")
+            avg_loss = _col_rolling(loss, n, 1, "mean")
+        elif method == "china":
+            avg_gain = _col_ewm(gain, 1 / float(n), adjust=True)
+            avg_loss = _col_ewm(loss, 1 / float(n), adjust=True)
+        else:
+            raise ValueError(f"不支持的RSI计算方法: {method}，支持的方法: 'ema', 'sma', 'china'")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+            return {f"rsi{n}": 100 - (100 / (1 + rs))}
+
+    if name == "boll":
+        n = int(params.get("n", 20))
+        k = float(params.get("k", 2.0))
+        mid = _col_rolling(close, n, 1, "mean")
+        std = _col_rolling(close, n, 1, "std")
+        return {"boll_mid": mid, "boll_upper": mid + k * std, "boll_lower": mid - k * std}
+
+    if name == "atr":
+        n = int(params.get("n", 14))
+        high, low = wide["high"], wide["low"]
+        prev_close = _col_shift(close)
+        tr = np.fmax(np.fmax(np.abs(high - low), np.abs(high - prev_close)), np.abs(low - prev_close))
+        return {f"atr{n}": _col_rolling(tr, n, n, "mean")}
+
+    if name == "kdj":
+        n = int(params.get("n", 9))
+        m1 = int(params.get("m1", 3))
+        m2 = int(params.get("m2", 3))
+        lowest_low = _col_rolling(wide["low"], n, n, "min")
+        highest_high = _col_rolling(wide["high"], n, n, "max")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsv = (close - lowest_low) / (highest_high - lowest_low) * 100
+        rsv[np.isinf(rsv)] = np.nan
+        k = _col_seeded_ewm(rsv, 1 / float(m1), 50.0)
+        d = _col_seeded_ewm(k, 1 / float(m2), 50.0)
+        return {"kdj_k": k, "kdj_d": d, "kdj_j": 3 * k - 2 * d}
+
+    raise ValueError(f"不支持的指标: {name}")
+
+
+_SPEC_REQUIRED_COLS = {
+    "ma": ["close"], "ema": ["close"], "macd": ["close"], "rsi": ["close"], "boll": ["close"],
+    "atr": ["high", "low", "close"], "kdj": ["high", "low", "close"],
+}
+
+
+def compute_many_grouped(df: pd.DataFrame, specs: List[IndicatorSpec], by: str = "code") -> pd.DataFrame:
+    """
+    面板数据（多只股票纵向拼接）按股票分组一次性向量化计算多个指标
+
+    结果与对每只股票分别调用 compute_many 一致，但不在 Python 层逐只循环，
+    适合全市场选股等需要同时计算数千只股票指标的场景。
+
+    Args:
+        df: 长表格式的行情面板，需包含分组列 by，且组内按日期升序排列
+        specs: 指标规格列表
+        by: 分组列名，默认 'code'
+
+    Returns:
+        添加了指标列的新 DataFrame（不修改原数据，保持原行顺序与索引）
+    """
+    _require_cols(df, [by])
+    unique_specs = _unique_specs(specs)
+    out = df.copy()
+    if not unique_specs or df.empty:
+        return out
+
+    cols: List[str] = []
+    for s in unique_specs:
+        if s.name.lower() not in SUPPORTED:
+            raise ValueError(f"不支持的指标: {s.name}")
+        for c in _SPEC_REQUIRED_COLS[s.name.lower()]:
+            if c not in cols:
+                cols.append(c)
+    _require_cols(df, cols)
+
+    group_idx, groups = pd.factorize(df[by], sort=False)
+    pos = df.groupby(group_idx, sort=False).cumcount().to_numpy()
+    shape = (int(pos.max()) + 1, len(groups))
+
+    wide: Dict[str, np.ndarray] = {}
+    for c in cols:
+        arr = np.full(shape, np.nan)
+        arr[pos, group_idx] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float)
+        wide[c] = arr
+
+    for s in unique_specs:
+        for col, values in _wide_indicator_columns(wide, s).items():
+            out[col] = values[pos, group_idx]
+    return out
+
+
 def last_values(df: pd.DataFrame, columns: List[str]) -> Dict[str, Any]:
     if df.empty:
         return {c: None for c in columns}
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+分析链路追踪（Span Trace）
+
+为一次 TradingAgentsGraph.propagate 记录结构化的 span：
+- node: LangGraph 节点执行（通过 LangChain 回调精确计时，支持并发分支）
+- llm: LLM 调用（含 token 用量）
+- tool: 工具调用
+- data_source: 数据源调用（Tushare/AKShare/BaoStock/MongoDB）
+- cache: 缓存查询（记录是否命中）
+
+使用方式：
+    trace = AnalysisTrace(trace_id=task_id)
+    with activate_trace(trace):
+        graph.stream(state, config={"callbacks": [TraceCallbackHandler(trace)]})
+    trace.export()
+
+数据层代码通过 trace_span / traced 记录 span；没有激活的 trace 时它们不做任何事。
+"""
+
+import contextvars
+import functools
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+
+SPAN_KIND_NODE = "node"
+SPAN_KIND_LLM = "llm"
+SPAN_KIND_TOOL = "tool"
+SPAN_KIND_DATA_SOURCE = "data_source"
+SPAN_KIND_CACHE = "cache"
+SPAN_KIND_OTHER = "other"
+
+
+@dataclass
+class Span:
+    """单个计时区间"""
+    span_id: str
+    name: str
+    kind: str
+    parent_id: Optional[str]
+    start_time: float
+    end_time: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        end = self.end_time if self.end_time is not None else time.time()
+        return max(end - self.start_time, 0.0)
+
+    def to_dict(self, trace_start: float) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_offset": round(self.start_time - trace_start, 4),
+            "duration": round(self.duration, 4),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class AnalysisTrace:
+    """一次分析任务的 span 集合（线程安全）"""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self._spans: Dict[str, Span] = {}
+        self._order: List[str] = []
+        self._lock = threading.Lock()
+        # LangChain run_id -> span_id / parent run_id，用于把数据层 span 挂到正确的工具/节点下
+        self._run_spans: Dict[Any, str] = {}
+        self._run_parents: Dict[Any, Any] = {}
+
+    def start_span(self, name: str, kind: str = SPAN_KIND_OTHER, parent_id: Optional[str] = None,
+                   attributes: Optional[Dict[str, Any]] = None) -> Span:
+        span = Span(
+            span_id=uuid.uuid4().hex[:16],
+            name=name,
+            kind=kind,
+            parent_id=parent_id,
+            start_time=time.time(),
+            attributes=dict(attributes or {}),
+        )
+        with self._lock:
+            self._spans[span.span_id] = span
+            self._order.append(span.span_id)
+        return span
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None, **attributes):
+        with self._lock:
+            span.end_time = time.time()
+            if attributes:
+                span.attributes.update(attributes)
+            if error is not None:
+                span.status = "error"
+                span.error = f"{type(error).__name__}: {error}"
+
+    def finish(self):
+        self.end_time = time.time()
+
+    @property
+    def duration(self) -> float:
+        end = self.end_time if self.end_time is not None else time.time()
+        return end - self.start_time
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return [self._spans[sid] for sid in self._order]
+
+    # ---- LangChain run 关联 ----
+
+    def bind_run(self, run_id, span: Span):
+        with self._lock:
+            self._run_spans[run_id] = span.span_id
+
+    def record_run_parent(self, run_id, parent_run_id):
+        with self._lock:
+            self._run_parents[run_id] = parent_run_id
+
+    def pop_run_span(self, run_id) -> Optional[Span]:
+        with self._lock:
+            span_id = self._run_spans.pop(run_id, None)
+            return self._spans.get(span_id) if span_id else None
+
+    def span_id_for_run(self, run_id) -> Optional[str]:
+        """沿 run 的父链向上查找最近一个被记录的 span"""
+        with self._lock:
+            seen = set()
+            while run_id is not None and run_id not in seen:
+                seen.add(run_id)
+                span_id = self._run_spans.get(run_id)
+                if span_id:
+                    return span_id
+                run_id = self._run_parents.get(run_id)
+        return None
+
+    # ---- 汇总 ----
+
+    def node_timings(self) -> Dict[str, float]:
+        """每个节点的累计耗时
+
+        只统计不包含其他节点的 node span（并行模式下的分支包装节点会被其内部节点代替），
+        同名节点多次执行（如分析师-工具循环）时累加。
+        """
+        spans = self.spans
+        parents_with_node_children = set()
+        by_id = {s.span_id: s for s in spans}
+        for s in spans:
+            if s.kind != SPAN_KIND_NODE:
+                continue
+            parent_id = s.parent_id
+            while parent_id:
+                parent = by_id.get(parent_id)
+                if parent is None:
+                    break
+                if parent.kind == SPAN_KIND_NODE:
+                    parents_with_node_children.add(parent.span_id)
+                    break
+                parent_id = parent.parent_id
+
+        timings: Dict[str, float] = {}
+        for s in spans:
+            if s.kind == SPAN_KIND_NODE and s.span_id not in parents_with_node_children:
+                timings[s.name] = timings.get(s.name, 0.0) + s.duration
+        return timings
+
+    def summary(self) -> Dict[str, Any]:
+        """按类型汇总耗时、token、缓存命中和数据源延迟"""
+        kinds: Dict[str, Dict[str, Any]] = {}
+        tokens = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        cache = {"hits": 0, "misses": 0}
+        llm_cache: Dict[str, Dict[str, Any]] = {}
+        data_sources: Dict[str, Dict[str, Any]] = {}
+
+        spans = self.spans
+        # 数据源 span 可能嵌套（如 MongoDB 未命中后降级到 Tushare），按自身耗时统计，避免重复计算
+        nested_time: Dict[str, float] = {}
+        by_id = {s.span_id: s for s in spans}
+        for s in spans:
+            if s.kind == SPAN_KIND_DATA_SOURCE and s.parent_id in by_id:
+                parent = by_id[s.parent_id]
+                if parent.kind == SPAN_KIND_DATA_SOURCE:
+                    nested_time[parent.span_id] = nested_time.get(parent.span_id, 0.0) + s.duration
+
+        for s in spans:
+            entry = kinds.setdefault(s.kind, {"count": 0, "total_time": 0.0, "errors": 0})
+            entry["count"] += 1
+            entry["total_time"] += s.duration
+            if s.status == "error":
+                entry["errors"] += 1
+
+            if s.kind == SPAN_KIND_LLM:
+                for key in tokens:
+                    tokens[key] += int(s.attributes.get(key) or 0)
+            if "cache_hit" in s.attributes:
+                cache["hits" if s.attributes["cache_hit"] else "misses"] += 1
+                if s.kind == SPAN_KIND_LLM:
+                    node = llm_cache.setdefault(s.attributes.get("node") or "unknown", {"hits": 0, "misses": 0})
+                    node["hits" if s.attributes["cache_hit"] else "misses"] += 1
+            if s.kind == SPAN_KIND_DATA_SOURCE:
+                source = s.attributes.get("source", s.name)
+                self_time = max(s.duration - nested_time.get(s.span_id, 0.0), 0.0)
+                ds = data_sources.setdefault(source, {"count": 0, "total_time": 0.0, "max_time": 0.0, "errors": 0})
+                ds["count"] += 1
+                ds["total_time"] += self_time
+                ds["max_time"] = max(ds["max_time"], self_time)
+                if s.status == "error":
+                    ds["errors"] += 1
+
+        for entry in llm_cache.values():
+            entry["hit_rate"] = round(entry["hits"] / (entry["hits"] + entry["misses"]), 3)
+
+        for entry in list(kinds.values()) + list(data_sources.values()):
+            for key in ("total_time", "max_time"):
+                if key in entry:
+                    entry[key] = round(entry[key], 3)
+
+        return {
+            "span_count": sum(e["count"] for e in kinds.values()),
+            "by_kind": kinds,
+            "llm_tokens": tokens,
+            "cache": cache,
+            "llm_cache": llm_cache,
+            "data_sources": data_sources,
+        }
+
+    def export(self) -> Dict[str, Any]:
+        """导出为可 JSON 序列化的字典（随任务一起保存）"""
+        return {
+            "trace_id": self.trace_id,
+            "start_time": self.start_time,
+            "duration": round(self.duration, 4),
+            "summary": self.summary(),
+            "spans": [s.to_dict(self.start_time) for s in self.spans],
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[AnalysisTrace]] = contextvars.ContextVar(
+    "tradingagents_current_trace", default=None
+)
+_current_span_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "tradingagents_current_span_id", default=None
+)
+
+
+def get_current_trace() -> Optional[AnalysisTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def activate_trace(trace: AnalysisTrace) -> Iterator[AnalysisTrace]:
+    """在当前上下文中激活 trace（LangGraph 的工作线程会继承上下文）"""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def _resolve_parent_span_id(trace: AnalysisTrace) -> Optional[str]:
+    span_id = _current_span_id.get()
+    if span_id:
+        return span_id
+    # 在工具/节点内部时，通过 LangChain 的运行时配置找到父 run
+    try:
+        from langchain_core.runnables.config import var_child_runnable_config
+        config = var_child_runnable_config.get() or {}
+        callbacks = config.get("callbacks")
+        parent_run_id = getattr(callbacks, "parent_run_id", None)
+        if parent_run_id is not None:
+            return trace.span_id_for_run(parent_run_id)
+    except Exception:
+        pass
+    return None
+
+
+@contextmanager
+def trace_span(name: str, kind: str = SPAN_KIND_OTHER, **attributes) -> Iterator[Optional[Span]]:
+    """记录一个 span；没有激活的 trace 时直接执行，yield None
+
+    在 with 块内可以通过 span.attributes 补充属性（如 cache_hit）。
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    span = trace.start_span(name, kind, _resolve_parent_span_id(trace), attributes)
+    token = _current_span_id.set(span.span_id)
+    try:
+        yield span
+    except BaseException as e:
+        trace.end_span(span, error=e)
+        raise
+    else:
+        trace.end_span(span)
+    finally:
+        _current_span_id.reset(token)
+
+
+def traced(kind: str = SPAN_KIND_OTHER, name: Optional[str] = None, **attributes) -> Callable:
+    """trace_span 的装饰器形式"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace_span(span_name, kind, **attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+def _extract_token_usage(response) -> Dict[str, int]:
+    """从 LLMResult 中提取 token 用量（兼容 llm_output 与 usage_metadata 两种格式）"""
+    usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    llm_output = getattr(response, "llm_output", None) or {}
+    token_usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+    if token_usage:
+        usage["input_tokens"] = int(token_usage.get("prompt_tokens") or token_usage.get("input_tokens") or 0)
+        usage["output_tokens"] = int(token_usage.get("completion_tokens") or token_usage.get("output_tokens") or 0)
+    else:
+        for generations in getattr(response, "generations", None) or []:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                metadata = getattr(message, "usage_metadata", None) or {}
+                usage["input_tokens"] += int(metadata.get("input_tokens") or 0)
+                usage["output_tokens"] += int(metadata.get("output_tokens") or 0)
+    usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+    return usage
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """把 LangGraph 节点、LLM 调用和工具调用记录为 span 的回调处理器"""
+
+    def __init__(self, trace: AnalysisTrace):
+        self.trace = trace
+
+    # ---- 节点 ----
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None,
+                       metadata=None, **kwargs):
+        self.trace.record_run_parent(run_id, parent_run_id)
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        metadata = metadata or {}
+        # 只记录 LangGraph 节点本身，节点内部的 Runnable（路由函数、提示链等）忽略
+        if not name or metadata.get("langgraph_node") != name:
+            return
+        span = self.trace.start_span(
+            name,
+            SPAN_KIND_NODE,
+            self.trace.span_id_for_run(parent_run_id),
+            {"langgraph_step": metadata.get("langgraph_step")},
+        )
+        self.trace.bind_run(run_id, span)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        span = self.trace.pop_run_span(run_id)
+        if span:
+            self.trace.end_span(span)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        span = self.trace.pop_run_span(run_id)
+        if span:
+            self.trace.end_span(span, error=error)
+
+    # ---- LLM ----
+
+    def _start_llm(self, serialized, run_id, parent_run_id, metadata, kwargs):
+        self.trace.record_run_parent(run_id, parent_run_id)
+        metadata = metadata or {}
+        serialized = serialized or {}
+        model = (
+            metadata.get("ls_model_name")
+            or (serialized.get("kwargs") or {}).get("model_name")
+            or (serialized.get("kwargs") or {}).get("model")
+            or kwargs.get("name")
+            or "llm"
+        )
+        span = self.trace.start_span(
+            f"llm:{model}",
+            SPAN_KIND_LLM,
+            self.trace.span_id_for_run(parent_run_id),
+            {"model": model, "provider": metadata.get("ls_provider"), "node": metadata.get("langgraph_node")},
+        )
+        self.trace.bind_run(run_id, span)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start_llm(serialized, run_id, parent_run_id, metadata, kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start_llm(serialized, run_id, parent_run_id, metadata, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self.trace.pop_run_span(run_id)
+        if span:
+            attributes = _extract_token_usage(response)
+            llm_output = getattr(response, "llm_output", None) or {}
+            cache_hit = llm_output.get("cache_hit")
+            if cache_hit is None:
+                # 流式调用没有 llm_output，缓存标记在 generation_info 中
+                try:
+                    cache_hit = (response.generations[0][0].generation_info or {}).get("cache_hit")
+                except (AttributeError, IndexError, TypeError):
+                    cache_hit = None
+            if cache_hit is not None:
+                attributes["cache_hit"] = bool(cache_hit)
+            self.trace.end_span(span, **attributes)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        span = self.trace.pop_run_span(run_id)
+        if span:
+            self.trace.end_span(span, error=error)
+
+    # ---- 工具 ----
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self.trace.record_run_parent(run_id, parent_run_id)
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        span = self.trace.start_span(
+            f"tool:{name}",
+            SPAN_KIND_TOOL,
+            self.trace.span_id_for_run(parent_run_id),
+            {"tool": name, "node": (metadata or {}).get("langgraph_node")},
+        )
+        self.trace.bind_run(run_id, span)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        span = self.trace.pop_run_span(run_id)
+        if span:
+            self.trace.end_span(span, output_length=len(str(output)) if output is not None else 0)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        span = self.trace.pop_run_span(run_id)
+        if span:
+            self.trace.end_span(span, error=error)
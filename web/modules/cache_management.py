@@ -267,18 +267,14 @@ def main():
     
     # 显示缓存文件列表
     try:
-        metadata_files = list(cache.metadata_dir.glob("*_meta.json"))
+        entries = cache.list_cache_entries(data_type)
         
-        if metadata_files:
-            import json
+        if entries:
             from datetime import datetime
             
             cache_items = []
-            for metadata_file in metadata_files:
+            for metadata in entries:
                 try:
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
                     if metadata.get('data_type') == data_type:
                         cached_at = datetime.fromisoformat(metadata['cached_at'])
                         cache_items.append({